@@ -0,0 +1,122 @@
+"""
+db_contention.py
+
+Measure how loading data requests into the database is affected by, and
+affects, processes that are reading the database at the same time, as the
+pre-processing tasks do. Each reader runs in its own process and repeatedly
+looks up data requests and their fixes until a stop file is created.
+"""
+import json
+import logging
+import os
+import sys
+import time
+
+from benchmarks.load_test import make_dmt_json, plan_tree
+
+logger = logging.getLogger(__name__)
+
+# The cases that the data requests are generated for
+CONTENTION_CASES = ['N96-Amon', 'ORCA1-Omon', 'ORCA1-Oday']
+
+
+def make_batches(num_data_requests, num_batches):
+    """
+    Generate the DMT JSON for the data requests, split into batches that are
+    each loaded separately.
+
+    :param int num_data_requests: The total number of data requests
+    :param int num_batches: The number of batches
+    :returns: The DMT JSON of each batch
+    :rtype: list
+    """
+    # With one file per dataset each file is a separate data request
+    file_specs = plan_tree(num_data_requests, CONTENTION_CASES,
+                           files_per_dataset=1)
+    batch_size = -(-len(file_specs) // num_batches)
+    return [make_dmt_json(file_specs[index:index + batch_size])
+            for index in range(0, len(file_specs), batch_size)]
+
+
+def run_reader(stop_path, interval=0.01):
+    """
+    Look up data requests and their fixes until the stop file exists. The
+    database must be specified in the environment before this is called.
+
+    :param str stop_path: The full path of the stop file
+    :param float interval: The time to wait between lookups in seconds, as
+        a pre-processing task spends most of its time running commands
+    :returns: The number of lookups, the number that failed because the
+        database was locked and the longest time taken by a lookup in
+        seconds
+    :rtype: dict
+    """
+    import django
+    django.setup()
+    from django.db.utils import OperationalError
+    from pre_proc_app.models import DataRequest, FileFix
+
+    num_queries = 0
+    num_locked = 0
+    max_latency = 0.0
+    index = 0
+    while not os.path.exists(stop_path):
+        start_time = time.perf_counter()
+        try:
+            data_reqs = DataRequest.objects.select_related(
+                'institution_id', 'source_id', 'experiment_id'
+            ).order_by('id')[index % 1000:index % 1000 + 10]
+            for data_req in data_reqs:
+                list(FileFix.objects.filter(
+                    fixprofile__datarequest=data_req
+                ).values_list('name', flat=True))
+            num_queries += 1
+        except OperationalError as exc:
+            if 'locked' not in str(exc):
+                raise
+            num_locked += 1
+        max_latency = max(max_latency, time.perf_counter() - start_time)
+        index += 10
+        time.sleep(interval)
+    return {
+        'queries': num_queries,
+        'locked': num_locked,
+        'max_latency': max_latency
+    }
+
+
+def summarise(mode, num_data_requests, ingest_time, ingest_failures,
+              reader_results, reader_time):
+    """
+    Summarise a contention test of one database mode.
+
+    :param str mode: The database mode
+    :param int num_data_requests: The number of data requests loaded
+    :param float ingest_time: The time taken to load them in seconds
+    :param int ingest_failures: The number of batches that failed to load
+    :param list reader_results: The results from each run_reader()
+    :param float reader_time: The time that the readers ran for in seconds
+    :returns: The summary
+    :rtype: dict
+    """
+    num_queries = sum(result['queries'] for result in reader_results)
+    return {
+        'mode': mode,
+        'num_readers': len(reader_results),
+        'num_data_requests': num_data_requests,
+        'ingest_time': ingest_time,
+        'data_requests_per_second': (num_data_requests / ingest_time
+                                     if ingest_time else None),
+        'ingest_failures': ingest_failures,
+        'reader_queries': num_queries,
+        'reader_queries_per_second': (num_queries / reader_time
+                                      if reader_time else None),
+        'reader_locked': sum(result['locked'] for result in reader_results),
+        'reader_max_latency': max([result['max_latency']
+                                   for result in reader_results] or [None])
+    }
+
+
+if __name__ == '__main__':
+    # Run as a reader process: db_contention.py <stop_path> <interval>
+    print(json.dumps(run_reader(sys.argv[1], float(sys.argv[2]))))
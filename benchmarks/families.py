@@ -0,0 +1,253 @@
+"""
+families.py
+
+A minimal concrete fix for each of the abstract fix families so that the
+cost of each family's mechanism can be measured on synthetic files without
+depending on the masks, grids and reference files on the JASMIN storage.
+These classes aren't part of pre_proc.file_fix and so are never added to
+the database.
+"""
+import shutil
+
+from pre_proc.file_fix.abstract import (AttributeAdd, AttributeUpdate,
+                                        CopyGlobalAttribute, FixHadGEMMask,
+                                        InsertHadGEMGrid, NcoDataFix,
+                                        NcksAppendDataFix, RemoveHalo)
+from pre_proc.exceptions import Ncap2Error
+
+from benchmarks.synthetic import MASK_VAR_NAME, REFERENCE_VAR_NAME
+
+
+class BenchmarkAttributeAdd(AttributeAdd):
+    """
+    Add a new global attribute.
+    """
+    def __init__(self, filename, directory, resources):
+        """
+        Initialise the class
+
+        :param str filename: The basename of the file to process.
+        :param str directory: The directory that the file is currently in.
+        :param dict resources: The paths of the generated resource files
+        """
+        super().__init__(filename, directory)
+        self.attribute_name = 'benchmark_attribute'
+        self.attribute_visibility = 'global'
+        self.attribute_type = 'c'
+
+    def _calculate_new_value(self):
+        """
+        The new value is a fixed string.
+        """
+        self.new_value = 'benchmark'
+
+
+class BenchmarkAttributeUpdate(AttributeUpdate):
+    """
+    Change the protocol in the further_info_url attribute from HTTP to
+    HTTPS.
+    """
+    def __init__(self, filename, directory, resources):
+        """
+        Initialise the class
+
+        :param str filename: The basename of the file to process.
+        :param str directory: The directory that the file is currently in.
+        :param dict resources: The paths of the generated resource files
+        """
+        super().__init__(filename, directory)
+        self.attribute_name = 'further_info_url'
+        self.attribute_visibility = 'global'
+        self.attribute_type = 'c'
+
+    def _calculate_new_value(self):
+        """
+        The new value is the existing URL with the HTTPS protocol.
+        """
+        self.new_value = self.existing_value.replace('http:', 'https:', 1)
+
+
+class BenchmarkCopyGlobalAttribute(CopyGlobalAttribute):
+    """
+    Replace the parent_source_id attribute value with the source_id value.
+    """
+    def __init__(self, filename, directory, resources):
+        """
+        Initialise the class
+
+        :param str filename: The basename of the file to process.
+        :param str directory: The directory that the file is currently in.
+        :param dict resources: The paths of the generated resource files
+        """
+        super().__init__(filename, directory)
+        self.source_attribute = 'source_id'
+        self.attribute_name = 'parent_source_id'
+        self.attribute_visibility = 'global'
+        self.attribute_type = 'c'
+
+
+class BenchmarkNcoDataFix(NcoDataFix):
+    """
+    Offset every data value with ncap2.
+    """
+    def __init__(self, filename, directory, resources):
+        """
+        Initialise the class
+
+        :param str filename: The basename of the file to process.
+        :param str directory: The directory that the file is currently in.
+        :param dict resources: The paths of the generated resource files
+        """
+        super().__init__(filename, directory)
+
+    def apply_fix(self):
+        """
+        Run the command.
+        """
+        self.command = ['ncap2', '-h', '-s',
+                        f'{self.variable_name}={self.variable_name}-273.15f']
+        self._run_nco_command(Ncap2Error)
+
+
+class BenchmarkNcksAppendDataFix(NcksAppendDataFix):
+    """
+    Append a scalar height coordinate from a reference file.
+    """
+    def __init__(self, filename, directory, resources):
+        """
+        Initialise the class
+
+        :param str filename: The basename of the file to process.
+        :param str directory: The directory that the file is currently in.
+        :param dict resources: The paths of the generated resource files
+        """
+        super().__init__(filename, directory)
+        self.reference_file = resources['reference']
+
+    def apply_fix(self):
+        """
+        Run the command.
+        """
+        self.command = ['ncks', '-h', '-A', '-v', REFERENCE_VAR_NAME,
+                        self.reference_file]
+        self._run_ncks_command()
+
+
+class BenchmarkRemoveHalo(RemoveHalo):
+    """
+    Remove the halo from an ocean grid.
+    """
+    def __init__(self, filename, directory, resources):
+        """
+        Initialise the class
+
+        :param str filename: The basename of the file to process.
+        :param str directory: The directory that the file is currently in.
+        :param dict resources: The paths of the generated resource files
+        """
+        super().__init__(filename, directory)
+        self._row_spec = resources['row_spec']
+
+    def _set_row_spec(self):
+        """Set the row specification"""
+        self.row_spec = self._row_spec
+
+
+class BenchmarkFixHadGEMMask(FixHadGEMMask):
+    """
+    Mask the data with a generated byte mask.
+    """
+    def __init__(self, filename, directory, resources):
+        """
+        Initialise the class
+
+        :param str filename: The basename of the file to process.
+        :param str directory: The directory that the file is currently in.
+        :param dict resources: The paths of the generated resource files
+        """
+        super().__init__(filename, directory)
+        self._mask_file = resources['mask']
+
+    def _set_byte_mask(self):
+        """Set the mask file and name"""
+        self.byte_mask_file = self._mask_file
+        self.mask_var_name = MASK_VAR_NAME
+
+
+class BenchmarkInsertHadGEMGrid(InsertHadGEMGrid):
+    """
+    Insert a generated grid.
+    """
+    def __init__(self, filename, directory, resources):
+        """
+        Initialise the class
+
+        :param str filename: The basename of the file to process.
+        :param str directory: The directory that the file is currently in.
+        :param dict resources: The paths of the generated resource files
+        """
+        super().__init__(filename, directory)
+        self._grid_file = resources['grid']
+
+    def _set_known_good(self):
+        """Set the known good grid file"""
+        self.known_good_file = self._grid_file
+
+
+# The benchmark for each family, keyed by the family's name, with the
+# external tools that it needs and whether it only applies to ocean grids
+FAMILIES = {
+    'AttributeAdd': {
+        'fix_class': BenchmarkAttributeAdd,
+        'tools': ['ncatted'],
+        'ocean_only': False
+    },
+    'AttributeUpdate': {
+        'fix_class': BenchmarkAttributeUpdate,
+        'tools': ['ncatted'],
+        'ocean_only': False
+    },
+    'CopyGlobalAttribute': {
+        'fix_class': BenchmarkCopyGlobalAttribute,
+        'tools': ['ncatted'],
+        'ocean_only': False
+    },
+    'NcoDataFix': {
+        'fix_class': BenchmarkNcoDataFix,
+        'tools': ['ncap2'],
+        'ocean_only': False
+    },
+    'NcksAppendDataFix': {
+        'fix_class': BenchmarkNcksAppendDataFix,
+        'tools': ['ncks'],
+        'ocean_only': False
+    },
+    'RemoveHalo': {
+        'fix_class': BenchmarkRemoveHalo,
+        'tools': ['ncks'],
+        'ocean_only': True
+    },
+    'FixHadGEMMask': {
+        'fix_class': BenchmarkFixHadGEMMask,
+        'tools': ['ncks', 'ncap2'],
+        'ocean_only': True
+    },
+    'InsertHadGEMGrid': {
+        'fix_class': BenchmarkInsertHadGEMGrid,
+        'tools': ['ncks'],
+        'ocean_only': True
+    }
+}
+
+
+def missing_tools(family_name):
+    """
+    Find the external tools needed by a family that aren't installed.
+
+    :param str family_name: The name of the family
+    :returns: The names of the missing tools
+    :rtype: list
+    """
+    return [tool for tool in FAMILIES[family_name]['tools']
+            if not shutil.which(tool)]
+
@@ -0,0 +1,347 @@
+"""
+load_test.py
+
+Build a synthetic DRS directory tree of files and the DMT JSON describing
+the data requests that they belong to, and summarise the performance of a
+run of run_pre_proc.py over the tree.
+"""
+import json
+import logging
+import math
+import os
+import shutil
+import sys
+import threading
+
+from benchmarks.synthetic import CASES, case_filename, write_case_file
+from pre_proc.staging import copy_file
+
+logger = logging.getLogger(__name__)
+
+# The external tools that a stand-in is created for if they're not installed
+STANDIN_TOOLS = ['ncatted', 'ncks', 'ncap2', 'ncpdq', 'ncrename', 'cdo']
+
+EXPERIMENTS = ['hist-1950', 'control-1950', 'highres-future',
+               'highresSST-present', 'highresSST-future', 'spinup-1950']
+
+# The fixes assigned to the data requests in each table. These don't need
+# any of the masks, grids or reference files on the JASMIN storage.
+DEFAULT_TABLE_FIXES = {
+    'Amon': ['FurtherInfoUrlToHttps', 'ParentSourceIdFromSourceId',
+             'RealmAtmos'],
+    'Omon': ['AAARemoveOrca1Halo', 'FurtherInfoUrlToHttps',
+             'ParentSourceIdFromSourceId', 'RealmOcean'],
+    'Oday': ['AAARemoveOrca1Halo', 'FurtherInfoUrlToHttps',
+             'ParentSourceIdFromSourceId', 'RealmOcean']
+}
+
+DEFAULT_LOAD_TEST_CASES = ['N96-Amon', 'ORCA1-Omon']
+
+INSTITUTION_ID = 'MOHC'
+VERSION = 'v20200101'
+
+
+def plan_tree(num_files, case_names, files_per_dataset=10):
+    """
+    Decide on the files in the tree, spreading them over datasets of
+    several files each with the cases, experiments and variants cycled
+    through in turn.
+
+    :param int num_files: The number of files
+    :param list case_names: The cases to generate files for
+    :param int files_per_dataset: The number of years of files in each
+        dataset
+    :returns: A dictionary for each file of its case, experiment, variant
+        and start year
+    :rtype: list
+    """
+    files = []
+    dataset_index = 0
+    while len(files) < num_files:
+        case_name = case_names[dataset_index % len(case_names)]
+        experiment_id = EXPERIMENTS[(dataset_index // len(case_names)) %
+                                    len(EXPERIMENTS)]
+        variant_label = 'r{}i1p1f1'.format(
+            dataset_index // (len(case_names) * len(EXPERIMENTS)) + 1
+        )
+        for year_index in range(min(files_per_dataset,
+                                    num_files - len(files))):
+            files.append({
+                'case': case_name,
+                'experiment_id': experiment_id,
+                'variant_label': variant_label,
+                'start_year': 1950 + year_index
+            })
+        dataset_index += 1
+    return files
+
+
+def make_dmt_json(file_specs):
+    """
+    Generate the DMT JSON, in the same format as example_data_requests.json,
+    for the data requests that the files belong to.
+
+    :param list file_specs: The files from plan_tree()
+    :returns: The JSON as a dictionary
+    :rtype: dict
+    """
+    def dmt_object(class_name, kwargs):
+        """ Create an object in the DMT's format """
+        return {
+            '__class__': class_name,
+            '__module__': 'pdata_app.models',
+            '__kwargs__': kwargs
+        }
+
+    source_ids = sorted({CASES[spec['case']]['source_id']
+                         for spec in file_specs})
+    experiment_ids = sorted({spec['experiment_id'] for spec in file_specs})
+    data_requests = {}
+    for spec in file_specs:
+        case = CASES[spec['case']]
+        key = (spec['case'], spec['experiment_id'], spec['variant_label'])
+        data_requests[key] = {
+            'table_id': case['table_id'],
+            'cmor_name': case['variable'],
+            'institution_id__name': INSTITUTION_ID,
+            'source_id__name': case['source_id'],
+            'experiment_id__name': spec['experiment_id'],
+            'variant_label': spec['variant_label']
+        }
+
+    return {
+        'source_id': [dmt_object('ClimateModel', {'short_name': name})
+                      for name in source_ids],
+        'experiment_id': [dmt_object('Experiment', {'short_name': name})
+                          for name in experiment_ids],
+        'institution_id': [dmt_object('Institution',
+                                      {'short_name': INSTITUTION_ID})],
+        'data_requests': [dmt_object('DataRequest', data_request)
+                          for data_request in data_requests.values()]
+    }
+
+
+def build_tree(file_specs, root_dir, template_dir, time_steps=1):
+    """
+    Create the files in a DRS directory structure. A template file is
+    generated for each case and copied, with a reflink where the file system
+    supports it, to each of the case's files.
+
+    :param list file_specs: The files from plan_tree()
+    :param str root_dir: The top of the DRS directory structure
+    :param str template_dir: The directory to generate the templates in
+    :param int time_steps: The number of time steps in each file
+    :returns: The total size of the files in bytes
+    :rtype: int
+    """
+    templates = {}
+    total_size = 0
+    os.makedirs(template_dir, exist_ok=True)
+    for spec in file_specs:
+        case_name = spec['case']
+        case = CASES[case_name]
+        if case_name not in templates:
+            templates[case_name] = write_case_file(case_name, template_dir,
+                                                   time_steps)
+        directory = os.path.join(
+            root_dir, 'HighResMIP', INSTITUTION_ID, case['source_id'],
+            spec['experiment_id'], spec['variant_label'], case['table_id'],
+            case['variable'], 'gn', VERSION
+        )
+        os.makedirs(directory, exist_ok=True)
+        filepath = os.path.join(
+            directory,
+            case_filename(case_name, spec['experiment_id'],
+                          spec['variant_label'], spec['start_year'])
+        )
+        copy_file(templates[case_name], filepath)
+        total_size += os.path.getsize(filepath)
+    return total_size
+
+
+def write_standins(bin_dir, tools=None):
+    """
+    Create a stand-in for each external tool that isn't installed.
+
+    :param str bin_dir: The directory to create the stand-ins in, which
+        should be put at the start of the PATH
+    :param list tools: The tools to check, which default to STANDIN_TOOLS
+    :returns: The names of the tools that stand-ins were created for
+    :rtype: list
+    """
+    standin_script = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                  'standin_nco.py')
+    created = []
+    os.makedirs(bin_dir, exist_ok=True)
+    for tool in tools or STANDIN_TOOLS:
+        if shutil.which(tool):
+            continue
+        tool_path = os.path.join(bin_dir, tool)
+        with open(tool_path, 'w') as fh:
+            fh.write('#!/bin/sh\nexec {} {} {} "$@"\n'.format(
+                sys.executable, standin_script, tool
+            ))
+        os.chmod(tool_path, 0o755)
+        created.append(tool)
+    return created
+
+
+def assign_fixes(table_fixes):
+    """
+    Assign the fixes to the data requests in each table. The database must
+    be specified in the environment before this is called.
+
+    :param dict table_fixes: The names of the fixes keyed by table
+    :returns: The number of data requests that fixes were assigned to
+    :rtype: int
+    """
+    import django
+    django.setup()
+    from pre_proc_app.bulk import add_fixes
+    from pre_proc_app.models import DataRequest, FileFix
+
+    num_assigned = 0
+    for table_id, fix_names in table_fixes.items():
+        data_reqs = DataRequest.objects.filter(table_id=table_id)
+        add_fixes(data_reqs, FileFix.objects.filter(name__in=fix_names))
+        num_assigned += data_reqs.count()
+    return num_assigned
+
+
+class DirectoryMonitor(object):
+    """
+    Poll the total size of the files in a directory in a background thread
+    and record the peak.
+    """
+    def __init__(self, directory, interval=0.2):
+        """
+        Initialise the class
+
+        :param str directory: The directory to monitor
+        :param float interval: The time between polls in seconds
+        """
+        self.directory = directory
+        self.interval = interval
+        self.peak_size = 0
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._poll, daemon=True)
+
+    def start(self):
+        """
+        Start polling.
+        """
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop polling.
+        """
+        self._stop_event.set()
+        self._thread.join()
+
+    def _poll(self):
+        """
+        Poll the directory until stopped.
+        """
+        while True:
+            self.peak_size = max(self.peak_size,
+                                 directory_size(self.directory))
+            if self._stop_event.wait(self.interval):
+                break
+
+
+def directory_size(directory):
+    """
+    Calculate the total size of the files in a directory tree. Files that
+    disappear while the tree is walked are ignored.
+
+    :param str directory: The top of the directory tree
+    :returns: The size in bytes
+    :rtype: int
+    """
+    total_size = 0
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                total_size += directory_size(entry.path)
+            else:
+                total_size += entry.stat(follow_symlinks=False).st_size
+        except FileNotFoundError:
+            pass
+    return total_size
+
+
+def percentile(values, fraction):
+    """
+    Calculate a percentile using the nearest-rank method.
+
+    :param list values: The values
+    :param float fraction: The percentile as a fraction, e.g. 0.95
+    :returns: The percentile or None if there are no values
+    :rtype: float
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(fraction * len(ordered)), 1)
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def file_latencies(journal_path):
+    """
+    Calculate the time taken to fix each file from the times that the
+    journal recorded it as started and done.
+
+    :param str journal_path: The full path to the resume journal
+    :returns: The latencies in seconds of the files that were completed and
+        the number of files that failed
+    :rtype: tuple
+    """
+    started = {}
+    latencies = []
+    num_failed = 0
+    with open(journal_path) as fh:
+        for line in fh:
+            entry = json.loads(line)
+            if entry['status'] == 'started':
+                started[entry['path']] = entry['time']
+            elif entry['status'] == 'done' and entry['path'] in started:
+                latencies.append(entry['time'] - started[entry['path']])
+            elif entry['status'] == 'failed':
+                num_failed += 1
+    return latencies, num_failed
+
+
+def summarise(num_files, total_size, wall_time, latencies, num_failed,
+              peak_rss_kb, peak_scratch, standins):
+    """
+    Summarise a load test run.
+
+    :param int num_files: The number of files in the tree
+    :param int total_size: The total size of the files in bytes
+    :param float wall_time: The run's wall time in seconds
+    :param list latencies: The time taken to fix each file in seconds
+    :param int num_failed: The number of files that failed
+    :param int peak_rss_kb: The peak resident set size in kilobytes
+    :param int peak_scratch: The peak scratch use in bytes
+    :param list standins: The tools that stand-ins were used for
+    :returns: The summary
+    :rtype: dict
+    """
+    return {
+        'num_files': num_files,
+        'num_failed': num_failed,
+        'total_size': total_size,
+        'wall_time': wall_time,
+        'files_per_second': num_files / wall_time if wall_time else None,
+        'latency_p50': percentile(latencies, 0.5),
+        'latency_p95': percentile(latencies, 0.95),
+        'peak_rss_mb': peak_rss_kb / 1024.,
+        'peak_scratch_mb': peak_scratch / 1024. ** 2,
+        'standins': standins
+    }
+
@@ -0,0 +1,163 @@
+"""
+runner.py
+
+Time each fix family on the synthetic files, save the results as a
+baseline and compare the results from different revisions.
+"""
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import time
+
+from benchmarks.families import FAMILIES, missing_tools
+from benchmarks.synthetic import (CASES, GRIDS, write_case_file,
+                                  write_grid_file, write_mask_file,
+                                  write_reference_file)
+
+logger = logging.getLogger(__name__)
+
+# The default fractional slow down that is reported as a regression
+DEFAULT_THRESHOLD = 0.1
+
+
+def run_benchmarks(case_names, family_names, work_dir, repeats=3,
+                   time_steps=None):
+    """
+    Time each family on each case. A fresh copy of the case's file is made
+    before each repetition and only the fix itself is timed.
+
+    :param list case_names: The cases to run
+    :param list family_names: The families to time
+    :param str work_dir: A directory to generate the files in
+    :param int repeats: The number of times to run each fix
+    :param int time_steps: Override the number of time steps in each case
+    :returns: The timings keyed by `case/family`
+    :rtype: dict
+    """
+    results = {}
+    available_families = []
+    for family_name in family_names:
+        missing = missing_tools(family_name)
+        if missing:
+            logger.warning('Skipping {} because {} not found'.
+                           format(family_name, ', '.join(missing)))
+        else:
+            available_families.append(family_name)
+
+    for case_name in case_names:
+        grid_name = CASES[case_name]['grid']
+        grid = GRIDS[grid_name]
+        case_dir = os.path.join(work_dir, case_name)
+        run_dir = os.path.join(case_dir, 'run')
+        os.makedirs(run_dir, exist_ok=True)
+        pristine_file = write_case_file(case_name, case_dir, time_steps)
+        filename = os.path.basename(pristine_file)
+        resources = {
+            'row_spec': grid['row_spec'],
+            'reference': write_reference_file(case_dir)
+        }
+        if grid['ocean']:
+            resources['mask'] = write_mask_file(grid_name, case_dir)
+            resources['grid'] = write_grid_file(grid_name, case_dir)
+
+        for family_name in available_families:
+            family = FAMILIES[family_name]
+            if family['ocean_only'] and not grid['ocean']:
+                continue
+            timings = []
+            for _repeat in range(repeats):
+                run_file = os.path.join(run_dir, filename)
+                shutil.copyfile(pristine_file, run_file)
+                fix = family['fix_class'](filename, run_dir, resources)
+                start_time = time.perf_counter()
+                fix.apply_fix()
+                timings.append(time.perf_counter() - start_time)
+                os.remove(run_file)
+            key = '{}/{}'.format(case_name, family_name)
+            results[key] = {
+                'size': os.path.getsize(pristine_file),
+                'repeats': repeats,
+                'min': min(timings),
+                'median': statistics.median(timings)
+            }
+            logger.info('{}: median {:.3f} s'.format(key,
+                                                     results[key]['median']))
+        shutil.rmtree(case_dir)
+
+    return results
+
+
+def save_results(results, filepath, revision=None):
+    """
+    Save benchmark results with details of where they were run.
+
+    :param dict results: The timings
+    :param str filepath: The JSON file to write
+    :param str revision: The revision of the code that was benchmarked
+    """
+    output = {
+        'revision': revision,
+        'host': platform.node(),
+        'python': platform.python_version(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'results': results
+    }
+    with open(filepath, 'w') as fh:
+        json.dump(output, fh, indent=4, sort_keys=True)
+
+
+def load_results(filepath):
+    """
+    Load benchmark results.
+
+    :param str filepath: The JSON file to read
+    :returns: The saved results and their details
+    :rtype: dict
+    """
+    with open(filepath) as fh:
+        return json.load(fh)
+
+
+def compare_results(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare the median timings of two sets of results. Only the benchmarks
+    that are in both sets are compared.
+
+    :param dict baseline: The baseline timings keyed by `case/family`
+    :param dict current: The new timings keyed by `case/family`
+    :param float threshold: The fractional slow down that is reported as a
+        regression
+    :returns: A tuple for each benchmark of its name, the baseline and
+        current medians, their ratio and whether it's a regression
+    :rtype: list
+    """
+    comparison = []
+    for key in sorted(set(baseline) & set(current)):
+        base_median = baseline[key]['median']
+        current_median = current[key]['median']
+        ratio = current_median / base_median if base_median else float('inf')
+        comparison.append((key, base_median, current_median, ratio,
+                           ratio > 1. + threshold))
+    return comparison
+
+
+def format_comparison(comparison):
+    """
+    Format a comparison as a table.
+
+    :param list comparison: The output from compare_results()
+    :returns: The table
+    :rtype: str
+    """
+    header = '{:<40} {:>10} {:>10} {:>8}'.format('benchmark', 'base (s)',
+                                                 'new (s)', 'ratio')
+    lines = [header, '-' * len(header)]
+    for key, base_median, current_median, ratio, regressed in comparison:
+        lines.append('{:<40} {:>10.3f} {:>10.3f} {:>8.2f}{}'.format(
+            key, base_median, current_median, ratio,
+            '  REGRESSION' if regressed else ''
+        ))
+    return '\n'.join(lines)
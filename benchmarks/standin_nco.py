@@ -0,0 +1,68 @@
+"""
+standin_nco.py
+
+A stand-in for the NCO and cdo command-line tools so that the load test can
+be run on a machine where they aren't installed. The data isn't changed but
+the files are read and written in the same pattern as the real tools: tools
+that edit a file in place update its modification time and tools that write
+an output file copy the input file to it.
+
+Usage: python standin_nco.py <tool> [arguments...]
+"""
+import os
+import shutil
+import sys
+
+# The options that take a separate value, which isn't a file
+VALUE_OPTIONS = ['-a', '-d', '-s', '-v', '-L']
+# The tools that only edit files in place
+IN_PLACE_TOOLS = ['ncatted', 'ncrename']
+
+
+def find_files(arguments):
+    """
+    Find the file arguments, which are those that aren't options or option
+    values.
+
+    :param list arguments: The command-line arguments
+    :returns: The file paths in the order that they were given
+    :rtype: list
+    """
+    files = []
+    skip_next = False
+    for argument in arguments:
+        if skip_next:
+            skip_next = False
+        elif argument in VALUE_OPTIONS:
+            skip_next = True
+        elif not argument.startswith('-') and (os.sep in argument or
+                                               argument.endswith('.nc')):
+            files.append(argument)
+    return files
+
+
+def main(tool, arguments):
+    """
+    Emulate the tool's effect on the files.
+
+    :param str tool: The name of the tool being emulated
+    :param list arguments: The command-line arguments
+    :returns: The exit status
+    :rtype: int
+    """
+    files = find_files(arguments)
+    for filepath in files[:-1] if len(files) > 1 else files:
+        if not os.path.exists(filepath):
+            sys.stderr.write('{}: unable to open {}\n'.format(tool, filepath))
+            return 1
+
+    if tool in IN_PLACE_TOOLS or '-A' in arguments or len(files) < 2:
+        if files:
+            os.utime(files[-1])
+    else:
+        shutil.copyfile(files[-2], files[-1])
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1], sys.argv[2:]))
@@ -0,0 +1,338 @@
+"""
+synthetic.py
+
+Generate synthetic CMIP6-like netCDF files, and the masks, grids and
+reference files that some fixes paste into them, on the grids used by the
+PRIMAVERA models at realistic sizes.
+"""
+import logging
+import os
+
+from netCDF4 import Dataset
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FILL_VALUE = np.float32(1.e20)
+
+# The horizontal grids. The shape of the ocean grids includes the halo, which
+# is removed by the RemoveHalo row specification.
+GRIDS = {
+    'N96': {
+        'ocean': False,
+        'dims': ('lat', 'lon'),
+        'shape': (144, 192),
+        'row_spec': None
+    },
+    'ORCA1': {
+        'ocean': True,
+        'dims': ('j', 'i'),
+        'shape': (332, 362),
+        'row_spec': ['-di,1,360', '-dj,1,330']
+    },
+    'ORCA025': {
+        'ocean': True,
+        'dims': ('j', 'i'),
+        'shape': (1207, 1442),
+        'row_spec': ['-di,1,1440', '-dj,1,1205']
+    },
+    'eORCA12': {
+        'ocean': True,
+        'dims': ('j', 'i'),
+        'shape': (3606, 4322),
+        'row_spec': ['-di,1,4320', '-dj,1,3604']
+    }
+}
+
+# The files that can be generated. The number of time steps is that in a
+# typical file, although daily files are a month rather than a year long to
+# keep the time taken to generate them reasonable.
+CASES = {
+    'N96-Amon': {
+        'grid': 'N96',
+        'table_id': 'Amon',
+        'variable': 'tas',
+        'units': 'K',
+        'source_id': 'HadGEM3-GC31-LL',
+        'time_steps': 12
+    },
+    'ORCA1-Omon': {
+        'grid': 'ORCA1',
+        'table_id': 'Omon',
+        'variable': 'tos',
+        'units': 'degC',
+        'source_id': 'HadGEM3-GC31-LL',
+        'time_steps': 12
+    },
+    'ORCA1-Oday': {
+        'grid': 'ORCA1',
+        'table_id': 'Oday',
+        'variable': 'tos',
+        'units': 'degC',
+        'source_id': 'HadGEM3-GC31-LL',
+        'time_steps': 30
+    },
+    'ORCA025-Omon': {
+        'grid': 'ORCA025',
+        'table_id': 'Omon',
+        'variable': 'tos',
+        'units': 'degC',
+        'source_id': 'HadGEM3-GC31-MM',
+        'time_steps': 12
+    },
+    'ORCA025-Oday': {
+        'grid': 'ORCA025',
+        'table_id': 'Oday',
+        'variable': 'tos',
+        'units': 'degC',
+        'source_id': 'HadGEM3-GC31-MM',
+        'time_steps': 30
+    },
+    'eORCA12-SIday': {
+        'grid': 'eORCA12',
+        'table_id': 'SIday',
+        'variable': 'siconc',
+        'units': '%',
+        'source_id': 'HadGEM3-GC31-HH',
+        'time_steps': 30
+    }
+}
+
+# The cases that are run by default, which are small enough to be run
+# frequently
+DEFAULT_CASES = ['N96-Amon', 'ORCA1-Omon']
+
+# The names of the variables in the generated files
+MASK_VAR_NAME = 'mask_2D_T'
+REFERENCE_VAR_NAME = 'height'
+
+
+def case_filename(case_name, experiment_id='hist-1950',
+                  variant_label='r1i1p1f1', start_year=1950):
+    """
+    Generate a CMIP6 filename for a case.
+
+    :param str case_name: The name of the case
+    :param str experiment_id: The experiment
+    :param str variant_label: The variant label
+    :param int start_year: The year that the file's data starts in
+    :returns: The filename
+    :rtype: str
+    """
+    case = CASES[case_name]
+    if case['table_id'].endswith('mon'):
+        time_range = '{0}01-{0}12'.format(start_year)
+    else:
+        time_range = '{0}0101-{0}0130'.format(start_year)
+    return '{}_{}_{}_{}_{}_gn_{}.nc'.format(
+        case['variable'], case['table_id'], case['source_id'],
+        experiment_id, variant_label, time_range
+    )
+
+
+def write_case_file(case_name, directory, time_steps=None, filename=None,
+                    experiment_id='hist-1950', variant_label='r1i1p1f1'):
+    """
+    Write a synthetic data file for a case. The data is a smooth field that
+    compresses to a realistic extent and is written one time step at a time
+    so that large grids don't need to be held in memory.
+
+    :param str case_name: The name of the case
+    :param str directory: The directory to write the file to
+    :param int time_steps: The number of time steps, which defaults to the
+        case's number
+    :param str filename: The file's name, which defaults to a CMIP6 name
+    :param str experiment_id: The experiment
+    :param str variant_label: The variant label
+    :returns: The full path of the file
+    :rtype: str
+    """
+    case = CASES[case_name]
+    grid = GRIDS[case['grid']]
+    if time_steps is None:
+        time_steps = case['time_steps']
+    if filename is None:
+        filename = case_filename(case_name, experiment_id, variant_label)
+    filepath = os.path.join(directory, filename)
+    y_dim, x_dim = grid['dims']
+    y_len, x_len = grid['shape']
+
+    with Dataset(filepath, 'w') as rootgrp:
+        rootgrp.createDimension('time', None)
+        rootgrp.createDimension(y_dim, y_len)
+        rootgrp.createDimension(x_dim, x_len)
+        rootgrp.createDimension('bnds', 2)
+
+        _write_global_attributes(rootgrp, case, experiment_id, variant_label)
+
+        time = rootgrp.createVariable('time', 'f8', ('time',))
+        time.units = 'days since 1950-01-01'
+        time.calendar = '360_day'
+        time.bounds = 'time_bnds'
+        time_bnds = rootgrp.createVariable('time_bnds', 'f8',
+                                           ('time', 'bnds'))
+        if grid['ocean']:
+            _write_curvilinear_coords(rootgrp, grid)
+            coordinates = 'latitude longitude'
+        else:
+            _write_regular_coords(rootgrp, grid)
+            coordinates = None
+
+        var = rootgrp.createVariable(case['variable'], 'f4',
+                                     ('time', y_dim, x_dim), zlib=True,
+                                     complevel=1, shuffle=True,
+                                     fill_value=FILL_VALUE)
+        var.units = case['units']
+        var.missing_value = FILL_VALUE
+        var.cell_methods = 'area: mean time: mean'
+        if coordinates:
+            var.coordinates = coordinates
+
+        y_index, x_index = np.meshgrid(np.linspace(0, np.pi, y_len),
+                                       np.linspace(0, 2 * np.pi, x_len),
+                                       indexing='ij')
+        time_spacing = 30. if case['table_id'].endswith('mon') else 1.
+        for index in range(time_steps):
+            time[index] = (index + 0.5) * time_spacing
+            time_bnds[index] = [index * time_spacing,
+                                (index + 1) * time_spacing]
+            var[index] = (np.sin(y_index + index * 0.1) *
+                          np.cos(x_index) * 10. + 280.).astype(np.float32)
+
+    logger.debug('Created {}'.format(filepath))
+    return filepath
+
+
+def write_mask_file(grid_name, directory):
+    """
+    Write a byte mask for a grid, as used by FixHadGEMMask.
+
+    :param str grid_name: The name of the grid
+    :param str directory: The directory to write the file to
+    :returns: The full path of the file
+    :rtype: str
+    """
+    grid = GRIDS[grid_name]
+    filepath = os.path.join(directory, '{}_byte_mask.nc'.format(grid_name))
+    y_len, x_len = grid['shape']
+    with Dataset(filepath, 'w') as rootgrp:
+        rootgrp.createDimension(grid['dims'][0], y_len)
+        rootgrp.createDimension(grid['dims'][1], x_len)
+        mask = rootgrp.createVariable(MASK_VAR_NAME, 'i1', grid['dims'])
+        mask_data = np.zeros((y_len, x_len), dtype=np.int8)
+        mask_data[:, :x_len // 10] = 1
+        mask[:] = mask_data
+    return filepath
+
+
+def write_grid_file(grid_name, directory):
+    """
+    Write a known good grid, as used by InsertHadGEMGrid.
+
+    :param str grid_name: The name of the grid
+    :param str directory: The directory to write the file to
+    :returns: The full path of the file
+    :rtype: str
+    """
+    grid = GRIDS[grid_name]
+    filepath = os.path.join(directory, '{}_grid.nc'.format(grid_name))
+    with Dataset(filepath, 'w') as rootgrp:
+        rootgrp.createDimension(grid['dims'][0], grid['shape'][0])
+        rootgrp.createDimension(grid['dims'][1], grid['shape'][1])
+        _write_curvilinear_coords(rootgrp, grid)
+    return filepath
+
+
+def write_reference_file(directory):
+    """
+    Write a reference file containing a scalar height coordinate, as
+    appended by NcksAppendDataFix.
+
+    :param str directory: The directory to write the file to
+    :returns: The full path of the file
+    :rtype: str
+    """
+    filepath = os.path.join(directory, 'height2m_reference.nc')
+    with Dataset(filepath, 'w') as rootgrp:
+        height = rootgrp.createVariable(REFERENCE_VAR_NAME, 'f8')
+        height.units = 'm'
+        height.axis = 'Z'
+        height.positive = 'up'
+        height[:] = 2.0
+    return filepath
+
+
+def _write_global_attributes(rootgrp, case, experiment_id, variant_label):
+    """
+    Write the CMIP6 global attributes that the fixes work on.
+
+    :param netCDF4.Dataset rootgrp: The file
+    :param dict case: The case
+    :param str experiment_id: The experiment
+    :param str variant_label: The variant label
+    """
+    rootgrp.Conventions = 'CF-1.7 CMIP-6.2'
+    rootgrp.activity_id = 'HighResMIP'
+    rootgrp.branch_time_in_parent = 0.0
+    rootgrp.data_specs_version = '01.00.23'
+    rootgrp.experiment_id = experiment_id
+    rootgrp.further_info_url = (
+        'http://furtherinfo.es-doc.org/CMIP6.MOHC.{}.{}.none.{}'.
+        format(case['source_id'], experiment_id, variant_label)
+    )
+    rootgrp.history = '1970-01-01T00:00:00Z synthetic file'
+    rootgrp.institution_id = 'MOHC'
+    rootgrp.mip_era = 'CMIP6'
+    rootgrp.parent_source_id = 'unknown'
+    rootgrp.source_id = case['source_id']
+    rootgrp.table_id = case['table_id']
+    rootgrp.tracking_id = 'hdl:21.14100/00000000-0000-0000-0000-000000000000'
+    rootgrp.variable_id = case['variable']
+    rootgrp.variant_label = variant_label
+
+
+def _write_regular_coords(rootgrp, grid):
+    """
+    Write the latitude and longitude coordinates of a regular grid.
+
+    :param netCDF4.Dataset rootgrp: The file
+    :param dict grid: The grid
+    """
+    y_len, x_len = grid['shape']
+    lat = rootgrp.createVariable('lat', 'f8', ('lat',))
+    lat.units = 'degrees_north'
+    lat.standard_name = 'latitude'
+    lat[:] = np.linspace(-90. + 90. / y_len, 90. - 90. / y_len, y_len)
+    lon = rootgrp.createVariable('lon', 'f8', ('lon',))
+    lon.units = 'degrees_east'
+    lon.standard_name = 'longitude'
+    lon[:] = np.linspace(0., 360. - 360. / x_len, x_len)
+
+
+def _write_curvilinear_coords(rootgrp, grid):
+    """
+    Write the two-dimensional latitude and longitude coordinates, and their
+    vertices, of an ocean grid.
+
+    :param netCDF4.Dataset rootgrp: The file
+    :param dict grid: The grid
+    """
+    y_len, x_len = grid['shape']
+    if 'vertices' not in rootgrp.dimensions:
+        rootgrp.createDimension('vertices', 4)
+    lats, lons = np.meshgrid(np.linspace(-78., 89., y_len),
+                             np.linspace(0., 360., x_len, endpoint=False),
+                             indexing='ij')
+    offsets = np.array([-0.5, -0.5, 0.5, 0.5])
+    for name, values, units in (('latitude', lats, 'degrees_north'),
+                                ('longitude', lons, 'degrees_east')):
+        var = rootgrp.createVariable(name, 'f8', grid['dims'], zlib=True)
+        var.units = units
+        var.standard_name = name
+        var.bounds = 'vertices_{}'.format(name)
+        var[:] = values
+        vertices = rootgrp.createVariable('vertices_{}'.format(name), 'f8',
+                                          grid['dims'] + ('vertices',),
+                                          zlib=True)
+        vertices.units = units
+        vertices[:] = values[..., np.newaxis] + offsets
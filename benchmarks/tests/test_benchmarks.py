@@ -0,0 +1,88 @@
+"""
+test_benchmarks.py
+
+Unit tests for the benchmarks package
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from netCDF4 import Dataset
+
+from benchmarks.runner import compare_results, run_benchmarks
+from benchmarks.synthetic import write_case_file, write_grid_file
+
+
+class TestSynthetic(unittest.TestCase):
+    """ Test benchmarks.synthetic """
+    def setUp(self):
+        """ Create a temporary directory """
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+
+    def test_ocean_case(self):
+        """ Test that an ocean file has the grid's shape and a CMIP6 name """
+        filepath = write_case_file('ORCA1-Omon', self.temp_dir, time_steps=2)
+        self.assertEqual('tos_Omon_HadGEM3-GC31-LL_hist-1950_r1i1p1f1_gn_'
+                         '195001-195012.nc', os.path.basename(filepath))
+        with Dataset(filepath) as rootgrp:
+            self.assertEqual((2, 332, 362), rootgrp.variables['tos'].shape)
+            self.assertEqual('HadGEM3-GC31-LL', rootgrp.source_id)
+
+    def test_grid_file(self):
+        """ Test that the grid file contains the vertices """
+        filepath = write_grid_file('ORCA1', self.temp_dir)
+        with Dataset(filepath) as rootgrp:
+            self.assertEqual(
+                (332, 362, 4),
+                rootgrp.variables['vertices_latitude'].shape
+            )
+
+
+class TestRunBenchmarks(unittest.TestCase):
+    """ Test benchmarks.runner.run_benchmarks """
+    def setUp(self):
+        """ Create a temporary directory and mock the commands """
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+
+        patch = mock.patch('benchmarks.runner.missing_tools')
+        self.mock_missing = patch.start()
+        self.mock_missing.return_value = []
+        self.addCleanup(patch.stop)
+
+        patch = mock.patch('pre_proc.file_fix.abstract.run_command')
+        self.mock_run_cmd = patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_ocean_only_families(self):
+        """ Test that the ocean families aren't run on atmosphere grids """
+        results = run_benchmarks(['N96-Amon'],
+                                 ['AttributeAdd', 'FixHadGEMMask'],
+                                 self.temp_dir, repeats=2, time_steps=1)
+        self.assertEqual(['N96-Amon/AttributeAdd'], list(results))
+        self.assertEqual(2, results['N96-Amon/AttributeAdd']['repeats'])
+        self.assertEqual(2, self.mock_run_cmd.call_count)
+
+    def test_missing_tools_skipped(self):
+        """ Test that a family is skipped if its tools aren't installed """
+        self.mock_missing.return_value = ['ncatted']
+        results = run_benchmarks(['N96-Amon'], ['AttributeAdd'],
+                                 self.temp_dir, repeats=1, time_steps=1)
+        self.assertEqual({}, results)
+
+
+class TestCompareResults(unittest.TestCase):
+    """ Test benchmarks.runner.compare_results """
+    def test_regression(self):
+        """ Test that a slow down beyond the threshold is a regression """
+        baseline = {'a/b': {'median': 1.0}, 'c/d': {'median': 2.0},
+                    'e/f': {'median': 1.0}}
+        current = {'a/b': {'median': 1.05}, 'c/d': {'median': 3.0}}
+        comparison = compare_results(baseline, current, 0.1)
+        self.assertEqual(['a/b', 'c/d'], [row[0] for row in comparison])
+        self.assertFalse(comparison[0][-1])
+        self.assertTrue(comparison[1][-1])
+        self.assertEqual(1.5, comparison[1][3])
@@ -0,0 +1,39 @@
+"""
+test_db_contention.py - unit tests for benchmarks.db_contention
+"""
+import unittest
+
+from benchmarks.db_contention import make_batches, summarise
+
+
+class TestMakeBatches(unittest.TestCase):
+    """ Test benchmarks.db_contention.make_batches """
+    def test_batches(self):
+        """ Test that the data requests are split between the batches """
+        batches = make_batches(25, 3)
+        self.assertEqual([9, 9, 7], [len(batch['data_requests'])
+                                     for batch in batches])
+        keys = {tuple(sorted(data_req['__kwargs__'].items()))
+                for batch in batches for data_req in batch['data_requests']}
+        self.assertEqual(25, len(keys))
+
+
+class TestSummarise(unittest.TestCase):
+    """ Test benchmarks.db_contention.summarise """
+    def test_summarise(self):
+        """ Test that the readers' results are combined """
+        summary = summarise(
+            'wal', 100, 4.0, 0,
+            [{'queries': 30, 'locked': 0, 'max_latency': 0.1},
+             {'queries': 20, 'locked': 2, 'max_latency': 0.3}],
+            5.0
+        )
+        self.assertEqual(25.0, summary['data_requests_per_second'])
+        self.assertEqual(10.0, summary['reader_queries_per_second'])
+        self.assertEqual(2, summary['reader_locked'])
+        self.assertEqual(0.3, summary['reader_max_latency'])
+        self.assertEqual(2, summary['num_readers'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+test_load_test.py
+
+Unit tests for benchmarks.load_test and benchmarks.standin_nco
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from benchmarks import standin_nco
+from benchmarks.load_test import (file_latencies, make_dmt_json, percentile,
+                                  plan_tree)
+
+
+class TestPlanTree(unittest.TestCase):
+    """ Test benchmarks.load_test.plan_tree """
+    def test_datasets(self):
+        """ Test that the files are split into datasets """
+        file_specs = plan_tree(25, ['N96-Amon', 'ORCA1-Omon'], 10)
+        self.assertEqual(25, len(file_specs))
+        self.assertEqual('N96-Amon', file_specs[0]['case'])
+        self.assertEqual('ORCA1-Omon', file_specs[10]['case'])
+        self.assertEqual('control-1950', file_specs[20]['experiment_id'])
+        self.assertEqual(1954, file_specs[24]['start_year'])
+
+    def test_dmt_json(self):
+        """ Test that there's a data request for each dataset """
+        dmt_json = make_dmt_json(plan_tree(25, ['N96-Amon', 'ORCA1-Omon'],
+                                           10))
+        self.assertEqual(3, len(dmt_json['data_requests']))
+        self.assertEqual(['control-1950', 'hist-1950'],
+                         [exp['__kwargs__']['short_name']
+                          for exp in dmt_json['experiment_id']])
+
+
+class TestFileLatencies(unittest.TestCase):
+    """ Test benchmarks.load_test.file_latencies and percentile """
+    def setUp(self):
+        """ Create a journal """
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.journal_path = os.path.join(self.temp_dir, 'journal.jsonl')
+        entries = [('/a.nc', 'started', 1.0), ('/a.nc', 'done', 3.0),
+                   ('/b.nc', 'started', 3.0), ('/b.nc', 'failed', 4.0)]
+        with open(self.journal_path, 'w') as fh:
+            for path, status, time in entries:
+                fh.write(json.dumps({'path': path, 'status': status,
+                                     'time': time}) + '\n')
+
+    def test_latencies(self):
+        """ Test that only completed files have a latency """
+        self.assertEqual(([2.0], 1), file_latencies(self.journal_path))
+
+    def test_percentile(self):
+        """ Test the nearest-rank percentile """
+        values = list(range(1, 101))
+        self.assertEqual(50, percentile(values, 0.5))
+        self.assertEqual(95, percentile(values, 0.95))
+        self.assertIsNone(percentile([], 0.5))
+
+
+class TestStandinNco(unittest.TestCase):
+    """ Test benchmarks.standin_nco """
+    def setUp(self):
+        """ Create an input file """
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.input_file = os.path.join(self.temp_dir, 'tas.nc')
+        self.output_file = self.input_file + '.temp'
+        with open(self.input_file, 'w') as fh:
+            fh.write('data')
+
+    def test_output_written(self):
+        """ Test that a tool with an output file copies the input to it """
+        self.assertEqual(0, standin_nco.main(
+            'ncap2', ['-h', '-s', 'tos=tos-273.15f', self.input_file,
+                      self.output_file]
+        ))
+        self.assertTrue(os.path.exists(self.output_file))
+
+    def test_append_in_place(self):
+        """ Test that appending doesn't create a new file """
+        reference = os.path.join(self.temp_dir, 'ref.nc')
+        shutil.copy(self.input_file, reference)
+        self.assertEqual(0, standin_nco.main(
+            'ncks', ['-h', '-A', '-v', 'height', reference, self.input_file]
+        ))
+        self.assertEqual(['ref.nc', 'tas.nc'],
+                         sorted(os.listdir(self.temp_dir)))
+
+    def test_missing_input(self):
+        """ Test that a missing input file fails """
+        self.assertEqual(1, standin_nco.main(
+            'ncks', ['-h', os.path.join(self.temp_dir, 'missing.nc'),
+                     self.output_file]
+        ))
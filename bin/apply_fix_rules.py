@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+"""
+apply_fix_rules.py
+
+Apply the fixes to data requests that are described in a declarative JSON
+rule file. The format of the file is described in
+pre_proc_app/rule_engine.py and example_fix_rules.json shows an example.
+"""
+import argparse
+import logging.config
+import sys
+
+import django
+django.setup()
+
+from pre_proc_app.lazy_rules import store_rules
+from pre_proc_app.models import FileFix
+from pre_proc_app.rule_engine import apply_rules, load_rules
+
+
+__version__ = '0.1.0b1'
+
+DEFAULT_LOG_LEVEL = logging.WARNING
+DEFAULT_LOG_FORMAT = '%(levelname)s: %(message)s'
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    """
+    Parse command-line arguments
+    """
+    parser = argparse.ArgumentParser(description='Apply a fix rule file.')
+    parser.add_argument('rule_file', help='the JSON rule file to apply')
+    parser.add_argument('-d', '--dry-run', action='store_true',
+                        help='display the changes without making them')
+    parser.add_argument('-z', '--lazy', action='store_true',
+                        help='store the rules in the database so that they '
+                             'are evaluated when the fixes for each file are '
+                             'determined, rather than applying them now')
+    parser.add_argument('-l', '--log-level', help='set logging level to one '
+                                                  'of debug, info, warn (the '
+                                                  'default), or error')
+    parser.add_argument('--version', action='version',
+                        version='%(prog)s {}'.format(__version__))
+    args = parser.parse_args()
+
+    return args
+
+
+def main(args):
+    """
+    Main entry point
+    """
+    try:
+        rules = load_rules(args.rule_file)
+        if args.lazy:
+            num_stored = store_rules(rules)
+            print('{} rules stored'.format(num_stored))
+            return
+        results, num_added, num_removed = apply_rules(rules, args.dry_run)
+    except (ValueError, FileFix.DoesNotExist) as exc:
+        logger.error(str(exc))
+        sys.exit(1)
+
+    header = '{:<30} {:>14} {:>8} {:>8}'.format('rule', 'data requests',
+                                               'added', 'removed')
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        print('{:<30} {:>14} {:>8} {:>8}'.format(
+            result['rule'], result['data_requests'], result['added'],
+            result['removed']
+        ))
+    print('{} fixes {} and {} {}'.format(
+        num_added, 'would be added' if args.dry_run else 'added', num_removed,
+        'would be removed' if args.dry_run else 'removed'
+    ))
+
+
+if __name__ == "__main__":
+    cmd_args = parse_args()
+
+    # determine the log level
+    if cmd_args.log_level:
+        try:
+            log_level = getattr(logging, cmd_args.log_level.upper())
+        except AttributeError:
+            logger.setLevel(logging.WARNING)
+            logger.error('log-level must be one of: debug, info, warn or error')
+            sys.exit(1)
+    else:
+        log_level = DEFAULT_LOG_LEVEL
+
+    # configure the logger
+    logging.config.dictConfig({
+        'version': 1,
+        'disable_existing_loggers': False,
+        'formatters': {
+            'standard': {
+                'format': DEFAULT_LOG_FORMAT,
+            },
+        },
+        'handlers': {
+            'default': {
+                'level': log_level,
+                'class': 'logging.StreamHandler',
+                'formatter': 'standard'
+            },
+        },
+        'loggers': {
+            '': {
+                'handlers': ['default'],
+                'level': log_level,
+                'propagate': True
+            }
+        }
+    })
+
+    # run the code
+    main(cmd_args)
@@ -15,6 +15,7 @@ import sys
 import django
 django.setup()
 
+from pre_proc_app.bulk import add_fixes, remove_fixes
 from pre_proc_app.models import DataRequest, FileFix
 
 
@@ -56,13 +57,7 @@ def main():
         FileFix.objects.get(name='EcEarthInstitution')
     ]
 
-    # This next line could be done more quickly by:
-    # further_info_url_fix.datarequest_set.add(*data_reqs)
-    # but sqlite3 gives an error of:
-    # django.db.utils.OperationalError: too many SQL variables
-    for data_req in data_reqs:
-        for fix in fixes:
-            data_req.fixes.add(fix)
+    add_fixes(data_reqs, fixes)
 
     num_data_reqs = data_reqs.count()
     for fix in fixes:
@@ -74,9 +69,7 @@ def main():
         FileFix.objects.get(name='FurtherInfoUrlToHttps'),
     ]
 
-    for data_req in data_reqs:
-        for fix in removers:
-            data_req.fixes.remove(fix)
+    remove_fixes(data_reqs, removers)
 
     num_data_reqs = data_reqs.count()
     for fix in removers:
@@ -13,6 +13,7 @@ import sys
 import django
 django.setup()
 
+from pre_proc_app.bulk import add_fixes, remove_fixes
 from pre_proc_app.models import DataRequest, FileFix  # nopep8
 
 
@@ -73,13 +74,7 @@ def main():
         FileFix.objects.get(name='AAVarNameToFileName')
     ]
 
-    # This next line could be done more quickly by:
-    # further_info_url_fix.datarequest_set.add(*data_reqs)
-    # but sqlite3 gives an error of:
-    # django.db.utils.OperationalError: too many SQL variables
-    for data_req in data_reqs:
-        for fix in fixes:
-            data_req.fixes.add(fix)
+    add_fixes(data_reqs, fixes)
 
     num_data_reqs = data_reqs.count()
     for fix in fixes:
@@ -88,8 +83,7 @@ def main():
 
     ## Remove old fix
     old_fix = FileFix.objects.get(name='VarNameToFileName')
-    for data_req in data_reqs:
-        data_req.fixes.remove(old_fix)
+    remove_fixes(data_reqs, [old_fix])
 
     num_data_reqs = data_reqs.count()
     logger.debug('FileFix {} removed from {} data requests.'.
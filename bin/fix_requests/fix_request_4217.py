@@ -13,6 +13,7 @@ import sys
 import django
 django.setup()
 
+from pre_proc_app.bulk import add_fixes
 from pre_proc_app.models import (ClimateModel, DataRequest, Experiment,
                                  FileFix, Institution)
 
@@ -47,7 +48,7 @@ def main():
     ec_earth = Institution.objects.get(name='EC-Earth-Consortium')
     ec_earth3_hr = ClimateModel.objects.get(name='EC-Earth3P-HR')
     amip = Experiment.objects.get(name='highresSST-present')
-    data_req = DataRequest.objects.create(
+    data_req, _created = DataRequest.objects.get_or_create(
         institution_id=ec_earth,
         source_id=ec_earth3_hr,
         experiment_id=amip,
@@ -67,12 +68,7 @@ def main():
         FileFix.objects.get(name='ZZZEcEarthLongitudeFix'),
     ]
 
-    # This next line could be done more quickly by:
-    # further_info_url_fix.datarequest_set.add(*data_reqs)
-    # but sqlite3 gives an error of:
-    # django.db.utils.OperationalError: too many SQL variables
-    for fix in fixes:
-        data_req.fixes.add(fix)
+    add_fixes([data_req], fixes)
 
     num_data_reqs = 1
     for fix in fixes:
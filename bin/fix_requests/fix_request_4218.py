@@ -13,6 +13,7 @@ import sys
 import django
 django.setup()
 
+from pre_proc_app.bulk import add_fixes, remove_fixes
 from pre_proc_app.models import DataRequest, FileFix
 
 
@@ -60,24 +61,19 @@ def main():
         logger.error(msg)
         sys.exit(1)
 
-    for data_req in data_reqs:
-        for fix in data_req.fixes.all():
-            data_req.fixes.remove(fix)
-        if data_req.fixes.count() != 0:
-            msg = f'{data_req} still contains fixes'
-            logger.warning(msg)
+    remove_fixes(data_reqs,
+                 FileFix.objects.filter(
+                     fixprofile__datarequest__in=data_reqs
+                 ).distinct())
+    for data_req in data_reqs.filter(fix_profile__isnull=False):
+        msg = f'{data_req} still contains fixes'
+        logger.warning(msg)
 
     fixes = [
         FileFix.objects.get(name='TrackingIdNew'),
     ]
 
-    # This next line could be done more quickly by:
-    # further_info_url_fix.datarequest_set.add(*data_reqs)
-    # but sqlite3 gives an error of:
-    # django.db.utils.OperationalError: too many SQL variables
-    for fix in fixes:
-        for data_req in data_reqs:
-            data_req.fixes.add(fix)
+    add_fixes(data_reqs, fixes)
 
     num_data_reqs = data_reqs.count()
     for fix in fixes:
@@ -13,6 +13,7 @@ import sys
 import django
 django.setup()
 
+from pre_proc_app.bulk import add_fixes, remove_fixes
 from pre_proc_app.models import DataRequest, FileFix
 
 
@@ -62,15 +63,8 @@ def main():
         FileFix.objects.get(name='ExternalVariablesAreacello')
     ]
 
-    # This next line could be done more quickly by:
-    # further_info_url_fix.datarequest_set.add(*data_reqs)
-    # but sqlite3 gives an error of:
-    # django.db.utils.OperationalError: too many SQL variables
-
     # Remove bad
-    for data_req in data_reqs:
-        for fix in bad_fixes:
-            data_req.fixes.remove(fix)
+    remove_fixes(data_reqs, bad_fixes)
 
     num_data_reqs = data_reqs.count()
     for fix in bad_fixes:
@@ -78,9 +72,7 @@ def main():
                      format(fix.name, num_data_reqs))
 
     # Add new
-    for data_req in data_reqs:
-        for fix in new_fixes:
-            data_req.fixes.add(fix)
+    add_fixes(data_reqs, new_fixes)
 
     for fix in new_fixes:
         logger.debug('FileFix {} added to {} data requests.'.
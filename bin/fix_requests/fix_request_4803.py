@@ -13,6 +13,7 @@ import sys
 import django
 django.setup()
 
+from pre_proc_app.bulk import add_fixes
 from pre_proc_app.models import DataRequest, FileFix
 
 
@@ -56,16 +57,9 @@ def main():
         FileFix.objects.get(name='ExternalVariablesAreacello'),
     ]
 
-    # This next line could be done more quickly by:
-    # further_info_url_fix.datarequest_set.add(*data_reqs)
-    # but sqlite3 gives an error of:
-    # django.db.utils.OperationalError: too many SQL variables
-
     # Add new
     num_data_reqs = data_reqs.count()
-    for data_req in data_reqs:
-        for fix in new_fixes:
-            data_req.fixes.add(fix)
+    add_fixes(data_reqs, new_fixes)
 
     for fix in new_fixes:
         logger.debug('FileFix {} added to {} data requests.'.
@@ -14,6 +14,7 @@ import sys
 import django
 django.setup()
 
+from pre_proc_app.bulk import add_fixes
 from pre_proc_app.models import DataRequest, FileFix
 
 
@@ -61,18 +62,12 @@ def main():
     areacella = FileFix.objects.get(name='CellMeasuresAreacellaAdd')
     ext_vars = FileFix.objects.get(name='ExternalVariablesAreacella')
 
-    # This next line could be done more quickly by:
-    # further_info_url_fix.datarequest_set.add(*data_reqs)
-    # but sqlite3 gives an error of:
-    # django.db.utils.OperationalError: too many SQL variables
-    for data_req in data_reqs:
-        data_req.fixes.add(areacella)
+    add_fixes(data_reqs, [areacella])
 
     logger.debug('FileFix {} added to {} data requests.'.
                  format(areacella.name, data_reqs.count()))
 
-    for data_req in uva7h_reqs:
-        data_req.fixes.add(ext_vars)
+    add_fixes(uva7h_reqs, [ext_vars])
 
     logger.debug('FileFix {} added to {} data requests.'.
                  format(ext_vars.name, uva7h_reqs.count()))
@@ -14,6 +14,7 @@ import sys
 import django
 django.setup()
 
+from pre_proc_app.bulk import add_fixes
 from pre_proc_app.models import DataRequest, FileFix
 
 
@@ -52,12 +53,7 @@ def main():
 
     wtem_std_name = FileFix.objects.get(name='WtemStandardNameAdd')
 
-    # This next line could be done more quickly by:
-    # further_info_url_fix.datarequest_set.add(*data_reqs)
-    # but sqlite3 gives an error of:
-    # django.db.utils.OperationalError: too many SQL variables
-    for data_req in data_reqs:
-        data_req.fixes.add(wtem_std_name)
+    add_fixes(data_reqs, [wtem_std_name])
 
     logger.debug('FileFix {} added to {} data requests.'.
                  format(wtem_std_name.name, data_reqs.count()))
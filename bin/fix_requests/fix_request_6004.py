@@ -14,6 +14,7 @@ import sys
 import django
 django.setup()
 
+from pre_proc_app.bulk import add_fixes, remove_fixes
 from pre_proc_app.models import DataRequest, FileFix
 
 
@@ -52,12 +53,7 @@ def main():
     # Remove existing CMIP6 fix
     further_info_url_fix = FileFix.objects.get(name='FurtherInfoUrlToHttps')
 
-    # This next line could be done more quickly by:
-    # further_info_url_fix.datarequest_set.add(*data_reqs)
-    # but sqlite3 gives an error of:
-    # django.db.utils.OperationalError: too many SQL variables
-    for data_req in data_reqs:
-        data_req.fixes.remove(further_info_url_fix)
+    remove_fixes(data_reqs, [further_info_url_fix])
 
     logger.debug('FileFix {} removed from {} data requests.'.
                  format(further_info_url_fix.name, data_reqs.count()))
@@ -67,8 +63,7 @@ def main():
         name='FurtherInfoUrlPrimToHttps'
     )
 
-    for data_req in data_reqs:
-        data_req.fixes.add(prim_further_info_fix)
+    add_fixes(data_reqs, [prim_further_info_fix])
 
     logger.debug('FileFix {} added to {} data requests.'.
                  format(prim_further_info_fix.name, data_reqs.count()))
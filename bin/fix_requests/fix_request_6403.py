@@ -13,6 +13,7 @@ import sys
 import django
 django.setup()
 
+from pre_proc_app.bulk import add_fixes, remove_fixes
 from pre_proc_app.models import DataRequest, FileFix
 
 
@@ -53,8 +54,7 @@ def main():
         FileFix.objects.get(name='AAARemoveOrca1Halo'),
     ]
 
-    for data_req in data_reqs:
-        data_req.fixes.add(*fixes)
+    add_fixes(data_reqs, fixes)
 
     num_data_reqs = data_reqs.count()
     for fix in fixes:
@@ -66,8 +66,7 @@ def main():
         FileFix.objects.get(name='RemoveOrca1Halo'),
     ]
 
-    for data_req in data_reqs:
-        data_req.fixes.remove(*fixes)
+    remove_fixes(data_reqs, fixes)
 
     num_data_reqs = data_reqs.count()
     for fix in fixes:
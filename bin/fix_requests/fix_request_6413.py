@@ -13,6 +13,7 @@ import sys
 import django
 django.setup()
 
+from pre_proc_app.bulk import add_fixes, remove_fixes
 from pre_proc_app.models import DataRequest, FileFix
 
 
@@ -73,12 +74,7 @@ def main():
         FileFix.objects.get(name='FixCiceCoords1T'),
     ]
 
-    # This next line could be done more quickly by:
-    # further_info_url_fix.datarequest_set.add(*data_reqs)
-    # but sqlite3 gives an error of:
-    # django.db.utils.OperationalError: too many SQL variables
-    for data_req in data_reqs:
-        data_req.fixes.add(*fixes)
+    add_fixes(data_reqs, fixes)
 
     num_data_reqs = data_reqs.count()
     for fix in fixes:
@@ -93,8 +89,7 @@ def main():
         cmor_name='siconc'
     )
 
-    for data_req in siconc:
-        data_req.fixes.remove(FileFix.objects.get(name='FixCiceCoords1T'))
+    remove_fixes(siconc, [FileFix.objects.get(name='FixCiceCoords1T')])
 
     num_data_reqs = siconc.count()
     logger.debug('FileFix {} removed from {} data requests.'.
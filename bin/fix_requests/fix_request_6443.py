@@ -14,6 +14,7 @@ import sys
 import django
 django.setup()
 
+from pre_proc_app.bulk import remove_fixes
 from pre_proc_app.models import DataRequest, FileFix
 
 
@@ -50,9 +51,10 @@ def main():
                       'PrimSIday']
     )
 
-    for data_req in data_reqs:
-        for fix in data_req.fixes.all():
-            data_req.fixes.remove(fix)
+    remove_fixes(data_reqs,
+                 FileFix.objects.filter(
+                     fixprofile__datarequest__in=data_reqs
+                 ).distinct())
 
     num_data_reqs = data_reqs.count()
     logger.debug('FileFixes removed from {} data requests.'.
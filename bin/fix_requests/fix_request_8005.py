@@ -13,6 +13,7 @@ import sys
 import django
 django.setup()
 
+from pre_proc_app.bulk import add_fixes, remove_fixes
 from pre_proc_app.models import DataRequest, FileFix
 
 
@@ -55,8 +56,7 @@ def main():
     # previously.
     data_edit = FileFix.objects.get(name='ToDegC')
 
-    for data_req in data_reqs:
-        data_req.fixes.remove(data_edit)
+    remove_fixes(data_reqs, [data_edit])
 
     logger.debug('FileFix {} removed from {} data requests.'.
                  format(data_edit.name, data_reqs.count()))
@@ -64,8 +64,7 @@ def main():
     # Add metadata fix to these files
     metadata_edit = FileFix.objects.get(name='VarUnitsToDegC')
 
-    for data_req in data_reqs:
-        data_req.fixes.add(metadata_edit)
+    add_fixes(data_reqs, [metadata_edit])
 
     logger.debug('FileFix {} added to {} data requests.'.
                  format(metadata_edit.name, data_reqs.count()))
@@ -13,6 +13,7 @@ import sys
 import django
 django.setup()
 
+from pre_proc_app.bulk import add_fixes
 from pre_proc_app.models import DataRequest, FileFix
 
 
@@ -65,12 +66,7 @@ def main():
 
     cmeas_rm = FileFix.objects.get(name='CellMeasuresDelete')
 
-    # This next line could be done more quickly by:
-    # further_info_url_fix.datarequest_set.add(*data_reqs)
-    # but sqlite3 gives an error of:
-    # django.db.utils.OperationalError: too many SQL variables
-    for data_req in data_reqs:
-        data_req.fixes.add(cmeas_rm)
+    add_fixes(data_reqs, [cmeas_rm])
 
     logger.debug('FileFix {} added to {} data requests.'.
                  format(cmeas_rm.name, data_reqs.count()))
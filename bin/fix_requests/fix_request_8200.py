@@ -14,6 +14,7 @@ import sys
 import django
 django.setup()
 
+from pre_proc_app.bulk import add_fixes
 from pre_proc_app.models import DataRequest, FileFix
 
 
@@ -57,18 +58,15 @@ def main():
     product = FileFix.objects.get(name='ProductAdd')
     tracking_id = FileFix.objects.get(name='TrackingIdFix')
 
-    # This next line could be done more quickly by:
-    # further_info_url_fix.datarequest_set.add(*data_reqs)
-    # but sqlite3 gives an error of:
-    # django.db.utils.OperationalError: too many SQL variables
-    for data_req in data_reqs:
-        data_req.fixes.add(data_specs)
-        data_req.fixes.add(realization)
-        data_req.fixes.add(initialization)
-        data_req.fixes.add(physics)
-        data_req.fixes.add(forcing)
-        data_req.fixes.add(product)
-        data_req.fixes.add(tracking_id)
+    add_fixes(data_reqs, [
+        data_specs,
+        realization,
+        initialization,
+        physics,
+        forcing,
+        product,
+        tracking_id
+    ])
 
     logger.debug('FileFix {} added to {} data requests.'.
                  format(data_specs.name, data_reqs.count()))
@@ -13,6 +13,7 @@ import sys
 import django
 django.setup()
 
+from pre_proc_app.bulk import add_fixes
 from pre_proc_app.models import DataRequest, FileFix
 
 
@@ -54,12 +55,7 @@ def main():
 
     lev_to_plev = FileFix.objects.get(name='LevToPlev')
 
-    # This next line could be done more quickly by:
-    # further_info_url_fix.datarequest_set.add(*data_reqs)
-    # but sqlite3 gives an error of:
-    # django.db.utils.OperationalError: too many SQL variables
-    for data_req in data_reqs:
-        data_req.fixes.add(lev_to_plev)
+    add_fixes(data_reqs, [lev_to_plev])
 
     logger.debug('FileFix {} added to {} data requests.'.
                  format(lev_to_plev.name, data_reqs.count()))
@@ -1,8 +1,13 @@
 #!/usr/bin/env python
 """
-index_fix)requests.py
+index_fix_requests.py
 
-This file builds an HTML summary of the Python files in this directory.
+This file builds an HTML summary and a JSON index of the Python files in this
+directory. The files are parsed rather than imported, so that Django doesn't
+need to be set up and no code in them is run. The index contains each file's
+docstring, the FileFix objects that it uses and the filters that it passes to
+DataRequest.objects.filter() and exclude(), including the variables selected
+in each table.
 
 The file naming convention is assumed to be:
 
@@ -35,12 +40,15 @@ docstring line on the left):
 5 continued.....
 """
 import argparse
+import ast
 import glob
-import importlib
+import html
+import json
 import logging.config
 import os
 import re
 import sys
+import time
 
 __version__ = '0.1.0b1'
 
@@ -51,6 +59,7 @@ logger = logging.getLogger(__name__)
 
 
 HTML_FILE = 'fix_requests.html'
+JSON_FILE = 'fix_requests.json'
 
 
 def _ouput_headers(fh):
@@ -115,27 +124,182 @@ def parse_args():
     return args
 
 
+def _literal(node, names, source):
+    """
+    Evaluate a node that is a literal or the name of a variable that was
+    assigned a literal.
+
+    :param ast.AST node: The node
+    :param dict names: The literal values of the variables by name
+    :param str source: The source code, used for nodes that aren't literals
+    :returns: The value, or the node's source code if it isn't a literal
+    """
+    if isinstance(node, ast.Name) and node.id in names:
+        return names[node.id]
+    try:
+        return ast.literal_eval(node)
+    except ValueError:
+        return ast.get_source_segment(source, node)
+
+
+def _is_objects_call(node, model, methods):
+    """
+    Check whether a node is a call of one of the methods of a model's
+    objects manager or of a QuerySet derived from it, e.g.
+    `DataRequest.objects.filter(...).exclude(...)`.
+
+    :param ast.AST node: The node
+    :param str model: The name of the model
+    :param tuple methods: The names of the methods
+    :returns: True if it is
+    :rtype: bool
+    """
+    if not (isinstance(node, ast.Call) and
+            isinstance(node.func, ast.Attribute) and
+            node.func.attr in methods):
+        return False
+    receiver = node.func.value
+    while isinstance(receiver, ast.Call):
+        receiver = receiver.func.value
+    return (isinstance(receiver, ast.Attribute) and
+            receiver.attr == 'objects' and
+            isinstance(receiver.value, ast.Name) and
+            receiver.value.id == model)
+
+
+def _tables(filters):
+    """
+    Collect the variables selected in each table by the filters.
+
+    :param list filters: The keyword arguments of each filter() call
+    :returns: The variables keyed by table, with None for all of a table's
+        variables
+    :rtype: dict
+    """
+    tables = {}
+    for kwargs in filters:
+        if 'table_id' in kwargs:
+            table_ids = [kwargs['table_id']]
+        elif isinstance(kwargs.get('table_id__in'), list):
+            table_ids = kwargs['table_id__in']
+        elif 'table_id__startswith' in kwargs:
+            table_ids = ['{}*'.format(kwargs['table_id__startswith'])]
+        else:
+            table_ids = ['*']
+        if 'cmor_name' in kwargs:
+            cmor_names = [kwargs['cmor_name']]
+        elif isinstance(kwargs.get('cmor_name__in'), list):
+            cmor_names = kwargs['cmor_name__in']
+        else:
+            cmor_names = None
+        for table_id in table_ids:
+            table_id = str(table_id)
+            if cmor_names is None or (table_id in tables and
+                                      tables[table_id] is None):
+                tables[table_id] = None
+            else:
+                tables[table_id] = sorted(set(tables.get(table_id, [])) |
+                                          set(map(str, cmor_names)))
+    return tables
+
+
+def parse_rule(rule_path):
+    """
+    Parse a fix_request file without importing it.
+
+    :param str rule_path: The full path to the file
+    :returns: The file's entry in the index
+    :rtype: dict
+    """
+    with open(rule_path) as fh:
+        source = fh.read()
+    tree = ast.parse(source, rule_path)
+
+    doc_lines = (ast.get_docstring(tree, clean=False) or '').split('\n')
+    file_name = os.path.basename(rule_path)
+
+    names = {}
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Assign) and len(node.targets) == 1 and
+                isinstance(node.targets[0], ast.Name)):
+            try:
+                names[node.targets[0].id] = ast.literal_eval(node.value)
+            except ValueError:
+                pass
+
+    fixes = set()
+    filters = []
+    excludes = []
+    for node in ast.walk(tree):
+        if _is_objects_call(node, 'FileFix', ('get',)):
+            for keyword in node.keywords:
+                if keyword.arg == 'name':
+                    fixes.add(_literal(keyword.value, names, source))
+        elif _is_objects_call(node, 'DataRequest', ('filter', 'exclude')):
+            kwargs = {keyword.arg: _literal(keyword.value, names, source)
+                      for keyword in node.keywords if keyword.arg}
+            if node.func.attr == 'filter':
+                filters.append(kwargs)
+            else:
+                excludes.append(kwargs)
+
+    return {
+        'index': re.findall(r'\d+', file_name)[0],
+        'file': file_name,
+        'affected': doc_lines[3] if len(doc_lines) > 3 else '',
+        'description': '\n'.join(doc_lines[5:]),
+        'fixes': sorted(map(str, fixes)),
+        'tables': _tables(filters),
+        'filters': filters,
+        'excludes': excludes
+    }
+
+
+def _output_row(fh, rule):
+    """
+    Write a rule's row of the HTML table.
+
+    :param file fh: The HTML file
+    :param dict rule: The rule's entry in the index
+    """
+    tables = '<br>'.join(
+        '{}: {}'.format(html.escape(table_id, quote=False),
+                        'all' if cmor_names is None else
+                        html.escape(', '.join(cmor_names), quote=False))
+        for table_id, cmor_names in sorted(rule['tables'].items())
+    )
+    cells = [rule['index']] + [
+        html.escape(text, quote=False)
+        for text in [rule['affected'], rule['description'],
+                     ', '.join(rule['fixes'])]
+    ] + [tables]
+    fh.write('<tr>{}</tr>\n'.format(''.join('<td>{}</td>'.format(cell)
+                                            for cell in cells)))
+
+
 def main():
     """
     Main entry point
     """
-    update_dir = os.path.dirname(__file__)
+    start_time = time.perf_counter()
+    update_dir = os.path.dirname(os.path.abspath(__file__))
     update_files = glob.glob(os.path.join(update_dir, 'fix_request_*.py'))
     update_files.sort()
 
+    rules = [parse_rule(update_file) for update_file in update_files]
+
     with open(os.path.join(update_dir, HTML_FILE), 'w') as fh:
         _ouput_headers(fh)
-        for update_file in update_files:
-            import_string = os.path.basename(update_file.rstrip('.py'))
-            doc_string = importlib.import_module(import_string).__doc__
-            file_name = os.path.basename(update_file)
-            file_index = re.findall(r'\d+', file_name)[0]
-            affected_drs = doc_string.split('\n')[3]
-            description = '\n'.join(doc_string.split('\n')[5:])
-            fh.write('<tr><td>{}</td><td>{}</td><td>{}</td></tr>\n'.
-                     format(file_index, affected_drs, description))
+        for rule in rules:
+            _output_row(fh, rule)
         _ouput_footers(fh)
 
+    with open(os.path.join(update_dir, JSON_FILE), 'w') as fh:
+        json.dump(rules, fh, indent=4)
+
+    logger.debug('{} files indexed in {:.2f} s'.
+                 format(len(rules), time.perf_counter() - start_time))
+
 
 if __name__ == "__main__":
     cmd_args = parse_args()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+"""
+run_fix_requests.py
+
+Run all of the fix_request_*.py scripts in this directory in a single
+process and a single database transaction. If any of the scripts fail then
+none of their changes are kept. The net change in the number of fixes
+assigned to data requests and the time taken by each script are displayed.
+"""
+import argparse
+import logging.config
+import os
+import sys
+
+import django
+django.setup()
+
+from pre_proc_app.rule_runner import (discover_rules, format_results,
+                                      load_rule, run_rules)
+
+
+__version__ = '0.1.0b1'
+
+DEFAULT_LOG_LEVEL = logging.WARNING
+DEFAULT_LOG_FORMAT = '%(levelname)s: %(message)s'
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    """
+    Parse command-line arguments
+    """
+    parser = argparse.ArgumentParser(description='Run all of the '
+                                                 'fix_request_*.py scripts.')
+    parser.add_argument('rules', nargs='*',
+                        help='only run these scripts, e.g. 2000 or '
+                             'fix_request_2000 (default: all scripts)')
+    parser.add_argument('-d', '--dry-run', action='store_true',
+                        help='roll back the changes after running the '
+                             'scripts')
+    parser.add_argument('-l', '--log-level', help='set logging level to one '
+                                                  'of debug, info, warn (the '
+                                                  'default), or error')
+    parser.add_argument('--version', action='version',
+                        version='%(prog)s {}'.format(__version__))
+    args = parser.parse_args()
+
+    return args
+
+
+def main(args):
+    """
+    Main entry point
+    """
+    rule_dir = os.path.dirname(os.path.abspath(__file__))
+    rules = discover_rules(rule_dir, args.rules)
+    if not rules:
+        logger.error('No fix_request scripts found')
+        sys.exit(1)
+
+    logger.debug('Loading {} fix_request scripts'.format(len(rules)))
+    rule_mains = [(name, load_rule(name, path)) for name, path in rules]
+
+    try:
+        results = run_rules(rule_mains, args.dry_run)
+    except Exception:
+        logger.exception('No changes have been made to the database')
+        sys.exit(1)
+
+    print(format_results(results))
+    if args.dry_run:
+        print('Dry run: no changes have been made to the database')
+
+
+if __name__ == "__main__":
+    cmd_args = parse_args()
+
+    # determine the log level
+    if cmd_args.log_level:
+        try:
+            log_level = getattr(logging, cmd_args.log_level.upper())
+        except AttributeError:
+            logger.setLevel(logging.WARNING)
+            logger.error('log-level must be one of: debug, info, warn or error')
+            sys.exit(1)
+    else:
+        log_level = DEFAULT_LOG_LEVEL
+
+    # configure the logger
+    logging.config.dictConfig({
+        'version': 1,
+        'disable_existing_loggers': False,
+        'formatters': {
+            'standard': {
+                'format': DEFAULT_LOG_FORMAT,
+            },
+        },
+        'handlers': {
+            'default': {
+                'level': log_level,
+                'class': 'logging.StreamHandler',
+                'formatter': 'standard'
+            },
+        },
+        'loggers': {
+            '': {
+                'handlers': ['default'],
+                'level': log_level,
+                'propagate': True
+            }
+        }
+    })
+
+    # run the code
+    main(cmd_args)
@@ -13,6 +13,7 @@ import django
 django.setup()
 
 import pre_proc_app.models
+from pre_proc_app.bulk import load_dmt_json
 from pre_proc_app.models import (Institution, ClimateModel, Experiment,
                                  DataRequest)
 
@@ -61,6 +62,20 @@ def _dict_to_object(dict_):
     return inst
 
 
+def _log_counts(object_type, num_created, num_objects):
+    """
+    Log the number of objects created and skipped because they already
+    existed.
+
+    :param str object_type: The type of object
+    :param int num_created: The number created
+    :param int num_objects: The number in the JSON
+    """
+    logger.debug('{} new {} created'.format(num_created, object_type))
+    logger.debug('{} existing {} skipped'.format(num_objects - num_created,
+                                                object_type))
+
+
 def parse_args():
     """
     Parse command-line arguments
@@ -69,6 +84,9 @@ def parse_args():
                                                  'from DMT JSON.')
     parser.add_argument('json_file', help='the full path to the JSON file to '
                                           'load into the database', type=str)
+    parser.add_argument('-b', '--bulk', action='store_true',
+                        help='load all objects in a single transaction, '
+                             'creating them in batches')
     parser.add_argument('-l', '--log-level', help='set logging level to one '
                                                   'of debug, info, warn (the '
                                                   'default), or error')
@@ -86,6 +104,12 @@ def main(args):
     with open(args.json_file) as fh:
         json_dict = json.load(fh,)
 
+    if args.bulk:
+        counts = load_dmt_json(json_dict)
+        for object_type, (num_created, num_objects) in counts.items():
+            _log_counts(object_type, num_created, num_objects)
+        return
+
     for object_type in ['institution_id', 'source_id', 'experiment_id',
                         'data_requests']:
         num_created = 0
@@ -93,7 +117,7 @@ def main(args):
             _obj, created = _dict_to_object(object_instance)
             if created:
                 num_created += 1
-        logger.debug('{} new {} created'.format(num_created, object_type))
+        _log_counts(object_type, num_created, len(json_dict[object_type]))
 
 
 if __name__ == "__main__":
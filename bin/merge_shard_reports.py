@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+"""
+merge_shard_reports.py
+
+Combine the reports written with --report by the shards of a run of
+run_pre_proc.py or run_force_fix.py, e.g. the tasks of an array job, into a
+single list of the files that failed and a single table of the metrics:
+
+    merge_shard_reports.py report_*.json -o report.json
+"""
+import argparse
+import json
+import logging.config
+import sys
+
+from pre_proc.metrics import MetricsRecorder
+from pre_proc.sharding import merge_reports
+
+__version__ = '0.1.0b1'
+
+DEFAULT_LOG_LEVEL = logging.WARNING
+DEFAULT_LOG_FORMAT = '%(levelname)s: %(message)s'
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    """
+    Parse command-line arguments
+    """
+    parser = argparse.ArgumentParser(description='Combine the reports of the '
+                                                 'shards of a run.')
+    parser.add_argument('reports', nargs='+', metavar='REPORT',
+                        help='the JSON reports written by the shards')
+    parser.add_argument('-o', '--output',
+                        help='write the combined report to the specified '
+                             'JSON file')
+    parser.add_argument('-l', '--log-level', help='set logging level to one '
+                                                  'of debug, info, warn (the '
+                                                  'default), or error')
+    parser.add_argument('--version', action='version',
+                        version='%(prog)s {}'.format(__version__))
+    args = parser.parse_args()
+
+    return args
+
+
+def main(args):
+    """
+    Main entry point
+    """
+    reports = []
+    for report_path in args.reports:
+        with open(report_path) as fh:
+            reports.append(json.load(fh))
+    merged = merge_reports(reports)
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump(merged, fh, indent=4)
+
+    if merged['metrics']:
+        print(MetricsRecorder.load(merged['metrics']).format_table())
+
+    print('{} files were processed by {} shards, {} failed and {} had '
+          'already been fixed'.format(merged['num_files'],
+                                      merged['num_shards'],
+                                      len(merged['files_failed']),
+                                      merged['files_skipped']))
+
+    if merged['missing_shards']:
+        logger.error('There are no reports for shards {}'.format(
+            ', '.join(str(index) for index in merged['missing_shards'])
+        ))
+
+    if merged['files_failed']:
+        logger.error('{} files failed:\n{}'.format(
+            len(merged['files_failed']), '\n'.join(merged['files_failed'])
+        ))
+
+    if merged['missing_shards'] or merged['files_failed']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    cmd_args = parse_args()
+
+    # determine the log level
+    if cmd_args.log_level:
+        try:
+            log_level = getattr(logging, cmd_args.log_level.upper())
+        except AttributeError:
+            logger.setLevel(logging.WARNING)
+            logger.error('log-level must be one of: debug, info, warn or error')
+            sys.exit(1)
+    else:
+        log_level = DEFAULT_LOG_LEVEL
+
+    # configure the logger
+    logging.config.dictConfig({
+        'version': 1,
+        'disable_existing_loggers': False,
+        'formatters': {
+            'standard': {
+                'format': DEFAULT_LOG_FORMAT,
+            },
+        },
+        'handlers': {
+            'default': {
+                'level': log_level,
+                'class': 'logging.StreamHandler',
+                'formatter': 'standard'
+            },
+        },
+        'loggers': {
+            '': {
+                'handlers': ['default'],
+                'level': log_level,
+                'propagate': True
+            }
+        }
+    })
+
+    # run the code
+    main(cmd_args)
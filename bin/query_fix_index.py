@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+"""
+query_fix_index.py
+
+Find the data requests that have, or don't have, particular fixes using an
+in-memory bitmap index, e.g. to find the data requests that have
+FixMaskOrca1TSurface but not FixGridOrca1T:
+
+    query_fix_index.py -w FixMaskOrca1TSurface -x FixGridOrca1T
+"""
+import argparse
+import logging.config
+import sys
+import time
+
+import django
+django.setup()
+
+from pre_proc_app.bitmap_index import BitmapIndex
+from pre_proc_app.rule_engine import FILTER_FIELDS
+
+
+__version__ = '0.1.0b1'
+
+DEFAULT_LOG_LEVEL = logging.WARNING
+DEFAULT_LOG_FORMAT = '%(levelname)s: %(message)s'
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    """
+    Parse command-line arguments
+    """
+    parser = argparse.ArgumentParser(description='Query the fixes assigned '
+                                                 'to data requests.')
+    parser.add_argument('-w', '--with', dest='with_fixes', nargs='+',
+                        default=[], metavar='FIX',
+                        help='the fixes that the data requests must have')
+    parser.add_argument('-x', '--without', dest='without_fixes', nargs='+',
+                        default=[], metavar='FIX',
+                        help='the fixes that the data requests must not have')
+    for field in FILTER_FIELDS:
+        parser.add_argument('--{}'.format(field.replace('_', '-')),
+                            nargs='+', dest=field,
+                            help='only include data requests with one of '
+                                 'these values of {}'.format(field))
+    parser.add_argument('-c', '--count', action='store_true',
+                        help='only display the number of data requests')
+    parser.add_argument('-s', '--stored-only', action='store_true',
+                        help='ignore the fixes from the fix rules stored in '
+                             'the database')
+    parser.add_argument('-l', '--log-level', help='set logging level to one '
+                                                  'of debug, info, warn (the '
+                                                  'default), or error')
+    parser.add_argument('--version', action='version',
+                        version='%(prog)s {}'.format(__version__))
+    args = parser.parse_args()
+
+    return args
+
+
+def main(args):
+    """
+    Main entry point
+    """
+    start_time = time.perf_counter()
+    index = BitmapIndex.from_db(lazy_rules=not args.stored_only)
+    logger.debug('Index of {} data requests and {} fixes built in {:.3f} s'.
+                 format(index.num_bits, len(index.fix_names),
+                        time.perf_counter() - start_time))
+
+    for fix_name in args.with_fixes + args.without_fixes:
+        if not index.fix(fix_name):
+            logger.warning('No data requests have fix {}'.format(fix_name))
+
+    start_time = time.perf_counter()
+    filters = {field: getattr(args, field) for field in FILTER_FIELDS
+               if getattr(args, field)}
+    bitmap = index.select(args.with_fixes, args.without_fixes, **filters)
+    logger.debug('Query took {:.6f} s'.format(time.perf_counter() -
+                                              start_time))
+
+    if not args.count:
+        for description in index.describe(bitmap):
+            print(description)
+    print('{} data requests'.format(index.count(bitmap)))
+
+
+if __name__ == "__main__":
+    cmd_args = parse_args()
+
+    # determine the log level
+    if cmd_args.log_level:
+        try:
+            log_level = getattr(logging, cmd_args.log_level.upper())
+        except AttributeError:
+            logger.setLevel(logging.WARNING)
+            logger.error('log-level must be one of: debug, info, warn or error')
+            sys.exit(1)
+    else:
+        log_level = DEFAULT_LOG_LEVEL
+
+    # configure the logger
+    logging.config.dictConfig({
+        'version': 1,
+        'disable_existing_loggers': False,
+        'formatters': {
+            'standard': {
+                'format': DEFAULT_LOG_FORMAT,
+            },
+        },
+        'handlers': {
+            'default': {
+                'level': log_level,
+                'class': 'logging.StreamHandler',
+                'formatter': 'standard'
+            },
+        },
+        'loggers': {
+            '': {
+                'handlers': ['default'],
+                'level': log_level,
+                'propagate': True
+            }
+        }
+    })
+
+    # run the code
+    main(cmd_args)
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+"""
+run_benchmarks.py
+
+Time each of the abstract fix families on synthetic CMIP6-like files and
+save the results as a baseline, or compare the results from two revisions.
+The NCO tools must be installed for the families that use them to be run.
+"""
+import argparse
+import logging.config
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.families import FAMILIES
+from benchmarks.runner import (DEFAULT_THRESHOLD, compare_results,
+                               format_comparison, load_results,
+                               run_benchmarks, save_results)
+from benchmarks.synthetic import CASES, DEFAULT_CASES
+
+__version__ = '0.1.0b1'
+
+DEFAULT_LOG_LEVEL = logging.WARNING
+DEFAULT_LOG_FORMAT = '%(levelname)s: %(message)s'
+
+# The directory where baselines are saved
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'benchmarks', 'baselines')
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    """
+    Parse command-line arguments
+    """
+    parser = argparse.ArgumentParser(description='Benchmark the fix '
+                                                 'families.')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    run_parser = subparsers.add_parser('run', help='run the benchmarks')
+    run_parser.add_argument('-c', '--cases', nargs='+', default=DEFAULT_CASES,
+                            choices=sorted(CASES),
+                            help='the cases to run (default: %(default)s)')
+    run_parser.add_argument('-f', '--families', nargs='+',
+                            default=list(FAMILIES), choices=list(FAMILIES),
+                            help='the fix families to time (default: all)')
+    run_parser.add_argument('-r', '--repeats', type=int, default=3,
+                            help='the number of times to run each fix '
+                                 '(default: %(default)s)')
+    run_parser.add_argument('-n', '--time-steps', type=int,
+                            help='override the number of time steps in each '
+                                 'case\'s file')
+    run_parser.add_argument('-w', '--work-dir',
+                            help='the directory to generate the files in '
+                                 '(default: a new temporary directory)')
+    run_parser.add_argument('-o', '--output',
+                            help='the file to save the results to (default: '
+                                 'benchmarks/baselines/<revision>.json)')
+
+    compare_parser = subparsers.add_parser('compare',
+                                           help='compare two sets of results')
+    compare_parser.add_argument('baseline', help='the baseline results file')
+    compare_parser.add_argument('current', help='the new results file')
+    compare_parser.add_argument('-t', '--threshold', type=float,
+                                default=DEFAULT_THRESHOLD,
+                                help='the fractional slow down that is a '
+                                     'regression (default: %(default)s)')
+
+    parser.add_argument('-l', '--log-level', help='set logging level to one '
+                                                  'of debug, info, warn (the '
+                                                  'default), or error')
+    parser.add_argument('--version', action='version',
+                        version='%(prog)s {}'.format(__version__))
+    args = parser.parse_args()
+
+    return args
+
+
+def _git_revision():
+    """
+    Get the current git revision.
+
+    :returns: The short hash of the current commit or None if it's unknown
+    :rtype: str
+    """
+    try:
+        revision = subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL
+        )
+    except (subprocess.CalledProcessError, OSError):
+        return None
+    return revision.decode().strip()
+
+
+def main(args):
+    """
+    Main entry point
+    """
+    if args.command == 'compare':
+        baseline = load_results(args.baseline)
+        current = load_results(args.current)
+        comparison = compare_results(baseline['results'], current['results'],
+                                     args.threshold)
+        print('Baseline {} compared to {}'.format(baseline['revision'],
+                                                  current['revision']))
+        print(format_comparison(comparison))
+        if any(row[-1] for row in comparison):
+            sys.exit(1)
+        return
+
+    revision = _git_revision()
+    work_dir = args.work_dir or tempfile.mkdtemp()
+    results = run_benchmarks(args.cases, args.families, work_dir,
+                             args.repeats, args.time_steps)
+    if not args.work_dir:
+        os.rmdir(work_dir)
+
+    if args.output:
+        output = args.output
+    else:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        output = os.path.join(BASELINE_DIR,
+                              '{}.json'.format(revision or 'unknown'))
+    save_results(results, output, revision)
+    print('Results saved to {}'.format(output))
+
+
+if __name__ == "__main__":
+    cmd_args = parse_args()
+
+    # determine the log level
+    if cmd_args.log_level:
+        try:
+            log_level = getattr(logging, cmd_args.log_level.upper())
+        except AttributeError:
+            logger.setLevel(logging.WARNING)
+            logger.error('log-level must be one of: debug, info, warn or error')
+            sys.exit(1)
+    else:
+        log_level = DEFAULT_LOG_LEVEL
+
+    # configure the logger
+    logging.config.dictConfig({
+        'version': 1,
+        'disable_existing_loggers': False,
+        'formatters': {
+            'standard': {
+                'format': DEFAULT_LOG_FORMAT,
+            },
+        },
+        'handlers': {
+            'default': {
+                'level': log_level,
+                'class': 'logging.StreamHandler',
+                'formatter': 'standard'
+            },
+        },
+        'loggers': {
+            '': {
+                'handlers': ['default'],
+                'level': log_level,
+                'propagate': True
+            }
+        }
+    })
+
+    # run the code
+    main(cmd_args)
@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+"""
+run_db_contention_test.py
+
+Measure the rate at which data requests can be loaded into the database
+while many other processes are reading it, and how much the readers are
+delayed, for each of the database modes. make_db_from_json.py is run on
+several batches of generated DMT JSON while the readers look up data
+requests and their fixes in the same way that the pre-processing tasks do.
+"""
+import argparse
+import json
+import logging.config
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.db_contention import make_batches, summarise
+
+__version__ = '0.1.0b1'
+
+DEFAULT_LOG_LEVEL = logging.WARNING
+DEFAULT_LOG_FORMAT = '%(levelname)s: %(message)s'
+
+INSTALL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    """
+    Parse command-line arguments
+    """
+    parser = argparse.ArgumentParser(description='Measure database '
+                                                 'contention.')
+    parser.add_argument('-m', '--modes', nargs='+', default=['default', 'wal'],
+                        choices=['default', 'wal'],
+                        help='the database modes to test (default: '
+                             '%(default)s)')
+    parser.add_argument('-r', '--readers', type=int, default=16,
+                        help='the number of reader processes (default: '
+                             '%(default)s)')
+    parser.add_argument('-n', '--num-data-requests', type=int, default=5000,
+                        help='the number of data requests to load (default: '
+                             '%(default)s)')
+    parser.add_argument('-b', '--batches', type=int, default=10,
+                        help='the number of batches to load the data '
+                             'requests in (default: %(default)s)')
+    parser.add_argument('-i', '--interval', type=float, default=0.01,
+                        help='the time in seconds that each reader waits '
+                             'between lookups (default: %(default)s)')
+    parser.add_argument('-w', '--work-dir',
+                        help='the directory to create the databases and '
+                             'report in, which is kept after the test '
+                             '(default: a temporary directory that is '
+                             'deleted)')
+    parser.add_argument('-l', '--log-level', help='set logging level to one '
+                                                  'of debug, info, warn (the '
+                                                  'default), or error')
+    parser.add_argument('--version', action='version',
+                        version='%(prog)s {}'.format(__version__))
+    args = parser.parse_args()
+
+    return args
+
+
+def _test_mode(mode, batch_paths, num_data_requests, num_readers, interval,
+               work_dir):
+    """
+    Load the batches into a new database while the readers are running.
+
+    :param str mode: The database mode
+    :param list batch_paths: The full paths of the batches' JSON files
+    :param int num_data_requests: The total number of data requests
+    :param int num_readers: The number of reader processes
+    :param float interval: The time in seconds between each reader's
+        lookups
+    :param str work_dir: The directory to create the database in
+    :returns: The summary of the test
+    :rtype: dict
+    """
+    db_dir = os.path.join(work_dir, mode)
+    os.makedirs(db_dir)
+    env = dict(os.environ)
+    env['DATABASE_DIR'] = db_dir
+    env['DATABASE_MODE'] = mode
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'pre_proc_site.settings')
+    env['PYTHONPATH'] = os.pathsep.join(
+        [INSTALL_DIR] + [path for path in [env.get('PYTHONPATH')] if path]
+    )
+    log_path = os.path.join(work_dir, '{}.log'.format(mode))
+    stop_path = os.path.join(work_dir, '{}.stop'.format(mode))
+
+    with open(log_path, 'w') as log_fh:
+        subprocess.check_call(
+            [sys.executable, os.path.join(INSTALL_DIR, 'manage.py'),
+             'migrate', '-v', '0'],
+            env=env, stdout=log_fh, stderr=subprocess.STDOUT
+        )
+        # Give the readers something to read from the start
+        subprocess.check_call(
+            [sys.executable, os.path.join(INSTALL_DIR, 'bin',
+                                          'make_db_from_json.py'),
+             '--bulk', batch_paths[0]],
+            env=env, stdout=log_fh, stderr=subprocess.STDOUT
+        )
+
+        logger.debug('Starting {} readers in {} mode'.format(num_readers,
+                                                             mode))
+        readers = [
+            subprocess.Popen(
+                [sys.executable, os.path.join(INSTALL_DIR, 'benchmarks',
+                                              'db_contention.py'),
+                 stop_path, str(interval)],
+                env=env, stdout=subprocess.PIPE, stderr=log_fh
+            )
+            for _index in range(num_readers)
+        ]
+        reader_start = time.perf_counter()
+
+        ingest_failures = 0
+        start_time = time.perf_counter()
+        for batch_path in batch_paths[1:]:
+            returncode = subprocess.call(
+                [sys.executable, os.path.join(INSTALL_DIR, 'bin',
+                                              'make_db_from_json.py'),
+                 '--bulk', batch_path],
+                env=env, stdout=log_fh, stderr=subprocess.STDOUT
+            )
+            if returncode:
+                ingest_failures += 1
+        ingest_time = time.perf_counter() - start_time
+
+        open(stop_path, 'w').close()
+        reader_results = []
+        for reader in readers:
+            stdout, _stderr = reader.communicate()
+            if reader.returncode:
+                logger.warning('A reader exited with status {}'.
+                               format(reader.returncode))
+            else:
+                reader_results.append(json.loads(stdout))
+        reader_time = time.perf_counter() - reader_start
+
+    with open(batch_paths[0]) as fh:
+        num_first_batch = len(json.load(fh)['data_requests'])
+    return summarise(mode, num_data_requests - num_first_batch, ingest_time,
+                     ingest_failures, reader_results, reader_time)
+
+
+def main(args):
+    """
+    Main entry point
+    """
+    work_dir = args.work_dir or tempfile.mkdtemp()
+    os.makedirs(work_dir, exist_ok=True)
+
+    # The first batch is loaded before the readers start
+    batch_paths = []
+    for index, batch in enumerate(make_batches(args.num_data_requests,
+                                               args.batches + 1)):
+        batch_path = os.path.join(work_dir, 'batch_{:03d}.json'.format(index))
+        with open(batch_path, 'w') as fh:
+            json.dump(batch, fh)
+        batch_paths.append(batch_path)
+
+    summaries = [_test_mode(mode, batch_paths, args.num_data_requests,
+                            args.readers, args.interval, work_dir)
+                 for mode in args.modes]
+
+    if args.work_dir:
+        with open(os.path.join(work_dir, 'db_contention_report.json'),
+                  'w') as fh:
+            json.dump(summaries, fh, indent=4)
+    else:
+        shutil.rmtree(work_dir)
+    print(json.dumps(summaries, indent=4))
+
+
+if __name__ == "__main__":
+    cmd_args = parse_args()
+
+    # determine the log level
+    if cmd_args.log_level:
+        try:
+            log_level = getattr(logging, cmd_args.log_level.upper())
+        except AttributeError:
+            logger.setLevel(logging.WARNING)
+            logger.error('log-level must be one of: debug, info, warn or error')
+            sys.exit(1)
+    else:
+        log_level = DEFAULT_LOG_LEVEL
+
+    # configure the logger
+    logging.config.dictConfig({
+        'version': 1,
+        'disable_existing_loggers': False,
+        'formatters': {
+            'standard': {
+                'format': DEFAULT_LOG_FORMAT,
+            },
+        },
+        'handlers': {
+            'default': {
+                'level': log_level,
+                'class': 'logging.StreamHandler',
+                'formatter': 'standard'
+            },
+        },
+        'loggers': {
+            '': {
+                'handlers': ['default'],
+                'level': log_level,
+                'propagate': True
+            }
+        }
+    })
+
+    # run the code
+    main(cmd_args)
@@ -7,6 +7,8 @@ is specified and all files in this directory are fixed with the specified
 FileFix.
 """
 import argparse
+from contextlib import nullcontext
+import json
 import logging.config
 import os
 import sys
@@ -17,7 +19,15 @@ import dask
 
 import pre_proc
 from pre_proc import EsgfSubmission
-from pre_proc.common import list_files
+from pre_proc.admission import (DEFAULT_MAX_WAIT, AdmissionController,
+                                parse_size)
+from pre_proc.common import iter_files, parse_drs_filters
+from pre_proc.metrics import MetricsRecorder
+from pre_proc.plan import FilePlan
+from pre_proc.profiling import BatchProfiler
+from pre_proc.sharding import (parse_shard, select_shard, shard_path,
+                               write_report)
+from pre_proc.timeouts import load_timeouts
 
 __version__ = '0.1.0b1'
 
@@ -42,6 +52,66 @@ def parse_args():
     parser.add_argument('-f', '--file', help='Process single file rather than '
                                              'directory',
                         action='store_true')
+    parser.add_argument('-s', '--select', action='append',
+                        metavar='COMPONENT=VALUE',
+                        help='only process files whose DRS component has one '
+                             'of the comma-separated values, e.g. '
+                             'table_id=Amon, or version=v20180101 with '
+                             '--drs-top, because components that aren\'t in '
+                             'the files\' names are matched against the '
+                             'directories (can be repeated)')
+    parser.add_argument('--drs-top', metavar='COMPONENT',
+                        help='the DRS component, e.g. activity_id, of the '
+                             'directories in the directory, so that '
+                             'directories that don\'t match the selection '
+                             'are skipped without listing them')
+    parser.add_argument('--list-threads', type=int, default=1,
+                        help='the number of threads to list the directory '
+                             'tree with (default: %(default)s)')
+    parser.add_argument('--timeouts', metavar='FILE',
+                        help='a JSON file of the time limits for the '
+                             'external commands, keyed by tool, fix class or '
+                             '<fix class>.<tool>, as a base time in seconds '
+                             'and a time per GiB of the file')
+    parser.add_argument('--shard', metavar='i/N',
+                        help='only fix the files in shard i, counting from '
+                             'zero, of N shards of similar total size, or '
+                             'take the shard from the SLURM or LSF job array '
+                             'if "array" is specified. The partition is saved '
+                             'in a .pre_proc_shards_* file in the directory '
+                             'and reused by later runs until it\'s deleted.')
+    parser.add_argument('--report', metavar='FILE',
+                        help='write a JSON report of the files that failed '
+                             'to the specified file, in which {shard} is '
+                             'replaced by the shard\'s index, for '
+                             'merge_shard_reports.py')
+    parser.add_argument('--min-free-disk', type=parse_size, metavar='SIZE',
+                        help='only start fixing a file while the free space '
+                             'on the directory\'s disk would stay above SIZE, '
+                             'e.g. 100G, after the file\'s '
+                             'estimated peak use')
+    parser.add_argument('--min-free-memory', type=parse_size, metavar='SIZE',
+                        help='only start fixing a file while the available '
+                             'memory would stay above SIZE, e.g. 4G, after '
+                             'the file\'s estimated peak use')
+    parser.add_argument('--admission-wait', type=float,
+                        default=DEFAULT_MAX_WAIT,
+                        help='the maximum time in seconds that a file waits '
+                             'for disk space or memory when no other files '
+                             'are being fixed (default: %(default)s)')
+    parser.add_argument('-m', '--metrics',
+                        help='append the time and I/O of each fix to the '
+                             'specified JSON lines file and display a table '
+                             'of the totals for each fix at the end of the '
+                             'run, in which {shard} is replaced by the '
+                             'shard\'s index')
+    parser.add_argument('--profile', metavar='DIR',
+                        help='profile the fixing of each file and write the '
+                             'merged statistics and a summary to the '
+                             'specified directory')
+    parser.add_argument('--profile-top', type=int, default=30,
+                        help='the number of functions to include in the '
+                             'profile summary (default: %(default)s)')
     parser.add_argument('-l', '--log-level', help='set logging level to one '
                                                   'of debug, info, warn (the '
                                                   'default), or error')
@@ -49,6 +119,19 @@ def parse_args():
                         version='%(prog)s {}'.format(__version__))
     args = parser.parse_args()
 
+    try:
+        args.drs_filters = parse_drs_filters(args.select, args.drs_top)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    if args.shard and args.file:
+        parser.error('--shard can\'t be used with --file')
+    if args.shard:
+        try:
+            args.shard = parse_shard(args.shard)
+        except ValueError as exc:
+            parser.error(str(exc))
+
     return args
 
 
@@ -62,22 +145,59 @@ def main(args):
     logger.debug('Database directory is {}'.
                  format(os.environ['DATABASE_DIR']))
 
+    if args.timeouts:
+        load_timeouts(args.timeouts)
+
     files_failed = []
+    shard_index = args.shard[0] if args.shard else 0
+    metrics_path = (shard_path(args.metrics, shard_index) if args.metrics
+                    else None)
+    metrics = MetricsRecorder(metrics_path) if metrics_path else None
+    profiler = BatchProfiler(args.profile, args.profile_top)
+    admission = None
+    if args.min_free_disk is not None or args.min_free_memory is not None:
+        admission = AdmissionController(
+            min_free_disk=args.min_free_disk or 0,
+            min_free_memory=args.min_free_memory or 0,
+            max_wait=args.admission_wait
+        )
 
     if args.file:
         files_to_process = [args.directory]
     else:
-        files_to_process = sorted(list_files(args.directory))
+        files_to_process = iter_files(
+            args.directory, drs_filters=args.drs_filters,
+            drs_top=args.drs_top, max_workers=args.list_threads
+        )
+        if args.shard:
+            files_to_process = select_shard(
+                files_to_process, args.directory, *args.shard,
+                selection=json.dumps([args.select, args.drs_top])
+            )
 
+    num_files = 0
     for filepath in files_to_process:
         logger.debug('Processing {}'.format(filepath))
+        num_files += 1
         try:
-            esgf_submission = EsgfSubmission.from_file(filepath)
-            esgf_submission.fixes = [getattr(pre_proc.file_fix, args.fix_name)
-                                     (os.path.basename(filepath),
-                                      os.path.dirname(filepath))]
-            esgf_submission.run_fixes()
-            esgf_submission.update_history()
+            with profiler.profile():
+                esgf_submission = EsgfSubmission.from_file(filepath)
+                fix_class = getattr(pre_proc.file_fix, args.fix_name)
+                esgf_submission.fixes = [
+                    fix_class(os.path.basename(filepath),
+                              os.path.dirname(filepath))
+                ]
+                if admission:
+                    admitted = admission.admit_plan(
+                        FilePlan(filepath, os.path.getsize(filepath),
+                                 esgf_submission.fixes),
+                        in_place=True
+                    )
+                else:
+                    admitted = nullcontext()
+                with admitted:
+                    esgf_submission.run_fixes(metrics)
+                    esgf_submission.update_history()
         except:
             files_failed.append(filepath)
             exc_type, exc_value, exc_tb = sys.exc_info()
@@ -86,6 +206,18 @@ def main(args):
             logger.error('Processing file {} failed\n{}'.
                          format(filepath, tb_string))
 
+    if metrics:
+        metrics.close()
+        print(metrics.format_table())
+
+    if args.profile:
+        print(profiler.dump())
+
+    if args.report:
+        write_report(shard_path(args.report, shard_index),
+                     args.shard or (0, 1), num_files, files_failed,
+                     metrics_path=metrics_path)
+
     if files_failed:
         logger.error('{} files failed:\n{}'.format(len(files_failed),
                                                    '\n'.join(files_failed)))
@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+"""
+run_load_test.py
+
+An end-to-end load test of run_pre_proc.py. A synthetic DRS directory tree
+of files and a database populated from generated DMT JSON are created, and
+run_pre_proc.py is then run over the tree. The files per second, the median
+and 95th percentile time to fix each file, the peak memory use and the peak
+use of the scratch directory are reported. Stand-ins are used for any NCO
+or cdo tools that aren't installed and so the test can be run offline.
+"""
+import argparse
+import json
+import logging.config
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.load_test import (DEFAULT_LOAD_TEST_CASES,
+                                  DEFAULT_TABLE_FIXES, DirectoryMonitor,
+                                  assign_fixes, build_tree, file_latencies,
+                                  make_dmt_json, plan_tree, summarise,
+                                  write_standins)
+from benchmarks.synthetic import CASES
+from pre_proc.journal import JOURNAL_FILENAME
+
+__version__ = '0.1.0b1'
+
+DEFAULT_LOG_LEVEL = logging.WARNING
+DEFAULT_LOG_FORMAT = '%(levelname)s: %(message)s'
+
+INSTALL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    """
+    Parse command-line arguments
+    """
+    parser = argparse.ArgumentParser(description='Load test run_pre_proc.py.')
+    parser.add_argument('-n', '--num-files', type=int, default=2000,
+                        help='the number of files in the tree (default: '
+                             '%(default)s)')
+    parser.add_argument('-c', '--cases', nargs='+',
+                        default=DEFAULT_LOAD_TEST_CASES, choices=sorted(CASES),
+                        help='the cases to generate files for (default: '
+                             '%(default)s)')
+    parser.add_argument('-y', '--files-per-dataset', type=int, default=10,
+                        help='the number of files in each dataset (default: '
+                             '%(default)s)')
+    parser.add_argument('-s', '--time-steps', type=int, default=1,
+                        help='the number of time steps in each file '
+                             '(default: %(default)s)')
+    parser.add_argument('-f', '--fixes', nargs='+',
+                        help='the fixes to assign to every data request '
+                             '(default: a typical set for each table)')
+    parser.add_argument('-w', '--work-dir',
+                        help='the directory to create the tree, database and '
+                             'report in, which is kept after the test '
+                             '(default: a temporary directory that is '
+                             'deleted)')
+    parser.add_argument('--assign-fixes', help=argparse.SUPPRESS)
+    parser.add_argument('-l', '--log-level', help='set logging level to one '
+                                                  'of debug, info, warn (the '
+                                                  'default), or error')
+    parser.add_argument('--version', action='version',
+                        version='%(prog)s {}'.format(__version__))
+    args = parser.parse_args()
+
+    return args
+
+
+def _run_step(command, env, description, log_fh):
+    """
+    Run a step of the test in a child process.
+
+    :param list command: The command and its arguments
+    :param dict env: The child's environment
+    :param str description: A description of the step for the log
+    :param file log_fh: The file to write the child's output to
+    """
+    logger.debug(description)
+    start_time = time.perf_counter()
+    subprocess.check_call(command, env=env, stdout=log_fh,
+                          stderr=subprocess.STDOUT)
+    logger.debug('{} took {:.1f} s'.format(description,
+                                           time.perf_counter() - start_time))
+
+
+def main(args):
+    """
+    Main entry point
+    """
+    if args.assign_fixes:
+        # Run in the child process where the database has been set
+        with open(args.assign_fixes) as fh:
+            num_assigned = assign_fixes(json.load(fh))
+        logger.debug('Fixes assigned to {} data requests'.
+                     format(num_assigned))
+        return
+
+    work_dir = args.work_dir or tempfile.mkdtemp()
+    tree_dir = os.path.join(work_dir, 'tree')
+    db_dir = os.path.join(work_dir, 'db')
+    scratch_dir = os.path.join(work_dir, 'scratch')
+    for directory in (tree_dir, db_dir, scratch_dir):
+        os.makedirs(directory)
+
+    standins = write_standins(os.path.join(work_dir, 'bin'))
+    if standins:
+        logger.warning('Using stand-ins for {}'.format(', '.join(standins)))
+
+    env = dict(os.environ)
+    env['DATABASE_DIR'] = db_dir
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'pre_proc_site.settings')
+    env['PATH'] = os.pathsep.join([os.path.join(work_dir, 'bin'),
+                                   env.get('PATH', '')])
+    env['PYTHONPATH'] = os.pathsep.join(
+        [INSTALL_DIR] + [path for path in [env.get('PYTHONPATH')] if path]
+    )
+
+    logger.debug('Building a tree of {} files in {}'.format(args.num_files,
+                                                            tree_dir))
+    file_specs = plan_tree(args.num_files, args.cases, args.files_per_dataset)
+    total_size = build_tree(file_specs, tree_dir,
+                            os.path.join(work_dir, 'templates'),
+                            args.time_steps)
+
+    json_path = os.path.join(work_dir, 'data_requests.json')
+    with open(json_path, 'w') as fh:
+        json.dump(make_dmt_json(file_specs), fh, indent=4)
+    if args.fixes:
+        table_fixes = {CASES[case_name]['table_id']: args.fixes
+                       for case_name in args.cases}
+    else:
+        table_fixes = DEFAULT_TABLE_FIXES
+    fixes_path = os.path.join(work_dir, 'table_fixes.json')
+    with open(fixes_path, 'w') as fh:
+        json.dump(table_fixes, fh)
+
+    open(os.path.join(db_dir, 'pre-proc_db.sqlite3'), 'w').close()
+    bin_dir = os.path.join(INSTALL_DIR, 'bin')
+    with open(os.path.join(work_dir, 'setup.log'), 'w') as log_fh:
+        _run_step([sys.executable, os.path.join(INSTALL_DIR, 'manage.py'),
+                   'migrate', '-v', '0'],
+                  env, 'Creating the database', log_fh)
+        _run_step([sys.executable,
+                   os.path.join(bin_dir, 'make_db_from_json.py'), json_path],
+                  env, 'Loading the data requests', log_fh)
+        _run_step([sys.executable,
+                   os.path.join(bin_dir, 'add_file_fixes_to_db.py')],
+                  env, 'Loading the file fixes', log_fh)
+        _run_step([sys.executable, os.path.abspath(__file__),
+                   '--assign-fixes', fixes_path],
+                  env, 'Assigning the fixes', log_fh)
+
+    monitor = DirectoryMonitor(scratch_dir)
+    command = [sys.executable, os.path.join(bin_dir, 'run_pre_proc.py'),
+               tree_dir,
+               '--temp-dir', scratch_dir, '--resume',
+               '--metrics', os.path.join(work_dir, 'metrics.jsonl')]
+    logger.debug('Running {}'.format(' '.join(command)))
+    with open(os.path.join(work_dir, 'run_pre_proc.log'), 'w') as log_fh:
+        monitor.start()
+        start_time = time.perf_counter()
+        process = subprocess.Popen(command, env=env, stdout=log_fh,
+                                   stderr=subprocess.STDOUT)
+        # wait4() gives the resource usage of this child and its descendants
+        _pid, status, rusage = os.wait4(process.pid, 0)
+        wall_time = time.perf_counter() - start_time
+        monitor.stop()
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode:
+        logger.warning('run_pre_proc.py exited with status {}'.
+                       format(process.returncode))
+
+    latencies, num_failed = file_latencies(os.path.join(tree_dir,
+                                                        JOURNAL_FILENAME))
+    summary = summarise(len(file_specs), total_size, wall_time, latencies,
+                        num_failed, rusage.ru_maxrss, monitor.peak_size,
+                        standins)
+
+    if args.work_dir:
+        with open(os.path.join(work_dir, 'load_test_report.json'),
+                  'w') as fh:
+            json.dump(summary, fh, indent=4)
+    else:
+        shutil.rmtree(work_dir)
+    print(json.dumps(summary, indent=4))
+
+
+if __name__ == "__main__":
+    cmd_args = parse_args()
+
+    # determine the log level
+    if cmd_args.log_level:
+        try:
+            log_level = getattr(logging, cmd_args.log_level.upper())
+        except AttributeError:
+            logger.setLevel(logging.WARNING)
+            logger.error('log-level must be one of: debug, info, warn or error')
+            sys.exit(1)
+    else:
+        log_level = DEFAULT_LOG_LEVEL
+
+    # configure the logger
+    logging.config.dictConfig({
+        'version': 1,
+        'disable_existing_loggers': False,
+        'formatters': {
+            'standard': {
+                'format': DEFAULT_LOG_FORMAT,
+            },
+        },
+        'handlers': {
+            'default': {
+                'level': log_level,
+                'class': 'logging.StreamHandler',
+                'formatter': 'standard'
+            },
+        },
+        'loggers': {
+            '': {
+                'handlers': ['default'],
+                'level': log_level,
+                'propagate': True
+            }
+        }
+    })
+
+    # run the code
+    main(cmd_args)
@@ -8,6 +8,7 @@ same fixes will be applied to all of the files, however, the fixes to apply
 are calculated again for each file.
 """
 import argparse
+import json
 import logging.config
 import os
 import shutil
@@ -20,7 +21,21 @@ import warnings
 import dask
 
 from pre_proc import EsgfSubmission
-from pre_proc.common import list_files
+from pre_proc.admission import (DEFAULT_MAX_WAIT, AdmissionController,
+                                parse_size)
+from pre_proc.async_commands import (DEFAULT_DATA_COMMANDS,
+                                     DEFAULT_METADATA_COMMANDS, fix_files)
+from pre_proc.common import (is_command_timeout, iter_files,
+                             parse_drs_filters)
+from pre_proc.executor import get_executor
+from pre_proc.journal import ResumeJournal, plan_hash
+from pre_proc.metrics import MetricsRecorder
+from pre_proc.profiling import BatchProfiler
+from pre_proc.plan import FilePlan, plan_files
+from pre_proc.sharding import (parse_shard, select_shard, shard_path,
+                               write_report)
+from pre_proc.staging import copy_file, replace_file
+from pre_proc.timeouts import load_timeouts
 
 __version__ = '0.1.0b1'
 
@@ -43,6 +58,94 @@ def parse_args():
     parser.add_argument('-t', '--temp-dir',
                         help='copy each file to the specified temporary '
                              'directory before processing it')
+    parser.add_argument('-r', '--resume', action='store_true',
+                        help='record progress in a journal in the directory '
+                             'and skip any files that a previous run has '
+                             'already completed (each shard has its own '
+                             'journal). With --plan, list the completed '
+                             'files whose fixes have changed since.')
+    parser.add_argument('-p', '--plan', action='store_true',
+                        help='don\'t fix any files but instead print a JSON '
+                             'summary of the fixes that would be applied and '
+                             'their predicted cost')
+    parser.add_argument('-s', '--select', action='append',
+                        metavar='COMPONENT=VALUE',
+                        help='only process files whose DRS component has one '
+                             'of the comma-separated values, e.g. '
+                             'table_id=Amon, or version=v20180101 with '
+                             '--drs-top, because components that aren\'t in '
+                             'the files\' names are matched against the '
+                             'directories (can be repeated)')
+    parser.add_argument('--drs-top', metavar='COMPONENT',
+                        help='the DRS component, e.g. activity_id, of the '
+                             'directories in the directory, so that '
+                             'directories that don\'t match the selection '
+                             'are skipped without listing them')
+    parser.add_argument('--list-threads', type=int, default=1,
+                        help='the number of threads to list the directory '
+                             'tree with (default: %(default)s)')
+    parser.add_argument('--timeouts', metavar='FILE',
+                        help='a JSON file of the time limits for the '
+                             'external commands, keyed by tool, fix class or '
+                             '<fix class>.<tool>, as a base time in seconds '
+                             'and a time per GiB of the file')
+    parser.add_argument('--timeout-retries', type=int, default=1,
+                        help='the number of times that a file is re-queued '
+                             'when a command is killed for exceeding its '
+                             'time limit (default: %(default)s)')
+    parser.add_argument('-c', '--concurrent', action='store_true',
+                        help='fix several files at once, keeping several '
+                             'external commands in flight')
+    parser.add_argument('--data-commands', type=int,
+                        default=DEFAULT_DATA_COMMANDS,
+                        help='with --concurrent, the maximum number of '
+                             'commands that rewrite the data in flight '
+                             '(default: %(default)s)')
+    parser.add_argument('--metadata-commands', type=int,
+                        default=DEFAULT_METADATA_COMMANDS,
+                        help='with --concurrent, the maximum number of '
+                             'commands that only edit the metadata in flight '
+                             '(default: %(default)s)')
+    parser.add_argument('--shard', metavar='i/N',
+                        help='only fix the files in shard i, counting from '
+                             'zero, of N shards of similar total size, or '
+                             'take the shard from the SLURM or LSF job array '
+                             'if "array" is specified. The partition is saved '
+                             'in a .pre_proc_shards_* file in the directory '
+                             'and reused by later runs until it\'s deleted.')
+    parser.add_argument('--report', metavar='FILE',
+                        help='write a JSON report of the files that failed '
+                             'to the specified file, in which {shard} is '
+                             'replaced by the shard\'s index, for '
+                             'merge_shard_reports.py')
+    parser.add_argument('--min-free-disk', type=parse_size, metavar='SIZE',
+                        help='only start fixing a file while the free space '
+                             'on the temporary directory\'s disk, or the '
+                             'directory\'s disk when fixing in place, would '
+                             'stay above SIZE, e.g. 100G, after the file\'s '
+                             'estimated peak use')
+    parser.add_argument('--min-free-memory', type=parse_size, metavar='SIZE',
+                        help='only start fixing a file while the available '
+                             'memory would stay above SIZE, e.g. 4G, after '
+                             'the file\'s estimated peak use')
+    parser.add_argument('--admission-wait', type=float,
+                        default=DEFAULT_MAX_WAIT,
+                        help='the maximum time in seconds that a file waits '
+                             'for disk space or memory when no other files '
+                             'are being fixed (default: %(default)s)')
+    parser.add_argument('-m', '--metrics',
+                        help='append the time and I/O of each fix to the '
+                             'specified JSON lines file and display a table '
+                             'of the totals for each fix at the end of the '
+                             'run, in which {shard} is replaced by the '
+                             'shard\'s index')
+    parser.add_argument('--profile', metavar='DIR',
+                        help='profile the fixing of each file and write the '
+                             'merged statistics and a summary to the '
+                             'specified directory')
+    parser.add_argument('--profile-top', type=int, default=30,
+                        help='the number of functions to include in the '
+                             'profile summary (default: %(default)s)')
     parser.add_argument('-l', '--log-level', help='set logging level to one '
                                                   'of debug, info, warn (the '
                                                   'default), or error')
@@ -50,9 +153,158 @@ def parse_args():
                         version='%(prog)s {}'.format(__version__))
     args = parser.parse_args()
 
+    try:
+        args.drs_filters = parse_drs_filters(args.select, args.drs_top)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    if args.shard:
+        try:
+            args.shard = parse_shard(args.shard)
+        except ValueError as exc:
+            parser.error(str(exc))
+
+    # The metrics and profiles of concurrently fixed files can't be separated
+    if args.concurrent and (args.metrics or args.profile):
+        parser.error('--metrics and --profile can\'t be used with '
+                     '--concurrent')
+
     return args
 
 
+def _retry_on_permission_error(func, src, dst):
+    """
+    Call `func(src, dst)`. A PermissionError occurs on the JASMIN storage
+    occasionally and so if one occurs then wait and then retry once.
+
+    :param func: The function that copies or moves `src` to `dst`
+    :param str src: The source path
+    :param str dst: The destination path
+    """
+    try:
+        func(src, dst)
+    except PermissionError:
+        logger.warning('PermissionError staging {} to {}. Waiting ten '
+                       'minutes'.format(src, dst))
+        time.sleep(600)
+        func(src, dst)
+
+
+def _files_to_fix(filepaths, journal, temp_dir_root, skipped, failed):
+    """
+    Yield the files that a previous run hasn't already completed. The
+    completed files aren't checked for changes to their fixes, which
+    `--plan` reports, because some fixes can't be applied twice.
+
+    :param filepaths: An iterable of the full paths of the files
+    :param ResumeJournal journal: The journal of a previous run or None
+    :param str temp_dir_root: The directory that temporary copies are made
+        in or None if files are fixed in place
+    :param list skipped: The paths of the completed files are appended
+    :param list failed: The paths of the files that a previous run was
+        interrupted while fixing in place are appended
+    """
+    for filepath in filepaths:
+        if journal and journal.is_complete(filepath):
+            skipped.append(filepath)
+            continue
+        if journal and journal.is_interrupted(filepath) and not temp_dir_root:
+            # Some of the fixes may have been applied and some fixes can't
+            # be applied twice
+            logger.error('A previous run was interrupted while fixing {} in '
+                         'place and so it must be checked manually'.
+                         format(filepath))
+            journal.record_failed(filepath,
+                                  journal.entries[filepath]['plan_hash'])
+            failed.append(filepath)
+            continue
+        yield filepath
+
+
+def _fix_file(filepath, temp_dir_root, journal, metrics, profiler):
+    """
+    Fix a file, in a copy in a temporary directory if `temp_dir_root` is
+    specified.
+
+    :param str filepath: The full path of the file
+    :param str temp_dir_root: The directory to make the temporary copy in
+        or None to fix the file in place
+    :param ResumeJournal journal: The journal to record progress in or None
+    :param MetricsRecorder metrics: The recorder of each fix's metrics or
+        None
+    :param BatchProfiler profiler: The profiler
+    :returns: None if the file was fixed. Otherwise, the exception's info,
+        the hash of the fixes or None if they weren't determined, and
+        whether the file can be re-queued because a command timed out and
+        it's safe to fix the file again.
+    :rtype: tuple
+    """
+    logger.debug('Processing {}'.format(filepath))
+    fix_hash = None
+    temp_dir = None
+    esgf_submission = None
+    try:
+        if temp_dir_root:
+            temp_dir = tempfile.mkdtemp(dir=temp_dir_root)
+            logger.debug('Temporary directory is {}'.format(temp_dir))
+            temp_path = os.path.join(temp_dir, os.path.basename(filepath))
+            with get_executor().blocking_io():
+                _retry_on_permission_error(copy_file, filepath, temp_path)
+            process_path = temp_path
+        else:
+            process_path = filepath
+        with profiler.profile():
+            esgf_submission = EsgfSubmission.from_file(process_path)
+            esgf_submission.determine_fixes()
+            if journal:
+                fix_hash = plan_hash([type(fix).__name__
+                                      for fix in esgf_submission.fixes])
+                journal.record_started(filepath, fix_hash)
+            esgf_submission.run_fixes(metrics)
+            esgf_submission.update_history()
+        if temp_dir_root:
+            # The fixed file replaces the original with a rename if
+            # they're on the same device and otherwise it's copied
+            # alongside the original and then renamed, so the original
+            # is never left missing and no .old backup is needed.
+            with get_executor().blocking_io():
+                _retry_on_permission_error(replace_file, temp_path, filepath)
+            os.rmdir(temp_dir)
+        if journal:
+            journal.record_done(filepath, fix_hash)
+    except:
+        exc_info = sys.exc_info()
+        # A file fixed in place can only be re-queued if no fixes had been
+        # applied, because some fixes can't be applied twice
+        can_requeue = (is_command_timeout(exc_info[1]) and
+                       (temp_dir_root is not None or esgf_submission is None or
+                        not esgf_submission.applied_fixes))
+        if can_requeue and temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        return exc_info, fix_hash, can_requeue
+    return None
+
+
+def _fix_admitted(filepath, fix_file, admit=None):
+    """
+    Fix a file once it has been admitted.
+
+    :param str filepath: The full path of the file
+    :param fix_file: The function that fixes the file
+    :param admit: A function that returns the context manager that admits
+        the file, or None to fix the file immediately
+    :returns: The value returned by fix_file() or the exception raised if
+        the file couldn't be admitted
+    """
+    if admit is None:
+        return fix_file(filepath)
+    try:
+        with admit(filepath):
+            return fix_file(filepath)
+    except Exception as exc:
+        return exc
+
+
 def main(args):
     """
     Main entry point
@@ -63,56 +315,115 @@ def main(args):
     logger.debug('Database directory is {}'.
                  format(os.environ['DATABASE_DIR']))
 
+    files_to_process = iter_files(
+        args.directory, drs_filters=args.drs_filters,
+        drs_top=args.drs_top, max_workers=args.list_threads
+    )
+
+    if args.shard:
+        files_to_process = select_shard(
+            files_to_process, args.directory, *args.shard,
+            selection=json.dumps([args.select, args.drs_top])
+        )
+        logger.debug('Shard {} of {} has {} files'.
+                     format(args.shard[0], args.shard[1],
+                            len(files_to_process)))
+
+    if args.plan:
+        journal = (ResumeJournal.for_directory(args.directory, args.shard)
+                   if args.resume else None)
+        summary = plan_files(list(files_to_process), journal=journal)
+        print(json.dumps(summary, indent=4))
+        return
+
+    if args.timeouts:
+        load_timeouts(args.timeouts)
+
+    journal = (ResumeJournal.for_directory(args.directory, args.shard)
+               if args.resume else None)
+    shard_index = args.shard[0] if args.shard else 0
+    metrics_path = (shard_path(args.metrics, shard_index) if args.metrics
+                    else None)
+    metrics = MetricsRecorder(metrics_path) if metrics_path else None
+    profiler = BatchProfiler(args.profile, args.profile_top)
+
+    def fix_file(filepath):
+        """ Fix a file with this run's options """
+        return _fix_file(filepath, args.temp_dir, journal, metrics, profiler)
+
+    admit = None
+    if args.min_free_disk is not None or args.min_free_memory is not None:
+        admission = AdmissionController(args.temp_dir, args.min_free_disk or 0,
+                                        args.min_free_memory or 0,
+                                        max_wait=args.admission_wait)
+
+        def admit(filepath):
+            """ Admit a file using its plan's requirements """
+            return admission.admit_plan(
+                FilePlan.from_file(filepath, run_probes=False),
+                in_place=not args.temp_dir
+            )
+
     files_failed = []
-    for filepath in sorted(list_files(args.directory)):
-        logger.debug('Processing {}'.format(filepath))
-        try:
-            if args.temp_dir:
-                temp_dir = tempfile.mkdtemp(dir=args.temp_dir)
-                logger.debug('Temporary directory is {}'.format(temp_dir))
-                temp_path = os.path.join(temp_dir, os.path.basename(filepath))
-                try:
-                    shutil.copyfile(filepath, temp_path)
-                except PermissionError:
-                    # A PermisssionError occurs on the JASMIN storage
-                    # occasionally and so wait and then retry once.
-                    logger.warning('PermissionError copying file to temp_dir. '
-                                   'Waiting ten minutes')
-                    time.sleep(600)
-                    shutil.copyfile(filepath, temp_path)
-                process_path = temp_path
-            else:
-                process_path = filepath
-            esgf_submission = EsgfSubmission.from_file(process_path)
-            esgf_submission.determine_fixes()
-            esgf_submission.run_fixes()
-            esgf_submission.update_history()
-            if args.temp_dir:
-                os.rename(filepath, filepath + '.old')
-                try:
-                    shutil.copyfile(temp_path, filepath)
-                except PermissionError:
-                    # A PermisssionError occurs on the JASMIN storage
-                    # occasionally and so wait and then retry once. The later
-                    # operations could also be affected but take much less
-                    # time and so are less likely to be affected. If experience
-                    # shows that they would also benefit from a repeat then
-                    # this can be added later. The later operations are also
-                    # easier to recover from.
-                    logger.warning('PermissionError copying file from '
-                                   'temp_dir. Waiting ten minutes')
-                    time.sleep(600)
-                    shutil.copyfile(temp_path, filepath)
-                os.remove(temp_path)
-                os.rmdir(temp_dir)
-                os.remove(filepath + '.old')
-        except:
+    skipped = []
+    num_files = 0
+    interrupted = []
+    files = _files_to_fix(files_to_process, journal, args.temp_dir, skipped,
+                          interrupted)
+    # The files whose commands timed out are re-queued and fixed again once
+    # all of the other files have been fixed
+    for attempt in range(args.timeout_retries + 1):
+        if args.concurrent:
+            results = fix_files(files, fix_file, args.metadata_commands,
+                                args.data_commands, admit=admit)
+        else:
+            results = ((filepath, _fix_admitted(filepath, fix_file, admit))
+                       for filepath in files)
+        requeued = []
+        for filepath, failure in results:
+            if attempt == 0:
+                num_files += 1
+            if failure is None:
+                continue
+            if isinstance(failure, Exception):
+                # The file wasn't admitted
+                failure = ((type(failure), failure, failure.__traceback__),
+                           None, False)
+            exc_info, fix_hash, can_requeue = failure
+            if can_requeue and attempt < args.timeout_retries:
+                logger.warning('A command timed out while processing {} and '
+                               'so it has been re-queued:\n{}'.
+                               format(filepath, exc_info[1]))
+                requeued.append(filepath)
+                continue
             files_failed.append(filepath)
-            exc_type, exc_value, exc_tb = sys.exc_info()
-            tb_list = traceback.format_exception(exc_type, exc_value, exc_tb)
+            if journal:
+                journal.record_failed(filepath, fix_hash)
+            tb_list = traceback.format_exception(*exc_info)
             tb_string = '\n'.join(tb_list)
             logger.error('Processing file {} failed\n{}'.
                          format(filepath, tb_string))
+        if not requeued:
+            break
+        files = requeued
+    num_files += len(interrupted)
+    files_failed = interrupted + files_failed
+
+    if metrics:
+        metrics.close()
+        print(metrics.format_table())
+
+    if args.profile:
+        print(profiler.dump())
+
+    if args.report:
+        write_report(shard_path(args.report, shard_index),
+                     args.shard or (0, 1), num_files, files_failed,
+                     len(skipped), metrics_path)
+
+    if skipped:
+        logger.debug('{} files already completed by a previous run were '
+                     'skipped'.format(len(skipped)))
 
     if files_failed:
         logger.error('{} files failed:\n{}'.format(len(files_failed),
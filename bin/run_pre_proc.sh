@@ -18,6 +18,15 @@ export PATH=$CONDA_DIR:$PATH
 export DJANGO_SETTINGS_MODULE=pre_proc_site.settings
 export PYTHONPATH=$INSTALL_DIR:$INSTALL_DIR/HighResMIP-fix:$INSTALL_DIR/cmor-fixer
 
+# In read-only mode the shared database is opened directly without locking
+# and so it mustn't be modified while this is running. Otherwise a private
+# copy of the database is used.
+if [ "$DATABASE_MODE" == "readonly" ]; then
+    export DATABASE_DIR=$INSTALL_DIR/db
+    $CONDA_ENV_DIR/python $INSTALL_DIR/bin/run_pre_proc.py -l debug "$@"
+    exit $?
+fi
+
 export DATABASE_DIR=`mktemp -d /tmp/prima-crepp.XXXXXXX`
 cp $INSTALL_DIR/db/pre-proc_db.sqlite3 $DATABASE_DIR
 
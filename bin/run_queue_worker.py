@@ -0,0 +1,306 @@
+#!/usr/bin/env python
+"""
+run_queue_worker.py
+
+Fix the files in a work queue that is shared by several workers, e.g. on
+different nodes or in different batch tasks, so that no file is fixed by two
+workers. Files are added to the queue from one or more directories with
+--enqueue, by this worker or by a separate run with --enqueue-only, and each
+worker then claims and fixes files until the queue is empty:
+
+    run_queue_worker.py queue.sqlite --enqueue /path/to/data --enqueue-only
+    run_queue_worker.py queue.sqlite --temp-dir /scratch
+"""
+import argparse
+from contextlib import nullcontext
+import logging.config
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import traceback
+import warnings
+
+import dask
+
+from pre_proc import EsgfSubmission
+from pre_proc.admission import (DEFAULT_MAX_WAIT, AdmissionController,
+                                parse_size)
+from pre_proc.common import is_command_timeout, iter_files, parse_drs_filters
+from pre_proc.plan import FilePlan
+from pre_proc.staging import copy_file, replace_file
+from pre_proc.timeouts import load_timeouts
+from pre_proc.work_queue import DEFAULT_LEASE_TIME, WorkQueue
+
+__version__ = '0.1.0b1'
+
+DEFAULT_LOG_LEVEL = logging.WARNING
+DEFAULT_LOG_FORMAT = '%(levelname)s: %(message)s'
+
+logger = logging.getLogger(__name__)
+
+# Ignore warnings displayed when loading data
+warnings.filterwarnings("ignore")
+
+
+def parse_args():
+    """
+    Parse command-line arguments
+    """
+    parser = argparse.ArgumentParser(description='Pre-process PRIMAVERA data '
+                                                 'from a shared work queue.')
+    parser.add_argument('queue', help='the sqlite file of the work queue, '
+                                      'which is created if it doesn\'t exist')
+    parser.add_argument('-e', '--enqueue', action='append', metavar='DIR',
+                        help='add the files in the directory to the queue '
+                             '(can be repeated)')
+    parser.add_argument('--enqueue-only', action='store_true',
+                        help='add the files to the queue but don\'t fix any')
+    parser.add_argument('-s', '--select', action='append',
+                        metavar='COMPONENT=VALUE',
+                        help='only add files whose DRS component has one '
+                             'of the comma-separated values, e.g. '
+                             'table_id=Amon, or version=v20180101 with '
+                             '--drs-top, because components that aren\'t in '
+                             'the files\' names are matched against the '
+                             'directories (can be repeated)')
+    parser.add_argument('--drs-top', metavar='COMPONENT',
+                        help='the DRS component, e.g. activity_id, of the '
+                             'directories in the enqueued directories')
+    parser.add_argument('--list-threads', type=int, default=1,
+                        help='the number of threads to list the directory '
+                             'tree with (default: %(default)s)')
+    parser.add_argument('-t', '--temp-dir',
+                        help='copy each file to the specified temporary '
+                             'directory before processing it, so that a file '
+                             'whose worker dies can be fixed by another '
+                             'worker')
+    parser.add_argument('--lease-time', type=float,
+                        default=DEFAULT_LEASE_TIME,
+                        help='the time in seconds after which a file whose '
+                             'worker has stopped sending heartbeats is '
+                             'reclaimed (default: %(default)s)')
+    parser.add_argument('--max-files', type=int,
+                        help='stop after fixing this number of files')
+    parser.add_argument('--min-free-disk', type=parse_size, metavar='SIZE',
+                        help='only start fixing a file while the free space '
+                             'on the temporary directory\'s disk, or the disk '
+                             'of the file being fixed in place, would stay '
+                             'above SIZE, e.g. 100G, after the file\'s '
+                             'estimated peak use')
+    parser.add_argument('--min-free-memory', type=parse_size, metavar='SIZE',
+                        help='only start fixing a file while the available '
+                             'memory would stay above SIZE, e.g. 4G, after '
+                             'the file\'s estimated peak use')
+    parser.add_argument('--admission-wait', type=float,
+                        default=DEFAULT_MAX_WAIT,
+                        help='the maximum time in seconds that a file waits '
+                             'for disk space or memory when no other files '
+                             'are being fixed (default: %(default)s)')
+    parser.add_argument('--timeouts', metavar='FILE',
+                        help='a JSON file of the time limits for the '
+                             'external commands, keyed by tool, fix class or '
+                             '<fix class>.<tool>, as a base time in seconds '
+                             'and a time per GiB of the file')
+    parser.add_argument('--timeout-retries', type=int, default=1,
+                        help='with --temp-dir, the number of times that a '
+                             'file is returned to the queue when a command '
+                             'is killed for exceeding its time limit '
+                             '(default: %(default)s)')
+    parser.add_argument('--status', action='store_true',
+                        help='display the number of files with each status '
+                             'and the files that failed, and then exit')
+    parser.add_argument('-l', '--log-level', help='set logging level to one '
+                                                  'of debug, info, warn (the '
+                                                  'default), or error')
+    parser.add_argument('--version', action='version',
+                        version='%(prog)s {}'.format(__version__))
+    args = parser.parse_args()
+
+    try:
+        args.drs_filters = parse_drs_filters(args.select, args.drs_top)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    return args
+
+
+def _fix_claimed_file(claim, temp_dir_root, admission=None):
+    """
+    Fix a claimed file, in a copy in a temporary directory if `temp_dir_root`
+    is specified. The copy only replaces the original if the claim is still
+    held.
+
+    :param pre_proc.work_queue.Claim claim: The claim on the file
+    :param str temp_dir_root: The directory to make the temporary copy in
+        or None to fix the file in place
+    :param pre_proc.admission.AdmissionController admission: Controls when
+        there are enough resources to fix the file, or None to fix it
+        immediately
+    :returns: True if the file was fixed and False if the claim was lost
+    :rtype: bool
+    """
+    filepath = claim.filepath
+    esgf_submission = EsgfSubmission.from_file(filepath)
+    esgf_submission.determine_fixes()
+    if admission:
+        admitted = admission.admit_plan(
+            FilePlan(filepath, os.path.getsize(filepath),
+                     esgf_submission.fixes),
+            in_place=not temp_dir_root
+        )
+    else:
+        admitted = nullcontext()
+
+    with admitted:
+        if not temp_dir_root:
+            esgf_submission.run_fixes()
+            esgf_submission.update_history()
+            return True
+
+        temp_dir = tempfile.mkdtemp(dir=temp_dir_root)
+        try:
+            temp_path = os.path.join(temp_dir, os.path.basename(filepath))
+            copy_file(filepath, temp_path)
+            esgf_submission = EsgfSubmission.from_file(temp_path)
+            esgf_submission.determine_fixes()
+            esgf_submission.run_fixes()
+            esgf_submission.update_history()
+            if not claim.begin_replace():
+                logger.error('The claim on {} was lost and so another worker '
+                             'may be fixing it. The fixed copy has been '
+                             'discarded.'.format(filepath))
+                return False
+            replace_file(temp_path, filepath)
+            return True
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def main(args):
+    """
+    Main entry point
+    """
+    # Assume that this will be run with one CPU allocated
+    dask.config.set(scheduler='synchronous')
+
+    queue = WorkQueue(args.queue, args.lease_time)
+
+    if args.status:
+        counts = queue.counts()
+        print(', '.join('{} {}'.format(count, status)
+                        for status, count in counts.items()))
+        for filepath, error in queue.failures():
+            print('{}: {}'.format(filepath, error))
+        return
+
+    for directory in args.enqueue or []:
+        num_added = queue.enqueue(iter_files(
+            directory, drs_filters=args.drs_filters, drs_top=args.drs_top,
+            max_workers=args.list_threads
+        ))
+        logger.debug('{} files from {} were added to the queue'.
+                     format(num_added, directory))
+    if args.enqueue_only:
+        return
+
+    if args.timeouts:
+        load_timeouts(args.timeouts)
+
+    admission = None
+    if args.min_free_disk is not None or args.min_free_memory is not None:
+        admission = AdmissionController(args.temp_dir, args.min_free_disk or 0,
+                                        args.min_free_memory or 0,
+                                        max_wait=args.admission_wait)
+
+    worker = '{}:{}'.format(socket.gethostname(), os.getpid())
+    logger.debug('Database directory is {}'.
+                 format(os.environ['DATABASE_DIR']))
+
+    num_fixed = 0
+    files_failed = []
+    while args.max_files is None or num_fixed < args.max_files:
+        claim = queue.claim(worker, in_place=not args.temp_dir)
+        if claim is None:
+            break
+        logger.debug('Processing {}'.format(claim.filepath))
+        try:
+            with claim.heartbeats():
+                fixed = _fix_claimed_file(claim, args.temp_dir, admission)
+        except:
+            exc_type, exc_value, exc_tb = sys.exc_info()
+            tb_string = '\n'.join(traceback.format_exception(exc_type,
+                                                             exc_value,
+                                                             exc_tb))
+            # A file fixed in a temporary copy is unchanged and so it can be
+            # retried by any worker
+            if (is_command_timeout(exc_value) and args.temp_dir and
+                    claim.attempt <= args.timeout_retries):
+                logger.warning('A command timed out while processing {} and '
+                               'so it has been returned to the queue:\n{}'.
+                               format(claim.filepath, exc_value))
+                claim.release()
+                continue
+            claim.fail(str(exc_value))
+            files_failed.append(claim.filepath)
+            logger.error('Processing file {} failed\n{}'.
+                         format(claim.filepath, tb_string))
+            continue
+        if not fixed:
+            # Another worker has claimed the file
+            continue
+        if not claim.complete():
+            logger.warning('The claim on {} was lost after it was fixed'.
+                           format(claim.filepath))
+        num_fixed += 1
+
+    logger.debug('{} fixed {} files'.format(worker, num_fixed))
+
+    if files_failed:
+        logger.error('{} files failed:\n{}'.format(len(files_failed),
+                                                   '\n'.join(files_failed)))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    cmd_args = parse_args()
+
+    # determine the log level
+    if cmd_args.log_level:
+        try:
+            log_level = getattr(logging, cmd_args.log_level.upper())
+        except AttributeError:
+            logger.setLevel(logging.WARNING)
+            logger.error('log-level must be one of: debug, info, warn or error')
+            sys.exit(1)
+    else:
+        log_level = DEFAULT_LOG_LEVEL
+
+    # configure the logger
+    logging.config.dictConfig({
+        'version': 1,
+        'disable_existing_loggers': False,
+        'formatters': {
+            'standard': {
+                'format': DEFAULT_LOG_FORMAT,
+            },
+        },
+        'handlers': {
+            'default': {
+                'level': log_level,
+                'class': 'logging.StreamHandler',
+                'formatter': 'standard'
+            },
+        },
+        'loggers': {
+            '': {
+                'handlers': ['default'],
+                'level': log_level,
+                'propagate': True
+            }
+        }
+    })
+
+    # run the code
+    main(cmd_args)
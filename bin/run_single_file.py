@@ -5,6 +5,7 @@ run_single_file.py
 Run PRIMAVERA pre-processing on a single file, which is fixed in place.
 """
 import argparse
+import json
 import logging.config
 import os
 import sys
@@ -13,6 +14,9 @@ import dask
 
 from pre_proc import EsgfSubmission
 from pre_proc.exceptions import PreProcError
+from pre_proc.metrics import MetricsRecorder
+from pre_proc.profiling import BatchProfiler
+from pre_proc.plan import plan_files
 
 __version__ = '0.1.0b1'
 
@@ -30,6 +34,22 @@ def parse_args():
                                                  'file.')
     parser.add_argument('file_path', help='the full path of the file to '
                                           'process', type=str)
+    parser.add_argument('-p', '--plan', action='store_true',
+                        help='don\'t fix any files but instead print a JSON '
+                             'summary of the fixes that would be applied and '
+                             'their predicted cost')
+    parser.add_argument('-m', '--metrics',
+                        help='append the time and I/O of each fix to the '
+                             'specified JSON lines file and display a table '
+                             'of the totals for each fix at the end of the '
+                             'run')
+    parser.add_argument('--profile', metavar='DIR',
+                        help='profile the fixing of each file and write the '
+                             'merged statistics and a summary to the '
+                             'specified directory')
+    parser.add_argument('--profile-top', type=int, default=30,
+                        help='the number of functions to include in the '
+                             'profile summary (default: %(default)s)')
     parser.add_argument('-l', '--log-level', help='set logging level to one '
                                                   'of debug, info, warn (the '
                                                   'default), or error')
@@ -50,11 +70,19 @@ def main(args):
     logger.debug('Database directory is {}'.
                  format(os.environ['DATABASE_DIR']))
 
+    if args.plan:
+        print(json.dumps(plan_files([args.file_path]), indent=4))
+        return
+
+    metrics = MetricsRecorder(args.metrics) if args.metrics else None
+    profiler = BatchProfiler(args.profile, args.profile_top)
+
     try:
-        esgf_submission = EsgfSubmission.from_file(args.file_path)
-        esgf_submission.determine_fixes()
-        esgf_submission.run_fixes()
-        esgf_submission.update_history()
+        with profiler.profile():
+            esgf_submission = EsgfSubmission.from_file(args.file_path)
+            esgf_submission.determine_fixes()
+            esgf_submission.run_fixes(metrics)
+            esgf_submission.update_history()
     except RuntimeError:
         logger.error('File processing failed')
         sys.exit(1)
@@ -62,6 +90,12 @@ def main(args):
         logger.warning(exc)
         logger.error('File processing failed')
         sys.exit(1)
+    finally:
+        if metrics:
+            metrics.close()
+            print(metrics.format_table())
+        if args.profile:
+            print(profiler.dump())
 
 
 if __name__ == "__main__":
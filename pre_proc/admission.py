@@ -0,0 +1,185 @@
+"""
+admission.py
+
+Admission control for the batch drivers, so that fixing several files at
+once, or sharing a node or a scratch disk with other runs, doesn't fill the
+scratch disk or the memory. The peak disk space and memory that fixing a
+file needs are estimated from its plan and its size and the file is only
+admitted while the free disk space and memory would stay above the
+configured thresholds. The space and memory of the files that have been
+admitted but are still being fixed are reserved until they complete, because
+their intermediate files may not have been written yet.
+
+A file that doesn't fit waits until the files in flight complete. If no
+files are in flight then the resources are being used by something else and
+so the file waits for up to a maximum time before it fails.
+"""
+from contextlib import contextmanager
+import logging
+import os
+import shutil
+import threading
+import time
+
+from pre_proc.exceptions import InsufficientResourcesError
+
+logger = logging.getLogger(__name__)
+
+# The time in seconds between checks of the free resources while waiting
+DEFAULT_POLL_INTERVAL = 10
+# The maximum time in seconds to wait when no files are in flight
+DEFAULT_MAX_WAIT = 1800
+
+# The multipliers of the suffixes of sizes such as 10G
+SIZE_SUFFIXES = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+
+def parse_size(value):
+    """
+    Parse a size such as `500M` or `1.5T`, in binary units, or a number of
+    bytes.
+
+    :param str value: The size
+    :returns: The size in bytes
+    :rtype: int
+    :raises ValueError: If the size isn't valid
+    """
+    number = value.strip().upper().rstrip('B')
+    multiplier = 1
+    if number and number[-1] in SIZE_SUFFIXES:
+        multiplier = SIZE_SUFFIXES[number[-1]]
+        number = number[:-1]
+    try:
+        return int(float(number) * multiplier)
+    except ValueError:
+        raise ValueError('Size {} is not a number of bytes or a number '
+                         'followed by K, M, G or T'.format(value))
+
+
+def available_memory():
+    """
+    Determine the memory that can be used without swapping.
+
+    :returns: The available memory in bytes
+    :rtype: int
+    """
+    try:
+        with open('/proc/meminfo') as fh:
+            for line in fh:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+
+
+class AdmissionController(object):
+    """
+    Admit files to be fixed while there are enough free resources. The
+    controller can be shared by several threads.
+    """
+    def __init__(self, disk_dir=None, min_free_disk=0, min_free_memory=0,
+                 poll_interval=DEFAULT_POLL_INTERVAL,
+                 max_wait=DEFAULT_MAX_WAIT):
+        """
+        Initialise the class
+
+        :param str disk_dir: A directory on the disk that the temporary
+            copies and their intermediate files are written to
+        :param int min_free_disk: The disk space in bytes that must stay free
+        :param int min_free_memory: The memory in bytes that must stay free
+        :param float poll_interval: The time in seconds between checks of the
+            free resources while waiting
+        :param float max_wait: The maximum time in seconds to wait for
+            resources when no files are in flight
+        """
+        self.disk_dir = disk_dir
+        self.min_free_disk = min_free_disk
+        self.min_free_memory = min_free_memory
+        self.poll_interval = poll_interval
+        self.max_wait = max_wait
+        self.reserved_disk = 0
+        self.reserved_memory = 0
+        self.num_admitted = 0
+        self._condition = threading.Condition()
+
+    def _shortfall(self, disk_bytes, memory_bytes, disk_dir):
+        """
+        Check whether a file's requirements fit in the free resources less
+        the reservations and the thresholds.
+
+        :param int disk_bytes: The disk space that the file needs
+        :param int memory_bytes: The memory that the file needs
+        :param str disk_dir: A directory on the disk that the file needs
+            space on
+        :returns: None if the file fits, otherwise the name of the resource
+            that is short, the bytes required and the bytes that can be used
+        :rtype: tuple
+        """
+        usable_disk = (shutil.disk_usage(disk_dir).free -
+                       self.reserved_disk - self.min_free_disk)
+        if disk_bytes > usable_disk:
+            return 'disk space', disk_bytes, max(usable_disk, 0)
+        usable_memory = (available_memory() - self.reserved_memory -
+                         self.min_free_memory)
+        if memory_bytes > usable_memory:
+            return 'memory', memory_bytes, max(usable_memory, 0)
+        return None
+
+    @contextmanager
+    def admit(self, filepath, disk_bytes, memory_bytes, disk_dir=None):
+        """
+        A context manager that waits until a file can be admitted and then
+        reserves its resources until the context exits.
+
+        :param str filepath: The full path of the file
+        :param int disk_bytes: The peak disk space that fixing the file needs
+        :param int memory_bytes: The peak memory that fixing the file needs
+        :param str disk_dir: A directory on the disk that the file needs
+            space on, which defaults to the controller's directory
+        :raises InsufficientResourcesError: If the file can't be admitted
+            within the maximum time while no files are in flight
+        """
+        disk_dir = disk_dir or self.disk_dir
+        start_time = time.monotonic()
+        with self._condition:
+            shortfall = self._shortfall(disk_bytes, memory_bytes, disk_dir)
+            while shortfall:
+                wait_time = time.monotonic() - start_time
+                if not self.num_admitted and wait_time >= self.max_wait:
+                    raise InsufficientResourcesError(filepath, *shortfall,
+                                                     wait_time)
+                logger.debug('Waiting for {} to fix {}'.format(shortfall[0],
+                                                               filepath))
+                self._condition.wait(self.poll_interval)
+                shortfall = self._shortfall(disk_bytes, memory_bytes,
+                                            disk_dir)
+            self.reserved_disk += disk_bytes
+            self.reserved_memory += memory_bytes
+            self.num_admitted += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.reserved_disk -= disk_bytes
+                self.reserved_memory -= memory_bytes
+                self.num_admitted -= 1
+                self._condition.notify_all()
+
+    def admit_plan(self, file_plan, in_place=False):
+        """
+        A context manager that admits a file using the requirements from its
+        plan.
+
+        :param pre_proc.plan.FilePlan file_plan: The file's plan
+        :param bool in_place: True if the file is fixed in place, and so the
+            intermediate files are written alongside it and the file itself
+            doesn't need any additional space
+        :raises InsufficientResourcesError: If the file can't be admitted
+        """
+        if in_place:
+            return self.admit(file_plan.filepath, file_plan.peak_temp_bytes,
+                              file_plan.peak_memory_bytes,
+                              os.path.dirname(file_plan.filepath))
+        return self.admit(file_plan.filepath, file_plan.peak_disk_bytes,
+                          file_plan.peak_memory_bytes)
@@ -0,0 +1,297 @@
+"""
+async_commands.py
+
+Fix many files at once in a single process by keeping several external
+commands in flight. Each file is fixed in its own thread, which applies the
+file's fixes in order exactly as they're applied when the files are fixed
+one at a time. The threads take turns to run Python code: a thread holds a
+lock that it only releases while it waits for an external command to
+complete, or while it copies a file within the executor's blocking_io().
+The commands are run by an asyncio event loop with
+asyncio.create_subprocess_exec() and so the only processes are the commands
+themselves, rather than a pool of Python workers that each load Django,
+iris and numpy just to wait for a command. As only one thread runs Python
+code at a time, the netCDF and HDF5 libraries, which aren't thread-safe,
+are only used by one thread at a time.
+
+The number of commands in flight is limited separately for the tools that
+only edit the metadata in place, which are cheap, and for the tools that
+rewrite the data, which are limited by the file system's bandwidth.
+
+The commands are run in their own sessions and so on Ctrl-C the interrupt
+is forwarded to the commands in flight, the files that haven't been started
+are cancelled and the KeyboardInterrupt is raised once the files in progress
+have stopped.
+"""
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+import logging
+import os
+import signal
+import subprocess
+import threading
+import time
+
+from django.db import connections
+
+from pre_proc.executor import (INTERRUPT_GRACE_TIME, CommandResult,
+                               Executor, command_string, set_executor)
+
+logger = logging.getLogger(__name__)
+
+# The tools that only edit the metadata in place
+METADATA_TOOLS = ['ncatted', 'ncrename']
+
+# The default number of commands in flight for each type of tool
+DEFAULT_METADATA_COMMANDS = 8
+DEFAULT_DATA_COMMANDS = 4
+
+
+class AsyncCommandExecutor(Executor):
+    """
+    Run commands in an asyncio event loop that is running in another thread.
+    The thread calling run() must hold the lock, which is released while the
+    command is running. The CPU time and peak memory use of the commands
+    aren't measured because the event loop reaps the processes. Once
+    interrupt() has been called, run() raises KeyboardInterrupt rather than
+    running any more commands.
+    """
+    def __init__(self, loop, lock, metadata_limit=DEFAULT_METADATA_COMMANDS,
+                 data_limit=DEFAULT_DATA_COMMANDS):
+        """
+        Initialise the class
+
+        :param asyncio.AbstractEventLoop loop: The running event loop
+        :param threading.Lock lock: The lock that allows a thread to run
+            Python code
+        :param int metadata_limit: The maximum number of metadata-only
+            commands in flight
+        :param int data_limit: The maximum number of data-rewriting commands
+            in flight
+        """
+        self.loop = loop
+        self.lock = lock
+        self.interrupted = False
+        # The processes of the commands in flight
+        self._processes = set()
+        self._slots = asyncio.run_coroutine_threadsafe(
+            self._create_slots(metadata_limit, data_limit), loop
+        ).result()
+
+    @staticmethod
+    async def _create_slots(metadata_limit, data_limit):
+        """
+        Create the semaphores that limit the commands in flight in the event
+        loop that they'll be used in.
+
+        :param int metadata_limit: The limit for metadata-only commands
+        :param int data_limit: The limit for data-rewriting commands
+        :returns: The semaphores keyed by whether they're for metadata-only
+            commands
+        :rtype: dict
+        """
+        return {True: asyncio.Semaphore(metadata_limit),
+                False: asyncio.Semaphore(data_limit)}
+
+    def run(self, argv, timeout=None):
+        """
+        Run a command in the event loop, releasing the lock until it has
+        completed.
+
+        :param list argv: The command's arguments
+        :param float timeout: The time in seconds after which the command is
+            killed, or None for no limit
+        :returns: The result
+        :rtype: CommandResult
+        """
+        argv = [str(arg) for arg in argv]
+        if self.interrupted:
+            raise KeyboardInterrupt
+        future = asyncio.run_coroutine_threadsafe(
+            self._run(argv, timeout), self.loop
+        )
+        self.lock.release()
+        try:
+            result = future.result()
+        finally:
+            self.lock.acquire()
+        if self.interrupted:
+            raise KeyboardInterrupt
+        return result
+
+    def interrupt(self):
+        """
+        Forward an interrupt, e.g. from Ctrl-C, to the commands in flight,
+        which are running in their own sessions and so don't receive the
+        terminal's signals, and stop any more commands from being run. The
+        commands are killed if they haven't exited within
+        INTERRUPT_GRACE_TIME.
+        """
+        self.interrupted = True
+        asyncio.run_coroutine_threadsafe(self._interrupt(),
+                                         self.loop).result()
+
+    async def _interrupt(self):
+        """
+        Interrupt the commands in flight and kill any that don't exit.
+        """
+        processes = list(self._processes)
+        for process in processes:
+            try:
+                os.killpg(process.pid, signal.SIGINT)
+            except ProcessLookupError:
+                pass
+        if not processes:
+            return
+        _done, running = await asyncio.wait(
+            [asyncio.ensure_future(process.wait()) for process in processes],
+            timeout=INTERRUPT_GRACE_TIME
+        )
+        if running:
+            for process in processes:
+                if process.returncode is None:
+                    try:
+                        os.killpg(process.pid, signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
+            await asyncio.wait(running)
+
+    @contextmanager
+    def blocking_io(self):
+        """
+        Release the lock during slow file I/O, e.g. staging a copy of a
+        file, so that other files' Python code can run.
+        """
+        self.lock.release()
+        try:
+            yield
+        finally:
+            self.lock.acquire()
+
+    async def _run(self, argv, timeout):
+        """
+        Run a command once a slot is free for its type of tool.
+
+        :param list argv: The command's arguments
+        :param float timeout: The time in seconds after which the command is
+            killed, or None for no limit
+        :returns: The result
+        :rtype: CommandResult
+        """
+        metadata_only = os.path.basename(argv[0]) in METADATA_TOOLS
+        async with self._slots[metadata_only]:
+            start_time = time.perf_counter()
+            if self.interrupted:
+                return CommandResult(argv, -signal.SIGINT)
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *argv, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE, start_new_session=True
+                )
+            except OSError as exc:
+                # e.g. the tool isn't installed
+                return CommandResult(argv, 127, stderr=str(exc),
+                                     wall_time=time.perf_counter() -
+                                     start_time)
+            timed_out = False
+            self._processes.add(process)
+            if self.interrupted:
+                # Started just as the others were interrupted
+                os.killpg(process.pid, signal.SIGINT)
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(),
+                                                        timeout)
+            except asyncio.TimeoutError:
+                timed_out = True
+                logger.warning('Killed {} after {:.0f} seconds'.
+                               format(command_string(argv), timeout))
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                await process.wait()
+                stdout, stderr = b'', b''
+            finally:
+                self._processes.discard(process)
+            return CommandResult(argv, process.returncode,
+                                 stdout.decode(errors='replace'),
+                                 stderr.decode(errors='replace'),
+                                 time.perf_counter() - start_time,
+                                 timed_out=timed_out)
+
+
+def fix_files(filepaths, fix_file, metadata_limit=DEFAULT_METADATA_COMMANDS,
+              data_limit=DEFAULT_DATA_COMMANDS, max_files=None, admit=None):
+    """
+    Fix files concurrently, with the external commands that they run kept
+    in flight by an asyncio event loop. The results are yielded in the same
+    order as the files, and only a limited number of files are taken from
+    `filepaths` ahead of the results, so it can be a lazy iterator.
+
+    :param filepaths: An iterable of the full paths of the files to fix
+    :param fix_file: The function that fixes a file, which is called with
+        the file's path in a worker thread and whose external commands must
+        be run with pre_proc.common.run_command()
+    :param int metadata_limit: The maximum number of metadata-only commands
+        in flight
+    :param int data_limit: The maximum number of data-rewriting commands in
+        flight
+    :param int max_files: The number of files fixed at once, which defaults
+        to enough for both limits to be reached
+    :param admit: A function that is called with a file's path and returns
+        a context manager that the file is fixed within, e.g. to wait until
+        there are enough resources to fix it. It's entered without holding
+        the lock so that the other files can be fixed while it waits.
+    :returns: An iterator of tuples of each file's path and the value that
+        fix_file() returned, or the exception that it raised
+    """
+    max_files = max_files or metadata_limit + data_limit
+    lock = threading.Lock()
+
+    def worker(filepath):
+        """ Fix a file while holding the lock """
+        try:
+            with admit(filepath) if admit else nullcontext():
+                with lock:
+                    return fix_file(filepath)
+        except Exception as exc:
+            return exc
+        finally:
+            # Django opens a connection for each thread that uses the
+            # database, which would otherwise be left open by the pool
+            connections.close_all()
+
+    loop = asyncio.new_event_loop()
+    loop_thread = threading.Thread(target=loop.run_forever,
+                                   name='pre_proc-commands', daemon=True)
+    loop_thread.start()
+    executor = AsyncCommandExecutor(loop, lock, metadata_limit, data_limit)
+    previous = set_executor(executor)
+    try:
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=max_files) as pool:
+            try:
+                for filepath in filepaths:
+                    pending.append((filepath, pool.submit(worker, filepath)))
+                    # Keep the workers busy when the oldest file is slow
+                    if len(pending) >= 4 * max_files:
+                        filepath, future = pending.popleft()
+                        yield filepath, future.result()
+                while pending:
+                    filepath, future = pending.popleft()
+                    yield filepath, future.result()
+            except KeyboardInterrupt:
+                # The pool waits for the files in progress, which stop at
+                # their next command
+                logger.warning('Interrupted, stopping the commands in flight')
+                for _filepath, future in pending:
+                    future.cancel()
+                executor.interrupt()
+                raise
+    finally:
+        set_executor(previous)
+        loop.call_soon_threadsafe(loop.stop)
+        loop_thread.join()
+        loop.close()
@@ -3,36 +3,114 @@ common.py
 
 Library code used by many functions.
 """
+from concurrent.futures import ThreadPoolExecutor
 import inspect
 import logging.config
 import os
 import re
-import subprocess
+import shlex
+
+from pre_proc.exceptions import CommandTimeoutError
+from pre_proc.executor import command_string, get_executor
+from pre_proc.timeouts import current_timeout
 
 logger = logging.getLogger(__name__)
 
+# The cumulative wall and CPU times in seconds that run_command() has spent
+# waiting for commands to complete
+_command_time = 0.0
+_command_cpu_time = 0.0
+
 
 def run_command(command):
     """
-    Run the command specified and return any output to stdout or stderr as
-    a list of strings.
-    :param str command: The complete command to run.
+    Run the command specified, without a shell, and return its output to
+    stdout as a list of strings. The command is run by the executor from
+    pre_proc.executor.get_executor(). If it's run within
+    pre_proc.timeouts.command_limits() then it's killed if it doesn't
+    complete within its time limit.
+
+    :param list command: The command's arguments. A string is split into
+        arguments as a shell would split it.
     :returns: Any output from the command as a list of strings.
+    :raises CommandTimeoutError: If the command was killed because it
+        didn't complete within its time limit.
     :raises RuntimeError: If the command did not complete successfully.
     """
-    try:
-        cmd_out = subprocess.check_output(command, stderr=subprocess.STDOUT,
-                                          shell=True)
-    except subprocess.CalledProcessError as exc:
+    global _command_time, _command_cpu_time
+    argv = shlex.split(command) if isinstance(command, str) else command
+    timeout = current_timeout(argv)
+    if timeout is None:
+        result = get_executor().run(argv)
+    else:
+        result = get_executor().run(argv, timeout=timeout)
+    _command_time += result.wall_time
+    _command_cpu_time += result.cpu_time
+    logger.debug('{} took {:.2f} s wall, {:.2f} s CPU, {} KiB max RSS'.
+                 format(command_string(argv), result.wall_time,
+                        result.cpu_time, result.max_rss))
+
+    if result.timed_out:
+        raise CommandTimeoutError(command_string(argv), timeout)
+    if result.returncode:
         msg = ('Command did not complete sucessfully.\ncommmand:\n{}\n'
-               'produced error:\n{}'.format(command, exc.output))
+               'exit status {} and produced error:\n{}'.
+               format(command_string(argv), result.returncode,
+                      result.stderr))
         logger.warning(msg)
         raise RuntimeError(msg)
 
-    if isinstance(cmd_out, str):
-        return cmd_out.rstrip().split('\n')
-    else:
-        return None
+    return result.stdout.rstrip().split('\n') if result.stdout else []
+
+
+def is_command_timeout(exc):
+    """
+    Check whether an exception was caused by a command timing out. The fix
+    classes raise their own exceptions when a command fails and so the
+    exceptions that these were raised while handling are checked too.
+
+    :param BaseException exc: The exception
+    :returns: True if a CommandTimeoutError caused the exception
+    :rtype: bool
+    """
+    while exc is not None:
+        if isinstance(exc, CommandTimeoutError):
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+def get_command_time():
+    """
+    Return the cumulative time spent waiting for commands run by
+    run_command() to complete.
+
+    :returns: The time in seconds
+    :rtype: float
+    """
+    return _command_time
+
+
+def get_command_cpu_time():
+    """
+    Return the cumulative user and system CPU time used by the commands run
+    by run_command().
+
+    :returns: The time in seconds
+    :rtype: float
+    """
+    return _command_cpu_time
+
+
+# The components of the CMIP6 data reference syntax (DRS) directory structure
+DRS_COMPONENTS = ['mip_era', 'activity_id', 'institution_id', 'source_id',
+                  'experiment_id', 'member_id', 'table_id', 'variable_id',
+                  'grid_label', 'version']
+
+# The DRS components that are also in each file's name, keyed by their
+# position in the name
+FILENAME_COMPONENTS = {0: 'variable_id', 1: 'table_id', 2: 'source_id',
+                       3: 'experiment_id', 4: 'member_id', 5: 'grid_label'}
 
 
 def list_files(directory, suffix='.nc'):
@@ -42,38 +120,223 @@ def list_files(directory, suffix='.nc'):
 
     :param str directory: The root directory of the submission
     :param str suffix: The suffix of the files of interest
-    :returns: A list of absolute filepaths
+    :returns: A sorted list of absolute filepaths
     """
-    nc_files = []
+    return list(iter_files(directory, suffix))
+
 
-    dir_files = os.listdir(directory)
-    for filename in dir_files:
-        file_path = os.path.join(directory, filename)
-        if os.path.isdir(file_path):
-            nc_files.extend(list_files(file_path, suffix))
-        elif file_path.endswith(suffix):
-            nc_files.append(file_path)
+def ilist_files(directory, suffix='.nc'):
+    """
+    Return an iterator of all the files with the specified suffix in the
+    submission directory structure and sub-directories, in the order that
+    the file system lists them.
 
-    return nc_files
+    :param str directory: The root directory of the submission
+    :param str suffix: The suffix of the files of interest
+    :returns: An iterator of absolute filepaths
+    """
+    with os.scandir(directory) as entries:
+        sub_dirs = []
+        for entry in entries:
+            if entry.is_dir():
+                sub_dirs.append(entry.path)
+            elif entry.name.endswith(suffix):
+                yield entry.path
+    for sub_dir in sub_dirs:
+        yield from ilist_files(sub_dir, suffix)
 
 
-def ilist_files(directory, suffix='.nc'):
+def iter_files(directory, suffix='.nc', drs_filters=None, drs_top=None,
+               max_workers=None):
     """
     Return an iterator of all the files with the specified suffix in the
-    submission directory structure and sub-directories.
+    submission directory structure and sub-directories in sorted order. The
+    paths are yielded as the directories are scanned, so the first file can
+    be processed before the whole tree has been listed, and in the same
+    order as sorted(ilist_files(directory, suffix)).
+
+    Files can be selected by the values of the DRS components with
+    drs_filters, e.g. `{'table_id': ['Amon'], 'variable_id': ['tas']}`.
+    The components in FILENAME_COMPONENTS are checked against each file's
+    name. If drs_top is specified then the directories are also matched
+    against the filters and whole sub-trees are skipped without listing
+    them, which is required to filter on components such as version that
+    are only in the directory names.
+
+    :param str directory: The root directory of the submission
+    :param str suffix: The suffix of the files of interest
+    :param dict drs_filters: The allowed values of each DRS component
+    :param str drs_top: The DRS component of the directories in `directory`
+    :param int max_workers: If greater than one then the sub-directories of
+        `directory` are listed in this many threads, which helps on file
+        systems where each listing has a high latency
+    :returns: An iterator of absolute filepaths
+    :raises ValueError: If a DRS component isn't known or can't be checked
+    """
+    drs_filters = {component: set(values) for component, values in
+                   (drs_filters or {}).items() if values}
+    check_drs_filters(drs_filters, drs_top)
+    depth = DRS_COMPONENTS.index(drs_top) if drs_top else None
+    return _iter_files(directory, suffix, drs_filters, depth, max_workers)
+
+
+def check_drs_filters(drs_filters, drs_top=None):
+    """
+    Check that DRS filters can be applied. A component that isn't in the
+    files' names can only be checked against the directories' names and so
+    drs_top must be specified and must not be below the component.
+
+    :param dict drs_filters: The allowed values of each DRS component
+    :param str drs_top: The DRS component of the top-level directories
+    :raises ValueError: If a DRS component isn't known or can't be checked
+    """
+    components = set(drs_filters or {}) | ({drs_top} if drs_top else set())
+    unknown = sorted(components - set(DRS_COMPONENTS))
+    if unknown:
+        raise ValueError('Unknown DRS component {}'.
+                         format(', '.join(unknown)))
+    depth = DRS_COMPONENTS.index(drs_top) if drs_top else len(DRS_COMPONENTS)
+    unchecked = [component for component in DRS_COMPONENTS
+                 if component in (drs_filters or {}) and
+                 component not in FILENAME_COMPONENTS.values() and
+                 DRS_COMPONENTS.index(component) < depth]
+    if unchecked:
+        raise ValueError('DRS component {} is not in the files\' names and '
+                         'so can only be selected when the DRS component of '
+                         'the top-level directories (--drs-top) is it or a '
+                         'component above it'.format(', '.join(unchecked)))
+
+
+def _iter_files(directory, suffix, drs_filters, depth, max_workers):
+    """
+    The generator part of iter_files(), so that the filters are checked
+    when it's called rather than when the first file is requested.
 
     :param str directory: The root directory of the submission
     :param str suffix: The suffix of the files of interest
-    :returns: A list of absolute filepaths
-    """
-    dir_files = os.listdir(directory)
-    for filename in dir_files:
-        file_path = os.path.join(directory, filename)
-        if os.path.isdir(file_path):
-            for ifile in ilist_files(file_path):
-                yield ifile
-        elif file_path.endswith(suffix):
-            yield file_path
+    :param dict drs_filters: The allowed values of each DRS component
+    :param int depth: The index in DRS_COMPONENTS of the directories in
+        `directory` or None if it's not known
+    :param int max_workers: The number of threads to list the directories in
+    :returns: An iterator of absolute filepaths
+    """
+    if not max_workers or max_workers < 2:
+        yield from _iter_sorted(directory, suffix, drs_filters, depth)
+        return
+
+    # Each top-level sub-directory is listed in full in a worker thread and
+    # its files are yielded in order as soon as it's complete
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = []
+        for path, is_dir in _sorted_entries(directory, suffix, drs_filters,
+                                            depth):
+            if is_dir:
+                results.append(executor.submit(
+                    list, _iter_sorted(path, suffix, drs_filters,
+                                       None if depth is None else depth + 1)
+                ))
+            else:
+                results.append([path])
+        for result in results:
+            yield from (result if isinstance(result, list)
+                        else result.result())
+
+
+def parse_drs_filters(filter_strings, drs_top=None):
+    """
+    Parse DRS filters from strings of the form `component=value[,value...]`,
+    as given on the command line.
+
+    :param list filter_strings: The filter strings
+    :param str drs_top: The DRS component of the top-level directories
+    :returns: The allowed values of each DRS component
+    :rtype: dict
+    :raises ValueError: If a string isn't in the correct form or a component
+        can't be checked
+    """
+    drs_filters = {}
+    for filter_string in filter_strings or []:
+        component, sep, values = filter_string.partition('=')
+        if not sep or not values:
+            raise ValueError('DRS filter {} is not of the form '
+                             'component=value'.format(filter_string))
+        drs_filters.setdefault(component.strip(), set()).update(
+            value.strip() for value in values.split(',')
+        )
+    check_drs_filters(drs_filters, drs_top)
+    return drs_filters
+
+
+def _iter_sorted(directory, suffix, drs_filters, depth):
+    """
+    The recursive part of iter_files().
+
+    :param str directory: The directory to list
+    :param str suffix: The suffix of the files of interest
+    :param dict drs_filters: The allowed values of each DRS component
+    :param int depth: The index in DRS_COMPONENTS of the directories in
+        `directory` or None if it's not known
+    :returns: An iterator of absolute filepaths
+    """
+    for path, is_dir in _sorted_entries(directory, suffix, drs_filters,
+                                        depth):
+        if is_dir:
+            yield from _iter_sorted(path, suffix, drs_filters,
+                                    None if depth is None else depth + 1)
+        else:
+            yield path
+
+
+def _sorted_entries(directory, suffix, drs_filters, depth):
+    """
+    List the files of interest and the sub-directories in a directory
+    whose names match the DRS filters. A directory's name is sorted as if
+    it ends with a separator so that the paths below it are yielded in the
+    same order as sorting the full paths would give.
+
+    :param str directory: The directory to list
+    :param str suffix: The suffix of the files of interest
+    :param dict drs_filters: The allowed values of each DRS component
+    :param int depth: The index in DRS_COMPONENTS of the directories in
+        `directory` or None if it's not known
+    :returns: Tuples of each entry's path and whether it's a directory
+    :rtype: list
+    """
+    component = (DRS_COMPONENTS[depth]
+                 if depth is not None and depth < len(DRS_COMPONENTS)
+                 else None)
+    allowed_dirs = drs_filters.get(component)
+    entries = []
+    with os.scandir(directory) as dir_entries:
+        for entry in dir_entries:
+            if entry.is_dir():
+                if allowed_dirs is None or entry.name in allowed_dirs:
+                    entries.append((entry.name + os.sep, entry.path, True))
+            elif (entry.name.endswith(suffix) and
+                    _filename_matches(entry.name, drs_filters)):
+                entries.append((entry.name, entry.path, False))
+    entries.sort()
+    return [(path, is_dir) for _key, path, is_dir in entries]
+
+
+def _filename_matches(filename, drs_filters):
+    """
+    Check whether the DRS components in a file's name match the filters.
+
+    :param str filename: The file's name
+    :param dict drs_filters: The allowed values of each DRS component
+    :returns: True if the file matches
+    :rtype: bool
+    """
+    if not drs_filters:
+        return True
+    components = os.path.splitext(filename)[0].split('_')
+    for position, component in FILENAME_COMPONENTS.items():
+        if component in drs_filters:
+            if (position >= len(components) or
+                    components[position] not in drs_filters[component]):
+                return False
+    return True
 
 
 def get_concrete_subclasses(parent_object):
@@ -17,6 +17,9 @@ django.setup()
 import pre_proc
 from pre_proc.common import run_command
 from pre_proc.exceptions import DataRequestNotFound, MultipleDataRequestsFound
+from pre_proc.file_header import FileHeader
+from pre_proc.timeouts import command_limits
+from pre_proc_app.lazy_rules import resolve_fixes
 from pre_proc_app.models import DataRequest
 
 
@@ -47,6 +50,10 @@ class EsgfSubmission(object):
         self.filename = os.path.basename(filepath)
         self.directory = os.path.dirname(filepath)
         self.fixes = []
+        # The fixes that the file already satisfied and so weren't applied
+        self.satisfied_fixes = []
+        # The fixes that have been applied to the file
+        self.applied_fixes = []
 
     @classmethod
     def from_file(cls, filepath):
@@ -72,26 +79,59 @@ class EsgfSubmission(object):
     def determine_fixes(self):
         """
         Scan through the DB, determine the fixes that need to be run on
-        this ESGF dataset and add them to the list.
+        this ESGF dataset and add them to the list. The fixes stored for the
+        data request are combined with those from any matching FixRule
+        objects.
         """
-        self.fixes = [getattr(pre_proc.file_fix, fix_name.name)(self.filename,
-                                                                self.directory)
-                      for fix_name in self._get_data_request().
-                          fixes.order_by('name')]
+        self.fixes = [getattr(pre_proc.file_fix, fix_name)(self.filename,
+                                                           self.directory)
+                      for fix_name in
+                      sorted(resolve_fixes(self._get_data_request()))]
 
-    def run_fixes(self):
+    def run_fixes(self, metrics=None):
         """
-        Loop through the fixes and run each of them in turn.
+        Loop through the fixes and run each of them in turn. Fixes that
+        declare a probe are skipped if the file already satisfies them. The
+        file's header is read once and shared between the probes until a fix
+        is applied and modifies the file.
+
+        :param pre_proc.metrics.MetricsRecorder metrics: If specified then
+            each fix that is applied is measured
         """
+        filepath = os.path.join(self.directory, self.filename)
+        header = None
+        self.satisfied_fixes = []
+        self.applied_fixes = []
         for fix in self.fixes:
-            fix.apply_fix()
+            if fix.has_probe():
+                if header is None:
+                    header = FileHeader.from_file(filepath)
+                if fix.is_satisfied(header):
+                    self.satisfied_fixes.append(fix)
+                    continue
+            with command_limits(filepath, type(fix)):
+                if metrics:
+                    with metrics.measure(filepath, fix):
+                        fix.apply_fix()
+                else:
+                    fix.apply_fix()
+            self.applied_fixes.append(fix)
+            header = None
+
+        if self.satisfied_fixes:
+            logger.debug('{} already satisfies {}'.format(
+                filepath,
+                ', '.join(type(fix).__name__ for fix in self.satisfied_fixes)
+            ))
 
     def update_history(self):
         """
         Add the fixes run to the history attribute.
         """
-        if self.fixes:
-            fix_names = [fix.__class__.__name__ for fix in self.fixes]
+        fixes_run = [fix for fix in self.fixes
+                     if fix not in self.satisfied_fixes]
+        if fixes_run:
+            fix_names = [fix.__class__.__name__ for fix in fixes_run]
             fix_names.sort()
             filepath = os.path.join(self.directory, self.filename)
 
@@ -105,7 +145,8 @@ class EsgfSubmission(object):
             else:
                 new_history = filefix_history
 
-            _set_attribute(filepath, 'history', new_history)
+            with command_limits(filepath):
+                _set_attribute(filepath, 'history', new_history)
 
     def _get_data_request(self):
         """
@@ -115,8 +156,11 @@ class EsgfSubmission(object):
         :returns: the data request object corresponding to this submission
         :rtype: pre_proc_app.models.DataRequest
         """
+        data_reqs = DataRequest.objects.select_related(
+            'institution_id', 'source_id', 'experiment_id'
+        )
         try:
-            dreq = DataRequest.objects.get(
+            dreq = data_reqs.get(
                 source_id__name=self.source_id,
                 experiment_id__name=self.experiment_id,
                 variant_label=self.variant_label,
@@ -125,7 +169,7 @@ class EsgfSubmission(object):
             )
         except django.core.exceptions.ObjectDoesNotExist:
             try:
-                dreq = DataRequest.objects.get(
+                dreq = data_reqs.get(
                     source_id__name=self.source_id,
                     experiment_id__name=self.experiment_id,
                     variant_label=self.variant_label,
@@ -171,6 +215,6 @@ def _set_attribute(filepath, attr_name, attr_value):
     :param str attr_value: The new value of the specified attribute
     :raises RunTimeError: if ncatted doesn't complete successfully
     """
-    cmd = "ncatted -h -a {},global,o,c,'{}' {}".format(attr_name, attr_value,
-                                                       filepath)
-    run_command(cmd)
+    # No shell is used and so the value can contain any characters
+    run_command(['ncatted', '-h', '-a',
+                 '{},global,o,c,{}'.format(attr_name, attr_value), filepath])
@@ -9,7 +9,9 @@ __all__ = ['PreProcError', 'CannotLoadSourceFileError',
            'AttributeNotFoundError', 'AttributeConversionError',
            'ExistingAttributeError', 'InstanceVariableNotDefinedError',
            'CdoError', 'NcattedError', 'NcpdqError', 'Ncap2Error', 'NcksError',
-           'NcrenameError', 'DataRequestNotFound', 'MultipleDataRequestsFound']
+           'NcrenameError', 'CommandTimeoutError',
+           'InsufficientResourcesError', 'DataRequestNotFound',
+           'MultipleDataRequestsFound']
 
 
 class PreProcError(Exception):
@@ -159,6 +161,39 @@ class NcrenameError(ExternalCommandError):
                          traceback_text)
 
 
+class CommandTimeoutError(PreProcError):
+    """
+    When an external command doesn't complete within its time limit and is
+    killed.
+    """
+    def __init__(self, command, timeout):
+        self.command = command
+        self.timeout = timeout
+
+    def __str__(self):
+        return ('Command did not complete within {:.0f} seconds and was '
+                'killed:\n{}'.format(self.timeout, self.command))
+
+
+class InsufficientResourcesError(PreProcError):
+    """
+    When there isn't enough free disk space or memory to start fixing a file
+    and none is freed within the time allowed.
+    """
+    def __init__(self, filepath, resource, required, available, wait_time):
+        self.filepath = filepath
+        self.resource = resource
+        self.required = required
+        self.available = available
+        self.wait_time = wait_time
+
+    def __str__(self):
+        return ('Not enough {} to fix {} after waiting {:.0f} seconds: {} '
+                'bytes are required but only {} bytes can be used'.
+                format(self.resource, self.filepath, self.wait_time,
+                       self.required, self.available))
+
+
 class DataRequestNotFound(PreProcError):
     """
     When a pre_proc data request cannot be found.
@@ -0,0 +1,299 @@
+"""
+executor.py
+
+The executors that run external commands such as the NCO and cdo tools. Each
+command is a list of arguments and is run without a shell, so that no extra
+shell process is started and argument values don't need to be quoted. The
+executor used by pre_proc.common.run_command() is chosen with
+set_executor():
+
+SubprocessExecutor
+    Run the commands and measure the wall time, CPU time and peak memory
+    use of each one. This is the default.
+DryRunExecutor
+    Don't run the commands but record them, e.g. to check which commands a
+    fix would run.
+StandinExecutor
+    Run stand-ins for some tools, e.g. benchmarks/standin_nco.py on a
+    machine where the tools aren't installed, and run the other tools
+    normally.
+"""
+from abc import ABCMeta, abstractmethod
+from contextlib import contextmanager
+import logging
+import os
+import shlex
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# The time in seconds that an interrupted command is given to clean up
+# before it's killed
+INTERRUPT_GRACE_TIME = 5
+
+
+def command_string(argv):
+    """
+    Format a command as it would be typed into a shell, for messages.
+
+    :param list argv: The command's arguments
+    :returns: The command
+    :rtype: str
+    """
+    return ' '.join(shlex.quote(str(arg)) for arg in argv)
+
+
+def _kill_group(pid, timed_out):
+    """
+    Kill a command that has exceeded its time limit, and any processes that
+    it has started.
+
+    :param int pid: The command's process id, which is also its process
+        group's id
+    :param threading.Event timed_out: Set to show that the command was killed
+    """
+    timed_out.set()
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        # The command completed just as the limit was reached
+        pass
+
+
+def interrupt_group(process):
+    """
+    Forward an interrupt, e.g. from Ctrl-C, to a command that is running in
+    its own session and so doesn't receive the terminal's signals. The
+    command is killed if it hasn't exited within INTERRUPT_GRACE_TIME.
+
+    :param subprocess.Popen process: The command's process, whose id is also
+        its process group's id
+    """
+    try:
+        os.killpg(process.pid, signal.SIGINT)
+        process.wait(INTERRUPT_GRACE_TIME)
+    except ProcessLookupError:
+        return
+    except subprocess.TimeoutExpired:
+        logger.warning('Killed {} after it was interrupted'.
+                       format(command_string(process.args)))
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            return
+        process.wait()
+
+
+class CommandResult(object):
+    """
+    The result and resource usage of running a command.
+    """
+    def __init__(self, argv, returncode, stdout='', stderr='', wall_time=0.0,
+                 cpu_time=0.0, max_rss=0, timed_out=False):
+        """
+        Initialise the class
+
+        :param list argv: The command's arguments
+        :param int returncode: The command's exit status
+        :param str stdout: The command's standard output
+        :param str stderr: The command's standard error
+        :param float wall_time: The elapsed time in seconds
+        :param float cpu_time: The user and system CPU time in seconds
+        :param int max_rss: The command's peak resident set size in KiB
+        :param bool timed_out: True if the command was killed because it
+            didn't complete within its time limit
+        """
+        self.argv = argv
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.wall_time = wall_time
+        self.cpu_time = cpu_time
+        self.max_rss = max_rss
+        self.timed_out = timed_out
+
+    def __repr__(self):
+        return 'CommandResult({!r}, {})'.format(command_string(self.argv),
+                                                self.returncode)
+
+
+class Executor(object, metaclass=ABCMeta):
+    """
+    The abstract base class of the executors.
+    """
+    @abstractmethod
+    def run(self, argv, timeout=None):
+        """
+        Run a command.
+
+        :param list argv: The command's arguments
+        :param float timeout: The time in seconds after which the command is
+            killed, or None for no limit
+        :returns: The result
+        :rtype: CommandResult
+        """
+        pass
+
+    @contextmanager
+    def blocking_io(self):
+        """
+        A context manager around slow file I/O that is done in Python rather
+        than by an external command, e.g. staging a copy of a file, during
+        which other files can be worked on. The netCDF libraries mustn't be
+        used within it. By default it does nothing.
+        """
+        yield
+
+
+class SubprocessExecutor(Executor):
+    """
+    Run each command as a child process and collect its resource usage with
+    os.wait4().
+    """
+    def run(self, argv, timeout=None):
+        """
+        Run a command. The output is written to temporary files rather than
+        pipes so that the process can be waited for with os.wait4() without
+        the risk of it blocking on a full pipe. The command is run in its own
+        process group so that if it times out then any processes that it has
+        started are killed with it. Because the process group is in its own
+        session, an interrupt is forwarded to it.
+
+        :param list argv: The command's arguments
+        :param float timeout: The time in seconds after which the command is
+            killed, or None for no limit
+        :returns: The result
+        :rtype: CommandResult
+        """
+        argv = [str(arg) for arg in argv]
+        start_time = time.perf_counter()
+        with tempfile.TemporaryFile() as stdout_fh, \
+                tempfile.TemporaryFile() as stderr_fh:
+            try:
+                process = subprocess.Popen(argv, stdin=subprocess.DEVNULL,
+                                           stdout=stdout_fh, stderr=stderr_fh,
+                                           start_new_session=True)
+            except OSError as exc:
+                # e.g. the tool isn't installed
+                return CommandResult(argv, 127, stderr=str(exc),
+                                     wall_time=time.perf_counter() -
+                                     start_time)
+            timed_out = threading.Event()
+            watchdog = None
+            if timeout is not None:
+                watchdog = threading.Timer(timeout, _kill_group,
+                                           (process.pid, timed_out))
+                watchdog.daemon = True
+                watchdog.start()
+            try:
+                _pid, status, rusage = os.wait4(process.pid, 0)
+            except KeyboardInterrupt:
+                interrupt_group(process)
+                raise
+            finally:
+                if watchdog:
+                    watchdog.cancel()
+            # Tell the Popen object that the process has been reaped
+            if os.WIFSIGNALED(status):
+                process.returncode = -os.WTERMSIG(status)
+            else:
+                process.returncode = os.WEXITSTATUS(status)
+            wall_time = time.perf_counter() - start_time
+            stdout_fh.seek(0)
+            stderr_fh.seek(0)
+            stdout = stdout_fh.read().decode(errors='replace')
+            stderr = stderr_fh.read().decode(errors='replace')
+
+        if timed_out.is_set():
+            logger.warning('Killed {} after {:.0f} seconds'.
+                           format(command_string(argv), timeout))
+        return CommandResult(argv, process.returncode, stdout, stderr,
+                             wall_time, rusage.ru_utime + rusage.ru_stime,
+                             rusage.ru_maxrss, timed_out.is_set())
+
+
+class DryRunExecutor(Executor):
+    """
+    Record the commands without running them. Every command succeeds.
+    """
+    def __init__(self):
+        """
+        Initialise the class
+        """
+        self.commands = []
+
+    def run(self, argv, timeout=None):
+        """
+        Record a command.
+
+        :param list argv: The command's arguments
+        :param float timeout: Ignored
+        :returns: A successful result with no output
+        :rtype: CommandResult
+        """
+        argv = [str(arg) for arg in argv]
+        self.commands.append(argv)
+        logger.debug('Not running {}'.format(command_string(argv)))
+        return CommandResult(argv, 0)
+
+
+class StandinExecutor(SubprocessExecutor):
+    """
+    Run stand-ins in place of some tools.
+    """
+    def __init__(self, standins):
+        """
+        Initialise the class
+
+        :param dict standins: The arguments that replace each tool's name,
+            keyed by the tool's name, e.g.
+            `{'ncks': ['python', 'standin_nco.py', 'ncks']}`
+        """
+        self.standins = standins
+
+    def run(self, argv, timeout=None):
+        """
+        Run a command, or its stand-in if it has one.
+
+        :param list argv: The command's arguments
+        :param float timeout: The time in seconds after which the command is
+            killed, or None for no limit
+        :returns: The result
+        :rtype: CommandResult
+        """
+        tool = os.path.basename(str(argv[0]))
+        if tool in self.standins:
+            argv = list(self.standins[tool]) + list(argv[1:])
+        return super().run(argv, timeout)
+
+
+# The executor used by pre_proc.common.run_command()
+_executor = SubprocessExecutor()
+
+
+def get_executor():
+    """
+    Get the executor that external commands are run with.
+
+    :returns: The executor
+    :rtype: Executor
+    """
+    return _executor
+
+
+def set_executor(executor):
+    """
+    Set the executor that external commands are run with.
+
+    :param Executor executor: The executor
+    :returns: The previous executor
+    :rtype: Executor
+    """
+    global _executor
+    previous = _executor
+    _executor = executor
+    return previous
@@ -5,21 +5,39 @@ The abstract base file fixes.
 """
 from abc import ABCMeta, abstractmethod
 import os
-import shutil
 import traceback
 
 from netCDF4 import Dataset
 
 from pre_proc.common import run_command
+from pre_proc.executor import command_string
 from pre_proc.exceptions import (AttributeNotFoundError,
                                  InstanceVariableNotDefinedError,
                                  Ncap2Error, NcattedError, NcksError)
+from pre_proc.file_header import has_nco_type
+from pre_proc.staging import copy_file, replace_file
+
+# The assumed ratio of a netCDF3 copy's size to a compressed netCDF4 file's
+# size that is used by the dry-run planner
+NETCDF3_EXPANSION = 3.0
 
 
 class FileFix(object, metaclass=ABCMeta):
     """
     The abstract base class that all fixes are made from
     """
+    # An estimate of the cost of applying the fix that is used by the dry-run
+    # planner: the number of external commands run, the number of times that
+    # the whole file is rewritten, the peak disk usage as a multiple of the
+    # file's size (including the file itself), the peak memory use as a
+    # multiple of the file's size, and the volumes read and written as
+    # multiples of the file's size.
+    num_commands = 0
+    num_rewrites = 0
+    peak_disk_factor = 1.0
+    peak_memory_factor = 0.0
+    read_factor = 0.0
+    write_factor = 0.0
 
     def __init__(self, filename, directory):
         """
@@ -36,12 +54,36 @@ class FileFix(object, metaclass=ABCMeta):
     def apply_fix(self):
         pass
 
+    def is_satisfied(self, header):
+        """
+        Check cheaply whether the file already satisfies this fix and so the
+        fix doesn't need to be applied. Fixes that can be checked from the
+        file's metadata override this to declare a probe.
+
+        :param pre_proc.file_header.FileHeader header: The file's header
+        :returns: True if the fix doesn't need to be applied.
+        :rtype: bool
+        """
+        return False
+
+    @classmethod
+    def has_probe(cls):
+        """
+        Check whether this fix declares a probe by overriding is_satisfied().
+
+        :returns: True if the fix declares a probe.
+        :rtype: bool
+        """
+        return cls.is_satisfied is not FileFix.is_satisfied
+
 
 class AttributeEdit(FileFix, metaclass=ABCMeta):
     """
     An abstract base class for fixes that require the use of `ncatted` to
     fix a metadata attribute.
     """
+    # ncatted only edits the metadata in place
+    num_commands = 1
 
     def __init__(self, filename, directory):
         """
@@ -74,6 +116,18 @@ class AttributeEdit(FileFix, metaclass=ABCMeta):
         """
         pass
 
+    def _attribute_matches(self, header):
+        """
+        Check whether the attribute already has the new value.
+
+        :param pre_proc.file_header.FileHeader header: The file's header
+        :returns: True if the attribute already has the new value and type.
+        :rtype: bool
+        """
+        return header.attribute_matches(self.attribute_visibility,
+                                        self.attribute_name, self.new_value,
+                                        self.attribute_type)
+
     def _run_ncatted(self, nco_mode):
         """
         Run the command
@@ -89,30 +143,35 @@ class AttributeEdit(FileFix, metaclass=ABCMeta):
 
         # Aiming for:
         # ncatted -h -a branch_time_in_parent,global,o,d,10800.0
-
-        quote_mark = "'" if isinstance(self.new_value, str) else ""
-
-        cmd = 'ncatted -h -a {},{},{},{},{}{}{} {}'.format(
-            self.attribute_name,
-            self.attribute_visibility,
-            nco_mode,
-            self.attribute_type,
-            quote_mark,
-            self.new_value,
-            quote_mark,
+        # No shell is used and so string values aren't quoted
+        cmd = [
+            'ncatted', '-h', '-a',
+            '{},{},{},{},{}'.format(
+                self.attribute_name,
+                self.attribute_visibility,
+                nco_mode,
+                self.attribute_type,
+                self.new_value
+            ),
             os.path.join(self.directory, self.filename)
-        )
+        ]
         try:
             run_command(cmd)
         except Exception:
-            raise NcattedError(type(self).__name__, self.filename, cmd,
-                               traceback.format_exc())
+            raise NcattedError(type(self).__name__, self.filename,
+                               command_string(cmd), traceback.format_exc())
 
 
 class DataFix(FileFix, metaclass=ABCMeta):
     """
     An abstract base class for fixes that edit the data in a netCDF file.
     """
+    # The tools read each variable into memory uncompressed
+    num_rewrites = 1
+    peak_memory_factor = NETCDF3_EXPANSION
+    read_factor = 1.0
+    write_factor = 1.0
+
     def __init__(self, filename, directory):
         """
         Initialise the class
@@ -123,9 +182,12 @@ class DataFix(FileFix, metaclass=ABCMeta):
 class NcoDataFix(DataFix, metaclass=ABCMeta):
     """
     An abstract base class for fixes that edit the data in a netCDF file
-    using the NCO tools. The specified command is run and the input and output
-    names are appended by this class.
+    using the NCO tools. The specified command, a list of arguments, is run
+    and the input and output names are appended by this class.
     """
+    num_commands = 1
+    peak_disk_factor = 2.0
+
     def __init__(self, filename, directory):
         """
         Initialise the class
@@ -144,26 +206,32 @@ class NcoDataFix(DataFix, metaclass=ABCMeta):
         if os.path.exists(temp_file):
             os.remove(temp_file)
 
-        cmd = f'{self.command} {output_file} {temp_file}'
+        cmd = self.command + [output_file, temp_file]
         try:
             run_command(cmd)
         except Exception:
             if os.path.exists(temp_file):
                 os.remove(temp_file)
-            raise command_error(type(self).__name__, self.filename, cmd,
-                                traceback.format_exc())
+            raise command_error(type(self).__name__, self.filename,
+                                command_string(cmd), traceback.format_exc())
 
-        os.remove(output_file)
-        os.rename(temp_file, output_file)
+        replace_file(temp_file, output_file)
 
 
 class NcksAppendDataFix(DataFix, metaclass=ABCMeta):
     """
     An abstract base class for fixes that edit the data in a netCDF file
     using ncks to append a reference file into the specified file. The file
-    to append should be specified in the command and the specified file's name
-    will be added to this by the class when the command is run.
+    to append should be specified in the command, a list of arguments, and
+    the specified file's name will be added to this by the class when the
+    command is run.
     """
+    # A copy is made and then ncks rewrites the copy as it appends
+    num_commands = 1
+    num_rewrites = 2
+    peak_disk_factor = 3.0
+    read_factor = 2.0
+    write_factor = 2.0
 
     def __init__(self, filename, directory):
         """
@@ -183,18 +251,17 @@ class NcksAppendDataFix(DataFix, metaclass=ABCMeta):
         if os.path.exists(temp_file):
             os.remove(temp_file)
 
-        shutil.copyfile(output_file, temp_file)
+        copy_file(output_file, temp_file)
 
-        cmd = f'{self.command} {temp_file}'
+        cmd = self.command + [temp_file]
         try:
             run_command(cmd)
         except Exception:
             os.remove(temp_file)
-            raise NcksError(type(self).__name__, self.filename, cmd,
-                            traceback.format_exc())
+            raise NcksError(type(self).__name__, self.filename,
+                            command_string(cmd), traceback.format_exc())
         else:
-            os.remove(output_file)
-            os.rename(temp_file, output_file)
+            replace_file(temp_file, output_file)
 
 
 class AttributeUpdate(AttributeEdit, metaclass=ABCMeta):
@@ -220,6 +287,34 @@ class AttributeUpdate(AttributeEdit, metaclass=ABCMeta):
         self._calculate_new_value()
         self._run_ncatted('o')
 
+    def is_satisfied(self, header):
+        """
+        Check whether the existing attribute has already been updated.
+
+        :param pre_proc.file_header.FileHeader header: The file's header
+        :returns: True if the fix doesn't need to be applied.
+        :rtype: bool
+        """
+        existing_value = header.get_attribute(self.attribute_visibility,
+                                              self.attribute_name)
+        if existing_value is None:
+            return False
+        return self._is_updated(existing_value)
+
+    def _is_updated(self, existing_value):
+        """
+        Check whether an existing value has already been updated. By default
+        an update to a numeric type is complete if the existing value already
+        has that type. Fixes that edit strings override this.
+
+        :param existing_value: The attribute's existing value
+        :returns: True if the value has already been updated.
+        :rtype: bool
+        """
+        if self.attribute_type == 'c':
+            return False
+        return has_nco_type(existing_value, self.attribute_type)
+
     def _get_existing_value(self):
         """
         Get the value of the existing attribute from the current file
@@ -287,6 +382,19 @@ class CopyGlobalAttribute(CopyAttribute, metaclass=ABCMeta):
         if self.new_value is None:
             raise AttributeNotFoundError(self.filename, self.source_attribute)
 
+    def is_satisfied(self, header):
+        """
+        Check whether the attribute already has the source attribute's value.
+
+        :param pre_proc.file_header.FileHeader header: The file's header
+        :returns: True if the fix doesn't need to be applied.
+        :rtype: bool
+        """
+        self.new_value = header.get_attribute('global', self.source_attribute)
+        if self.new_value is None:
+            return False
+        return self._attribute_matches(header)
+
 
 class CopyVariableAttribute(CopyAttribute, metaclass=ABCMeta):
     """
@@ -323,6 +431,20 @@ class CopyVariableAttribute(CopyAttribute, metaclass=ABCMeta):
         if self.new_value is None:
             raise_error()
 
+    def is_satisfied(self, header):
+        """
+        Check whether the attribute already has the source attribute's value.
+
+        :param pre_proc.file_header.FileHeader header: The file's header
+        :returns: True if the fix doesn't need to be applied.
+        :rtype: bool
+        """
+        self.new_value = header.get_attribute(self.variable_name,
+                                              self.source_attribute)
+        if self.new_value is None:
+            return False
+        return self._attribute_matches(header)
+
 
 class AttributeAdd(AttributeEdit, metaclass=ABCMeta):
     """
@@ -343,6 +465,17 @@ class AttributeAdd(AttributeEdit, metaclass=ABCMeta):
         self._calculate_new_value()
         self._run_ncatted('o')
 
+    def is_satisfied(self, header):
+        """
+        Check whether the attribute already has the new value.
+
+        :param pre_proc.file_header.FileHeader header: The file's header
+        :returns: True if the fix doesn't need to be applied.
+        :rtype: bool
+        """
+        self._calculate_new_value()
+        return self._attribute_matches(header)
+
 
 class AttributeDelete(AttributeEdit, metaclass=ABCMeta):
     """
@@ -368,6 +501,17 @@ class AttributeDelete(AttributeEdit, metaclass=ABCMeta):
         self._calculate_new_value()
         self._run_ncatted('d')
 
+    def is_satisfied(self, header):
+        """
+        Check whether the attribute has already been removed.
+
+        :param pre_proc.file_header.FileHeader header: The file's header
+        :returns: True if the fix doesn't need to be applied.
+        :rtype: bool
+        """
+        return not header.has_attribute(self.attribute_visibility,
+                                        self.attribute_name)
+
 
 class RemoveHalo(NcoDataFix, metaclass=ABCMeta):
     """
@@ -392,7 +536,7 @@ class RemoveHalo(NcoDataFix, metaclass=ABCMeta):
         Remove the halo.
         """
         self._set_row_spec()
-        self.command = f'ncks -h --no_alphabetize {self.row_spec}'
+        self.command = ['ncks', '-h', '--no_alphabetize'] + self.row_spec
         self._run_nco_command(NcksError)
 
 
@@ -400,7 +544,9 @@ class MultiStageDataFix(DataFix, metaclass=ABCMeta):
     """
     A DataFix where intermediate files are generated by multiple intermediate
     commands. When an external command fails then these intermediate files are
-    deleted.
+    deleted. The original file is only replaced, with
+    pre_proc.staging.replace_file(), once the final file is complete and so
+    it's never modified by a failed command.
     """
     def __init__(self, filename, directory):
         """Initialise the class"""
@@ -410,26 +556,39 @@ class MultiStageDataFix(DataFix, metaclass=ABCMeta):
     def _run_command(self, cmd, cmd_error):
         """
         Run `cmd` and raise `cmd_error` if it fails when the specified
-        temporary files are deleted.
+        temporary files are deleted. They're also deleted if the command is
+        interrupted.
 
-        :param str cmd: The command to run
+        :param list cmd: The command's arguments
         :param PreProcError cmd_error: The exception to raise if the command
             fails
         """
         try:
             run_command(cmd)
-        except Exception:
+        except BaseException as exc:
             for fn in self.intermediate_files:
                 if os.path.exists(fn):
                     os.remove(fn)
-            raise cmd_error(type(self).__name__, self.filename, cmd,
-                            traceback.format_exc())
+            if not isinstance(exc, Exception):
+                # e.g. KeyboardInterrupt
+                raise
+            raise cmd_error(type(self).__name__, self.filename,
+                            command_string(cmd), traceback.format_exc())
 
 
 class FixHadGEMMask(MultiStageDataFix, metaclass=ABCMeta):
     """
     Fix the land sea mask in the HadGEM ORCA grids.
     """
+    # The copy, masked and final intermediate files all exist at the end.
+    # ncap2 holds the uncompressed variable and its mask in memory.
+    num_commands = 3
+    num_rewrites = 4
+    peak_disk_factor = 4.0
+    peak_memory_factor = 2 * NETCDF3_EXPANSION
+    read_factor = 4.0
+    write_factor = 4.0
+
     def __init__(self, filename, directory):
         """Initialise the class"""
         super().__init__(filename, directory)
@@ -461,27 +620,27 @@ class FixHadGEMMask(MultiStageDataFix, metaclass=ABCMeta):
         for fn in self.intermediate_files:
             if os.path.exists(fn):
                 os.remove(fn)
-        shutil.copyfile(output_file, temp_file)
+        copy_file(output_file, temp_file)
 
         # Copy the mask into the file
-        command = (f"ncks -h --no_alphabetize -A -v {self.mask_var_name} "
-                   f"{self.byte_mask_file} {temp_file}")
+        command = ['ncks', '-h', '--no_alphabetize', '-A', '-v',
+                   self.mask_var_name, self.byte_mask_file, temp_file]
         self._run_command(command, NcksError)
 
         # Do the masking
-        command = (f"ncap2 -h -s 'where({self.mask_var_name}!=0) "
-                   f"{self.variable_name}={self.variable_name}@_FillValue' "
-                   f"{temp_file} {masked_file}")
+        command = ['ncap2', '-h', '-s',
+                   f'where({self.mask_var_name}!=0) '
+                   f'{self.variable_name}={self.variable_name}@_FillValue',
+                   temp_file, masked_file]
         self._run_command(command, Ncap2Error)
 
         # Remove the mask
-        command = (f"ncks -h --no_alphabetize -x -v {self.mask_var_name} "
-                   f"{masked_file} {final_file}")
+        command = ['ncks', '-h', '--no_alphabetize', '-x', '-v',
+                   self.mask_var_name, masked_file, final_file]
         self._run_command(command, NcksError)
 
         # Set the name on the file and remove intermediate files
-        os.remove(output_file)
-        os.rename(final_file, output_file)
+        replace_file(final_file, output_file)
         self.intermediate_files.remove(final_file)
         for fn in self.intermediate_files:
             os.remove(fn)
@@ -491,6 +650,14 @@ class InsertHadGEMGrid(MultiStageDataFix, metaclass=ABCMeta):
     """
     Insert the correct grid into HadGEM ocean and ice files.
     """
+    # The netCDF3 intermediate file is uncompressed and so is assumed to be
+    # NETCDF3_EXPANSION times the size of the original
+    num_commands = 3
+    num_rewrites = 3
+    peak_disk_factor = 2.0 + NETCDF3_EXPANSION
+    read_factor = 1.0 + 2 * NETCDF3_EXPANSION
+    write_factor = 1.0 + 2 * NETCDF3_EXPANSION
+
     def __init__(self, filename, directory):
         """Initialise the class"""
         super().__init__(filename, directory)
@@ -505,34 +672,34 @@ class InsertHadGEMGrid(MultiStageDataFix, metaclass=ABCMeta):
         self._set_known_good()
         output_file = os.path.join(self.directory, self.filename)
         temp_file = output_file + '.temp'
-        backup_file = output_file + '.temp_backup'
-        self.intermediate_files = [temp_file, backup_file]
+        final_file = output_file + '.temp_final'
+        self.intermediate_files = [temp_file, final_file]
 
-        if os.path.exists(temp_file):
-            os.remove(temp_file)
+        # Remove any temporary file left over from a previous failed
+        # run as it could prevent some nco commands from running.
+        for fn in self.intermediate_files:
+            if os.path.exists(fn):
+                os.remove(fn)
 
         # Convert to netCDF3
-        command = (f'ncks -h --no_alphabetize -3 '
-                   f'{output_file} {temp_file}')
+        command = ['ncks', '-h', '--no_alphabetize', '-3', output_file,
+                   temp_file]
         self._run_command(command, NcksError)
 
         # Paste in the grid
-        command = (f'ncks -h --no_alphabetize -A -v latitude,longitude,'
-                   f'vertices_latitude,vertices_longitude '
-                   f'{self.known_good_file} {temp_file}')
+        command = ['ncks', '-h', '--no_alphabetize', '-A', '-v',
+                   'latitude,longitude,vertices_latitude,vertices_longitude',
+                   self.known_good_file, temp_file]
         self._run_command(command, NcksError)
 
-        # All's gone well so rename the original file
-        os.rename(output_file, backup_file)
-
         # Save as netCDF v4
-        command = (f'ncks -h --no_alphabetize -7 --deflate=3 {temp_file} '
-                   f'{output_file}')
+        command = ['ncks', '-h', '--no_alphabetize', '-7', '--deflate=3',
+                   temp_file, final_file]
         self._run_command(command, NcksError)
 
-        # Complete so remove the intermediate files
-        for fn in self.intermediate_files:
-            os.remove(fn)
+        # The original is only replaced once the new file is complete
+        replace_file(final_file, output_file)
+        os.remove(temp_file)
 
     @abstractmethod
     def _set_known_good(self):
@@ -205,6 +205,13 @@ class FurtherInfoUrlToHttps(AttributeUpdate):
 
         self.new_value = self.existing_value.replace('http:', 'https:', 1)
 
+    def _is_updated(self, existing_value):
+        """
+        The update is complete if the URL already uses HTTPS.
+        """
+        return (isinstance(existing_value, str) and
+                existing_value.startswith('https:'))
+
 
 class FurtherInfoUrlAWISourceIdAndHttps(AttributeUpdate):
     """
@@ -289,6 +296,14 @@ class FurtherInfoUrlPrimToHttps(AttributeUpdate):
             1
         )
 
+    def _is_updated(self, existing_value):
+        """
+        The update is complete if the URL is already the PRIMAVERA HTTPS one.
+        """
+        return (isinstance(existing_value, str) and
+                existing_value.startswith(
+                    'https://furtherinfo.es-doc.org/PRIMAVERA'))
+
 
 class FurtherInfoUrlToPrim(AttributeUpdate):
     """
@@ -325,6 +340,14 @@ class FurtherInfoUrlToPrim(AttributeUpdate):
             1
         )
 
+    def _is_updated(self, existing_value):
+        """
+        The update is complete if the URL is already the PRIMAVERA HTTPS one.
+        """
+        return (isinstance(existing_value, str) and
+                existing_value.startswith(
+                    'https://furtherinfo.es-doc.org/PRIMAVERA'))
+
 
 class AogcmToAgcm(AttributeUpdate):
     """
@@ -352,6 +375,12 @@ class AogcmToAgcm(AttributeUpdate):
         else:
             self.new_value = 'AGCM'
 
+    def _is_updated(self, existing_value):
+        """
+        The update is complete if the existing value is already `AGCM`.
+        """
+        return existing_value == 'AGCM'
+
 
 class TrackingIdFix(AttributeUpdate):
     """
@@ -379,3 +408,10 @@ class TrackingIdFix(AttributeUpdate):
                                          'starts with hdl:')
 
         self.new_value = 'hdl:21.14100/{}'.format(self.existing_value)
+
+    def _is_updated(self, existing_value):
+        """
+        The update is complete if the tracking_id already starts with hdl:
+        """
+        return (isinstance(existing_value, str) and
+                existing_value.startswith('hdl:'))
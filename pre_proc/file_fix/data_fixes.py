@@ -11,8 +11,9 @@ import warnings
 import iris
 
 from .abstract import (DataFix, FixHadGEMMask, NcoDataFix, NcksAppendDataFix,
-                       RemoveHalo, InsertHadGEMGrid)
+                       RemoveHalo, InsertHadGEMGrid, NETCDF3_EXPANSION)
 from pre_proc.common import run_command
+from pre_proc.executor import command_string
 from pre_proc.exceptions import (ExistingAttributeError, CdoError, Ncap2Error,
                                  NcattedError, NcpdqError, NcksError,
                                  NcrenameError)
@@ -36,6 +37,13 @@ class LatDirection(NcoDataFix):
     """
     Reverse the direction of the latitude dimension using ncpdq.
     """
+    # ncpdq rewrites the file and then the bounds are fixed in four more
+    # commands, the last of which rewrites the file again
+    num_commands = 5
+    num_rewrites = 2
+    read_factor = 2.0
+    write_factor = 2.0
+
     def __init__(self, filename, directory):
         """
         Initialise the class
@@ -51,7 +59,7 @@ class LatDirection(NcoDataFix):
         if not self._is_lat_decreasing():
             raise ExistingAttributeError(self.filename, 'latitude',
                                          'Latitude is not decreasing.')
-        self.command = 'ncpdq -a -lat'
+        self.command = ['ncpdq', '-a', '-lat']
         self._run_nco_command(NcpdqError)
 
         original_nc = os.path.join(self.directory, self.filename)
@@ -66,13 +74,14 @@ class LatDirection(NcoDataFix):
 
         commands = [
             # Copy lat_bnds to a new file
-            f'ncks -v lat_bnds {original_nc} {bnds_file}',
+            ['ncks', '-v', 'lat_bnds', original_nc, bnds_file],
             # Swap the colums
-            f'ncpdq -a -bnds {bnds_file} {corrected_bnds_file}',
+            ['ncpdq', '-a', '-bnds', bnds_file, corrected_bnds_file],
             # Remove history from lat_bnds as this is pasted back into the file
-            f'ncatted -h -a history,global,d,, {corrected_bnds_file}',
+            ['ncatted', '-h', '-a', 'history,global,d,,',
+             corrected_bnds_file],
             # Paste the fixed bnds back into the original file
-            f'ncks -A -v lat_bnds {corrected_bnds_file} {original_nc}'
+            ['ncks', '-A', '-v', 'lat_bnds', corrected_bnds_file, original_nc]
         ]
         for cmd in commands:
             try:
@@ -83,9 +92,9 @@ class LatDirection(NcoDataFix):
                     'ncpdq': NcpdqError,
                     'ncatted': NcattedError
                 }
-                cmd_name = cmd.split()[0]
-                raise exceptions[cmd_name](type(self).__name__, self.filename,
-                                           cmd, traceback.format_exc())
+                raise exceptions[cmd[0]](type(self).__name__, self.filename,
+                                         command_string(cmd),
+                                         traceback.format_exc())
         os.remove(bnds_file)
         os.remove(corrected_bnds_file)
 
@@ -117,7 +126,7 @@ class LevToPlev(NcoDataFix):
         """
         Run ncpdq and then swap the columns in lat_bnds.
         """
-        self.command = 'ncrename -h -d lev,plev -v lev,plev'
+        self.command = ['ncrename', '-h', '-d', 'lev,plev', '-v', 'lev,plev']
         self._run_nco_command(NcrenameError)
 
 
@@ -125,6 +134,10 @@ class ToDegC(NcoDataFix):
     """
     Convert the data and units of a file from Kelvin to degrees Celsius.
     """
+    # ncap2 holds the uncompressed variable and the result in memory
+    num_commands = 2
+    peak_memory_factor = 2 * NETCDF3_EXPANSION
+
     def __init__(self, filename, directory):
         """
         Initialise the class
@@ -146,16 +159,18 @@ class ToDegC(NcoDataFix):
             raise ExistingAttributeError(self.filename, 'units',
                                          'Units are not K.')
 
-        self.command = (f"ncap2 -h -s '{self.variable_name}="
-                        f"{self.variable_name}-273.15f'")
+        self.command = ['ncap2', '-h', '-s',
+                        f'{self.variable_name}={self.variable_name}-273.15f']
         self._run_nco_command(Ncap2Error)
-        units_command = (f"ncatted -h -a units,{self.variable_name},m,c,'degC' "
-                         f"{os.path.join(self.directory, self.filename)}")
+        units_command = ['ncatted', '-h', '-a',
+                         f'units,{self.variable_name},m,c,degC',
+                         os.path.join(self.directory, self.filename)]
         try:
             run_command(units_command)
         except Exception:
             raise NcattedError(type(self).__name__, self.filename,
-                               units_command, traceback.format_exc())
+                               command_string(units_command),
+                               traceback.format_exc())
 
     def _is_kelvin(self):
         """
@@ -172,6 +187,11 @@ class AAVarNameToFileName(NcoDataFix):
     Rename the variable itself and variable_id global attribute to the first
     component of the filename.
     """
+    num_commands = 2
+    num_rewrites = 2
+    read_factor = 2.0
+    write_factor = 2.0
+
     def __init__(self, filename, directory):
         """
         Initialise the class
@@ -185,10 +205,11 @@ class AAVarNameToFileName(NcoDataFix):
         var_name = self.filename.split('_')[0]
         existing_name = self._get_existing_name()
 
-        self.command = f'ncrename -h -v {existing_name},{var_name}'
+        self.command = ['ncrename', '-h', '-v', f'{existing_name},{var_name}']
         self._run_nco_command(NcrenameError)
 
-        self.command = f'ncatted -h -a variable_id,global,m,c,{var_name}'
+        self.command = ['ncatted', '-h', '-a',
+                        f'variable_id,global,m,c,{var_name}']
         self._run_nco_command(NcattedError)
 
     def _get_existing_name(self):
@@ -260,7 +281,8 @@ class SetTimeReference1949(NcoDataFix):
         """
         Use cdo to set the reference time.
         """
-        self.command = "cdo -z zip_3 -setreftime,'1949-01-01','00:00:00'"
+        self.command = ['cdo', '-z', 'zip_3',
+                        '-setreftime,1949-01-01,00:00:00']
         self._run_nco_command(CdoError)
 
 
@@ -268,6 +290,8 @@ class ZZZAddHeight2m(NcksAppendDataFix):
     """
     Add a heighr2m dimension from the reference file.
     """
+    num_commands = 2
+
     def __init__(self, filename, directory):
         """
         Initialise the class
@@ -282,17 +306,19 @@ class ZZZAddHeight2m(NcksAppendDataFix):
         """
         Use cdo to set the reference time.
         """
-        self.command = f"ncks -h -A -v height {self.reference_file}"
+        self.command = ['ncks', '-h', '-A', '-v', 'height',
+                        self.reference_file]
         self._run_ncks_command()
 
-        units_command = (f"ncatted -h -a coordinates,{self.variable_name},o,c,"
-                         f"'height' "
-                         f"{os.path.join(self.directory, self.filename)}")
+        units_command = ['ncatted', '-h', '-a',
+                         f'coordinates,{self.variable_name},o,c,height',
+                         os.path.join(self.directory, self.filename)]
         try:
             run_command(units_command)
         except Exception:
             raise NcattedError(type(self).__name__, self.filename,
-                               units_command, traceback.format_exc())
+                               command_string(units_command),
+                               traceback.format_exc())
 
 
 class AAARemoveOrca1Halo(RemoveHalo):
@@ -306,7 +332,7 @@ class AAARemoveOrca1Halo(RemoveHalo):
 
     def _set_row_spec(self):
         """Set the row specification"""
-        self.row_spec = '-di,1,360 -dj,1,330'
+        self.row_spec = ['-di,1,360', '-dj,1,330']
 
 
 class AAARemoveOrca025Halo(RemoveHalo):
@@ -320,7 +346,7 @@ class AAARemoveOrca025Halo(RemoveHalo):
 
     def _set_row_spec(self):
         """Set the row specification"""
-        self.row_spec = '-di,1,1440 -dj,1,1205'
+        self.row_spec = ['-di,1,1440', '-dj,1,1205']
 
 
 class FixMaskOrca1TSurface(FixHadGEMMask):
@@ -0,0 +1,147 @@
+"""
+file_header.py
+
+A single read of a netCDF file's metadata that can be shared between the
+fixes that are to be applied to that file.
+"""
+import numpy as np
+from netCDF4 import Dataset
+
+from pre_proc.exceptions import CannotLoadSourceFileError
+
+# The numpy types of the numeric attribute types that can be passed to
+# ncatted
+NCO_NUMPY_TYPES = {
+    'f': np.float32,
+    'd': np.float64,
+    'b': np.int8,
+    'ub': np.uint8,
+    's': np.int16,
+    'us': np.uint16,
+    'i': np.int32,
+    'l': np.int32,
+    'u': np.uint32,
+    'ui': np.uint32,
+    'ul': np.uint32,
+    'll': np.int64,
+    'int64': np.int64,
+    'ull': np.uint64,
+    'uint64': np.uint64
+}
+
+
+class FileHeader(object):
+    """
+    The global attributes and the attributes of each variable in a netCDF
+    file.
+    """
+    def __init__(self, global_attributes, variable_attributes):
+        """
+        Initialise the class
+
+        :param dict global_attributes: The global attributes' values keyed by
+            their names
+        :param dict variable_attributes: A dictionary of each variable's
+            attributes keyed by the variable's name
+        """
+        self.global_attributes = global_attributes
+        self.variable_attributes = variable_attributes
+
+    @classmethod
+    def from_file(cls, filepath):
+        """
+        Read the header from a netCDF file.
+
+        :param str filepath: The full path to the file
+        :returns: The file's header
+        :rtype: pre_proc.file_header.FileHeader
+        :raises CannotLoadSourceFileError: if the file cannot be opened
+        """
+        try:
+            with Dataset(filepath) as rootgrp:
+                global_attributes = {name: rootgrp.getncattr(name)
+                                     for name in rootgrp.ncattrs()}
+                variable_attributes = {
+                    var_name: {name: var.getncattr(name)
+                               for name in var.ncattrs()}
+                    for var_name, var in rootgrp.variables.items()
+                }
+        except (IOError, OSError):
+            raise CannotLoadSourceFileError(filepath)
+
+        return cls(global_attributes, variable_attributes)
+
+    def get_attribute(self, visibility, attribute_name):
+        """
+        Get an attribute's value.
+
+        :param str visibility: `global` or the name of the variable that the
+            attribute belongs to, as passed to ncatted
+        :param str attribute_name: The name of the attribute
+        :returns: The attribute's value or None if it doesn't exist
+        """
+        return self._attributes(visibility).get(attribute_name)
+
+    def has_attribute(self, visibility, attribute_name):
+        """
+        Check whether an attribute exists.
+
+        :param str visibility: `global` or the name of the variable that the
+            attribute belongs to, as passed to ncatted
+        :param str attribute_name: The name of the attribute
+        :returns: True if the attribute exists.
+        :rtype: bool
+        """
+        return attribute_name in self._attributes(visibility)
+
+    def attribute_matches(self, visibility, attribute_name, value,
+                          attribute_type):
+        """
+        Check whether an attribute already has the specified value and type.
+
+        :param str visibility: `global` or the name of the variable that the
+            attribute belongs to, as passed to ncatted
+        :param str attribute_name: The name of the attribute
+        :param value: The required value
+        :param str attribute_type: The required type, as passed to ncatted
+        :returns: True if the attribute has the required value and type.
+        :rtype: bool
+        """
+        existing_value = self.get_attribute(visibility, attribute_name)
+        if existing_value is None:
+            return False
+        if not has_nco_type(existing_value, attribute_type):
+            return False
+        if attribute_type == 'c':
+            return existing_value == value
+        return bool(np.all(existing_value == value))
+
+    def _attributes(self, visibility):
+        """
+        Get the attributes dictionary for the specified visibility.
+
+        :param str visibility: `global` or the name of a variable
+        :returns: The attributes
+        :rtype: dict
+        """
+        if visibility == 'global':
+            return self.global_attributes
+        return self.variable_attributes.get(visibility, {})
+
+
+def has_nco_type(value, attribute_type):
+    """
+    Check whether an attribute value read from a netCDF file has the type
+    specified by the ncatted type code.
+
+    :param value: The attribute value
+    :param str attribute_type: The ncatted type, e.g. c or d
+    :returns: True if the value has the type.
+    :rtype: bool
+    """
+    if attribute_type in ('c', 'sng'):
+        return isinstance(value, str)
+    numpy_type = NCO_NUMPY_TYPES.get(attribute_type)
+    if numpy_type is None or not isinstance(value, (np.generic, np.ndarray)):
+        return False
+    return value.dtype == np.dtype(numpy_type)
@@ -0,0 +1,191 @@
+"""
+journal.py
+
+A resume journal that records the progress of a pre-processing run through a
+directory so that an interrupted run can be restarted without fixing any
+file for a second time.
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# The default name of the journal file in the directory being processed
+JOURNAL_FILENAME = '.pre_proc_journal.jsonl'
+# The name of each shard's journal file, so that the shards of an array job
+# don't append to the same file
+SHARD_JOURNAL_FILENAME = '.pre_proc_journal_{}_of_{}.jsonl'
+
+STATUS_STARTED = 'started'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+
+def plan_hash(fix_names):
+    """
+    Calculate a hash that identifies the fixes to be applied to a file and
+    the order that they're applied in.
+
+    :param list fix_names: The names of the fixes to apply, in order
+    :returns: The hash's hexadecimal digest
+    :rtype: str
+    """
+    return hashlib.sha1(','.join(fix_names).encode()).hexdigest()
+
+
+class ResumeJournal(object):
+    """
+    An append-only JSON lines journal. Each line records a file's path, the
+    hash of its fix plan, its status and, when the fixes have been completed,
+    the file's size and modification time. The latest line for each file
+    takes precedence and so the journal is loaded into a dictionary and each
+    file can be checked in O(1).
+    """
+    def __init__(self, journal_path):
+        """
+        Initialise the class and load any existing entries.
+
+        :param str journal_path: The full path to the journal file
+        """
+        self.journal_path = journal_path
+        self.entries = {}
+        # True if the last line of the journal was only partially written
+        self._partial_line = False
+        self._load()
+
+    @classmethod
+    def for_directory(cls, directory, shard=None):
+        """
+        Create a journal in the default location for a directory, or for a
+        shard of the directory.
+
+        :param str directory: The directory being processed
+        :param tuple shard: The shard's index and the number of shards, or
+            None if the directory isn't sharded
+        :returns: The directory's journal
+        :rtype: pre_proc.journal.ResumeJournal
+        """
+        filename = (SHARD_JOURNAL_FILENAME.format(*shard) if shard
+                    else JOURNAL_FILENAME)
+        return cls(os.path.join(directory, filename))
+
+    def is_complete(self, filepath, fix_hash=None):
+        """
+        Check whether the fixes have already been completed on a file. The
+        file must not have changed size or modification time since the fixes
+        were completed and, if `fix_hash` is specified, the file's fix plan
+        must not have changed.
+
+        :param str filepath: The full path to the file
+        :param str fix_hash: The hash of the file's current fix plan or None
+            to not check the plan
+        :returns: True if the file has been completed.
+        :rtype: bool
+        """
+        entry = self.entries.get(filepath)
+        if not entry or entry['status'] != STATUS_DONE:
+            return False
+        if fix_hash is not None and entry['plan_hash'] != fix_hash:
+            return False
+        try:
+            stat = os.stat(filepath)
+        except FileNotFoundError:
+            return False
+        return (entry['size'] == stat.st_size and
+                entry['mtime'] == stat.st_mtime)
+
+    def is_interrupted(self, filepath):
+        """
+        Check whether a previous run started the fixes on a file but did not
+        record their completion or failure.
+
+        :param str filepath: The full path to the file
+        :returns: True if a previous run was interrupted on this file.
+        :rtype: bool
+        """
+        entry = self.entries.get(filepath)
+        return bool(entry) and entry['status'] == STATUS_STARTED
+
+    def record_started(self, filepath, fix_hash):
+        """
+        Record that the fixes have been started on a file.
+
+        :param str filepath: The full path to the file
+        :param str fix_hash: The hash of the file's fix plan
+        """
+        self._append(filepath, fix_hash, STATUS_STARTED)
+
+    def record_done(self, filepath, fix_hash):
+        """
+        Record that the fixes have been completed on a file.
+
+        :param str filepath: The full path to the file
+        :param str fix_hash: The hash of the file's fix plan
+        """
+        stat = os.stat(filepath)
+        self._append(filepath, fix_hash, STATUS_DONE, size=stat.st_size,
+                     mtime=stat.st_mtime, sync=True)
+
+    def record_failed(self, filepath, fix_hash):
+        """
+        Record that the fixes failed on a file.
+
+        :param str filepath: The full path to the file
+        :param str fix_hash: The hash of the file's fix plan, or None if the
+            plan could not be determined
+        """
+        self._append(filepath, fix_hash, STATUS_FAILED)
+
+    def _load(self):
+        """
+        Load the existing entries from the journal. A line that was only
+        partially written when a run was killed is ignored.
+        """
+        if not os.path.exists(self.journal_path):
+            return
+        line = ''
+        with open(self.journal_path) as fh:
+            for line in fh:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    logger.warning('Ignoring corrupt line in journal {}'.
+                                   format(self.journal_path))
+                    continue
+                self.entries[entry['path']] = entry
+            self._partial_line = bool(line) and not line.endswith('\n')
+        logger.debug('Loaded {} entries from journal {}'.
+                     format(len(self.entries), self.journal_path))
+
+    def _append(self, filepath, fix_hash, status, size=None, mtime=None,
+                sync=False):
+        """
+        Append an entry to the journal.
+
+        :param str filepath: The full path to the file
+        :param str fix_hash: The hash of the file's fix plan
+        :param str status: The file's status
+        :param int size: The file's size in bytes
+        :param float mtime: The file's modification time
+        :param bool sync: If True then flush the journal to disk
+        """
+        entry = {
+            'path': filepath,
+            'plan_hash': fix_hash,
+            'status': status,
+            'size': size,
+            'mtime': mtime,
+            'time': time.time()
+        }
+        with open(self.journal_path, 'a') as fh:
+            if self._partial_line:
+                fh.write('\n')
+                self._partial_line = False
+            fh.write(json.dumps(entry) + '\n')
+            if sync:
+                fh.flush()
+                os.fsync(fh.fileno())
+        self.entries[filepath] = entry
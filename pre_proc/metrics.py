@@ -0,0 +1,199 @@
+"""
+metrics.py
+
+Record the wall time, the wall and CPU time spent in external commands, the
+I/O and the change in file size of each fix that is applied, so that the fix
+classes that dominate a run can be identified.
+"""
+from contextlib import contextmanager
+import json
+import logging
+import os
+import resource
+import time
+
+from pre_proc.common import get_command_cpu_time, get_command_time
+
+logger = logging.getLogger(__name__)
+
+# The size in bytes of the blocks counted by getrusage()
+RUSAGE_BLOCK_SIZE = 512
+
+
+def _block_io():
+    """
+    Return the number of bytes read from and written to the block devices
+    by this process and its completed child processes. Reads that are
+    satisfied by the page cache aren't included.
+
+    :returns: The bytes read and the bytes written
+    :rtype: tuple
+    """
+    self_usage = resource.getrusage(resource.RUSAGE_SELF)
+    child_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    bytes_read = ((self_usage.ru_inblock + child_usage.ru_inblock) *
+                  RUSAGE_BLOCK_SIZE)
+    bytes_written = ((self_usage.ru_oublock + child_usage.ru_oublock) *
+                     RUSAGE_BLOCK_SIZE)
+    return bytes_read, bytes_written
+
+
+def _file_size(filepath):
+    """
+    Return a file's size or None if the file doesn't exist.
+
+    :param str filepath: The full path to the file
+    :returns: The size in bytes
+    :rtype: int
+    """
+    try:
+        return os.path.getsize(filepath)
+    except OSError:
+        return None
+
+
+class MetricsRecorder(object):
+    """
+    Measure each fix that is applied. Each measurement is optionally written
+    as a line to a JSON lines file as soon as it's made, so that the
+    measurements survive a run that is killed, and is also kept so that an
+    aggregate table can be displayed at the end of the run.
+    """
+    def __init__(self, metrics_path=None):
+        """
+        Initialise the class
+
+        :param str metrics_path: The full path of a JSON lines file that
+            the measurements are appended to
+        """
+        self.metrics_path = metrics_path
+        self.records = []
+        self._fh = open(metrics_path, 'a') if metrics_path else None
+
+    @classmethod
+    def load(cls, metrics_paths):
+        """
+        Load the measurements from one or more metrics files, e.g. those
+        written by the shards of a run, without appending to them.
+
+        :param list metrics_paths: The full paths of the JSON lines files
+        :returns: A recorder holding all of the measurements
+        :rtype: pre_proc.metrics.MetricsRecorder
+        """
+        recorder = cls()
+        for metrics_path in metrics_paths:
+            with open(metrics_path) as fh:
+                recorder.records.extend(json.loads(line) for line in fh
+                                        if line.strip())
+        return recorder
+
+    @contextmanager
+    def measure(self, filepath, fix):
+        """
+        A context manager that measures the fix that is applied within it.
+        The measurement is recorded even if the fix fails.
+
+        :param str filepath: The full path to the file being fixed
+        :param pre_proc.file_fix.FileFix fix: The fix being applied
+        """
+        size_before = _file_size(filepath)
+        read_before, written_before = _block_io()
+        command_time_before = get_command_time()
+        command_cpu_time_before = get_command_cpu_time()
+        start_time = time.perf_counter()
+        succeeded = False
+        try:
+            yield
+            succeeded = True
+        finally:
+            wall_time = time.perf_counter() - start_time
+            read_after, written_after = _block_io()
+            self.record({
+                'path': filepath,
+                'fix': type(fix).__name__,
+                'succeeded': succeeded,
+                'wall_time': wall_time,
+                'command_time': get_command_time() - command_time_before,
+                'command_cpu_time': (get_command_cpu_time() -
+                                     command_cpu_time_before),
+                'bytes_read': read_after - read_before,
+                'bytes_written': written_after - written_before,
+                'size_before': size_before,
+                'size_after': _file_size(filepath)
+            })
+
+    def record(self, measurement):
+        """
+        Record a measurement.
+
+        :param dict measurement: The measurement
+        """
+        self.records.append(measurement)
+        if self._fh:
+            self._fh.write(json.dumps(measurement) + '\n')
+            self._fh.flush()
+
+    def close(self):
+        """
+        Close the metrics file.
+        """
+        if self._fh:
+            self._fh.close()
+            self._fh = None
+
+    def aggregate(self):
+        """
+        Aggregate the measurements by fix class.
+
+        :returns: The totals for each fix class keyed by the class's name
+        :rtype: dict
+        """
+        totals = {}
+        for measurement in self.records:
+            fix_totals = totals.setdefault(measurement['fix'], {
+                'count': 0,
+                'failed': 0,
+                'wall_time': 0.0,
+                'command_time': 0.0,
+                'command_cpu_time': 0.0,
+                'bytes_read': 0,
+                'bytes_written': 0
+            })
+            fix_totals['count'] += 1
+            if not measurement['succeeded']:
+                fix_totals['failed'] += 1
+            for key in ('wall_time', 'command_time', 'bytes_read',
+                        'bytes_written'):
+                fix_totals[key] += measurement[key]
+            # Measurements recorded before the CPU time was measured don't
+            # include it
+            fix_totals['command_cpu_time'] += measurement.get(
+                'command_cpu_time', 0.0
+            )
+        return totals
+
+    def format_table(self):
+        """
+        Format the aggregated measurements as a table, with the fix classes
+        that took the most time first.
+
+        :returns: The table
+        :rtype: str
+        """
+        totals = self.aggregate()
+        header = '{:<40} {:>6} {:>6} {:>10} {:>10} {:>12} {:>12}'.format(
+            'fix', 'count', 'failed', 'wall (s)', 'cmd (s)', 'read (MB)',
+            'write (MB)'
+        )
+        lines = [header, '-' * len(header)]
+        for fix_name in sorted(totals, key=lambda name:
+                               totals[name]['wall_time'], reverse=True):
+            fix_totals = totals[fix_name]
+            lines.append(
+                '{:<40} {:>6} {:>6} {:>10.2f} {:>10.2f} {:>12.1f} {:>12.1f}'.
+                format(fix_name, fix_totals['count'], fix_totals['failed'],
+                       fix_totals['wall_time'], fix_totals['command_time'],
+                       fix_totals['bytes_read'] / 1024 ** 2,
+                       fix_totals['bytes_written'] / 1024 ** 2)
+            )
+        return '\n'.join(lines)
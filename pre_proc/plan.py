@@ -0,0 +1,203 @@
+"""
+plan.py
+
+A dry-run planner that resolves the fixes that would be applied to each file
+and predicts the cost of applying them, without modifying any data.
+"""
+import logging
+import os
+
+from pre_proc.esgf_submission import EsgfSubmission
+from pre_proc.exceptions import PreProcError
+from pre_proc.file_header import FileHeader
+from pre_proc.journal import plan_hash
+
+logger = logging.getLogger(__name__)
+
+
+class FilePlan(object):
+    """
+    The fixes that would be applied to a file and their predicted cost.
+    """
+    def __init__(self, filepath, file_size, fixes, satisfied_fixes=None):
+        """
+        Initialise the class
+
+        :param str filepath: The full path to the file
+        :param int file_size: The file's size in bytes
+        :param list fixes: The pre_proc.file_fix.FileFix objects that would be
+            applied
+        :param list satisfied_fixes: The fixes that the file already satisfies
+            and so wouldn't be applied
+        """
+        self.filepath = filepath
+        self.file_size = file_size
+        self.fixes = fixes
+        self.satisfied_fixes = satisfied_fixes or []
+
+    @classmethod
+    def from_file(cls, filepath, run_probes=True):
+        """
+        Plan the fixes for a file. The file's header is only read, to run the
+        probes of any fixes that declare one.
+
+        :param str filepath: The full path to the file
+        :param bool run_probes: If True then fixes that the file already
+            satisfies are not included in the cost
+        :returns: The file's plan
+        :rtype: pre_proc.plan.FilePlan
+        """
+        esgf_submission = EsgfSubmission.from_file(filepath)
+        esgf_submission.determine_fixes()
+        fixes = esgf_submission.fixes
+        satisfied_fixes = []
+        if run_probes and any(fix.has_probe() for fix in fixes):
+            try:
+                header = FileHeader.from_file(filepath)
+            except PreProcError:
+                logger.warning('Unable to read header from {}'.
+                               format(filepath))
+            else:
+                satisfied_fixes = [fix for fix in fixes
+                                   if fix.has_probe() and
+                                   fix.is_satisfied(header)]
+        return cls(filepath, os.path.getsize(filepath), fixes,
+                   satisfied_fixes)
+
+    @property
+    def fixes_to_apply(self):
+        """
+        The fixes that would be applied.
+        """
+        return [fix for fix in self.fixes if fix not in self.satisfied_fixes]
+
+    @property
+    def num_commands(self):
+        """
+        The number of external commands that would be run, including the
+        history update.
+        """
+        fixes = self.fixes_to_apply
+        history_update = 1 if fixes else 0
+        return sum(fix.num_commands for fix in fixes) + history_update
+
+    @property
+    def num_rewrites(self):
+        """
+        The number of times that the whole file would be rewritten.
+        """
+        return sum(fix.num_rewrites for fix in self.fixes_to_apply)
+
+    @property
+    def peak_disk_bytes(self):
+        """
+        The peak disk usage in bytes, including the file itself, while the
+        most demanding fix is applied.
+        """
+        factors = [fix.peak_disk_factor for fix in self.fixes_to_apply]
+        return int(max(factors + [1.0]) * self.file_size)
+
+    @property
+    def peak_temp_bytes(self):
+        """
+        The peak additional disk usage in bytes while the fixes are applied.
+        """
+        return self.peak_disk_bytes - self.file_size
+
+    @property
+    def peak_memory_bytes(self):
+        """
+        The peak memory use in bytes of the most demanding fix.
+        """
+        factors = [fix.peak_memory_factor for fix in self.fixes_to_apply]
+        return int(max(factors + [0.0]) * self.file_size)
+
+    @property
+    def bytes_read(self):
+        """
+        The estimated number of bytes read.
+        """
+        return int(sum(fix.read_factor for fix in self.fixes_to_apply) *
+                   self.file_size)
+
+    @property
+    def bytes_written(self):
+        """
+        The estimated number of bytes written.
+        """
+        return int(sum(fix.write_factor for fix in self.fixes_to_apply) *
+                   self.file_size)
+
+    def to_dict(self):
+        """
+        Convert the plan to a dictionary that can be serialised to JSON.
+
+        :returns: The plan
+        :rtype: dict
+        """
+        return {
+            'path': self.filepath,
+            'size': self.file_size,
+            'fixes': [type(fix).__name__ for fix in self.fixes_to_apply],
+            'satisfied_fixes': [type(fix).__name__
+                                for fix in self.satisfied_fixes],
+            'num_commands': self.num_commands,
+            'num_rewrites': self.num_rewrites,
+            'peak_temp_bytes': self.peak_temp_bytes,
+            'peak_memory_bytes': self.peak_memory_bytes,
+            'bytes_read': self.bytes_read,
+            'bytes_written': self.bytes_written
+        }
+
+
+def plan_files(filepaths, run_probes=True, journal=None):
+    """
+    Plan the fixes for several files and summarise the total cost.
+
+    :param list filepaths: The full paths of the files
+    :param bool run_probes: If True then fixes that the files already satisfy
+        are not included in the cost
+    :param pre_proc.journal.ResumeJournal journal: The journal of a previous
+        run, whose completed files are checked for fixes that have changed
+        since, or None
+    :returns: A dictionary, which can be serialised to JSON, containing the
+        plan for each file, the files that couldn't be planned, the files
+        completed by a previous run whose fixes have changed and the totals
+    :rtype: dict
+    """
+    file_plans = []
+    files_failed = []
+    plans_changed = []
+    for filepath in filepaths:
+        try:
+            file_plan = FilePlan.from_file(filepath, run_probes)
+        except (PreProcError, OSError) as exc:
+            logger.warning('Unable to plan {}: {}'.format(filepath, exc))
+            files_failed.append(filepath)
+            continue
+        file_plans.append(file_plan)
+        if journal and journal.is_complete(filepath):
+            fix_hash = plan_hash([type(fix).__name__
+                                  for fix in file_plan.fixes])
+            if not journal.is_complete(filepath, fix_hash):
+                plans_changed.append(filepath)
+
+    return {
+        'files': [file_plan.to_dict() for file_plan in file_plans],
+        'files_failed': files_failed,
+        'plans_changed': plans_changed,
+        'totals': {
+            'num_files': len(file_plans),
+            'num_files_to_fix': sum(1 for file_plan in file_plans
+                                    if file_plan.fixes_to_apply),
+            'size': sum(fp.file_size for fp in file_plans),
+            'num_commands': sum(fp.num_commands for fp in file_plans),
+            'num_rewrites': sum(fp.num_rewrites for fp in file_plans),
+            'max_peak_temp_bytes': max([fp.peak_temp_bytes
+                                        for fp in file_plans] + [0]),
+            'max_peak_memory_bytes': max([fp.peak_memory_bytes
+                                          for fp in file_plans] + [0]),
+            'bytes_read': sum(fp.bytes_read for fp in file_plans),
+            'bytes_written': sum(fp.bytes_written for fp in file_plans)
+        }
+    }
@@ -0,0 +1,108 @@
+"""
+profiling.py
+
+Profile the fixing of each file in a batch run with cProfile and merge the
+profiles into a single set of statistics for the whole run.
+"""
+from contextlib import contextmanager
+import cProfile
+import io
+import logging
+import os
+import pstats
+
+from pre_proc.common import get_command_time
+
+logger = logging.getLogger(__name__)
+
+# The name of the merged statistics file in the profile directory
+STATS_FILENAME = 'pre_proc.pstats'
+# The name of the summary file in the profile directory
+SUMMARY_FILENAME = 'pre_proc_summary.txt'
+
+
+class BatchProfiler(object):
+    """
+    Profile the fixing of each file and merge the statistics. If no profile
+    directory is specified then profiling is disabled and profile() does
+    nothing.
+    """
+    def __init__(self, profile_dir=None, top_n=30):
+        """
+        Initialise the class
+
+        :param str profile_dir: The directory to write the statistics to
+        :param int top_n: The number of functions to include in the summary
+        """
+        self.profile_dir = profile_dir
+        self.top_n = top_n
+        self.stats = None
+        self.num_files = 0
+        # The time spent waiting for external commands while profiling
+        self.command_time = 0.0
+
+    @contextmanager
+    def profile(self):
+        """
+        A context manager that profiles the code run within it and adds the
+        results to the merged statistics.
+        """
+        if not self.profile_dir:
+            yield
+            return
+
+        profiler = cProfile.Profile()
+        command_time_before = get_command_time()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            self.command_time += get_command_time() - command_time_before
+            self.num_files += 1
+            if self.stats is None:
+                self.stats = pstats.Stats(profiler)
+            else:
+                self.stats.add(profiler)
+
+    def summary(self):
+        """
+        Summarise the merged statistics, showing the functions with the
+        largest cumulative time. The time spent waiting for external commands
+        is shown separately so that it can be compared to the time spent in
+        Python.
+
+        :returns: The summary
+        :rtype: str
+        """
+        if self.stats is None:
+            return 'No files were profiled'
+        stream = io.StringIO()
+        stream.write('Profiled {} files in {:.2f} s, of which {:.2f} s was '
+                     'spent waiting for external commands\n'.
+                     format(self.num_files, self.stats.total_tt,
+                            self.command_time))
+        self.stats.stream = stream
+        self.stats.sort_stats('cumulative').print_stats(self.top_n)
+        return stream.getvalue()
+
+    def dump(self):
+        """
+        Write the merged statistics and the summary to the profile directory.
+        The statistics can be loaded with pstats or a viewer such as
+        snakeviz.
+
+        :returns: The summary
+        :rtype: str
+        """
+        summary = self.summary()
+        if self.stats is None:
+            return summary
+        if not os.path.exists(self.profile_dir):
+            os.makedirs(self.profile_dir)
+        stats_path = os.path.join(self.profile_dir, STATS_FILENAME)
+        self.stats.dump_stats(stats_path)
+        with open(os.path.join(self.profile_dir, SUMMARY_FILENAME), 'w') as fh:
+            fh.write(summary)
+        logger.debug('Profile written to {}'.format(stats_path))
+        return summary
@@ -0,0 +1,296 @@
+"""
+sharding.py
+
+Split the files in a directory between the tasks of a batch array job, so
+that a large submission can be fixed by many nodes at once without splitting
+it by hand. Each shard is given a similar number of bytes to fix rather than
+a similar number of files.
+
+Every shard lists the whole directory, but because fixing a file changes its
+size, the shards can't each calculate the partition independently once any
+shard has started fixing. The first shard to calculate the partition
+therefore publishes it in a manifest file in the directory and every other
+shard uses the published partition. Files that aren't in the manifest, e.g.
+because they were added later, are assigned to a shard by a hash of their
+path. The manifest is kept and reused by later runs over the same selection
+with the same number of shards, e.g. to resume them, even though the sizes
+that it was calculated from are then out of date. Delete the manifest to
+calculate a new partition from the current sizes.
+
+Each shard can write a JSON report of the files that it fixed and failed to
+fix, and the reports and metrics of all of the shards can be combined with
+merge_reports().
+"""
+import hashlib
+import heapq
+import json
+import logging
+import os
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+# The prefix of the name of the manifest files in the directory being fixed
+MANIFEST_PREFIX = '.pre_proc_shards'
+
+# The environment variables that give the index of the task in an array job
+# and the number of tasks, for SLURM (which LOTUS uses) and for LSF. LSF
+# arrays are assumed to be numbered from one.
+SLURM_TASK_ID = 'SLURM_ARRAY_TASK_ID'
+SLURM_TASK_COUNT = 'SLURM_ARRAY_TASK_COUNT'
+SLURM_TASK_MIN = 'SLURM_ARRAY_TASK_MIN'
+LSF_TASK_ID = 'LSB_JOBINDEX'
+LSF_TASK_END = 'LSB_JOBINDEX_END'
+
+
+def parse_shard(spec, environ=None):
+    """
+    Parse a shard specification, which is either `i/N` for shard i, counting
+    from zero, of N shards, or `array` to take the shard from the array job
+    environment variables.
+
+    :param str spec: The specification
+    :param dict environ: The environment variables, which default to
+        os.environ
+    :returns: The shard's index and the number of shards
+    :rtype: tuple
+    :raises ValueError: If the specification isn't valid or `array` is
+        specified outside of an array job
+    """
+    if spec == 'array':
+        return array_shard(environ)
+    try:
+        index, count = (int(value) for value in spec.split('/'))
+    except ValueError:
+        raise ValueError('The shard must be i/N or array, not {}'.
+                         format(spec))
+    if count < 1 or not 0 <= index < count:
+        raise ValueError('The shard index must be at least 0 and less than '
+                         'the number of shards in {}'.format(spec))
+    return index, count
+
+
+def array_shard(environ=None):
+    """
+    Determine the shard from the environment variables of a SLURM or LSF
+    array job.
+
+    :param dict environ: The environment variables, which default to
+        os.environ
+    :returns: The shard's index and the number of shards
+    :rtype: tuple
+    :raises ValueError: If this isn't an array job
+    """
+    environ = os.environ if environ is None else environ
+    if SLURM_TASK_ID in environ and SLURM_TASK_COUNT in environ:
+        index = (int(environ[SLURM_TASK_ID]) -
+                 int(environ.get(SLURM_TASK_MIN, 0)))
+        count = int(environ[SLURM_TASK_COUNT])
+    elif environ.get(LSF_TASK_ID, '0') != '0' and LSF_TASK_END in environ:
+        index = int(environ[LSF_TASK_ID]) - 1
+        count = int(environ[LSF_TASK_END])
+    else:
+        raise ValueError('The shard can only be taken from the environment '
+                         'in a SLURM or LSF array job')
+    if not 0 <= index < count:
+        raise ValueError('The array task {} is outside of the {} tasks. The '
+                         'array must have consecutive indices.'.
+                         format(index, count))
+    return index, count
+
+
+def _path_hash(filepath):
+    """
+    Calculate a hash of a file's path that is the same in every process.
+
+    :param str filepath: The full path of the file
+    :returns: The hash
+    :rtype: int
+    """
+    return int(hashlib.sha1(filepath.encode()).hexdigest()[:16], 16)
+
+
+def hash_shard(filepath, num_shards):
+    """
+    Assign a file to a shard by a hash of its path.
+
+    :param str filepath: The full path of the file
+    :param int num_shards: The number of shards
+    :returns: The shard's index
+    :rtype: int
+    """
+    return _path_hash(filepath) % num_shards
+
+
+def partition_by_size(file_sizes, num_shards):
+    """
+    Partition files between shards so that each shard has a similar total
+    size. The largest files are assigned first, each to the shard with the
+    smallest total so far, and files of the same size are taken in the
+    order of the hash of their path, so that the partition is the same in
+    every process.
+
+    :param dict file_sizes: The size in bytes of each file keyed by its path
+    :param int num_shards: The number of shards
+    :returns: The index of each file's shard keyed by its path
+    :rtype: dict
+    """
+    shards = [(0, index) for index in range(num_shards)]
+    assignment = {}
+    for filepath in sorted(file_sizes, key=lambda path: (-file_sizes[path],
+                                                         _path_hash(path),
+                                                         path)):
+        total, index = heapq.heappop(shards)
+        assignment[filepath] = index
+        heapq.heappush(shards, (total + file_sizes[filepath], index))
+    return assignment
+
+
+def _file_size(filepath):
+    """
+    Return a file's size, or zero if it has been removed.
+
+    :param str filepath: The full path of the file
+    :returns: The size in bytes
+    :rtype: int
+    """
+    try:
+        return os.path.getsize(filepath)
+    except OSError:
+        return 0
+
+
+def shard_assignment(directory, filepaths, num_shards, selection=''):
+    """
+    Load the partition of the files between the shards from the directory's
+    manifest, or calculate the partition and publish it in the manifest if
+    no shard has already done so.
+
+    :param str directory: The directory being fixed
+    :param list filepaths: The full paths of all of the files to fix
+    :param int num_shards: The number of shards
+    :param str selection: A description of how the files were selected from
+        the directory, so that runs over different selections don't share a
+        manifest
+    :returns: The index of each file's shard keyed by its path
+    :rtype: dict
+    """
+    key = hashlib.sha1(selection.encode()).hexdigest()[:12]
+    manifest_path = os.path.join(directory, '{}_{}_{}.json'.format(
+        MANIFEST_PREFIX, num_shards, key
+    ))
+    if not os.path.exists(manifest_path):
+        assignment = partition_by_size({filepath: _file_size(filepath)
+                                        for filepath in filepaths},
+                                       num_shards)
+        fd, temp_path = tempfile.mkstemp(dir=directory,
+                                         prefix=MANIFEST_PREFIX)
+        try:
+            with os.fdopen(fd, 'w') as fh:
+                json.dump(assignment, fh)
+            # link() fails if another shard has already published a manifest
+            os.link(temp_path, manifest_path)
+            logger.debug('Published the shard manifest {}'.
+                         format(manifest_path))
+            return assignment
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(temp_path)
+    logger.debug('Using the shard manifest {}'.format(manifest_path))
+    with open(manifest_path) as fh:
+        return json.load(fh)
+
+
+def select_shard(filepaths, directory, shard_index, num_shards,
+                 selection=''):
+    """
+    Select a shard's files from all of the files to fix.
+
+    :param filepaths: An iterable of the full paths of all of the files
+    :param str directory: The directory being fixed
+    :param int shard_index: The shard's index, counting from zero
+    :param int num_shards: The number of shards
+    :param str selection: A description of how the files were selected from
+        the directory
+    :returns: The shard's files in the order they were listed
+    :rtype: list
+    """
+    filepaths = list(filepaths)
+    if num_shards == 1:
+        return filepaths
+    assignment = shard_assignment(directory, filepaths, num_shards,
+                                  selection)
+    return [filepath for filepath in filepaths
+            if assignment.get(filepath, hash_shard(filepath, num_shards)) ==
+            shard_index]
+
+
+def write_report(report_path, shard, num_files, files_failed,
+                 files_skipped=0, metrics_path=None):
+    """
+    Write a shard's report.
+
+    :param str report_path: The full path of the JSON report
+    :param tuple shard: The shard's index and the number of shards
+    :param int num_files: The number of files that the shard tried to fix
+    :param list files_failed: The full paths of the files that failed
+    :param int files_skipped: The number of files that had already been
+        fixed by a previous run
+    :param str metrics_path: The full path of the shard's metrics file
+    """
+    with open(report_path, 'w') as fh:
+        json.dump({
+            'shard': list(shard),
+            'num_files': num_files,
+            'files_failed': files_failed,
+            'files_skipped': files_skipped,
+            'metrics': metrics_path
+        }, fh, indent=4)
+
+
+def merge_reports(reports):
+    """
+    Combine the reports of the shards of a run.
+
+    :param list reports: The shards' reports as loaded from their JSON
+        files
+    :returns: The combined report, including the indices of any shards whose
+        report is missing and the metrics files of all of the shards
+    :rtype: dict
+    """
+    merged = {
+        'num_shards': 0,
+        'num_files': 0,
+        'files_failed': [],
+        'files_skipped': 0,
+        'missing_shards': [],
+        'metrics': []
+    }
+    shard_indices = set()
+    for report in reports:
+        index, count = report['shard']
+        merged['num_shards'] = max(merged['num_shards'], count)
+        shard_indices.add(index)
+        merged['num_files'] += report['num_files']
+        merged['files_failed'].extend(report['files_failed'])
+        merged['files_skipped'] += report['files_skipped']
+        if report['metrics']:
+            merged['metrics'].append(report['metrics'])
+    merged['files_failed'].sort()
+    merged['missing_shards'] = sorted(set(range(merged['num_shards'])) -
+                                      shard_indices)
+    return merged
+
+
+def shard_path(path, shard_index):
+    """
+    Substitute a shard's index for `{shard}` in a path, so that each shard
+    of a run can write its own report and metrics.
+
+    :param str path: The path, which may contain `{shard}`
+    :param int shard_index: The shard's index
+    :returns: The shard's path
+    :rtype: str
+    """
+    return path.replace('{shard}', str(shard_index))
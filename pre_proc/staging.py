@@ -0,0 +1,155 @@
+"""
+staging.py
+
+Copy and replace files as cheaply as the underlying filesystem allows.
+Copies are made with a reflink or os.copy_file_range() where the filesystem
+supports them, and files are renamed rather than copied when the source and
+destination are on the same device.
+"""
+import errno
+import fcntl
+import logging
+import os
+import shutil
+
+logger = logging.getLogger(__name__)
+
+# The FICLONE ioctl request number from linux/fs.h
+FICLONE = 0x40049409
+
+# The errors that indicate that a zero-copy method isn't supported here and
+# that the next method should be tried
+UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.ENOTTY,
+                      errno.EOPNOTSUPP, errno.EBADF, errno.EPERM}
+
+# The suffix of the temporary file used when replacing a file across devices
+STAGING_SUFFIX = '.staging'
+
+
+def same_filesystem(path1, path2):
+    """
+    Check whether two paths are on the same device. If a path doesn't exist
+    then its parent directory is checked instead.
+
+    :param str path1: The first path
+    :param str path2: The second path
+    :returns: True if both paths are on the same device.
+    :rtype: bool
+    """
+    return _device(path1) == _device(path2)
+
+
+def copy_file(src, dst):
+    """
+    Copy the contents of `src` to `dst`. A reflink is tried first, then
+    os.copy_file_range() and finally shutil.copyfile().
+
+    :param str src: The path of the file to copy
+    :param str dst: The path to copy the file to
+    """
+    with open(src, 'rb') as src_fh, open(dst, 'wb') as dst_fh:
+        if _reflink(src_fh, dst_fh):
+            logger.debug('Reflinked {} to {}'.format(src, dst))
+            return
+        if _copy_file_range(src_fh, dst_fh):
+            logger.debug('Copied {} to {} with copy_file_range'.
+                         format(src, dst))
+            return
+    shutil.copyfile(src, dst)
+    logger.debug('Copied {} to {}'.format(src, dst))
+
+
+def replace_file(src, dst):
+    """
+    Replace `dst` with `src`, which is removed. If both are on the same device
+    then this is an atomic rename. Otherwise `src` is copied to a temporary
+    file alongside `dst`, which is then atomically renamed over `dst`, and so
+    `dst` is never left missing or partially written.
+
+    :param str src: The path of the new file
+    :param str dst: The path of the file to replace
+    """
+    if same_filesystem(src, dst):
+        os.replace(src, dst)
+        return
+
+    staging_file = dst + STAGING_SUFFIX
+    try:
+        copy_file(src, staging_file)
+        os.replace(staging_file, dst)
+    except Exception:
+        if os.path.exists(staging_file):
+            os.remove(staging_file)
+        raise
+    os.remove(src)
+
+
+def _device(path):
+    """
+    Return the device that `path`, or its parent directory if `path` doesn't
+    exist, is on.
+
+    :param str path: The path to check
+    :returns: The device number
+    :rtype: int
+    """
+    try:
+        return os.stat(path).st_dev
+    except FileNotFoundError:
+        return os.stat(os.path.dirname(os.path.abspath(path))).st_dev
+
+
+def _reflink(src_fh, dst_fh):
+    """
+    Try to reflink the destination file to the source file.
+
+    :param src_fh: The open source file
+    :param dst_fh: The open destination file
+    :returns: True if the reflink was made.
+    :rtype: bool
+    """
+    try:
+        fcntl.ioctl(dst_fh.fileno(), FICLONE, src_fh.fileno())
+    except OSError as exc:
+        if exc.errno in UNSUPPORTED_ERRNOS:
+            return False
+        raise
+    return True
+
+
+def _copy_file_range(src_fh, dst_fh):
+    """
+    Try to copy the source file to the destination file in the kernel using
+    os.copy_file_range(). If the kernel stops copying before the end of the
+    file then the remainder is copied with shutil.copyfileobj().
+
+    :param src_fh: The open source file
+    :param dst_fh: The open destination file
+    :returns: True if the copy was made.
+    :rtype: bool
+    """
+    if not hasattr(os, 'copy_file_range'):
+        return False
+
+    bytes_left = os.fstat(src_fh.fileno()).st_size
+    offset = 0
+    while bytes_left > 0:
+        try:
+            num_copied = os.copy_file_range(src_fh.fileno(), dst_fh.fileno(),
+                                            bytes_left, offset, offset)
+        except OSError as exc:
+            if offset == 0 and exc.errno in UNSUPPORTED_ERRNOS:
+                return False
+            raise
+        if num_copied == 0:
+            # The file is shorter than when the copy started, or the kernel
+            # stopped early, so copy whatever remains in user space
+            logger.debug('copy_file_range stopped after {} bytes and so '
+                         'the rest is copied with shutil'.format(offset))
+            src_fh.seek(offset)
+            dst_fh.seek(offset)
+            shutil.copyfileobj(src_fh, dst_fh)
+            break
+        offset += num_copied
+        bytes_left -= num_copied
+    return True
@@ -0,0 +1,120 @@
+"""
+test_admission.py
+
+Unit tests for pre_proc.admission
+"""
+from collections import namedtuple
+import threading
+import time
+import unittest
+
+import mock
+
+from pre_proc.admission import AdmissionController, parse_size
+from pre_proc.exceptions import InsufficientResourcesError
+from pre_proc.file_fix import FixMaskOrca1TSurface, RealmAtmos
+from pre_proc.plan import FilePlan
+
+DiskUsage = namedtuple('DiskUsage', 'total used free')
+
+FILENAME = 'tsl_Lmon_HadGEM3-GC31-LL_highresSST-present_r1i1p1f1_gn_' \
+           '195001-195012.nc'
+GIB = 1024 ** 3
+
+
+class TestParseSize(unittest.TestCase):
+    """ Test pre_proc.admission.parse_size """
+    def test_suffixes(self):
+        """ Test that the binary suffixes are applied """
+        self.assertEqual(500 * 1024 ** 2, parse_size('500M'))
+        self.assertEqual(int(1.5 * 1024 ** 4), parse_size('1.5T'))
+        self.assertEqual(10 * GIB, parse_size('10GB'))
+        self.assertEqual(1000, parse_size('1000'))
+
+    def test_invalid(self):
+        """ Test that an invalid size is rejected """
+        self.assertRaises(ValueError, parse_size, 'lots')
+
+
+class TestAdmissionController(unittest.TestCase):
+    """ Test pre_proc.admission.AdmissionController """
+    def setUp(self):
+        patch = mock.patch('pre_proc.admission.shutil.disk_usage')
+        self.mock_disk_usage = patch.start()
+        self.addCleanup(patch.stop)
+        self.mock_disk_usage.return_value = DiskUsage(100 * GIB, 90 * GIB,
+                                                      10 * GIB)
+        patch = mock.patch('pre_proc.admission.available_memory')
+        self.mock_memory = patch.start()
+        self.addCleanup(patch.stop)
+        self.mock_memory.return_value = 8 * GIB
+        self.controller = AdmissionController('/scratch', GIB, GIB,
+                                              poll_interval=0.01,
+                                              max_wait=0.05)
+
+    def test_admitted(self):
+        """ Test that a file that fits is admitted and reserved """
+        with self.controller.admit('/a/1.nc', 4 * GIB, 2 * GIB):
+            self.assertEqual(4 * GIB, self.controller.reserved_disk)
+            self.assertEqual(2 * GIB, self.controller.reserved_memory)
+        self.assertEqual(0, self.controller.reserved_disk)
+        self.mock_disk_usage.assert_called_with('/scratch')
+
+    def test_disk_threshold(self):
+        """ Test that a file isn't admitted below the disk threshold """
+        with self.assertRaises(InsufficientResourcesError) as context:
+            with self.controller.admit('/a/1.nc', 9.5 * GIB, 0):
+                pass
+        self.assertEqual('disk space', context.exception.resource)
+        self.assertEqual(9 * GIB, context.exception.available)
+
+    def test_memory_threshold(self):
+        """ Test that a file isn't admitted below the memory threshold """
+        with self.assertRaises(InsufficientResourcesError) as context:
+            with self.controller.admit('/a/1.nc', 0, 8 * GIB):
+                pass
+        self.assertEqual('memory', context.exception.resource)
+
+    def test_waits_for_files_in_flight(self):
+        """ Test that a file waits for the reservations to be released """
+        admitted = []
+
+        def second_file():
+            with self.controller.admit('/a/2.nc', 6 * GIB, 0):
+                admitted.append(time.monotonic())
+
+        with self.controller.admit('/a/1.nc', 6 * GIB, 0):
+            thread = threading.Thread(target=second_file)
+            thread.start()
+            # The second file waits for longer than the maximum wait because
+            # a file is in flight
+            time.sleep(0.2)
+            self.assertFalse(admitted)
+            released = time.monotonic()
+        thread.join()
+        self.assertGreaterEqual(admitted[0], released)
+
+    def test_plan_in_place(self):
+        """ Test that a file fixed in place only needs the extra space """
+        self.mock_memory.return_value = 32 * GIB
+        file_plan = FilePlan('/a/b/' + FILENAME, 3 * GIB,
+                             [RealmAtmos(FILENAME, '/a/b'),
+                              FixMaskOrca1TSurface(FILENAME, '/a/b')])
+        with self.controller.admit_plan(file_plan, in_place=True):
+            self.assertEqual(9 * GIB, self.controller.reserved_disk)
+            self.assertEqual(18 * GIB, self.controller.reserved_memory)
+        self.mock_disk_usage.assert_called_with('/a/b')
+
+    def test_plan_copy(self):
+        """ Test that a copy needs the whole of its peak disk use """
+        self.mock_memory.return_value = 32 * GIB
+        file_plan = FilePlan('/a/b/' + FILENAME, 3 * GIB,
+                             [FixMaskOrca1TSurface(FILENAME, '/a/b')])
+        with self.assertRaises(InsufficientResourcesError):
+            with self.controller.admit_plan(file_plan):
+                pass
+        self.mock_disk_usage.assert_called_with('/scratch')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,208 @@
+"""
+test_async_commands.py
+
+Unit tests for pre_proc.async_commands
+"""
+from contextlib import contextmanager
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from pre_proc.async_commands import fix_files
+from pre_proc.common import run_command
+from pre_proc.exceptions import (CommandTimeoutError,
+                                 InsufficientResourcesError)
+from pre_proc.executor import SubprocessExecutor, get_executor
+from pre_proc.tests.test_executor import interrupt_after
+from pre_proc.timeouts import command_limits, set_timeouts
+
+# A stand-in tool that records when it starts and stops in a log file
+TOOL_SCRIPT = """#!{python}
+import os, sys, time
+with open(os.environ['TOOL_LOG'], 'a') as fh:
+    fh.write('start {{}} {{}}\\n'.format(os.path.basename(sys.argv[0]),
+                                      sys.argv[1]))
+time.sleep(float(sys.argv[2]))
+with open(os.environ['TOOL_LOG'], 'a') as fh:
+    fh.write('stop {{}} {{}}\\n'.format(os.path.basename(sys.argv[0]),
+                                     sys.argv[1]))
+"""
+
+
+class TestFixFiles(unittest.TestCase):
+    """ Test pre_proc.async_commands.fix_files """
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.log_path = os.path.join(self.temp_dir, 'tool.log')
+        self.tools = {}
+        for tool in ['ncks', 'ncatted']:
+            self.tools[tool] = os.path.join(self.temp_dir, tool)
+            with open(self.tools[tool], 'w') as fh:
+                fh.write(TOOL_SCRIPT.format(python=sys.executable))
+            os.chmod(self.tools[tool], 0o755)
+        os.environ['TOOL_LOG'] = self.log_path
+        self.addCleanup(os.environ.pop, 'TOOL_LOG')
+
+    def _log(self):
+        """ Return the lines of the tools' log """
+        with open(self.log_path) as fh:
+            return [line.split() for line in fh]
+
+    def _max_in_flight(self, tool):
+        """ Return the maximum number of commands of a tool in flight """
+        in_flight = 0
+        max_in_flight = 0
+        for event, name, _filepath in self._log():
+            if name == tool:
+                in_flight += 1 if event == 'start' else -1
+                max_in_flight = max(max_in_flight, in_flight)
+        return max_in_flight
+
+    def test_order_per_file(self):
+        """ Test that each file's commands run in order """
+        def fix_file(filepath):
+            run_command([self.tools['ncks'], filepath, '0.2'])
+            run_command([self.tools['ncatted'], filepath, '0.1'])
+            return filepath.upper()
+
+        filepaths = ['a{}.nc'.format(index) for index in range(4)]
+        results = list(fix_files(filepaths, fix_file))
+        self.assertEqual([(filepath, filepath.upper())
+                          for filepath in filepaths], results)
+        for filepath in filepaths:
+            events = [(event, tool) for event, tool, path in self._log()
+                      if path == filepath]
+            self.assertEqual([('start', 'ncks'), ('stop', 'ncks'),
+                              ('start', 'ncatted'), ('stop', 'ncatted')],
+                             events)
+
+    def test_limits(self):
+        """ Test that the commands in flight are limited by type """
+        def fix_file(filepath):
+            tool = 'ncks' if filepath.startswith('d') else 'ncatted'
+            run_command([self.tools[tool], filepath, '0.3'])
+
+        filepaths = ['d0.nc', 'm0.nc', 'm1.nc', 'm2.nc', 'd1.nc', 'm3.nc',
+                     'm4.nc', 'm5.nc', 'd2.nc', 'd3.nc']
+        start_time = time.perf_counter()
+        list(fix_files(filepaths, fix_file, metadata_limit=3, data_limit=2))
+        # Run one at a time, the commands would take three seconds
+        self.assertLess(time.perf_counter() - start_time, 3.0)
+        self.assertEqual(2, self._max_in_flight('ncks'))
+        self.assertEqual(3, self._max_in_flight('ncatted'))
+
+    def test_failure(self):
+        """ Test that a file's exception is returned """
+        def fix_file(filepath):
+            run_command([self.tools['ncks'], filepath])
+
+        results = list(fix_files(['a.nc'], fix_file))
+        self.assertIsInstance(results[0][1], RuntimeError)
+
+    def test_timeout(self):
+        """ Test that a command that exceeds its time limit is killed """
+        def fix_file(filepath):
+            with command_limits(filepath):
+                run_command([self.tools['ncks'], filepath, '30'])
+
+        set_timeouts({'ncks': [0.5, 0]})
+        self.addCleanup(set_timeouts, {})
+        start_time = time.perf_counter()
+        results = list(fix_files(['a.nc'], fix_file))
+        self.assertLess(time.perf_counter() - start_time, 10)
+        self.assertIsInstance(results[0][1], CommandTimeoutError)
+
+    def test_blocking_io(self):
+        """ Test that the lock is released during blocking I/O """
+        copied = threading.Event()
+
+        def fix_file(filepath):
+            if filepath == 'a.nc':
+                with get_executor().blocking_io():
+                    # The other file can only run while the lock is released
+                    if not copied.wait(10):
+                        raise RuntimeError('The lock was not released')
+            else:
+                copied.set()
+
+        results = list(fix_files(['a.nc', 'b.nc'], fix_file))
+        self.assertEqual([('a.nc', None), ('b.nc', None)], results)
+
+    def test_admit(self):
+        """ Test that a file waiting to be admitted doesn't block others """
+        admitted = threading.Event()
+
+        @contextmanager
+        def admit(filepath):
+            if filepath == 'b.nc':
+                # Wait until the other file has been fixed
+                self.assertTrue(admitted.wait(10))
+            yield
+
+        def fix_file(filepath):
+            run_command([self.tools['ncatted'], filepath, '0.1'])
+            admitted.set()
+
+        results = list(fix_files(['b.nc', 'a.nc'], fix_file, admit=admit))
+        self.assertEqual([('b.nc', None), ('a.nc', None)], results)
+
+    def test_not_admitted(self):
+        """ Test that an exception while admitting a file is returned """
+        @contextmanager
+        def admit(filepath):
+            raise InsufficientResourcesError(filepath, 'memory', 2, 1, 0)
+            yield
+
+        results = list(fix_files(['a.nc'], lambda filepath: None,
+                                 admit=admit))
+        self.assertIsInstance(results[0][1], InsufficientResourcesError)
+
+    def test_interrupt(self):
+        """
+        Test that an interrupt stops the commands in flight and that the
+        files that haven't been started aren't fixed
+        """
+        started = []
+
+        def fix_file(filepath):
+            started.append(filepath)
+            run_command([self.tools['ncks'], filepath, '30'])
+            run_command([self.tools['ncatted'], filepath, '0'])
+
+        interrupt_after(self, 1)
+        filepaths = ['a{}.nc'.format(index) for index in range(4)]
+        start_time = time.perf_counter()
+        with self.assertRaises(KeyboardInterrupt):
+            list(fix_files(filepaths, fix_file, max_files=2))
+        self.assertLess(time.perf_counter() - start_time, 10)
+        self.assertEqual(['a0.nc', 'a1.nc'], sorted(started))
+        self.assertEqual([['start', 'ncks', 'a0.nc'],
+                          ['start', 'ncks', 'a1.nc']], sorted(self._log()))
+        self.assertIsInstance(get_executor(), SubprocessExecutor)
+
+    @mock.patch('pre_proc.async_commands.connections')
+    def test_connections_closed(self, mock_connections):
+        """ Test that each worker's database connections are closed """
+        def fix_file(filepath):
+            if filepath == 'b.nc':
+                raise RuntimeError('failed')
+
+        list(fix_files(['a.nc', 'b.nc'], fix_file))
+        self.assertEqual(2, mock_connections.close_all.call_count)
+
+    def test_executor_restored(self):
+        """ Test that the previous executor is restored """
+        previous = get_executor()
+        list(fix_files(['a.nc'], lambda filepath: None))
+        self.assertIs(previous, get_executor())
+        self.assertIsInstance(get_executor(), SubprocessExecutor)
+
+
+if __name__ == '__main__':
+    unittest.main()
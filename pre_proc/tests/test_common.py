@@ -4,9 +4,13 @@ test_common.py
 Unit tests for pre_proc.common
 """
 from abc import ABCMeta, abstractmethod
+import os
+import shutil
+import tempfile
 import unittest
 
-from pre_proc.common import get_concrete_subclasses
+from pre_proc.common import (get_concrete_subclasses, ilist_files,
+                              iter_files, list_files, parse_drs_filters)
 
 
 class AbstractParent(object, metaclass=ABCMeta):
@@ -60,3 +64,118 @@ class TestGetConcreteSubclasses(unittest.TestCase):
         """ Test that nothing is returned if there are no children"""
         self.assertEqual([],
                          get_concrete_subclasses(ConcreteChild))
+
+
+class TestFileDiscovery(unittest.TestCase):
+    """ test pre_proc.common's listing of files """
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.files = []
+        for table, var, version in [('Amon', 'tas', 'v20180101'),
+                                    ('Amon', 'tas', 'v20190101'),
+                                    ('Amon', 'pr', 'v20180101'),
+                                    ('day', 'tas', 'v20180101')]:
+            dir_path = os.path.join(self.root, 'HighResMIP', 'MOHC',
+                                    'HadGEM3-GC31-LM', 'highresSST-present',
+                                    'r1i1p1f1', table, var, 'gn', version)
+            os.makedirs(dir_path, exist_ok=True)
+            for years in ['1950-1950', '1951-1951']:
+                filename = ('{}_{}_HadGEM3-GC31-LM_highresSST-present_'
+                            'r1i1p1f1_gn_{}.nc'.format(var, table, years))
+                self.files.append(os.path.join(dir_path, filename))
+                open(self.files[-1], 'w').close()
+        # Files that sort between a directory and the files below it
+        for filename in ['HighResMIP.nc', 'HighResMIP-a.nc', 'HighResMIP0.nc',
+                         'notes.txt']:
+            open(os.path.join(self.root, filename), 'w').close()
+        self.files.extend(os.path.join(self.root, filename) for filename in
+                          ['HighResMIP.nc', 'HighResMIP-a.nc',
+                           'HighResMIP0.nc'])
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_sorted(self):
+        """ Test that the files are yielded in sorted order """
+        self.assertEqual(sorted(self.files), list(iter_files(self.root)))
+
+    def test_list_files(self):
+        """ Test that list_files() returns a sorted list """
+        self.assertEqual(sorted(self.files), list_files(self.root))
+
+    def test_threads(self):
+        """ Test that listing in threads gives the same order """
+        self.assertEqual(sorted(self.files),
+                         list(iter_files(self.root, max_workers=3)))
+
+    def test_ilist_files_suffix(self):
+        """ Test that the suffix is used in sub-directories """
+        text_path = os.path.join(os.path.dirname(self.files[0]), 'a.txt')
+        open(text_path, 'w').close()
+        self.assertEqual(sorted([text_path,
+                                 os.path.join(self.root, 'notes.txt')]),
+                         sorted(ilist_files(self.root, '.txt')))
+
+    def test_filename_filter(self):
+        """ Test that the files are filtered by their names """
+        expected = sorted(path for path in self.files
+                          if os.path.basename(path).startswith('tas_Amon'))
+        self.assertEqual(expected, list(iter_files(
+            self.root, drs_filters={'table_id': ['Amon'],
+                                    'variable_id': ['tas']}
+        )))
+
+    def test_directory_filter(self):
+        """ Test that directories are pruned when drs_top is specified """
+        expected = sorted(path for path in self.files
+                          if '/Amon/tas/gn/v20190101/' in path)
+        self.assertEqual(expected, list(iter_files(
+            self.root, drs_filters={'table_id': ['Amon'],
+                                    'version': ['v20190101']},
+            drs_top='activity_id'
+        )))
+
+    def test_directory_filter_threads(self):
+        """ Test that directories are pruned in threads """
+        expected = sorted(path for path in self.files if '/day/' in path)
+        self.assertEqual(expected, list(iter_files(
+            self.root, drs_filters={'table_id': ['day']},
+            drs_top='activity_id', max_workers=2
+        )))
+
+    def test_unknown_component(self):
+        """ Test that an unknown DRS component raises an exception """
+        self.assertRaises(ValueError, iter_files, self.root,
+                          drs_filters={'frequency': ['mon']})
+
+    def test_directory_component_without_top(self):
+        """
+        Test that a component that's only in the directories' names can't be
+        selected without drs_top.
+        """
+        self.assertRaises(ValueError, iter_files, self.root,
+                          drs_filters={'version': ['v20190101']})
+        self.assertRaises(ValueError, iter_files, self.root,
+                          drs_filters={'activity_id': ['HighResMIP']},
+                          drs_top='source_id')
+
+
+class TestParseDrsFilters(unittest.TestCase):
+    """ test pre_proc.common.parse_drs_filters """
+    def test_parse(self):
+        """ Test that repeated components are combined """
+        self.assertEqual(
+            {'table_id': {'Amon', 'day'}, 'version': {'v20180101'}},
+            parse_drs_filters(['table_id=Amon,day', 'version=v20180101',
+                               'table_id=Amon'], 'mip_era')
+        )
+
+    def test_invalid(self):
+        """ Test that a string without a value raises an exception """
+        self.assertRaises(ValueError, parse_drs_filters, ['table_id'])
+
+    def test_drs_top(self):
+        """ Test that a directory component needs drs_top """
+        self.assertRaises(ValueError, parse_drs_filters, ['version=v1'])
+        self.assertEqual({'version': {'v1'}},
+                         parse_drs_filters(['version=v1'], 'activity_id'))
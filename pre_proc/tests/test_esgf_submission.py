@@ -8,7 +8,8 @@ import unittest
 from unittest import mock
 
 from pre_proc import EsgfSubmission
-from pre_proc.file_fix import ChildBranchTimeAdd
+from pre_proc.file_fix import ChildBranchTimeAdd, LevToPlev, RealmAtmos
+from pre_proc.file_header import FileHeader
 
 
 class TestEsgfSubmission(unittest.TestCase):
@@ -53,3 +54,72 @@ class TestEsgfSubmission(unittest.TestCase):
         self.esgf.update_history()
         self.mock_get_attr.assert_not_called()
         self.mock_set_attr.assert_not_called()
+
+
+class TestRunFixes(unittest.TestCase):
+    """ test esgf_submission.EsgfSubmission.run_fixes """
+    def setUp(self):
+        self.esgf = EsgfSubmission(source_id='source_id',
+                                   experiment_id='experiment_id',
+                                   variant_label='variant_label',
+                                   table_id='table_id', cmor_name='cmor_name',
+                                   filepath='/file/tas_path.nc')
+
+        patch = mock.patch('pre_proc.esgf_submission.FileHeader.from_file')
+        self.mock_header = patch.start()
+        self.mock_header.return_value = FileHeader({'realm': 'atmos'}, {})
+        self.addCleanup(patch.stop)
+
+        patch = mock.patch('pre_proc.esgf_submission._set_attribute')
+        self.mock_set_attr = patch.start()
+        self.addCleanup(patch.stop)
+
+    def _add_fix(self, fix_class):
+        """ Add a mocked instance of the fix to the submission """
+        fix = fix_class(self.esgf.filename, self.esgf.directory)
+        fix.apply_fix = mock.MagicMock()
+        self.esgf.fixes.append(fix)
+        return fix
+
+    def test_satisfied_fix_skipped(self):
+        """ Test that a fix that's already satisfied isn't applied """
+        realm = self._add_fix(RealmAtmos)
+        child = self._add_fix(ChildBranchTimeAdd)
+        self.esgf.run_fixes()
+        realm.apply_fix.assert_not_called()
+        child.apply_fix.assert_called_once_with()
+        self.assertEqual([realm], self.esgf.satisfied_fixes)
+        self.mock_header.assert_called_once_with('/file/tas_path.nc')
+
+    def test_header_reread_after_fix(self):
+        """ Test that the header is read again after a fix is applied """
+        self._add_fix(ChildBranchTimeAdd)
+        self._add_fix(RealmAtmos)
+        self.esgf.run_fixes()
+        self.assertEqual(2, self.mock_header.call_count)
+
+    def test_no_probe_no_header(self):
+        """ Test that the header isn't read if no fix has a probe """
+        lev = self._add_fix(LevToPlev)
+        self.esgf.run_fixes()
+        lev.apply_fix.assert_called_once_with()
+        self.mock_header.assert_not_called()
+
+    def test_fixes_measured(self):
+        """ Test that each fix applied is measured when requested """
+        realm = self._add_fix(RealmAtmos)
+        lev = self._add_fix(LevToPlev)
+        metrics = mock.MagicMock()
+        self.esgf.run_fixes(metrics)
+        metrics.measure.assert_called_once_with('/file/tas_path.nc', lev)
+        lev.apply_fix.assert_called_once_with()
+        realm.apply_fix.assert_not_called()
+
+    @mock.patch('pre_proc.esgf_submission._get_attribute')
+    def test_satisfied_not_in_history(self, mock_get_attr):
+        """ Test that all fixes satisfied leaves the file untouched """
+        mock_get_attr.return_value = None
+        self._add_fix(RealmAtmos)
+        self.esgf.run_fixes()
+        self.esgf.update_history()
+        self.mock_set_attr.assert_not_called()
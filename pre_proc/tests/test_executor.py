@@ -0,0 +1,241 @@
+"""
+test_executor.py
+
+Unit tests for pre_proc.executor and pre_proc.common.run_command
+"""
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+import mock
+
+from pre_proc.common import (get_command_cpu_time, is_command_timeout,
+                             run_command)
+from pre_proc.exceptions import CommandTimeoutError, NcksError
+from pre_proc import executor as executor_module
+from pre_proc.executor import (CommandResult, DryRunExecutor,
+                               StandinExecutor, SubprocessExecutor,
+                               command_string, get_executor, set_executor)
+from pre_proc.timeouts import command_limits
+
+
+class TestSubprocessExecutor(unittest.TestCase):
+    """ Test pre_proc.executor.SubprocessExecutor """
+    def setUp(self):
+        self.executor = SubprocessExecutor()
+
+    def test_output_separate(self):
+        """ Test that stdout and stderr are captured separately """
+        result = self.executor.run([
+            sys.executable, '-c',
+            'import sys; print("out"); sys.stderr.write("err")'
+        ])
+        self.assertEqual(0, result.returncode)
+        self.assertEqual('out\n', result.stdout)
+        self.assertEqual('err', result.stderr)
+
+    def test_no_shell(self):
+        """ Test that arguments are passed without shell quoting """
+        value = "a value with 'quotes' and $HOME"
+        result = self.executor.run([sys.executable, '-c',
+                                    'import sys; print(sys.argv[1])', value])
+        self.assertEqual(value + '\n', result.stdout)
+
+    def test_resource_usage(self):
+        """ Test that the resource usage is measured """
+        result = self.executor.run([
+            sys.executable, '-c', 'sum(range(1000000))'
+        ])
+        self.assertGreater(result.wall_time, 0.0)
+        self.assertGreater(result.cpu_time, 0.0)
+        self.assertGreater(result.max_rss, 0)
+
+    def test_exit_status(self):
+        """ Test that a failing command's exit status is returned """
+        result = self.executor.run([sys.executable, '-c',
+                                    'import sys; sys.exit(3)'])
+        self.assertEqual(3, result.returncode)
+
+    def test_timeout(self):
+        """ Test that a command that exceeds its time limit is killed """
+        result = self.executor.run([sys.executable, '-c',
+                                    'import time; time.sleep(30)'],
+                                   timeout=0.5)
+        self.assertTrue(result.timed_out)
+        self.assertLess(result.wall_time, 10)
+        self.assertNotEqual(0, result.returncode)
+
+    def test_within_timeout(self):
+        """ Test that a command that completes in time isn't killed """
+        result = self.executor.run([sys.executable, '-c', 'pass'],
+                                   timeout=30)
+        self.assertFalse(result.timed_out)
+        self.assertEqual(0, result.returncode)
+
+    def test_missing_tool(self):
+        """ Test that a tool that isn't installed fails """
+        result = self.executor.run(['pre-proc-no-such-tool', 'a.nc'])
+        self.assertEqual(127, result.returncode)
+
+
+def interrupt_after(test, delay):
+    """
+    Send this process an interrupt, as Ctrl-C would, after a delay.
+
+    :param unittest.TestCase test: The test, which restores the previous
+        handler
+    :param float delay: The delay in seconds
+    """
+    previous = signal.signal(signal.SIGINT, signal.default_int_handler)
+    test.addCleanup(signal.signal, signal.SIGINT, previous)
+    timer = threading.Timer(delay, os.kill, (os.getpid(), signal.SIGINT))
+    timer.start()
+    test.addCleanup(timer.cancel)
+
+
+class TestSubprocessExecutorInterrupt(unittest.TestCase):
+    """ Test that SubprocessExecutor forwards an interrupt """
+    def setUp(self):
+        self.executor = SubprocessExecutor()
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.pid_path = os.path.join(self.temp_dir, 'pid')
+
+    def _command(self, handler):
+        """ A command that writes its pid and sleeps """
+        return [sys.executable, '-c',
+                'import os, signal, time\n'
+                'signal.signal(signal.SIGINT, {})\n'
+                'open({!r}, "w").write(str(os.getpid()))\n'
+                'time.sleep(30)'.format(handler, self.pid_path)]
+
+    def _assert_stopped(self):
+        """ Assert that the command has exited and been reaped """
+        with open(self.pid_path) as fh:
+            pid = int(fh.read())
+        self.assertRaises(ProcessLookupError, os.kill, pid, 0)
+
+    def test_interrupt_forwarded(self):
+        """ Test that the command is interrupted too """
+        interrupt_after(self, 1)
+        start_time = time.perf_counter()
+        self.assertRaises(KeyboardInterrupt, self.executor.run,
+                          self._command('signal.default_int_handler'))
+        self.assertLess(time.perf_counter() - start_time, 10)
+        self._assert_stopped()
+
+    @mock.patch.object(executor_module, 'INTERRUPT_GRACE_TIME', 0.5)
+    def test_killed(self):
+        """ Test that a command that ignores the interrupt is killed """
+        interrupt_after(self, 1)
+        start_time = time.perf_counter()
+        self.assertRaises(KeyboardInterrupt, self.executor.run,
+                          self._command('signal.SIG_IGN'))
+        self.assertLess(time.perf_counter() - start_time, 10)
+        self._assert_stopped()
+
+
+class TestDryRunExecutor(unittest.TestCase):
+    """ Test pre_proc.executor.DryRunExecutor """
+    def test_recorded(self):
+        """ Test that the commands are recorded and succeed """
+        executor = DryRunExecutor()
+        result = executor.run(['ncatted', '-h', '-a', 'a,global,o,c,b',
+                               '/a/1.nc'])
+        self.assertEqual(0, result.returncode)
+        self.assertEqual([['ncatted', '-h', '-a', 'a,global,o,c,b',
+                           '/a/1.nc']], executor.commands)
+
+
+class TestStandinExecutor(unittest.TestCase):
+    """ Test pre_proc.executor.StandinExecutor """
+    def test_standin_used(self):
+        """ Test that a tool with a stand-in is replaced """
+        executor = StandinExecutor({
+            'ncks': [sys.executable, '-c', 'import sys; print(sys.argv[1:])']
+        })
+        result = executor.run(['/usr/bin/ncks', '-A', 'a.nc'])
+        self.assertEqual(0, result.returncode)
+        self.assertEqual("['-A', 'a.nc']\n", result.stdout)
+
+
+class TestRunCommand(unittest.TestCase):
+    """ Test pre_proc.common.run_command """
+    def setUp(self):
+        self.executor = DryRunExecutor()
+        self.previous = set_executor(self.executor)
+        self.addCleanup(set_executor, self.previous)
+
+    def test_executor_used(self):
+        """ Test that the current executor runs the command """
+        self.assertIs(self.executor, get_executor())
+        run_command(['ncks', '-3', 'a.nc', 'b.nc'])
+        self.assertEqual([['ncks', '-3', 'a.nc', 'b.nc']],
+                         self.executor.commands)
+
+    def test_string_split(self):
+        """ Test that a string command is split as a shell would """
+        run_command("ncatted -h -a source,global,o,c,'a b' a.nc")
+        self.assertEqual([['ncatted', '-h', '-a', 'source,global,o,c,a b',
+                           'a.nc']], self.executor.commands)
+
+    def test_output(self):
+        """ Test that the output is returned as a list of lines """
+        self.executor.run = mock.Mock(
+            return_value=CommandResult(['ls'], 0, stdout='a\nb\n')
+        )
+        self.assertEqual(['a', 'b'], run_command(['ls']))
+
+    def test_failure(self):
+        """ Test that stderr is included in the exception's message """
+        self.executor.run = mock.Mock(
+            return_value=CommandResult(['ncks'], 1, stderr='ncks: bad')
+        )
+        self.assertRaisesRegex(RuntimeError, 'ncks: bad', run_command,
+                               ['ncks'])
+
+    def test_timeout(self):
+        """ Test that a timed out command raises CommandTimeoutError """
+        self.executor.run = mock.Mock(
+            return_value=CommandResult(['ncks'], -9, timed_out=True)
+        )
+        with command_limits('/a/1.nc'):
+            with self.assertRaises(CommandTimeoutError) as context:
+                run_command(['ncks'])
+        self.assertEqual(600, self.executor.run.call_args[1]['timeout'])
+        self.assertTrue(is_command_timeout(context.exception))
+
+    def test_timeout_cause(self):
+        """ Test that a timeout is found from the exception's context """
+        try:
+            try:
+                raise CommandTimeoutError('ncks', 600)
+            except CommandTimeoutError:
+                raise NcksError('LevToPlev', '1.nc', 'ncks', '')
+        except NcksError as exc:
+            self.assertTrue(is_command_timeout(exc))
+        self.assertFalse(is_command_timeout(NcksError('LevToPlev', '1.nc',
+                                                      'ncks', '')))
+
+    def test_cpu_time(self):
+        """ Test that the CPU time of the commands is accumulated """
+        self.executor.run = mock.Mock(
+            return_value=CommandResult(['ncks'], 0, cpu_time=1.5)
+        )
+        cpu_time_before = get_command_cpu_time()
+        run_command(['ncks'])
+        self.assertEqual(1.5, get_command_cpu_time() - cpu_time_before)
+
+
+class TestCommandString(unittest.TestCase):
+    """ Test pre_proc.executor.command_string """
+    def test_quoted(self):
+        """ Test that arguments are quoted where a shell would need it """
+        self.assertEqual("ncatted -a 'source,global,o,c,a b' a.nc",
+                         command_string(['ncatted', '-a',
+                                         'source,global,o,c,a b', 'a.nc']))
@@ -3,11 +3,12 @@ test_attribute_add.py
 
 Unit tests for all FileFix concrete classes from attribute_add.py
 """
-import subprocess
 import unittest
 
 import mock
+import numpy as np
 
+from pre_proc.executor import CommandResult
 from pre_proc.file_fix import (
     ParentBranchTimeAdd,
     ChildBranchTimeAdd,
@@ -77,6 +78,7 @@ from pre_proc.file_fix import (
     WindSpeedStandardNameAdd,
     ZZZThetapv2StandardNameAdd
 )
+from pre_proc.file_header import FileHeader
 
 
 class BaseTest(unittest.TestCase):
@@ -84,8 +86,9 @@ class BaseTest(unittest.TestCase):
     def setUp(self):
         """ Set up code run before every test """
         # mock any external calls
-        patch = mock.patch('pre_proc.common.subprocess.check_output')
-        self.mock_subprocess = patch.start()
+        patch = mock.patch('pre_proc.common.get_executor')
+        self.mock_subprocess = patch.start().return_value.run
+        self.mock_subprocess.return_value = CommandResult([], 0)
         self.addCleanup(patch.stop)
 
 
@@ -99,10 +102,8 @@ class TestParentBranchTimeAdd(BaseTest):
         fix = ParentBranchTimeAdd('1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            'ncatted -h -a branch_time_in_parent,global,o,d,0.0 '
-            '/a/1.nc',
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'branch_time_in_parent,global,o,d,0.0',
+             '/a/1.nc']
         )
 
 
@@ -116,10 +117,8 @@ class TestChildBranchTimeAdd(BaseTest):
         fix = ChildBranchTimeAdd('1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            'ncatted -h -a branch_time_in_child,global,o,d,0.0 '
-            '/a/1.nc',
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'branch_time_in_child,global,o,d,0.0',
+             '/a/1.nc']
         )
 
 
@@ -133,10 +132,8 @@ class TestBranchMethodAdd(BaseTest):
         fix = BranchMethodAdd('1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a branch_method,global,o,c,'no parent' "
-            "/a/1.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'branch_method,global,o,c,no parent',
+             '/a/1.nc']
         )
 
 
@@ -150,10 +147,7 @@ class TestBranchTimeDelete(BaseTest):
         fix = BranchTimeDelete('1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a branch_time,global,d,c,0 "
-            "/a/1.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'branch_time,global,d,c,0', '/a/1.nc']
         )
 
 
@@ -167,10 +161,8 @@ class TestDataSpecsVersionAdd(BaseTest):
         fix = DataSpecsVersionAdd('1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a data_specs_version,global,o,c,'01.00.23' "
-            "/a/1.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'data_specs_version,global,o,c,01.00.23',
+             '/a/1.nc']
         )
 
 
@@ -184,10 +176,8 @@ class TestDataSpecsVersion29Add(BaseTest):
         fix = DataSpecsVersion29Add('1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a data_specs_version,global,o,c,'01.00.29' "
-            "/a/1.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'data_specs_version,global,o,c,01.00.29',
+             '/a/1.nc']
         )
 
 
@@ -201,10 +191,8 @@ class TestCellMeasuresAreacellaAdd(BaseTest):
         fix = CellMeasuresAreacellaAdd('tas_components.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a cell_measures,tas,o,c,'area: areacella' "
-            "/a/tas_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'cell_measures,tas,o,c,area: areacella',
+             '/a/tas_components.nc']
         )
 
 
@@ -218,10 +206,8 @@ class TestCellMeasuresAreacelloAdd(BaseTest):
         fix = CellMeasuresAreacelloAdd('tos_components.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a cell_measures,tos,o,c,'area: areacello' "
-            "/a/tos_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'cell_measures,tos,o,c,area: areacello',
+             '/a/tos_components.nc']
         )
 
 
@@ -235,11 +221,9 @@ class TestCellMeasuresAreacelloVolcelloAdd(BaseTest):
         fix = CellMeasuresAreacelloVolcelloAdd('so_components.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a cell_measures,so,o,c,"
-            "'area: areacello volume: volcello' "
-            "/a/so_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'cell_measures,so,o,c,area: areacello volume: volcello',
+             '/a/so_components.nc']
         )
 
 
@@ -253,10 +237,8 @@ class TestCellMeasuresDelete(BaseTest):
         fix = CellMeasuresDelete('so_components.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a cell_measures,so,d,c,0 "
-            "/a/so_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'cell_measures,so,d,c,0',
+             '/a/so_components.nc']
         )
 
 
@@ -270,10 +252,8 @@ class TestCellMethodsTimeMeanAdd(BaseTest):
         fix = CellMethodsTimeMeanAdd('tas_components.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a cell_methods,tas,o,c,'time: mean' "
-            "/a/tas_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'cell_methods,tas,o,c,time: mean',
+             '/a/tas_components.nc']
         )
 
 
@@ -287,10 +267,8 @@ class TestCellMethodsTimePointAdd(BaseTest):
         fix = CellMethodsTimePointAdd('ua_components.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a cell_methods,ua,o,c,'time: point' "
-            "/a/ua_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'cell_methods,ua,o,c,time: point',
+             '/a/ua_components.nc']
         )
 
 
@@ -304,10 +282,8 @@ class TestCellMethodsAreaTimeMeanAdd(BaseTest):
         fix = CellMethodsAreaTimeMeanAdd('tas_components.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a cell_methods,tas,o,c,'area: time: mean' "
-            "/a/tas_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'cell_methods,tas,o,c,area: time: mean',
+             '/a/tas_components.nc']
         )
 
 
@@ -321,11 +297,9 @@ class TestCellMethodsSeaAreaTimeMeanAdd(BaseTest):
         fix = CellMethodsSeaAreaTimeMeanAdd('so_components.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a cell_methods,so,o,c,"
-            "'area: mean where sea time: mean' "
-            "/a/so_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'cell_methods,so,o,c,area: mean where sea time: mean',
+             '/a/so_components.nc']
         )
 
 
@@ -339,11 +313,9 @@ class TestCellMethodsAreaMeanTimePointAdd(BaseTest):
         fix = CellMethodsAreaMeanTimePointAdd('so_components.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a cell_methods,so,o,c,"
-            "'area: mean time: point' "
-            "/a/so_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'cell_methods,so,o,c,area: mean time: point',
+             '/a/so_components.nc']
         )
 
 
@@ -357,11 +329,9 @@ class TestCellMethodsAreaTimeMeanAddLand(BaseTest):
         fix = CellMethodsAreaTimeMeanAddLand('so_components.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a cell_methods,so,o,c,"
-            "'area: time: mean (comment: over land and sea ice)' "
-            "/a/so_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'cell_methods,so,o,c,area: time: mean (comment: over land and '
+             'sea ice)', '/a/so_components.nc']
         )
 
 
@@ -375,11 +345,9 @@ class TestCellMethodsAreaMeanTimePointAddLand(BaseTest):
         fix = CellMethodsAreaMeanTimePointAddLand('so_components.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a cell_methods,so,o,c,"
-            "'area: mean (comment: over land and sea ice) time: point' "
-            "/a/so_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'cell_methods,so,o,c,area: mean (comment: over land and sea '
+             'ice) time: point', '/a/so_components.nc']
         )
 
 
@@ -394,11 +362,9 @@ class TestCellMethodsAreaMeanLandTimeMeanAdd(BaseTest):
         fix = CellMethodsAreaMeanLandTimeMeanAdd('mrso_components.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a cell_methods,mrso,o,c,"
-            "'time: mean area: mean where land' "
-            "/a/mrso_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'cell_methods,mrso,o,c,time: mean area: mean where land',
+             '/a/mrso_components.nc']
         )
 
 
@@ -412,11 +378,9 @@ class TestCellMethodsAreaMeanLandTimePointAdd(BaseTest):
         fix = CellMethodsAreaMeanLandTimePointAdd('so_components.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a cell_methods,so,o,c,"
-            "'area: mean where land time: point' "
-            "/a/so_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'cell_methods,so,o,c,area: mean where land time: point',
+             '/a/so_components.nc']
         )
 
 
@@ -430,11 +394,9 @@ class TestCellMethodsAreaMeanTimeMinimumAdd(BaseTest):
         fix = CellMethodsAreaMeanTimeMinimumAdd('tasmin_components.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a cell_methods,tasmin,o,c,"
-            "'area: mean time: minimum within days time: mean over days' "
-            "/a/tasmin_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'cell_methods,tasmin,o,c,area: mean time: minimum within days '
+             'time: mean over days', '/a/tasmin_components.nc']
         )
 
 
@@ -448,11 +410,9 @@ class TestCellMethodsAreaMeanTimeMaximumAdd(BaseTest):
         fix = CellMethodsAreaMeanTimeMaximumAdd('tasmax_components.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a cell_methods,tasmax,o,c,"
-            "'area: mean time: maximum within days time: mean over days' "
-            "/a/tasmax_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'cell_methods,tasmax,o,c,area: mean time: maximum within days '
+             'time: mean over days', '/a/tasmax_components.nc']
         )
 
 
@@ -466,11 +426,9 @@ class TestCellMethodsAreaMeanTimeMinDailyAdd(BaseTest):
         fix = CellMethodsAreaMeanTimeMinDailyAdd('tasmin_components.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a cell_methods,tasmin,o,c,"
-            "'area: mean time: minimum' "
-            "/a/tasmin_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'cell_methods,tasmin,o,c,area: mean time: minimum',
+             '/a/tasmin_components.nc']
         )
 
 
@@ -485,11 +443,9 @@ class TestCellMethodsAreaMeanTimeMaxDailyAdd(BaseTest):
                                                  '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a cell_methods,sfcWindmax,o,c,"
-            "'area: mean time: maximum' "
-            "/a/sfcWindmax_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'cell_methods,sfcWindmax,o,c,area: mean time: maximum',
+             '/a/sfcWindmax_components.nc']
         )
 
 
@@ -503,25 +459,23 @@ class TestEcEartInstitution(BaseTest):
         fix = EcEarthInstitution('1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a institution,global,o,c,'AEMET, Spain; BSC, Spain; "
-            "CNR-ISAC, Italy; DMI, Denmark; ENEA, Italy; FMI, Finland; Geomar, "
-            "Germany; ICHEC, Ireland; ICTP, Italy; IDL, Portugal; IMAU, The "
-            "Netherlands; IPMA, Portugal; KIT, Karlsruhe, Germany; KNMI, The "
-            "Netherlands; Lund University, Sweden; Met Eireann, Ireland; "
-            "NLeSC, The Netherlands; NTNU, Norway; Oxford University, UK; "
-            "surfSARA, The Netherlands; SMHI, Sweden; Stockholm University, "
-            "Sweden; Unite ASTR, Belgium; University College Dublin, Ireland; "
-            "University of Bergen, Norway; University of Copenhagen, Denmark; "
-            "University of Helsinki, Finland; University of Santiago de "
-            "Compostela, Spain; Uppsala University, Sweden; Utrecht "
-            "University, The Netherlands; Vrije Universiteit Amsterdam, the "
-            "Netherlands; Wageningen University, The Netherlands. Mailing "
-            "address: EC-Earth consortium, Rossby Center, Swedish "
-            "Meteorological and Hydrological Institute/SMHI, SE-601 76 "
-            "Norrkoping, Sweden' "
-            "/a/1.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'institution,global,o,c,AEMET, Spain; BSC, Spain; CNR-ISAC, '
+             'Italy; DMI, Denmark; ENEA, Italy; FMI, Finland; Geomar, '
+             'Germany; ICHEC, Ireland; ICTP, Italy; IDL, Portugal; IMAU, The '
+             'Netherlands; IPMA, Portugal; KIT, Karlsruhe, Germany; KNMI, '
+             'The Netherlands; Lund University, Sweden; Met Eireann, Ireland;'
+             ' NLeSC, The Netherlands; NTNU, Norway; Oxford University, UK; '
+             'surfSARA, The Netherlands; SMHI, Sweden; Stockholm University, '
+             'Sweden; Unite ASTR, Belgium; University College Dublin, '
+             'Ireland; University of Bergen, Norway; University of '
+             'Copenhagen, Denmark; University of Helsinki, Finland; '
+             'University of Santiago de Compostela, Spain; Uppsala '
+             'University, Sweden; Utrecht University, The Netherlands; Vrije '
+             'Universiteit Amsterdam, the Netherlands; Wageningen University,'
+             ' The Netherlands. Mailing address: EC-Earth consortium, Rossby '
+             'Center, Swedish Meteorological and Hydrological Institute/SMHI,'
+             ' SE-601 76 Norrkoping, Sweden', '/a/1.nc']
         )
 
 
@@ -535,11 +489,9 @@ class TestEcmwfInstitution(BaseTest):
         fix = EcmwfInstitution('1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a institution,global,o,c,'European Centre for Medium-"
-            "Range Weather Forecasts, Reading RG2 9AX, UK' "
-            "/a/1.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'institution,global,o,c,European Centre for Medium-Range '
+             'Weather Forecasts, Reading RG2 9AX, UK', '/a/1.nc']
         )
 
 
@@ -553,14 +505,13 @@ class TestEcmwfReferences(BaseTest):
         fix = EcmwfReferences('1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a references,global,o,c,'Roberts, C. D., Senan, R., "
-            "Molteni, F., Boussetta, S., Mayer, M., and Keeley, S. P. E.: "
-            "Climate model configurations of the ECMWF Integrated Forecasting "
-            "System (ECMWF-IFS cycle 43r1) for HighResMIP, Geosci. Model Dev., "
-            "11, 3681-3712, https://doi.org/10.5194/gmd-11-3681-2018, 2018.' "
-            "/a/1.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'references,global,o,c,Roberts, C. D., Senan, R., Molteni, F., '
+             'Boussetta, S., Mayer, M., and Keeley, S. P. E.: Climate model '
+             'configurations of the ECMWF Integrated Forecasting System '
+             '(ECMWF-IFS cycle 43r1) for HighResMIP, Geosci. Model Dev., 11, '
+             '3681-3712, https://doi.org/10.5194/gmd-11-3681-2018, 2018.',
+             '/a/1.nc']
         )
 
 
@@ -574,18 +525,16 @@ class TestEcmwfSourceHr(BaseTest):
         fix = EcmwfSourceHr('1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a source,global,o,c,'ECMWF-IFS-HR (2017): "
-            "\naerosol: none\natmos: IFS (IFS CY43R1, Tco399, cubic "
-            "octahedral reduced Gaussian grid equivalent to 1600 x 800 "
-            "longitude/latitude; 91 levels; top level 0.01 hPa)\natmosChem: "
-            "none\nland: HTESSEL (as implemented in IFS CY43R1)\nlandIce: none"
-            "\nocean: NEMO3.4 (NEMO v3.4; ORCA025 tripolar grid; 1442 x 1021 "
-            "longitude/latitude; 75 levels; top grid cell 0-1 m)\nocnBgchem: "
-            "none\nseaIce: LIM2 (LIM v2; ORCA025 tripolar grid; 1442 x 1021 "
-            "longitude/latitude)' "
-            "/a/1.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'source,global,o,c,ECMWF-IFS-HR (2017): \naerosol: none\natmos: '
+             'IFS (IFS CY43R1, Tco399, cubic octahedral reduced Gaussian '
+             'grid equivalent to 1600 x 800 longitude/latitude; 91 levels; '
+             'top level 0.01 hPa)\natmosChem: none\nland: HTESSEL (as '
+             'implemented in IFS CY43R1)\nlandIce: none\nocean: NEMO3.4 '
+             '(NEMO v3.4; ORCA025 tripolar grid; 1442 x 1021 longitude/'
+             'latitude; 75 levels; top grid cell 0-1 m)\nocnBgchem: '
+             'none\nseaIce: LIM2 (LIM v2; ORCA025 tripolar grid; 1442 x 1021 '
+             'longitude/latitude)', '/a/1.nc']
         )
 
 
@@ -599,17 +548,16 @@ class TestEcmwfSourceMr(BaseTest):
         fix = EcmwfSourceMr('1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a source,global,o,c,'ECMWF-IFS-MR (2017): "
-            "\naerosol: none\natmos: IFS (IFS CY43R1, Tco199, cubic octahedral "
-            "reduced Gaussian grid equivalent to 800 x 400 longitude/latitude; "
-            "91 levels; top level 0.01 hPa)\natmosChem: none\nland: HTESSEL "
-            "(as implemented in IFS CY43R1)\nlandIce: none\nocean: NEMO3.4 "
-            "(NEMO v3.4; ORCA025 tripolar grid; 1442 x 1021 longitude/latitude;"
-            " 75 levels; top grid cell 0-1 m)\nocnBgchem: none\nseaIce: LIM2 "
-            "(LIM v2; ORCA025 tripolar grid; 1442 x 1021 longitude/latitude)' "
-            "/a/1.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'source,global,o,c,ECMWF-IFS-MR (2017): \naerosol: none\natmos: '
+             'IFS (IFS CY43R1, Tco199, cubic octahedral reduced Gaussian '
+             'grid equivalent to 800 x 400 longitude/latitude; 91 levels; '
+             'top level 0.01 hPa)\natmosChem: none\nland: HTESSEL (as '
+             'implemented in IFS CY43R1)\nlandIce: none\nocean: NEMO3.4 '
+             '(NEMO v3.4; ORCA025 tripolar grid; 1442 x 1021 longitude/'
+             'latitude; 75 levels; top grid cell 0-1 m)\nocnBgchem: '
+             'none\nseaIce: LIM2 (LIM v2; ORCA025 tripolar grid; 1442 x 1021 '
+             'longitude/latitude)', '/a/1.nc']
         )
 
 
@@ -623,18 +571,16 @@ class TestEcmwfSourceLr(BaseTest):
         fix = EcmwfSourceLr('1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a source,global,o,c,'ECMWF-IFS-LR (2017): "
-            "\naerosol: none\natmos: IFS (IFS CY43R1, Tco199, cubic "
-            "octahedral reduced Gaussian grid equivalent to 800 x 400 "
-            "longitude/latitude; 91 levels; top level 0.01 hPa)\natmosChem: "
-            "none\nland: HTESSEL (as implemented in IFS CY43R1)\nlandIce: "
-            "none\nocean: NEMO3.4 (NEMO v3.4; ORCA1 tripolar grid; 362 x 292 "
-            "longitude/latitude; 75 levels; top grid cell 0-1 m)\nocnBgchem: "
-            "none\nseaIce: LIM2 (LIM v2; ORCA1 tripolar grid; 362 x 292 "
-            "longitude/latitude)' "
-            "/a/1.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'source,global,o,c,ECMWF-IFS-LR (2017): \naerosol: none\natmos: '
+             'IFS (IFS CY43R1, Tco199, cubic octahedral reduced Gaussian '
+             'grid equivalent to 800 x 400 longitude/latitude; 91 levels; '
+             'top level 0.01 hPa)\natmosChem: none\nland: HTESSEL (as '
+             'implemented in IFS CY43R1)\nlandIce: none\nocean: NEMO3.4 '
+             '(NEMO v3.4; ORCA1 tripolar grid; 362 x 292 longitude/latitude; '
+             '75 levels; top grid cell 0-1 m)\nocnBgchem: none\nseaIce: LIM2 '
+             '(LIM v2; ORCA1 tripolar grid; 362 x 292 longitude/latitude)',
+             '/a/1.nc']
         )
 
 
@@ -648,10 +594,8 @@ class TestExternalVariablesAreacella(BaseTest):
         fix = ExternalVariablesAreacella('1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a external_variables,global,o,c,'areacella' "
-            "/a/1.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'external_variables,global,o,c,areacella',
+             '/a/1.nc']
         )
 
 
@@ -665,10 +609,8 @@ class TestExternalVariablesAreacello(BaseTest):
         fix = ExternalVariablesAreacello('1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a external_variables,global,o,c,'areacello' "
-            "/a/1.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'external_variables,global,o,c,areacello',
+             '/a/1.nc']
         )
 
 
@@ -682,10 +624,8 @@ class TestExternalVariablesAreacelloVolcello(BaseTest):
         fix = ExternalVariablesAreacelloVolcello('1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a external_variables,global,o,c,'areacello volcello' "
-            "/a/1.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'external_variables,global,o,c,areacello volcello', '/a/1.nc']
         )
 
 
@@ -699,10 +639,8 @@ class TestHadGemMMParentSourceId(BaseTest):
         fix = HadGemMMParentSourceId('1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a parent_source_id,global,o,c,'HadGEM3-GC31-MM' "
-            "/a/1.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'parent_source_id,global,o,c,HadGEM3-GC31-MM', '/a/1.nc']
         )
 
 
@@ -716,10 +654,7 @@ class TestHistoryClearOld(BaseTest):
         fix = HistoryClearOld('1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a history,global,o,c,'' "
-            "/a/1.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'history,global,o,c,', '/a/1.nc']
         )
 
 
@@ -732,9 +667,8 @@ class TestProductAdd(BaseTest):
         fix = ProductAdd('1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a product,global,o,c,'model-output' /a/1.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'product,global,o,c,model-output',
+             '/a/1.nc']
         )
 
 
@@ -749,11 +683,9 @@ class TestAtmosphereCloudIceContentStandardNameAdd(BaseTest):
                                                        '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a standard_name,clivi,o,c,"
-            "'atmosphere_cloud_ice_content' "
-            "/a/clivi_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'standard_name,clivi,o,c,atmosphere_cloud_ice_content',
+             '/a/clivi_components.nc']
         )
 
 
@@ -767,12 +699,10 @@ class TestHfbasinpmadvStandardNameAdd(BaseTest):
         fix = HfbasinpmadvStandardNameAdd('hfbasinpmadv_components.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a standard_name,hfbasinpmadv,o,c,"
-            "'northward_ocean_heat_transport_due_to_parameterized_mesoscale_"
-            "eddy_advection' "
-            "/a/hfbasinpmadv_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'standard_name,hfbasinpmadv,o,c,'
+             'northward_ocean_heat_transport_due_to_parameterized_mesoscale_e'
+             'ddy_advection', '/a/hfbasinpmadv_components.nc']
         )
 
 
@@ -786,12 +716,10 @@ class TestHfbasinpmdiffStandardNameAdd(BaseTest):
         fix = HfbasinpmdiffStandardNameAdd('hfbasinpmdiff_components.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a standard_name,hfbasinpmdiff,o,c,"
-            "'northward_ocean_heat_transport_due_to_parameterized_mesoscale_"
-            "eddy_diffusion' "
-            "/a/hfbasinpmdiff_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'standard_name,hfbasinpmdiff,o,c,'
+             'northward_ocean_heat_transport_due_to_parameterized_mesoscale_e'
+             'ddy_diffusion', '/a/hfbasinpmdiff_components.nc']
         )
 
 
@@ -805,10 +733,8 @@ class TestMipEraToPrim(BaseTest):
         fix = MipEraToPrim('var_components.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a mip_era,global,o,c,'PRIMAVERA' "
-            "/a/var_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'mip_era,global,o,c,PRIMAVERA',
+             '/a/var_components.nc']
         )
 
 
@@ -822,11 +748,10 @@ class TestMsftmzmpaStandardNameAdd(BaseTest):
         fix = MsftmzmpaStandardNameAdd('msftmzmpa_components.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a standard_name,msftmzmpa,o,c,'ocean_meridional_"
-            "overturning_mass_streamfunction_due_to_parameterized_mesoscale_"
-            "eddy_advection' /a/msftmzmpa_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'standard_name,msftmzmpa,o,c,'
+             'ocean_meridional_overturning_mass_streamfunction_due_to_paramet'
+             'erized_mesoscale_eddy_advection', '/a/msftmzmpa_components.nc']
         )
 
 
@@ -840,10 +765,8 @@ class TestRealmAtmos(BaseTest):
         fix = RealmAtmos('var_components.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a realm,global,o,c,'atmos' "
-            "/a/var_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'realm,global,o,c,atmos',
+             '/a/var_components.nc']
         )
 
 
@@ -857,10 +780,8 @@ class TestRealmOcean(BaseTest):
         fix = RealmOcean('var_components.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a realm,global,o,c,'ocean' "
-            "/a/var_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'realm,global,o,c,ocean',
+             '/a/var_components.nc']
         )
 
 
@@ -874,10 +795,8 @@ class TestSeaWaterSalinityStandardNameAdd(BaseTest):
         fix = SeaWaterSalinityStandardNameAdd('so_components.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a standard_name,so,o,c,'sea_water_salinity' "
-            "/a/so_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'standard_name,so,o,c,sea_water_salinity',
+             '/a/so_components.nc']
         )
 
 
@@ -891,10 +810,9 @@ class TestSeaSurfaceTemperatureNameAdd(BaseTest):
         fix = SeaSurfaceTemperatureNameAdd('tos_components.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a standard_name,tos,o,c,'sea_surface_temperature' "
-            "/a/tos_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'standard_name,tos,o,c,sea_surface_temperature',
+             '/a/tos_components.nc']
         )
 
 
@@ -910,11 +828,9 @@ class TestShallowConvectivePrecipitationFluxStandardNameAdd(BaseTest):
         )
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a standard_name,prcsh,o,c,"
-            "'shallow_convective_precipitation_flux' "
-            "/a/prcsh_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'standard_name,prcsh,o,c,shallow_convective_precipitation_flux',
+             '/a/prcsh_components.nc']
         )
 
 
@@ -930,11 +846,10 @@ class TestSidmassdynStandardNameAdd(BaseTest):
         )
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a standard_name,sidmassdyn,o,c,"
-            "'tendency_of_sea_ice_amount_due_to_sea_ice_dynamics' "
-            "/a/sidmassdyn_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'standard_name,sidmassdyn,o,c,'
+             'tendency_of_sea_ice_amount_due_to_sea_ice_dynamics',
+             '/a/sidmassdyn_components.nc']
         )
 
 
@@ -950,11 +865,10 @@ class TestSidmassthStandardNameAdd(BaseTest):
         )
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a standard_name,sidmassth,o,c,"
-            "'tendency_of_sea_ice_amount_due_to_sea_ice_thermodynamics' "
-            "/a/sidmassth_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'standard_name,sidmassth,o,c,'
+             'tendency_of_sea_ice_amount_due_to_sea_ice_thermodynamics',
+             '/a/sidmassth_components.nc']
         )
 
 
@@ -970,11 +884,10 @@ class TestSiflcondbotStandardNameAdd(BaseTest):
         )
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a standard_name,siflcondbot,o,c,"
-            "'sea_ice_basal_net_downward_sensible_heat_flux' "
-            "/a/siflcondbot_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'standard_name,siflcondbot,o,c,'
+             'sea_ice_basal_net_downward_sensible_heat_flux',
+             '/a/siflcondbot_components.nc']
         )
 
 
@@ -990,11 +903,10 @@ class TestSiflfwbotStandardNameAdd(BaseTest):
         )
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a standard_name,siflfwbot,o,c,"
-            "'water_flux_into_sea_water_from_sea_ice' "
-            "/a/siflfwbot_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'standard_name,siflfwbot,o,c,'
+             'water_flux_into_sea_water_from_sea_ice',
+             '/a/siflfwbot_components.nc']
         )
 
 
@@ -1010,11 +922,9 @@ class TestSiflsensupbotStandardNameAdd(BaseTest):
         )
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a standard_name,siflsensupbot,o,c,"
-            "'upward_sea_ice_basal_heat_flux' "
-            "/a/siflsensupbot_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'standard_name,siflsensupbot,o,c,upward_sea_ice_basal_heat_flux',
+             '/a/siflsensupbot_components.nc']
         )
 
 
@@ -1030,11 +940,10 @@ class TestSihcStandardNameAdd(BaseTest):
         )
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a standard_name,sihc,o,c,"
-            "'sea_ice_temperature_expressed_as_heat_content' "
-            "/a/sihc_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'standard_name,sihc,o,c,'
+             'sea_ice_temperature_expressed_as_heat_content',
+             '/a/sihc_components.nc']
         )
 
 
@@ -1050,11 +959,9 @@ class TestSisaltmassStandardNameAdd(BaseTest):
         )
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a standard_name,sisaltmass,o,c,"
-            "'sea_ice_salt_content' "
-            "/a/sisaltmass_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'standard_name,sisaltmass,o,c,sea_ice_salt_content',
+             '/a/sisaltmass_components.nc']
         )
 
 
@@ -1070,11 +977,9 @@ class TestSistrxubotStandardNameAdd(BaseTest):
         )
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a standard_name,sistrxubot,o,c,"
-            "'upward_x_stress_at_sea_ice_base' "
-            "/a/sistrxubot_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'standard_name,sistrxubot,o,c,upward_x_stress_at_sea_ice_base',
+             '/a/sistrxubot_components.nc']
         )
 
 
@@ -1090,11 +995,9 @@ class TestSistryubotStandardNameAdd(BaseTest):
         )
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a standard_name,sistryubot,o,c,"
-            "'upward_y_stress_at_sea_ice_base' "
-            "/a/sistryubot_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'standard_name,sistryubot,o,c,upward_y_stress_at_sea_ice_base',
+             '/a/sistryubot_components.nc']
         )
 
 
@@ -1110,11 +1013,9 @@ class TestSitempbotStandardNameAdd(BaseTest):
         )
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a standard_name,sitempbot,o,c,"
-            "'sea_ice_basal_temperature' "
-            "/a/sitempbot_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'standard_name,sitempbot,o,c,sea_ice_basal_temperature',
+             '/a/sitempbot_components.nc']
         )
 
 
@@ -1130,11 +1031,10 @@ class TestSitimefracStandardNameAdd(BaseTest):
         )
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a standard_name,sitimefrac,o,c,"
-            "'fraction_of_time_with_sea_ice_area_fraction_above_threshold' "
-            "/a/sitimefrac_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'standard_name,sitimefrac,o,c,'
+             'fraction_of_time_with_sea_ice_area_fraction_above_threshold',
+             '/a/sitimefrac_components.nc']
         )
 
 
@@ -1148,10 +1048,8 @@ class TestSurfaceTemperatureNameAdd(BaseTest):
         fix = SurfaceTemperatureNameAdd('ts_components.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a standard_name,ts,o,c,'surface_temperature' "
-            "/a/ts_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'standard_name,ts,o,c,surface_temperature',
+             '/a/ts_components.nc']
         )
 
 
@@ -1165,10 +1063,12 @@ class TestTrackingIdNew(BaseTest):
         fix = TrackingIdNew('prcsh_components.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once()
-        self.assertRegex(self.mock_subprocess.call_args[0][0],
-                         r"ncatted -h -a tracking_id,global,o,c,"
-                         r"'hdl:21.14100/\w{8}-\w{4}-\w{4}-\w{4}-\w{12}' "
-                         r"/a/prcsh_components.nc")
+        argv = self.mock_subprocess.call_args[0][0]
+        self.assertEqual(['ncatted', '-h', '-a'], argv[:3])
+        self.assertRegex(argv[3],
+                         r"^tracking_id,global,o,c,"
+                         r"hdl:21.14100/\w{8}-\w{4}-\w{4}-\w{4}-\w{12}$")
+        self.assertEqual('/a/prcsh_components.nc', argv[4])
 
 
 class TestVarUnitsToDegC(BaseTest):
@@ -1181,10 +1081,8 @@ class TestVarUnitsToDegC(BaseTest):
         fix = VarUnitsToDegC('tos_components.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a units,tos,o,c,'degC' "
-            "/a/tos_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'units,tos,o,c,degC',
+             '/a/tos_components.nc']
         )
 
 
@@ -1198,10 +1096,7 @@ class TestVarUnitsToKelvin(BaseTest):
         fix = VarUnitsToKelvin('ts_components.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a units,ts,o,c,'K' "
-            "/a/ts_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'units,ts,o,c,K', '/a/ts_components.nc']
         )
 
 
@@ -1215,10 +1110,7 @@ class TestVarUnitsToPercent(BaseTest):
         fix = VarUnitsToPercent('clt_components.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a units,clt,o,c,'%' "
-            "/a/clt_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'units,clt,o,c,%', '/a/clt_components.nc']
         )
 
 
@@ -1232,10 +1124,8 @@ class TestVarUnitsToThousandths(BaseTest):
         fix = VarUnitsToThousandths('so_components.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a units,so,o,c,'0.001' "
-            "/a/so_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'units,so,o,c,0.001',
+             '/a/so_components.nc']
         )
 
 
@@ -1249,10 +1139,8 @@ class TestVerticesLatStdNameDelete(BaseTest):
         fix = VerticesLatStdNameDelete('1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a standard_name,vertices_latitude,d,c,0 "
-            "/a/1.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'standard_name,vertices_latitude,d,c,0',
+             '/a/1.nc']
         )
 
 
@@ -1266,10 +1154,8 @@ class TestVerticesLonStdNameDelete(BaseTest):
         fix = VerticesLonStdNameDelete('1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a standard_name,vertices_longitude,d,c,0 "
-            "/a/1.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'standard_name,vertices_longitude,d,c,0',
+             '/a/1.nc']
         )
 
 
@@ -1283,11 +1169,10 @@ class TestWtemStandardNameAdd(BaseTest):
         fix = WtemStandardNameAdd('wtem_components.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a standard_name,wtem,o,c,"
-            "'upward_transformed_eulerian_mean_air_velocity' "
-            "/a/wtem_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'standard_name,wtem,o,c,'
+             'upward_transformed_eulerian_mean_air_velocity',
+             '/a/wtem_components.nc']
         )
 
 
@@ -1301,11 +1186,8 @@ class TestWindSpeedStandardNameAdd(BaseTest):
         fix = WindSpeedStandardNameAdd('sfcWindmax_components.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a standard_name,sfcWindmax,o,c,"
-            "'wind_speed' "
-            "/a/sfcWindmax_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'standard_name,sfcWindmax,o,c,wind_speed',
+             '/a/sfcWindmax_components.nc']
         )
 
 
@@ -1319,13 +1201,57 @@ class TestZZZThetapv2StandardNameAdd(BaseTest):
         fix = ZZZThetapv2StandardNameAdd('thetapv2_components.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a standard_name,thetapv2,o,c,"
-            "'theta_on_pv2_surface' "
-            "/a/thetapv2_components.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'standard_name,thetapv2,o,c,theta_on_pv2_surface',
+             '/a/thetapv2_components.nc']
         )
 
 
+class TestAttributeAddProbes(unittest.TestCase):
+    """ Test the is_satisfied() probes of the AttributeAdd fixes """
+    def setUp(self):
+        """ Create a header that is partly correct """
+        self.header = FileHeader(
+            {'data_specs_version': '01.00.23',
+             'realm': 'atmos',
+             'external_variables': 'areacella',
+             'branch_time_in_parent': np.float32(0.0),
+             'tracking_id': 'hdl:21.14100/abc'},
+            {'tas': {'units': 'K'}}
+        )
+
+    def test_satisfied(self):
+        """ Test fixes whose values are already in the file """
+        for fix_class in (DataSpecsVersionAdd, ExternalVariablesAreacella,
+                          RealmAtmos):
+            self.assertTrue(fix_class('tas_1.nc', '/a').
+                            is_satisfied(self.header))
+
+    def test_not_satisfied(self):
+        """ Test fixes whose values are different to the file """
+        for fix_class in (DataSpecsVersion29Add, RealmOcean,
+                          VarUnitsToDegC, ProductAdd):
+            self.assertFalse(fix_class('tas_1.nc', '/a').
+                             is_satisfied(self.header))
+
+    def test_type_differs(self):
+        """ Test that a value with a different type isn't satisfied """
+        self.assertFalse(ParentBranchTimeAdd('tas_1.nc', '/a').
+                         is_satisfied(self.header))
+
+    def test_tracking_id_new_never_satisfied(self):
+        """ Test that a new tracking_id is always generated """
+        self.assertFalse(TrackingIdNew('tas_1.nc', '/a').
+                         is_satisfied(self.header))
+
+    def test_delete(self):
+        """ Test that a delete is satisfied if the attribute's missing """
+        self.assertTrue(BranchTimeDelete('tas_1.nc', '/a').
+                        is_satisfied(self.header))
+        self.header.global_attributes['branch_time'] = 'a'
+        self.assertFalse(BranchTimeDelete('tas_1.nc', '/a').
+                         is_satisfied(self.header))
+
+
 if __name__ == '__main__':
     unittest.main()
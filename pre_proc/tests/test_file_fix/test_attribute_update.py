@@ -3,15 +3,16 @@ test_attribute_add.py
 
 Unit tests for all FileFix concrete classes from attribute_add.py
 """
-import subprocess
 import unittest
 
 import mock
+import numpy as np
 
 from pre_proc.exceptions import (AttributeNotFoundError,
                                  AttributeConversionError,
                                  ExistingAttributeError,
                                  InstanceVariableNotDefinedError)
+from pre_proc.executor import CommandResult
 from pre_proc.file_fix import (ParentBranchTimeDoubleFix,
                                ChildBranchTimeDoubleFix,
                                ForcingIndexIntFix,
@@ -23,6 +24,7 @@ from pre_proc.file_fix import (ParentBranchTimeDoubleFix,
                                FurtherInfoUrlPrimToHttps,
                                FurtherInfoUrlToPrim,
                                AogcmToAgcm, TrackingIdFix)
+from pre_proc.file_header import FileHeader
 
 
 class BaseTest(unittest.TestCase):
@@ -30,8 +32,9 @@ class BaseTest(unittest.TestCase):
     def setUp(self):
         """ Set up code run before every test """
         # mock any external calls
-        patch = mock.patch('pre_proc.common.subprocess.check_output')
-        self.mock_subprocess = patch.start()
+        patch = mock.patch('pre_proc.common.get_executor')
+        self.mock_subprocess = patch.start().return_value.run
+        self.mock_subprocess.return_value = CommandResult([], 0)
         self.addCleanup(patch.stop)
 
         class MockedNamespace(object):
@@ -116,10 +119,8 @@ class TestParentBranchTimeDoubleFix(BaseTest):
         fix = ParentBranchTimeDoubleFix('1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            'ncatted -h -a branch_time_in_parent,global,o,d,1080.0 '
-            '/a/1.nc',
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'branch_time_in_parent,global,o,d,1080.0',
+             '/a/1.nc']
         )
 
     def test_subprocess_called_correctly_with_trailing_letter(self):
@@ -131,10 +132,8 @@ class TestParentBranchTimeDoubleFix(BaseTest):
         fix = ParentBranchTimeDoubleFix('1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            'ncatted -h -a branch_time_in_parent,global,o,d,0.0 '
-            '/a/1.nc',
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'branch_time_in_parent,global,o,d,0.0',
+             '/a/1.nc']
         )
 
 
@@ -166,10 +165,8 @@ class TestChildBranchTimeDoubleFix(BaseTest):
         fix = ChildBranchTimeDoubleFix('1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            'ncatted -h -a branch_time_in_child,global,o,d,0.0 '
-            '/a/1.nc',
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'branch_time_in_child,global,o,d,0.0',
+             '/a/1.nc']
         )
 
 
@@ -201,10 +198,8 @@ class TestInitializationIndexIntFix(BaseTest):
         fix = InitializationIndexIntFix('1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            'ncatted -h -a initialization_index,global,o,s,99 '
-            '/a/1.nc',
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'initialization_index,global,o,s,99',
+             '/a/1.nc']
         )
 
 
@@ -236,10 +231,7 @@ class TestForcingIndexIntFix(BaseTest):
         fix = ForcingIndexIntFix('1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            'ncatted -h -a forcing_index,global,o,s,99 '
-            '/a/1.nc',
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'forcing_index,global,o,s,99', '/a/1.nc']
         )
 
 
@@ -271,10 +263,7 @@ class TestPhysicsIndexIntFix(BaseTest):
         fix = PhysicsIndexIntFix('1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            'ncatted -h -a physics_index,global,o,s,99 '
-            '/a/1.nc',
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'physics_index,global,o,s,99', '/a/1.nc']
         )
 
 
@@ -306,10 +295,8 @@ class TestRealizationIndexIntFix(BaseTest):
         fix = RealizationIndexIntFix('1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            'ncatted -h -a realization_index,global,o,s,99 '
-            '/a/1.nc',
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'realization_index,global,o,s,99',
+             '/a/1.nc']
         )
 
 
@@ -343,11 +330,9 @@ class TestFurtherInfoUrlToHttps(BaseTest):
         fix = FurtherInfoUrlToHttps('1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a further_info_url,global,o,c,"
-            "'https://furtherinfo.es-doc.org/part1.part2' "
-            "/a/1.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'further_info_url,global,o,c,https://furtherinfo.es-doc.org/'
+             'part1.part2', '/a/1.nc']
         )
 
 
@@ -399,11 +384,9 @@ class TestFurtherInfoUrlAWISourceIdAndHttps(BaseTest):
         fix = FurtherInfoUrlAWISourceIdAndHttps('1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a further_info_url,global,o,c,"
-            "'https://furtherinfo.es-doc.org/CMIP6.AWI.AWI-CM-1-0-LR."
-            "hist-1950.none.r1i1p1f002' /a/1.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'further_info_url,global,o,c,https://furtherinfo.es-doc.org/'
+             'CMIP6.AWI.AWI-CM-1-0-LR.hist-1950.none.r1i1p1f002', '/a/1.nc']
         )
 
 
@@ -448,11 +431,9 @@ class TestFurtherInfoUrlPrimToHttps(BaseTest):
         fix = FurtherInfoUrlPrimToHttps('1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a further_info_url,global,o,c,"
-            "'https://furtherinfo.es-doc.org/PRIMAVERA.part2' "
-            "/a/1.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'further_info_url,global,o,c,https://furtherinfo.es-doc.org/'
+             'PRIMAVERA.part2', '/a/1.nc']
         )
 
 
@@ -497,11 +478,9 @@ class TestFurtherInfoUrlToPrim(BaseTest):
         fix = FurtherInfoUrlToPrim('1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a further_info_url,global,o,c,"
-            "'https://furtherinfo.es-doc.org/PRIMAVERA.part2' "
-            "/a/1.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'further_info_url,global,o,c,https://furtherinfo.es-doc.org/'
+             'PRIMAVERA.part2', '/a/1.nc']
         )
 
 
@@ -526,10 +505,7 @@ class TestAogcmToAgcm(BaseTest):
         fix = AogcmToAgcm('1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a source_type,global,o,c,"
-            "'AGCM' /a/1.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'source_type,global,o,c,AGCM', '/a/1.nc']
         )
 
 
@@ -562,13 +538,59 @@ class TestTrackingIdFix(BaseTest):
         fix = TrackingIdFix('1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a tracking_id,global,o,c,"
-            "'hdl:21.14100/79fa5ac0-14cb-4a9f-bcff-ca097ba45c46' "
-            "/a/1.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a',
+             'tracking_id,global,o,c,hdl:21.14100/'
+             '79fa5ac0-14cb-4a9f-bcff-ca097ba45c46', '/a/1.nc']
         )
 
 
+class TestAttributeUpdateProbes(unittest.TestCase):
+    """ Test the is_satisfied() probes of the AttributeUpdate fixes """
+    def _header(self, **global_attributes):
+        """ Make a header with the specified global attributes """
+        return FileHeader(global_attributes, {})
+
+    def test_double_fix(self):
+        """ Test that a value that is already a double is satisfied """
+        fix = ParentBranchTimeDoubleFix('1.nc', '/a')
+        self.assertTrue(fix.is_satisfied(
+            self._header(branch_time_in_parent=np.float64(0.0))))
+        self.assertFalse(fix.is_satisfied(
+            self._header(branch_time_in_parent='0.0')))
+
+    def test_missing_attribute(self):
+        """ Test that a missing attribute isn't satisfied """
+        fix = ForcingIndexIntFix('1.nc', '/a')
+        self.assertFalse(fix.is_satisfied(self._header()))
+
+    def test_further_info_url(self):
+        """ Test that an HTTPS URL is satisfied """
+        fix = FurtherInfoUrlToHttps('1.nc', '/a')
+        self.assertTrue(fix.is_satisfied(
+            self._header(further_info_url='https://a.url/')))
+        self.assertFalse(fix.is_satisfied(
+            self._header(further_info_url='http://a.url/')))
+
+    def test_further_info_url_prim(self):
+        """ Test that a PRIMAVERA URL is satisfied """
+        fix = FurtherInfoUrlToPrim('1.nc', '/a')
+        self.assertTrue(fix.is_satisfied(self._header(
+            further_info_url='https://furtherinfo.es-doc.org/PRIMAVERA.a')))
+        self.assertFalse(fix.is_satisfied(self._header(
+            further_info_url='https://furtherinfo.es-doc.org/CMIP6.a')))
+
+    def test_aogcm_to_agcm(self):
+        """ Test that AGCM is satisfied """
+        fix = AogcmToAgcm('1.nc', '/a')
+        self.assertTrue(fix.is_satisfied(self._header(source_type='AGCM')))
+        self.assertFalse(fix.is_satisfied(self._header(source_type='AOGCM')))
+
+    def test_tracking_id_fix(self):
+        """ Test that a tracking_id that starts with hdl: is satisfied """
+        fix = TrackingIdFix('1.nc', '/a')
+        self.assertTrue(fix.is_satisfied(
+            self._header(tracking_id='hdl:21.14100/abc')))
+
+
 if __name__ == '__main__':
     unittest.main()
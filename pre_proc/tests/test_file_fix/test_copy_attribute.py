@@ -3,12 +3,12 @@ test_attribute_add.py
 
 Unit tests for all FileFix concrete classes from attribute_add.py
 """
-import subprocess
 import unittest
 
 import mock
 
 from pre_proc.exceptions import AttributeNotFoundError
+from pre_proc.executor import CommandResult
 from pre_proc.file_fix import (ParentSourceIdFromSourceId,
                                FillValueFromMissingValue)
 
@@ -18,8 +18,9 @@ class BaseTest(unittest.TestCase):
     def setUp(self):
         """ Set up code run before every test """
         # mock any external calls
-        patch = mock.patch('pre_proc.common.subprocess.check_output')
-        self.mock_subprocess = patch.start()
+        patch = mock.patch('pre_proc.common.get_executor')
+        self.mock_subprocess = patch.start().return_value.run
+        self.mock_subprocess.return_value = CommandResult([], 0)
         self.addCleanup(patch.stop)
 
         class MockedNamespace(object):
@@ -55,9 +56,8 @@ class TestParentSourceIdFromSourceId(BaseTest):
         fix = ParentSourceIdFromSourceId('1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a parent_source_id,global,o,c,'some-model' /a/1.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', 'parent_source_id,global,o,c,some-model',
+             '/a/1.nc']
         )
 
 
@@ -82,9 +82,8 @@ class TestFillValueFromMissingValue(BaseTest):
         fix = FillValueFromMissingValue('tos_gubbins.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_once_with(
-            "ncatted -h -a _FillValue,tos,o,f,1e-07 /a/tos_gubbins.nc",
-            stderr=subprocess.STDOUT,
-            shell=True
+            ['ncatted', '-h', '-a', '_FillValue,tos,o,f,1e-07',
+             '/a/tos_gubbins.nc']
         )
 
 
@@ -3,7 +3,6 @@ test_data_fixes.py
 
 Unit tests for all FileFix concrete classes from data_fixes.py
 """
-import subprocess
 import unittest
 from unittest import mock
 
@@ -11,7 +10,10 @@ import cf_units
 from iris.tests.stock import realistic_3d
 import numpy as np
 
-from pre_proc.exceptions import ExistingAttributeError, NcksError
+from pre_proc.common import is_command_timeout
+from pre_proc.exceptions import (ExistingAttributeError, Ncap2Error,
+                                 NcksError)
+from pre_proc.executor import CommandResult
 from pre_proc.file_fix import (LatDirection, LevToPlev, AAVarNameToFileName,
                                ToDegC, ZZEcEarthAtmosFix,
                                ZZZEcEarthLongitudeFix,
@@ -36,6 +38,7 @@ from pre_proc.file_fix import (LatDirection, LevToPlev, AAVarNameToFileName,
                                FixMaskCICEOrca1UV,
                                FixMaskCICEOrca025T,
                                FixMaskCICEOrca12T)
+from pre_proc.timeouts import command_limits
 
 
 class NcoDataFixBaseTest(unittest.TestCase):
@@ -45,8 +48,9 @@ class NcoDataFixBaseTest(unittest.TestCase):
     def setUp(self):
         """ Set up code run before every test """
         # mock any external calls
-        patch = mock.patch('pre_proc.common.subprocess.check_output')
-        self.mock_subprocess = patch.start()
+        patch = mock.patch('pre_proc.common.get_executor')
+        self.mock_subprocess = patch.start().return_value.run
+        self.mock_subprocess.return_value = CommandResult([], 0)
         self.addCleanup(patch.stop)
 
         patch = mock.patch('pre_proc.file_fix.data_fixes.os.remove')
@@ -62,11 +66,15 @@ class NcoDataFixBaseTest(unittest.TestCase):
         self.mock_exists.return_value = False
         self.addCleanup(patch.stop)
 
-        patch = mock.patch('pre_proc.file_fix.abstract.shutil.copyfile')
+        patch = mock.patch('pre_proc.file_fix.abstract.copy_file')
         self.mock_copyfile = patch.start()
         self.mock_copyfile.return_value = False
         self.addCleanup(patch.stop)
 
+        patch = mock.patch('pre_proc.file_fix.abstract.replace_file')
+        self.mock_replace = patch.start()
+        self.addCleanup(patch.stop)
+
 
 class TestLatDirection(NcoDataFixBaseTest):
     """
@@ -90,16 +98,14 @@ class TestLatDirection(NcoDataFixBaseTest):
         fix = LatDirection('1.nc', '/a')
         fix.apply_fix()
         calls = [
-            mock.call('ncpdq -a -lat /a/1.nc /a/1.nc.temp',
-                      stderr=subprocess.STDOUT, shell=True),
-            mock.call('ncks -v lat_bnds /a/1.nc /a/1.nc.bnds',
-                      stderr=subprocess.STDOUT, shell=True),
-            mock.call('ncpdq -a -bnds /a/1.nc.bnds /a/1.nc.bnds_corr',
-                      stderr=subprocess.STDOUT, shell=True),
-            mock.call('ncatted -h -a history,global,d,, /a/1.nc.bnds_corr',
-                      stderr=subprocess.STDOUT, shell=True),
-            mock.call('ncks -A -v lat_bnds /a/1.nc.bnds_corr /a/1.nc',
-                      stderr=subprocess.STDOUT, shell=True)
+            mock.call(['ncpdq', '-a', '-lat', '/a/1.nc', '/a/1.nc.temp']),
+            mock.call(['ncks', '-v', 'lat_bnds', '/a/1.nc', '/a/1.nc.bnds']),
+            mock.call(['ncpdq', '-a', '-bnds', '/a/1.nc.bnds',
+                       '/a/1.nc.bnds_corr']),
+            mock.call(['ncatted', '-h', '-a', 'history,global,d,,',
+                       '/a/1.nc.bnds_corr']),
+            mock.call(['ncks', '-A', '-v', 'lat_bnds', '/a/1.nc.bnds_corr',
+                       '/a/1.nc'])
         ]
         self.mock_subprocess.assert_has_calls(calls)
 
@@ -110,19 +116,18 @@ class TestLatDirection(NcoDataFixBaseTest):
         fix = LatDirection('1.nc', '/a')
         fix.apply_fix()
         calls = [
-            mock.call('/a/1.nc'),
             mock.call('/a/1.nc.bnds'),
             mock.call('/a/1.nc.bnds_corr')
         ]
         self.mock_remove.assert_has_calls(calls)
 
-    def test_rename_called_correctly(self):
+    def test_replace_called_correctly(self):
         """
-        Test that output file is renamed.
+        Test that output file replaces the input.
         """
         fix = LatDirection('1.nc', '/a')
         fix.apply_fix()
-        self.mock_rename.assert_called_once_with('/a/1.nc.temp', '/a/1.nc')
+        self.mock_replace.assert_called_once_with('/a/1.nc.temp', '/a/1.nc')
 
     def test_decreasing_exception_raised(self):
         """
@@ -140,11 +145,11 @@ class TestLatDirection(NcoDataFixBaseTest):
         """
         fix = LatDirection('1.nc', '/a')
         self.mock_subprocess.side_effect = [
-            None,
-            None,
-            None,
-            None,
-            RuntimeError('Not in the mood today')
+            CommandResult([], 0),
+            CommandResult([], 0),
+            CommandResult([], 0),
+            CommandResult([], 0),
+            CommandResult([], 1, stderr='Not in the mood today')
         ]
         self.assertRaises(NcksError, fix.apply_fix)
 
@@ -154,7 +159,6 @@ class TestLatDirection(NcoDataFixBaseTest):
         fix.apply_fix()
         calls = [
             mock.call('/a/1.nc.temp'),
-            mock.call('/a/1.nc'),
             mock.call('/a/1.nc.bnds'),
             mock.call('/a/1.nc.bnds_corr'),
             mock.call('/a/1.nc.bnds'),
@@ -175,8 +179,8 @@ class TestLevToPlev(NcoDataFixBaseTest):
         fix = LevToPlev('1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_with(
-            'ncrename -h -d lev,plev -v lev,plev /a/1.nc /a/1.nc.temp',
-            stderr=subprocess.STDOUT, shell=True
+            ['ncrename', '-h', '-d', 'lev,plev', '-v', 'lev,plev', '/a/1.nc',
+             '/a/1.nc.temp']
         )
 
 
@@ -235,12 +239,10 @@ class TestAAVarNameToFileName(NcoDataFixBaseTest):
         fix = AAVarNameToFileName('hus_blah_blah.nc', '/a')
         fix.apply_fix()
         calls = [
-            mock.call('ncrename -h -v hus7h,hus /a/hus_blah_blah.nc '
-                      '/a/hus_blah_blah.nc.temp',
-                      stderr=subprocess.STDOUT, shell=True),
-            mock.call('ncatted -h -a variable_id,global,m,c,hus '
-                      '/a/hus_blah_blah.nc /a/hus_blah_blah.nc.temp',
-                      stderr=subprocess.STDOUT, shell=True)
+            mock.call(['ncrename', '-h', '-v', 'hus7h,hus',
+                       '/a/hus_blah_blah.nc', '/a/hus_blah_blah.nc.temp']),
+            mock.call(['ncatted', '-h', '-a', 'variable_id,global,m,c,hus',
+                       '/a/hus_blah_blah.nc', '/a/hus_blah_blah.nc.temp'])
         ]
         self.mock_subprocess.assert_has_calls(calls)
 
@@ -267,30 +269,29 @@ class TestToDegC(NcoDataFixBaseTest):
         fix = ToDegC('tos_table.nc', '/a')
         fix.apply_fix()
         calls = [
-            mock.call("ncap2 -h -s 'tos=tos-273.15f' /a/tos_table.nc "
-                      "/a/tos_table.nc.temp",
-                      stderr=subprocess.STDOUT, shell=True),
-            mock.call("ncatted -h -a units,tos,m,c,'degC' /a/tos_table.nc",
-                      stderr=subprocess.STDOUT, shell=True)
+            mock.call(['ncap2', '-h', '-s', 'tos=tos-273.15f',
+                       '/a/tos_table.nc', '/a/tos_table.nc.temp']),
+            mock.call(['ncatted', '-h', '-a', 'units,tos,m,c,degC',
+                       '/a/tos_table.nc'])
         ]
         self.mock_subprocess.assert_has_calls(calls)
 
     def test_remove_called_correctly(self):
         """
-        Test that input files is removed.
+        Test that the input file isn't removed before being replaced.
         """
         fix = ToDegC('tos_table.nc', '/a')
         fix.apply_fix()
-        self.mock_remove.assert_called_once_with('/a/tos_table.nc')
+        self.mock_remove.assert_not_called()
 
-    def test_rename_called_correctly(self):
+    def test_replace_called_correctly(self):
         """
-        Test that output file is renamed.
+        Test that output file replaces the input.
         """
         fix = ToDegC('tos_table.nc', '/a')
         fix.apply_fix()
-        self.mock_rename.assert_called_once_with('/a/tos_table.nc.temp',
-                                                 '/a/tos_table.nc')
+        self.mock_replace.assert_called_once_with('/a/tos_table.nc.temp',
+                                                  '/a/tos_table.nc')
 
     def test_exception_raised(self):
         """
@@ -375,9 +376,8 @@ class TestSetTimeReference1949(NcoDataFixBaseTest):
         fix = SetTimeReference1949('1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_with(
-            "cdo -z zip_3 -setreftime,'1949-01-01','00:00:00' /a/1.nc "
-            "/a/1.nc.temp",
-            stderr=subprocess.STDOUT, shell=True
+            ['cdo', '-z', 'zip_3', '-setreftime,1949-01-01,00:00:00',
+             '/a/1.nc', '/a/1.nc.temp']
         )
 
 
@@ -394,37 +394,33 @@ class TestZZZAddHeight2m(NcoDataFixBaseTest):
         fix.apply_fix()
         calls = [
             mock.call(
-                "ncks -h -A -v height /gws/nopw/j04/primavera1/cache/jseddon/"
-                "reference_files/height2m_reference.nc /a/tas_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '-A', '-v', 'height',
+                 '/gws/nopw/j04/primavera1/cache/jseddon/reference_files/'
+                 'height2m_reference.nc', '/a/tas_1.nc.temp']
             ),
             mock.call(
-                "ncatted -h -a coordinates,tas,o,c,'height' /a/tas_1.nc",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncatted', '-h', '-a', 'coordinates,tas,o,c,height',
+                 '/a/tas_1.nc']
             ),
         ]
         self.mock_subprocess.assert_has_calls(calls)
 
     def test_remove_called_correctly(self):
         """
-        Test that input files is removed.
+        Test that any leftover temporary file is removed.
         """
         self.mock_exists.return_value = True
         fix = ZZZAddHeight2m('1.nc', '/a')
         fix.apply_fix()
-        calls = [
-            mock.call('/a/1.nc.temp'),
-            mock.call('/a/1.nc')
-        ]
-        self.mock_remove.assert_has_calls(calls)
+        self.mock_remove.assert_called_once_with('/a/1.nc.temp')
 
-    def test_rename_called_correctly(self):
+    def test_replace_called_correctly(self):
         """
-        Test that output file is renamed.
+        Test that output file replaces the input.
         """
         fix = ZZZAddHeight2m('1.nc', '/a')
         fix.apply_fix()
-        self.mock_rename.assert_called_once_with('/a/1.nc.temp', '/a/1.nc')
+        self.mock_replace.assert_called_once_with('/a/1.nc.temp', '/a/1.nc')
 
 
 class TestRemoveOrca1Halo(NcoDataFixBaseTest):
@@ -439,9 +435,8 @@ class TestRemoveOrca1Halo(NcoDataFixBaseTest):
         fix = AAARemoveOrca1Halo('tas_1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_with(
-            "ncks -h --no_alphabetize -di,1,360 -dj,1,330 /a/tas_1.nc "
-            "/a/tas_1.nc.temp",
-            stderr=subprocess.STDOUT, shell=True
+            ['ncks', '-h', '--no_alphabetize', '-di,1,360', '-dj,1,330',
+             '/a/tas_1.nc', '/a/tas_1.nc.temp']
         )
 
 
@@ -457,9 +452,8 @@ class TestRemoveOrca025Halo(NcoDataFixBaseTest):
         fix = AAARemoveOrca025Halo('tas_1.nc', '/a')
         fix.apply_fix()
         self.mock_subprocess.assert_called_with(
-            "ncks -h --no_alphabetize -di,1,1440 -dj,1,1205 /a/tas_1.nc "
-            "/a/tas_1.nc.temp",
-            stderr=subprocess.STDOUT, shell=True
+            ['ncks', '-h', '--no_alphabetize', '-di,1,1440', '-dj,1,1205',
+             '/a/tas_1.nc', '/a/tas_1.nc.temp']
         )
 
 
@@ -475,26 +469,50 @@ class TestMaskOrca1TOlevel(NcoDataFixBaseTest):
         fix.apply_fix()
         calls = [
             mock.call(
-                "ncks -h --no_alphabetize -A -v mask_3D_T "
-                "/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/"
-                "bytes_masks/HadGEM3-GC31-LL/primavera_byte_masks.nc "
-                "/a/tos_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-A', '-v', 'mask_3D_T',
+                 '/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/'
+                 'bytes_masks/HadGEM3-GC31-LL/primavera_byte_masks.nc',
+                 '/a/tos_1.nc.temp']
             ),
             mock.call(
-                "ncap2 -h -s 'where(mask_3D_T!=0) tos=tos@_FillValue' "
-                "/a/tos_1.nc.temp /a/tos_1.nc.temp_masked",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncap2', '-h', '-s', 'where(mask_3D_T!=0) tos=tos@_FillValue',
+                 '/a/tos_1.nc.temp', '/a/tos_1.nc.temp_masked']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -x -v mask_3D_T "
-                "/a/tos_1.nc.temp_masked /a/tos_1.nc.temp_final",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-x', '-v', 'mask_3D_T',
+                 '/a/tos_1.nc.temp_masked', '/a/tos_1.nc.temp_final']
             ),
         ]
         self.mock_subprocess.assert_has_calls(calls)
 
 
+class TestMaskCommandTimeout(NcoDataFixBaseTest):
+    """
+    Test that FixMaskOrca1TOlevel cleans up when a command times out
+    """
+    def test_intermediate_files_removed(self):
+        """
+        Test that the intermediate files are removed and that the timeout can
+        be identified from the exception.
+        """
+        self.mock_exists.return_value = True
+        self.mock_subprocess.side_effect = [
+            CommandResult([], 0),
+            CommandResult([], -9, timed_out=True)
+        ]
+        fix = FixMaskOrca1TOlevel('tos_1.nc', '/a')
+        with command_limits('/a/tos_1.nc', type(fix)):
+            with self.assertRaises(Ncap2Error) as context:
+                fix.apply_fix()
+        self.assertTrue(is_command_timeout(context.exception))
+        self.assertIsNotNone(self.mock_subprocess.call_args[1]['timeout'])
+        self.mock_remove.assert_has_calls([
+            mock.call('/a/tos_1.nc.temp'),
+            mock.call('/a/tos_1.nc.temp_masked'),
+            mock.call('/a/tos_1.nc.temp_final')
+        ])
+
+
 class TestMaskOrca025TOlevel(NcoDataFixBaseTest):
     """
     Test FixMaskOrca025TOlevel
@@ -507,21 +525,18 @@ class TestMaskOrca025TOlevel(NcoDataFixBaseTest):
         fix.apply_fix()
         calls = [
             mock.call(
-                "ncks -h --no_alphabetize -A -v mask_3D_T "
-                "/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/"
-                "bytes_masks/HadGEM3-GC31-MM/primavera_byte_masks.nc "
-                "/a/tos_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-A', '-v', 'mask_3D_T',
+                 '/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/'
+                 'bytes_masks/HadGEM3-GC31-MM/primavera_byte_masks.nc',
+                 '/a/tos_1.nc.temp']
             ),
             mock.call(
-                "ncap2 -h -s 'where(mask_3D_T!=0) tos=tos@_FillValue' "
-                "/a/tos_1.nc.temp /a/tos_1.nc.temp_masked",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncap2', '-h', '-s', 'where(mask_3D_T!=0) tos=tos@_FillValue',
+                 '/a/tos_1.nc.temp', '/a/tos_1.nc.temp_masked']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -x -v mask_3D_T "
-                "/a/tos_1.nc.temp_masked /a/tos_1.nc.temp_final",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-x', '-v', 'mask_3D_T',
+                 '/a/tos_1.nc.temp_masked', '/a/tos_1.nc.temp_final']
             ),
         ]
         self.mock_subprocess.assert_has_calls(calls)
@@ -539,21 +554,18 @@ class TestMaskOrca1UOlevel(NcoDataFixBaseTest):
         fix.apply_fix()
         calls = [
             mock.call(
-                "ncks -h --no_alphabetize -A -v mask_3D_U "
-                "/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/"
-                "bytes_masks/HadGEM3-GC31-LL/primavera_byte_masks.nc "
-                "/a/uo_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-A', '-v', 'mask_3D_U',
+                 '/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/'
+                 'bytes_masks/HadGEM3-GC31-LL/primavera_byte_masks.nc',
+                 '/a/uo_1.nc.temp']
             ),
             mock.call(
-                "ncap2 -h -s 'where(mask_3D_U!=0) uo=uo@_FillValue' "
-                "/a/uo_1.nc.temp /a/uo_1.nc.temp_masked",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncap2', '-h', '-s', 'where(mask_3D_U!=0) uo=uo@_FillValue',
+                 '/a/uo_1.nc.temp', '/a/uo_1.nc.temp_masked']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -x -v mask_3D_U "
-                "/a/uo_1.nc.temp_masked /a/uo_1.nc.temp_final",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-x', '-v', 'mask_3D_U',
+                 '/a/uo_1.nc.temp_masked', '/a/uo_1.nc.temp_final']
             ),
         ]
         self.mock_subprocess.assert_has_calls(calls)
@@ -571,21 +583,18 @@ class TestMaskOrca025UOlevel(NcoDataFixBaseTest):
         fix.apply_fix()
         calls = [
             mock.call(
-                "ncks -h --no_alphabetize -A -v mask_3D_U "
-                "/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/"
-                "bytes_masks/HadGEM3-GC31-MM/primavera_byte_masks.nc "
-                "/a/uo_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-A', '-v', 'mask_3D_U',
+                 '/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/'
+                 'bytes_masks/HadGEM3-GC31-MM/primavera_byte_masks.nc',
+                 '/a/uo_1.nc.temp']
             ),
             mock.call(
-                "ncap2 -h -s 'where(mask_3D_U!=0) uo=uo@_FillValue' "
-                "/a/uo_1.nc.temp /a/uo_1.nc.temp_masked",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncap2', '-h', '-s', 'where(mask_3D_U!=0) uo=uo@_FillValue',
+                 '/a/uo_1.nc.temp', '/a/uo_1.nc.temp_masked']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -x -v mask_3D_U "
-                "/a/uo_1.nc.temp_masked /a/uo_1.nc.temp_final",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-x', '-v', 'mask_3D_U',
+                 '/a/uo_1.nc.temp_masked', '/a/uo_1.nc.temp_final']
             ),
         ]
         self.mock_subprocess.assert_has_calls(calls)
@@ -603,21 +612,18 @@ class TestMaskOrca1VOlevel(NcoDataFixBaseTest):
         fix.apply_fix()
         calls = [
             mock.call(
-                "ncks -h --no_alphabetize -A -v mask_3D_V "
-                "/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/"
-                "bytes_masks/HadGEM3-GC31-LL/primavera_byte_masks.nc "
-                "/a/vo_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-A', '-v', 'mask_3D_V',
+                 '/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/'
+                 'bytes_masks/HadGEM3-GC31-LL/primavera_byte_masks.nc',
+                 '/a/vo_1.nc.temp']
             ),
             mock.call(
-                "ncap2 -h -s 'where(mask_3D_V!=0) vo=vo@_FillValue' "
-                "/a/vo_1.nc.temp /a/vo_1.nc.temp_masked",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncap2', '-h', '-s', 'where(mask_3D_V!=0) vo=vo@_FillValue',
+                 '/a/vo_1.nc.temp', '/a/vo_1.nc.temp_masked']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -x -v mask_3D_V "
-                "/a/vo_1.nc.temp_masked /a/vo_1.nc.temp_final",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-x', '-v', 'mask_3D_V',
+                 '/a/vo_1.nc.temp_masked', '/a/vo_1.nc.temp_final']
             ),
         ]
         self.mock_subprocess.assert_has_calls(calls)
@@ -635,21 +641,18 @@ class TestMaskOrca025VOlevel(NcoDataFixBaseTest):
         fix.apply_fix()
         calls = [
             mock.call(
-                "ncks -h --no_alphabetize -A -v mask_3D_V "
-                "/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/"
-                "bytes_masks/HadGEM3-GC31-MM/primavera_byte_masks.nc "
-                "/a/vo_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-A', '-v', 'mask_3D_V',
+                 '/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/'
+                 'bytes_masks/HadGEM3-GC31-MM/primavera_byte_masks.nc',
+                 '/a/vo_1.nc.temp']
             ),
             mock.call(
-                "ncap2 -h -s 'where(mask_3D_V!=0) vo=vo@_FillValue' "
-                "/a/vo_1.nc.temp /a/vo_1.nc.temp_masked",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncap2', '-h', '-s', 'where(mask_3D_V!=0) vo=vo@_FillValue',
+                 '/a/vo_1.nc.temp', '/a/vo_1.nc.temp_masked']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -x -v mask_3D_V "
-                "/a/vo_1.nc.temp_masked /a/vo_1.nc.temp_final",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-x', '-v', 'mask_3D_V',
+                 '/a/vo_1.nc.temp_masked', '/a/vo_1.nc.temp_final']
             ),
         ]
         self.mock_subprocess.assert_has_calls(calls)
@@ -667,21 +670,18 @@ class TestMaskOrca1TSurface(NcoDataFixBaseTest):
         fix.apply_fix()
         calls = [
             mock.call(
-                "ncks -h --no_alphabetize -A -v mask_2D_T "
-                "/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/"
-                "bytes_masks/HadGEM3-GC31-LL/primavera_byte_masks.nc "
-                "/a/tos_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-A', '-v', 'mask_2D_T',
+                 '/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/'
+                 'bytes_masks/HadGEM3-GC31-LL/primavera_byte_masks.nc',
+                 '/a/tos_1.nc.temp']
             ),
             mock.call(
-                "ncap2 -h -s 'where(mask_2D_T!=0) tos=tos@_FillValue' "
-                "/a/tos_1.nc.temp /a/tos_1.nc.temp_masked",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncap2', '-h', '-s', 'where(mask_2D_T!=0) tos=tos@_FillValue',
+                 '/a/tos_1.nc.temp', '/a/tos_1.nc.temp_masked']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -x -v mask_2D_T "
-                "/a/tos_1.nc.temp_masked /a/tos_1.nc.temp_final",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-x', '-v', 'mask_2D_T',
+                 '/a/tos_1.nc.temp_masked', '/a/tos_1.nc.temp_final']
             ),
         ]
         self.mock_subprocess.assert_has_calls(calls)
@@ -699,21 +699,18 @@ class TestMaskOrca025TSurface(NcoDataFixBaseTest):
         fix.apply_fix()
         calls = [
             mock.call(
-                "ncks -h --no_alphabetize -A -v mask_2D_T "
-                "/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/"
-                "bytes_masks/HadGEM3-GC31-MM/primavera_byte_masks.nc "
-                "/a/tos_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-A', '-v', 'mask_2D_T',
+                 '/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/'
+                 'bytes_masks/HadGEM3-GC31-MM/primavera_byte_masks.nc',
+                 '/a/tos_1.nc.temp']
             ),
             mock.call(
-                "ncap2 -h -s 'where(mask_2D_T!=0) tos=tos@_FillValue' "
-                "/a/tos_1.nc.temp /a/tos_1.nc.temp_masked",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncap2', '-h', '-s', 'where(mask_2D_T!=0) tos=tos@_FillValue',
+                 '/a/tos_1.nc.temp', '/a/tos_1.nc.temp_masked']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -x -v mask_2D_T "
-                "/a/tos_1.nc.temp_masked /a/tos_1.nc.temp_final",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-x', '-v', 'mask_2D_T',
+                 '/a/tos_1.nc.temp_masked', '/a/tos_1.nc.temp_final']
             ),
         ]
         self.mock_subprocess.assert_has_calls(calls)
@@ -731,21 +728,18 @@ class TestMaskOrca1USurface(NcoDataFixBaseTest):
         fix.apply_fix()
         calls = [
             mock.call(
-                "ncks -h --no_alphabetize -A -v mask_2D_U "
-                "/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/"
-                "bytes_masks/HadGEM3-GC31-LL/primavera_byte_masks.nc "
-                "/a/uo_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-A', '-v', 'mask_2D_U',
+                 '/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/'
+                 'bytes_masks/HadGEM3-GC31-LL/primavera_byte_masks.nc',
+                 '/a/uo_1.nc.temp']
             ),
             mock.call(
-                "ncap2 -h -s 'where(mask_2D_U!=0) uo=uo@_FillValue' "
-                "/a/uo_1.nc.temp /a/uo_1.nc.temp_masked",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncap2', '-h', '-s', 'where(mask_2D_U!=0) uo=uo@_FillValue',
+                 '/a/uo_1.nc.temp', '/a/uo_1.nc.temp_masked']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -x -v mask_2D_U "
-                "/a/uo_1.nc.temp_masked /a/uo_1.nc.temp_final",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-x', '-v', 'mask_2D_U',
+                 '/a/uo_1.nc.temp_masked', '/a/uo_1.nc.temp_final']
             ),
         ]
         self.mock_subprocess.assert_has_calls(calls)
@@ -764,22 +758,18 @@ class TestMaskOrca1USingleLevel(NcoDataFixBaseTest):
         fix.apply_fix()
         calls = [
             mock.call(
-                "ncks -h --no_alphabetize -A -v mask_3D_U "
-                "/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/"
-                "bytes_masks/HadGEM3-GC31-LL/"
-                "primavera_single_level_byte_masks.nc "
-                "/a/uo_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-A', '-v', 'mask_3D_U',
+                 '/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/'
+                 'bytes_masks/HadGEM3-GC31-LL/'
+                 'primavera_single_level_byte_masks.nc', '/a/uo_1.nc.temp']
             ),
             mock.call(
-                "ncap2 -h -s 'where(mask_3D_U!=0) uo=uo@_FillValue' "
-                "/a/uo_1.nc.temp /a/uo_1.nc.temp_masked",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncap2', '-h', '-s', 'where(mask_3D_U!=0) uo=uo@_FillValue',
+                 '/a/uo_1.nc.temp', '/a/uo_1.nc.temp_masked']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -x -v mask_3D_U "
-                "/a/uo_1.nc.temp_masked /a/uo_1.nc.temp_final",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-x', '-v', 'mask_3D_U',
+                 '/a/uo_1.nc.temp_masked', '/a/uo_1.nc.temp_final']
             ),
         ]
         self.mock_subprocess.assert_has_calls(calls)
@@ -797,21 +787,18 @@ class TestMaskOrca025USurface(NcoDataFixBaseTest):
         fix.apply_fix()
         calls = [
             mock.call(
-                "ncks -h --no_alphabetize -A -v mask_2D_U "
-                "/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/"
-                "bytes_masks/HadGEM3-GC31-MM/primavera_byte_masks.nc "
-                "/a/uo_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-A', '-v', 'mask_2D_U',
+                 '/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/'
+                 'bytes_masks/HadGEM3-GC31-MM/primavera_byte_masks.nc',
+                 '/a/uo_1.nc.temp']
             ),
             mock.call(
-                "ncap2 -h -s 'where(mask_2D_U!=0) uo=uo@_FillValue' "
-                "/a/uo_1.nc.temp /a/uo_1.nc.temp_masked",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncap2', '-h', '-s', 'where(mask_2D_U!=0) uo=uo@_FillValue',
+                 '/a/uo_1.nc.temp', '/a/uo_1.nc.temp_masked']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -x -v mask_2D_U "
-                "/a/uo_1.nc.temp_masked /a/uo_1.nc.temp_final",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-x', '-v', 'mask_2D_U',
+                 '/a/uo_1.nc.temp_masked', '/a/uo_1.nc.temp_final']
             ),
         ]
         self.mock_subprocess.assert_has_calls(calls)
@@ -830,22 +817,18 @@ class TestMaskOrca025USingleLevel(NcoDataFixBaseTest):
         fix.apply_fix()
         calls = [
             mock.call(
-                "ncks -h --no_alphabetize -A -v mask_3D_U "
-                "/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/"
-                "bytes_masks/HadGEM3-GC31-MM/"
-                "primavera_single_level_byte_masks.nc "
-                "/a/uo_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-A', '-v', 'mask_3D_U',
+                 '/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/'
+                 'bytes_masks/HadGEM3-GC31-MM/'
+                 'primavera_single_level_byte_masks.nc', '/a/uo_1.nc.temp']
             ),
             mock.call(
-                "ncap2 -h -s 'where(mask_3D_U!=0) uo=uo@_FillValue' "
-                "/a/uo_1.nc.temp /a/uo_1.nc.temp_masked",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncap2', '-h', '-s', 'where(mask_3D_U!=0) uo=uo@_FillValue',
+                 '/a/uo_1.nc.temp', '/a/uo_1.nc.temp_masked']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -x -v mask_3D_U "
-                "/a/uo_1.nc.temp_masked /a/uo_1.nc.temp_final",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-x', '-v', 'mask_3D_U',
+                 '/a/uo_1.nc.temp_masked', '/a/uo_1.nc.temp_final']
             ),
         ]
         self.mock_subprocess.assert_has_calls(calls)
@@ -863,21 +846,18 @@ class TestMaskOrca1VSurface(NcoDataFixBaseTest):
         fix.apply_fix()
         calls = [
             mock.call(
-                "ncks -h --no_alphabetize -A -v mask_2D_V "
-                "/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/"
-                "bytes_masks/HadGEM3-GC31-LL/primavera_byte_masks.nc "
-                "/a/vo_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-A', '-v', 'mask_2D_V',
+                 '/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/'
+                 'bytes_masks/HadGEM3-GC31-LL/primavera_byte_masks.nc',
+                 '/a/vo_1.nc.temp']
             ),
             mock.call(
-                "ncap2 -h -s 'where(mask_2D_V!=0) vo=vo@_FillValue' "
-                "/a/vo_1.nc.temp /a/vo_1.nc.temp_masked",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncap2', '-h', '-s', 'where(mask_2D_V!=0) vo=vo@_FillValue',
+                 '/a/vo_1.nc.temp', '/a/vo_1.nc.temp_masked']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -x -v mask_2D_V "
-                "/a/vo_1.nc.temp_masked /a/vo_1.nc.temp_final",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-x', '-v', 'mask_2D_V',
+                 '/a/vo_1.nc.temp_masked', '/a/vo_1.nc.temp_final']
             ),
         ]
         self.mock_subprocess.assert_has_calls(calls)
@@ -896,22 +876,18 @@ class TestMaskOrca1VSingleLevel(NcoDataFixBaseTest):
         fix.apply_fix()
         calls = [
             mock.call(
-                "ncks -h --no_alphabetize -A -v mask_3D_V "
-                "/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/"
-                "bytes_masks/HadGEM3-GC31-LL/"
-                "primavera_single_level_byte_masks.nc "
-                "/a/vo_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-A', '-v', 'mask_3D_V',
+                 '/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/'
+                 'bytes_masks/HadGEM3-GC31-LL/'
+                 'primavera_single_level_byte_masks.nc', '/a/vo_1.nc.temp']
             ),
             mock.call(
-                "ncap2 -h -s 'where(mask_3D_V!=0) vo=vo@_FillValue' "
-                "/a/vo_1.nc.temp /a/vo_1.nc.temp_masked",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncap2', '-h', '-s', 'where(mask_3D_V!=0) vo=vo@_FillValue',
+                 '/a/vo_1.nc.temp', '/a/vo_1.nc.temp_masked']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -x -v mask_3D_V "
-                "/a/vo_1.nc.temp_masked /a/vo_1.nc.temp_final",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-x', '-v', 'mask_3D_V',
+                 '/a/vo_1.nc.temp_masked', '/a/vo_1.nc.temp_final']
             ),
         ]
         self.mock_subprocess.assert_has_calls(calls)
@@ -929,21 +905,18 @@ class TestMaskOrca025VSurface(NcoDataFixBaseTest):
         fix.apply_fix()
         calls = [
             mock.call(
-                "ncks -h --no_alphabetize -A -v mask_2D_V "
-                "/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/"
-                "bytes_masks/HadGEM3-GC31-MM/primavera_byte_masks.nc "
-                "/a/vo_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-A', '-v', 'mask_2D_V',
+                 '/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/'
+                 'bytes_masks/HadGEM3-GC31-MM/primavera_byte_masks.nc',
+                 '/a/vo_1.nc.temp']
             ),
             mock.call(
-                "ncap2 -h -s 'where(mask_2D_V!=0) vo=vo@_FillValue' "
-                "/a/vo_1.nc.temp /a/vo_1.nc.temp_masked",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncap2', '-h', '-s', 'where(mask_2D_V!=0) vo=vo@_FillValue',
+                 '/a/vo_1.nc.temp', '/a/vo_1.nc.temp_masked']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -x -v mask_2D_V "
-                "/a/vo_1.nc.temp_masked /a/vo_1.nc.temp_final",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-x', '-v', 'mask_2D_V',
+                 '/a/vo_1.nc.temp_masked', '/a/vo_1.nc.temp_final']
             ),
         ]
         self.mock_subprocess.assert_has_calls(calls)
@@ -962,22 +935,18 @@ class TestMaskOrca025VSingleLevel(NcoDataFixBaseTest):
         fix.apply_fix()
         calls = [
             mock.call(
-                "ncks -h --no_alphabetize -A -v mask_3D_V "
-                "/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/"
-                "bytes_masks/HadGEM3-GC31-MM/"
-                "primavera_single_level_byte_masks.nc "
-                "/a/vo_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-A', '-v', 'mask_3D_V',
+                 '/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/'
+                 'bytes_masks/HadGEM3-GC31-MM/'
+                 'primavera_single_level_byte_masks.nc', '/a/vo_1.nc.temp']
             ),
             mock.call(
-                "ncap2 -h -s 'where(mask_3D_V!=0) vo=vo@_FillValue' "
-                "/a/vo_1.nc.temp /a/vo_1.nc.temp_masked",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncap2', '-h', '-s', 'where(mask_3D_V!=0) vo=vo@_FillValue',
+                 '/a/vo_1.nc.temp', '/a/vo_1.nc.temp_masked']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -x -v mask_3D_V "
-                "/a/vo_1.nc.temp_masked /a/vo_1.nc.temp_final",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-x', '-v', 'mask_3D_V',
+                 '/a/vo_1.nc.temp_masked', '/a/vo_1.nc.temp_final']
             ),
         ]
         self.mock_subprocess.assert_has_calls(calls)
@@ -995,25 +964,79 @@ class TestFixGridOrca1T(NcoDataFixBaseTest):
         fix.apply_fix()
         calls = [
             mock.call(
-                "ncks -h --no_alphabetize -3 /a/tos_1.nc /a/tos_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-3', '/a/tos_1.nc',
+                 '/a/tos_1.nc.temp']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -A -v latitude,longitude,"
-                "vertices_latitude,vertices_longitude "
-                "/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/"
-                "grids/ORCA1/ORCA1_grid-t.nc /a/tos_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-A', '-v',
+                 'latitude,longitude,vertices_latitude,vertices_longitude',
+                 '/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/grids/'
+                 'ORCA1/ORCA1_grid-t.nc', '/a/tos_1.nc.temp']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -7 --deflate=3 /a/tos_1.nc.temp "
-                "/a/tos_1.nc",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-7', '--deflate=3',
+                 '/a/tos_1.nc.temp', '/a/tos_1.nc.temp_final']
             ),
         ]
         self.mock_subprocess.assert_has_calls(calls)
 
 
+class TestGridCommandTimeout(NcoDataFixBaseTest):
+    """
+    Test that FixGridOrca1T leaves the original when a command times out
+    """
+    def test_original_kept(self):
+        """
+        Test that the original file isn't touched and the intermediate files
+        are removed when the final command times out.
+        """
+        self.mock_exists.return_value = True
+        self.mock_subprocess.side_effect = [
+            CommandResult([], 0),
+            CommandResult([], 0),
+            CommandResult([], -9, timed_out=True)
+        ]
+        fix = FixGridOrca1T('tos_1.nc', '/a')
+        with command_limits('/a/tos_1.nc', type(fix)):
+            with self.assertRaises(NcksError) as context:
+                fix.apply_fix()
+        self.assertTrue(is_command_timeout(context.exception))
+        self.mock_rename.assert_not_called()
+        self.mock_replace.assert_not_called()
+        self.mock_remove.assert_has_calls([
+            mock.call('/a/tos_1.nc.temp'),
+            mock.call('/a/tos_1.nc.temp_final')
+        ])
+        self.assertNotIn(mock.call('/a/tos_1.nc'),
+                         self.mock_remove.call_args_list)
+
+    def test_interrupted(self):
+        """
+        Test that the intermediate files are removed and the original kept
+        when a command is interrupted.
+        """
+        self.mock_exists.return_value = True
+        self.mock_subprocess.side_effect = [
+            CommandResult([], 0),
+            KeyboardInterrupt
+        ]
+        fix = FixGridOrca1T('tos_1.nc', '/a')
+        self.assertRaises(KeyboardInterrupt, fix.apply_fix)
+        self.mock_replace.assert_not_called()
+        self.mock_remove.assert_has_calls([
+            mock.call('/a/tos_1.nc.temp'),
+            mock.call('/a/tos_1.nc.temp_final')
+        ])
+
+    def test_replaced(self):
+        """ Test that the new file replaces the original """
+        fix = FixGridOrca1T('tos_1.nc', '/a')
+        fix.apply_fix()
+        self.mock_replace.assert_called_once_with('/a/tos_1.nc.temp_final',
+                                                  '/a/tos_1.nc')
+        self.mock_remove.assert_called_once_with('/a/tos_1.nc.temp')
+
+
 class TestFixGridOrca025T(NcoDataFixBaseTest):
     """
     Test FixGridOrca025T
@@ -1026,20 +1049,18 @@ class TestFixGridOrca025T(NcoDataFixBaseTest):
         fix.apply_fix()
         calls = [
             mock.call(
-                "ncks -h --no_alphabetize -3 /a/tos_1.nc /a/tos_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-3', '/a/tos_1.nc',
+                 '/a/tos_1.nc.temp']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -A -v latitude,longitude,"
-                "vertices_latitude,vertices_longitude "
-                "/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/"
-                "grids/ORCA025/ORCA025_grid-t.nc /a/tos_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-A', '-v',
+                 'latitude,longitude,vertices_latitude,vertices_longitude',
+                 '/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/grids/'
+                 'ORCA025/ORCA025_grid-t.nc', '/a/tos_1.nc.temp']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -7 --deflate=3 /a/tos_1.nc.temp "
-                "/a/tos_1.nc",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-7', '--deflate=3',
+                 '/a/tos_1.nc.temp', '/a/tos_1.nc.temp_final']
             ),
         ]
         self.mock_subprocess.assert_has_calls(calls)
@@ -1057,20 +1078,18 @@ class TestFixGridOrca1U(NcoDataFixBaseTest):
         fix.apply_fix()
         calls = [
             mock.call(
-                "ncks -h --no_alphabetize -3 /a/uo_1.nc /a/uo_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-3', '/a/uo_1.nc',
+                 '/a/uo_1.nc.temp']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -A -v latitude,longitude,"
-                "vertices_latitude,vertices_longitude "
-                "/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/"
-                "grids/ORCA1/ORCA1_grid-u.nc /a/uo_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-A', '-v',
+                 'latitude,longitude,vertices_latitude,vertices_longitude',
+                 '/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/grids/'
+                 'ORCA1/ORCA1_grid-u.nc', '/a/uo_1.nc.temp']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -7 --deflate=3 /a/uo_1.nc.temp "
-                "/a/uo_1.nc",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-7', '--deflate=3',
+                 '/a/uo_1.nc.temp', '/a/uo_1.nc.temp_final']
             ),
         ]
         self.mock_subprocess.assert_has_calls(calls)
@@ -1088,20 +1107,18 @@ class TestFixGridOrca025U(NcoDataFixBaseTest):
         fix.apply_fix()
         calls = [
             mock.call(
-                "ncks -h --no_alphabetize -3 /a/uo_1.nc /a/uo_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-3', '/a/uo_1.nc',
+                 '/a/uo_1.nc.temp']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -A -v latitude,longitude,"
-                "vertices_latitude,vertices_longitude "
-                "/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/"
-                "grids/ORCA025/ORCA025_grid-u.nc /a/uo_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-A', '-v',
+                 'latitude,longitude,vertices_latitude,vertices_longitude',
+                 '/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/grids/'
+                 'ORCA025/ORCA025_grid-u.nc', '/a/uo_1.nc.temp']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -7 --deflate=3 /a/uo_1.nc.temp "
-                "/a/uo_1.nc",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-7', '--deflate=3',
+                 '/a/uo_1.nc.temp', '/a/uo_1.nc.temp_final']
             ),
         ]
         self.mock_subprocess.assert_has_calls(calls)
@@ -1119,20 +1136,18 @@ class TestFixGridOrca1V(NcoDataFixBaseTest):
         fix.apply_fix()
         calls = [
             mock.call(
-                "ncks -h --no_alphabetize -3 /a/vo_1.nc /a/vo_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-3', '/a/vo_1.nc',
+                 '/a/vo_1.nc.temp']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -A -v latitude,longitude,"
-                "vertices_latitude,vertices_longitude "
-                "/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/"
-                "grids/ORCA1/ORCA1_grid-v.nc /a/vo_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-A', '-v',
+                 'latitude,longitude,vertices_latitude,vertices_longitude',
+                 '/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/grids/'
+                 'ORCA1/ORCA1_grid-v.nc', '/a/vo_1.nc.temp']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -7 --deflate=3 /a/vo_1.nc.temp "
-                "/a/vo_1.nc",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-7', '--deflate=3',
+                 '/a/vo_1.nc.temp', '/a/vo_1.nc.temp_final']
             ),
         ]
         self.mock_subprocess.assert_has_calls(calls)
@@ -1150,20 +1165,18 @@ class TestFixGridOrca025V(NcoDataFixBaseTest):
         fix.apply_fix()
         calls = [
             mock.call(
-                "ncks -h --no_alphabetize -3 /a/vo_1.nc /a/vo_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-3', '/a/vo_1.nc',
+                 '/a/vo_1.nc.temp']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -A -v latitude,longitude,"
-                "vertices_latitude,vertices_longitude "
-                "/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/"
-                "grids/ORCA025/ORCA025_grid-v.nc /a/vo_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-A', '-v',
+                 'latitude,longitude,vertices_latitude,vertices_longitude',
+                 '/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/grids/'
+                 'ORCA025/ORCA025_grid-v.nc', '/a/vo_1.nc.temp']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -7 --deflate=3 /a/vo_1.nc.temp "
-                "/a/vo_1.nc",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-7', '--deflate=3',
+                 '/a/vo_1.nc.temp', '/a/vo_1.nc.temp_final']
             ),
         ]
         self.mock_subprocess.assert_has_calls(calls)
@@ -1181,21 +1194,19 @@ class TestFixCiceCoords1T(NcoDataFixBaseTest):
         fix.apply_fix()
         calls = [
             mock.call(
-                "ncks -h --no_alphabetize -3 /a/siconc_1.nc "
-                "/a/siconc_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-3', '/a/siconc_1.nc',
+                 '/a/siconc_1.nc.temp']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -A -v latitude,longitude,"
-                "vertices_latitude,vertices_longitude "
-                "/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/cice_coords/"
-                "eORCA1/cice_eORCA1_coords_grid-t.nc /a/siconc_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-A', '-v',
+                 'latitude,longitude,vertices_latitude,vertices_longitude',
+                 '/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/'
+                 'cice_coords/eORCA1/cice_eORCA1_coords_grid-t.nc',
+                 '/a/siconc_1.nc.temp']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -7 --deflate=3 /a/siconc_1.nc.temp "
-                "/a/siconc_1.nc",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-7', '--deflate=3',
+                 '/a/siconc_1.nc.temp', '/a/siconc_1.nc.temp_final']
             ),
         ]
         self.mock_subprocess.assert_has_calls(calls)
@@ -1213,21 +1224,19 @@ class TestFixCiceCoords1UV(NcoDataFixBaseTest):
         fix.apply_fix()
         calls = [
             mock.call(
-                "ncks -h --no_alphabetize -3 /a/siv_1.nc "
-                "/a/siv_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-3', '/a/siv_1.nc',
+                 '/a/siv_1.nc.temp']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -A -v latitude,longitude,"
-                "vertices_latitude,vertices_longitude "
-                "/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/cice_coords/"
-                "eORCA1/cice_eORCA1_coords_grid-uv.nc /a/siv_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-A', '-v',
+                 'latitude,longitude,vertices_latitude,vertices_longitude',
+                 '/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/'
+                 'cice_coords/eORCA1/cice_eORCA1_coords_grid-uv.nc',
+                 '/a/siv_1.nc.temp']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -7 --deflate=3 /a/siv_1.nc.temp "
-                "/a/siv_1.nc",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-7', '--deflate=3',
+                 '/a/siv_1.nc.temp', '/a/siv_1.nc.temp_final']
             ),
         ]
         self.mock_subprocess.assert_has_calls(calls)
@@ -1245,21 +1254,19 @@ class TestFixCiceCoords025T(NcoDataFixBaseTest):
         fix.apply_fix()
         calls = [
             mock.call(
-                "ncks -h --no_alphabetize -3 /a/siconc_1.nc "
-                "/a/siconc_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-3', '/a/siconc_1.nc',
+                 '/a/siconc_1.nc.temp']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -A -v latitude,longitude,"
-                "vertices_latitude,vertices_longitude "
-                "/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/cice_coords/"
-                "eORCA025/cice_eORCA025_coords_grid-t.nc /a/siconc_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-A', '-v',
+                 'latitude,longitude,vertices_latitude,vertices_longitude',
+                 '/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/'
+                 'cice_coords/eORCA025/cice_eORCA025_coords_grid-t.nc',
+                 '/a/siconc_1.nc.temp']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -7 --deflate=3 /a/siconc_1.nc.temp "
-                "/a/siconc_1.nc",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-7', '--deflate=3',
+                 '/a/siconc_1.nc.temp', '/a/siconc_1.nc.temp_final']
             ),
         ]
         self.mock_subprocess.assert_has_calls(calls)
@@ -1277,21 +1284,19 @@ class TestFixCiceCoords025UV(NcoDataFixBaseTest):
         fix.apply_fix()
         calls = [
             mock.call(
-                "ncks -h --no_alphabetize -3 /a/siv_1.nc "
-                "/a/siv_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-3', '/a/siv_1.nc',
+                 '/a/siv_1.nc.temp']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -A -v latitude,longitude,"
-                "vertices_latitude,vertices_longitude "
-                "/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/cice_coords/"
-                "eORCA025/cice_eORCA025_coords_grid-uv.nc /a/siv_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-A', '-v',
+                 'latitude,longitude,vertices_latitude,vertices_longitude',
+                 '/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/'
+                 'cice_coords/eORCA025/cice_eORCA025_coords_grid-uv.nc',
+                 '/a/siv_1.nc.temp']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -7 --deflate=3 /a/siv_1.nc.temp "
-                "/a/siv_1.nc",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-7', '--deflate=3',
+                 '/a/siv_1.nc.temp', '/a/siv_1.nc.temp_final']
             ),
         ]
         self.mock_subprocess.assert_has_calls(calls)
@@ -1309,21 +1314,19 @@ class TestFixCiceCoords12T(NcoDataFixBaseTest):
         fix.apply_fix()
         calls = [
             mock.call(
-                "ncks -h --no_alphabetize -3 /a/siconc_1.nc "
-                "/a/siconc_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-3', '/a/siconc_1.nc',
+                 '/a/siconc_1.nc.temp']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -A -v latitude,longitude,"
-                "vertices_latitude,vertices_longitude "
-                "/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/cice_coords/"
-                "eORCA12/cice_eORCA12_coords_grid-t.nc /a/siconc_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-A', '-v',
+                 'latitude,longitude,vertices_latitude,vertices_longitude',
+                 '/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/'
+                 'cice_coords/eORCA12/cice_eORCA12_coords_grid-t.nc',
+                 '/a/siconc_1.nc.temp']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -7 --deflate=3 /a/siconc_1.nc.temp "
-                "/a/siconc_1.nc",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-7', '--deflate=3',
+                 '/a/siconc_1.nc.temp', '/a/siconc_1.nc.temp_final']
             ),
         ]
         self.mock_subprocess.assert_has_calls(calls)
@@ -1341,21 +1344,19 @@ class TestFixCiceCoords12UV(NcoDataFixBaseTest):
         fix.apply_fix()
         calls = [
             mock.call(
-                "ncks -h --no_alphabetize -3 /a/siv_1.nc "
-                "/a/siv_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-3', '/a/siv_1.nc',
+                 '/a/siv_1.nc.temp']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -A -v latitude,longitude,"
-                "vertices_latitude,vertices_longitude "
-                "/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/cice_coords/"
-                "eORCA12/cice_eORCA12_coords_grid-uv.nc /a/siv_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-A', '-v',
+                 'latitude,longitude,vertices_latitude,vertices_longitude',
+                 '/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/'
+                 'cice_coords/eORCA12/cice_eORCA12_coords_grid-uv.nc',
+                 '/a/siv_1.nc.temp']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -7 --deflate=3 /a/siv_1.nc.temp "
-                "/a/siv_1.nc",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-7', '--deflate=3',
+                 '/a/siv_1.nc.temp', '/a/siv_1.nc.temp_final']
             ),
         ]
         self.mock_subprocess.assert_has_calls(calls)
@@ -1374,21 +1375,17 @@ class TestFixMaskCICEOrca1UV(NcoDataFixBaseTest):
         fix.apply_fix()
         calls = [
             mock.call(
-                "ncks -h --no_alphabetize -A -v mask "
-                "/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/cice_masks/"
-                "primavera_cice_orca1_uv.nc "
-                "/a/uo_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-A', '-v', 'mask',
+                 '/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/'
+                 'cice_masks/primavera_cice_orca1_uv.nc', '/a/uo_1.nc.temp']
             ),
             mock.call(
-                "ncap2 -h -s 'where(mask!=0) uo=uo@_FillValue' "
-                "/a/uo_1.nc.temp /a/uo_1.nc.temp_masked",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncap2', '-h', '-s', 'where(mask!=0) uo=uo@_FillValue',
+                 '/a/uo_1.nc.temp', '/a/uo_1.nc.temp_masked']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -x -v mask "
-                "/a/uo_1.nc.temp_masked /a/uo_1.nc.temp_final",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-x', '-v', 'mask',
+                 '/a/uo_1.nc.temp_masked', '/a/uo_1.nc.temp_final']
             ),
         ]
         self.mock_subprocess.assert_has_calls(calls)
@@ -1407,21 +1404,17 @@ class TestFixMaskCICEOrca025T(NcoDataFixBaseTest):
         fix.apply_fix()
         calls = [
             mock.call(
-                "ncks -h --no_alphabetize -A -v mask "
-                "/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/cice_masks/"
-                "primavera_cice_orca025_t.nc "
-                "/a/sit_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-A', '-v', 'mask',
+                 '/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/'
+                 'cice_masks/primavera_cice_orca025_t.nc', '/a/sit_1.nc.temp']
             ),
             mock.call(
-                "ncap2 -h -s 'where(mask!=0) sit=sit@_FillValue' "
-                "/a/sit_1.nc.temp /a/sit_1.nc.temp_masked",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncap2', '-h', '-s', 'where(mask!=0) sit=sit@_FillValue',
+                 '/a/sit_1.nc.temp', '/a/sit_1.nc.temp_masked']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -x -v mask "
-                "/a/sit_1.nc.temp_masked /a/sit_1.nc.temp_final",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-x', '-v', 'mask',
+                 '/a/sit_1.nc.temp_masked', '/a/sit_1.nc.temp_final']
             ),
         ]
         self.mock_subprocess.assert_has_calls(calls)
@@ -1440,21 +1433,17 @@ class TestFixMaskCICEOrca12T(NcoDataFixBaseTest):
         fix.apply_fix()
         calls = [
             mock.call(
-                "ncks -h --no_alphabetize -A -v mask "
-                "/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/cice_masks/"
-                "primavera_cice_orca12_t.nc "
-                "/a/sit_1.nc.temp",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-A', '-v', 'mask',
+                 '/gws/nopw/j04/primavera1/masks/HadGEM3Ocean_fixes/'
+                 'cice_masks/primavera_cice_orca12_t.nc', '/a/sit_1.nc.temp']
             ),
             mock.call(
-                "ncap2 -h -s 'where(mask!=0) sit=sit@_FillValue' "
-                "/a/sit_1.nc.temp /a/sit_1.nc.temp_masked",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncap2', '-h', '-s', 'where(mask!=0) sit=sit@_FillValue',
+                 '/a/sit_1.nc.temp', '/a/sit_1.nc.temp_masked']
             ),
             mock.call(
-                "ncks -h --no_alphabetize -x -v mask "
-                "/a/sit_1.nc.temp_masked /a/sit_1.nc.temp_final",
-                stderr=subprocess.STDOUT, shell=True
+                ['ncks', '-h', '--no_alphabetize', '-x', '-v', 'mask',
+                 '/a/sit_1.nc.temp_masked', '/a/sit_1.nc.temp_final']
             ),
         ]
         self.mock_subprocess.assert_has_calls(calls)
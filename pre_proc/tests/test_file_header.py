@@ -0,0 +1,77 @@
+"""
+test_file_header.py
+
+Unit tests for pre_proc.file_header
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from netCDF4 import Dataset
+import numpy as np
+
+from pre_proc.exceptions import CannotLoadSourceFileError
+from pre_proc.file_header import FileHeader, has_nco_type
+
+
+class TestFileHeader(unittest.TestCase):
+    """ Test pre_proc.file_header.FileHeader """
+    def setUp(self):
+        """ Create a netCDF file with some attributes """
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.filepath = os.path.join(self.temp_dir, 'tas_Amon.nc')
+        with Dataset(self.filepath, 'w') as rootgrp:
+            rootgrp.createDimension('time', 1)
+            tas = rootgrp.createVariable('tas', 'f4', ('time',))
+            tas.units = 'K'
+            rootgrp.data_specs_version = '01.00.23'
+            rootgrp.branch_time_in_parent = np.float64(0.0)
+            rootgrp.forcing_index = np.int32(1)
+        self.header = FileHeader.from_file(self.filepath)
+
+    def test_global_attribute(self):
+        """ Test that a global attribute is read """
+        self.assertEqual('01.00.23',
+                         self.header.get_attribute('global',
+                                                   'data_specs_version'))
+
+    def test_variable_attribute(self):
+        """ Test that a variable attribute is read """
+        self.assertEqual('K', self.header.get_attribute('tas', 'units'))
+        self.assertTrue(self.header.has_attribute('tas', 'units'))
+        self.assertFalse(self.header.has_attribute('pr', 'units'))
+
+    def test_string_matches(self):
+        """ Test that a string attribute with the same value matches """
+        self.assertTrue(self.header.attribute_matches(
+            'global', 'data_specs_version', '01.00.23', 'c'))
+        self.assertFalse(self.header.attribute_matches(
+            'global', 'data_specs_version', '01.00.29', 'c'))
+
+    def test_type_must_match(self):
+        """ Test that a numeric attribute must have the same type """
+        self.assertTrue(self.header.attribute_matches(
+            'global', 'branch_time_in_parent', 0.0, 'd'))
+        self.assertFalse(self.header.attribute_matches(
+            'global', 'branch_time_in_parent', 0.0, 'f'))
+        self.assertFalse(self.header.attribute_matches(
+            'global', 'forcing_index', 1, 's'))
+
+    def test_missing_file(self):
+        """ Test that a file that can't be opened raises an error """
+        self.assertRaises(CannotLoadSourceFileError, FileHeader.from_file,
+                          os.path.join(self.temp_dir, 'missing.nc'))
+
+
+class TestHasNcoType(unittest.TestCase):
+    """ Test pre_proc.file_header.has_nco_type """
+    def test_string(self):
+        """ Test a string value """
+        self.assertTrue(has_nco_type('abc', 'c'))
+        self.assertFalse(has_nco_type('abc', 'd'))
+
+    def test_unknown_type(self):
+        """ Test that an unknown type never matches """
+        self.assertFalse(has_nco_type(np.int32(1), 'xyz'))
@@ -0,0 +1,107 @@
+"""
+test_journal.py
+
+Unit tests for pre_proc.journal
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from pre_proc.journal import JOURNAL_FILENAME, ResumeJournal, plan_hash
+
+
+class TestResumeJournal(unittest.TestCase):
+    """ Test pre_proc.journal.ResumeJournal """
+    def setUp(self):
+        """ Create a directory containing a file to fix """
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.filepath = os.path.join(self.temp_dir, 'tas_Amon.nc')
+        with open(self.filepath, 'w') as fh:
+            fh.write('data')
+        self.fix_hash = plan_hash(['RealmAtmos', 'DataSpecsVersionAdd'])
+
+    def test_new_file_not_complete(self):
+        """ Test that a file that isn't in the journal isn't complete """
+        journal = ResumeJournal.for_directory(self.temp_dir)
+        self.assertFalse(journal.is_complete(self.filepath))
+
+    def test_done_reloaded(self):
+        """ Test that a completed file is found by a later run """
+        journal = ResumeJournal.for_directory(self.temp_dir)
+        journal.record_started(self.filepath, self.fix_hash)
+        journal.record_done(self.filepath, self.fix_hash)
+        new_journal = ResumeJournal.for_directory(self.temp_dir)
+        self.assertTrue(new_journal.is_complete(self.filepath))
+        self.assertEqual(self.fix_hash,
+                         new_journal.entries[self.filepath]['plan_hash'])
+
+    def test_failed_not_complete(self):
+        """ Test that a failed file is retried """
+        journal = ResumeJournal.for_directory(self.temp_dir)
+        journal.record_done(self.filepath, self.fix_hash)
+        journal.record_failed(self.filepath, self.fix_hash)
+        new_journal = ResumeJournal.for_directory(self.temp_dir)
+        self.assertFalse(new_journal.is_complete(self.filepath))
+
+    def test_interrupted(self):
+        """ Test that a file that was started but not finished is found """
+        journal = ResumeJournal.for_directory(self.temp_dir)
+        journal.record_started(self.filepath, self.fix_hash)
+        new_journal = ResumeJournal.for_directory(self.temp_dir)
+        self.assertFalse(new_journal.is_complete(self.filepath))
+        self.assertTrue(new_journal.is_interrupted(self.filepath))
+
+    def test_modified_file_not_complete(self):
+        """ Test that a file that has changed since it was fixed is redone """
+        journal = ResumeJournal.for_directory(self.temp_dir)
+        journal.record_done(self.filepath, self.fix_hash)
+        with open(self.filepath, 'a') as fh:
+            fh.write('more data')
+        self.assertFalse(journal.is_complete(self.filepath))
+
+    def test_changed_plan_not_complete(self):
+        """ Test that a file whose fixes have changed is redone """
+        journal = ResumeJournal.for_directory(self.temp_dir)
+        journal.record_done(self.filepath, self.fix_hash)
+        self.assertTrue(journal.is_complete(self.filepath, self.fix_hash))
+        self.assertFalse(journal.is_complete(
+            self.filepath,
+            plan_hash(['RealmAtmos', 'DataSpecsVersionAdd', 'ToDegC'])
+        ))
+
+    def test_shard_journal(self):
+        """ Test that each shard has its own journal """
+        journal = ResumeJournal.for_directory(self.temp_dir, (1, 4))
+        journal.record_done(self.filepath, self.fix_hash)
+        self.assertTrue(os.path.exists(os.path.join(
+            self.temp_dir, '.pre_proc_journal_1_of_4.jsonl'
+        )))
+        self.assertFalse(ResumeJournal.for_directory(
+            self.temp_dir, (2, 4)).is_complete(self.filepath))
+        self.assertTrue(ResumeJournal.for_directory(
+            self.temp_dir, (1, 4)).is_complete(self.filepath))
+
+    def test_partial_line_ignored(self):
+        """ Test that a line truncated by a killed run is ignored """
+        journal = ResumeJournal.for_directory(self.temp_dir)
+        journal.record_done(self.filepath, self.fix_hash)
+        with open(os.path.join(self.temp_dir, JOURNAL_FILENAME), 'a') as fh:
+            fh.write('{"path": "/a/b.nc", "sta')
+        new_journal = ResumeJournal.for_directory(self.temp_dir)
+        self.assertTrue(new_journal.is_complete(self.filepath))
+        new_journal.record_failed(self.filepath, self.fix_hash)
+        newer_journal = ResumeJournal.for_directory(self.temp_dir)
+        self.assertFalse(newer_journal.is_complete(self.filepath))
+
+
+class TestPlanHash(unittest.TestCase):
+    """ Test pre_proc.journal.plan_hash """
+    def test_order(self):
+        """ Test that the hash depends on the order of the fixes """
+        self.assertNotEqual(plan_hash(['A', 'B']), plan_hash(['B', 'A']))
+
+    def test_different_plans(self):
+        """ Test that different plans have different hashes """
+        self.assertNotEqual(plan_hash(['A']), plan_hash(['A', 'B']))
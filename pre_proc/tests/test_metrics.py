@@ -0,0 +1,80 @@
+"""
+test_metrics.py
+
+Unit tests for pre_proc.metrics
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from pre_proc.file_fix import LevToPlev, RealmAtmos
+from pre_proc.metrics import MetricsRecorder
+
+
+class TestMetricsRecorder(unittest.TestCase):
+    """ Test pre_proc.metrics.MetricsRecorder """
+    def setUp(self):
+        """ Create a file to measure """
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.filepath = os.path.join(self.temp_dir, 'tas_Amon.nc')
+        with open(self.filepath, 'w') as fh:
+            fh.write('data')
+        self.metrics_path = os.path.join(self.temp_dir, 'metrics.jsonl')
+        self.recorder = MetricsRecorder(self.metrics_path)
+        self.addCleanup(self.recorder.close)
+        self.realm = RealmAtmos('tas_Amon.nc', self.temp_dir)
+        self.lev = LevToPlev('tas_Amon.nc', self.temp_dir)
+
+    def test_sizes_recorded(self):
+        """ Test that the file's size before and after is recorded """
+        with self.recorder.measure(self.filepath, self.realm):
+            with open(self.filepath, 'a') as fh:
+                fh.write('more')
+        measurement = self.recorder.records[0]
+        self.assertEqual('RealmAtmos', measurement['fix'])
+        self.assertEqual(4, measurement['size_before'])
+        self.assertEqual(8, measurement['size_after'])
+        self.assertTrue(measurement['succeeded'])
+
+    def test_failure_recorded(self):
+        """ Test that a fix that raises an exception is still recorded """
+        with self.assertRaises(RuntimeError):
+            with self.recorder.measure(self.filepath, self.realm):
+                raise RuntimeError('failed')
+        self.assertFalse(self.recorder.records[0]['succeeded'])
+
+    def test_json_lines_written(self):
+        """ Test that each measurement is written as a line of JSON """
+        with self.recorder.measure(self.filepath, self.realm):
+            pass
+        with self.recorder.measure(self.filepath, self.lev):
+            pass
+        self.recorder.close()
+        with open(self.metrics_path) as fh:
+            lines = [json.loads(line) for line in fh]
+        self.assertEqual(['RealmAtmos', 'LevToPlev'],
+                         [line['fix'] for line in lines])
+
+    def test_aggregate(self):
+        """ Test that the measurements are aggregated by fix class """
+        for wall_time in (1.0, 2.0):
+            self.recorder.record({
+                'fix': 'RealmAtmos', 'succeeded': True,
+                'wall_time': wall_time, 'command_time': 0.5,
+                'bytes_read': 10, 'bytes_written': 20
+            })
+        self.recorder.record({
+            'fix': 'LevToPlev', 'succeeded': False, 'wall_time': 5.0,
+            'command_time': 4.0, 'bytes_read': 100, 'bytes_written': 200
+        })
+        totals = self.recorder.aggregate()
+        self.assertEqual(2, totals['RealmAtmos']['count'])
+        self.assertEqual(3.0, totals['RealmAtmos']['wall_time'])
+        self.assertEqual(1.0, totals['RealmAtmos']['command_time'])
+        self.assertEqual(40, totals['RealmAtmos']['bytes_written'])
+        self.assertEqual(1, totals['LevToPlev']['failed'])
+        table_lines = self.recorder.format_table().split('\n')
+        self.assertTrue(table_lines[2].startswith('LevToPlev'))
@@ -0,0 +1,114 @@
+"""
+test_plan.py
+
+Unit tests for pre_proc.plan
+"""
+import unittest
+from unittest import mock
+
+from pre_proc.exceptions import CannotLoadSourceFileError
+from pre_proc.file_fix import (FixMaskOrca1TSurface, LatDirection,
+                               RealmAtmos)
+from pre_proc.journal import plan_hash
+from pre_proc.plan import FilePlan, plan_files
+
+FILENAME = 'tsl_Lmon_HadGEM3-GC31-LL_highresSST-present_r1i1p1f1_gn_' \
+           '195001-195012.nc'
+DIRECTORY = '/a/b'
+FILE_SIZE = 1000
+
+
+class TestFilePlan(unittest.TestCase):
+    """ Test pre_proc.plan.FilePlan """
+    def setUp(self):
+        """ Create some fixes """
+        self.attribute_fix = RealmAtmos(FILENAME, DIRECTORY)
+        self.mask_fix = FixMaskOrca1TSurface(FILENAME, DIRECTORY)
+        self.nco_fix = LatDirection(FILENAME, DIRECTORY)
+
+    def test_attribute_only(self):
+        """ Test a plan that only edits metadata """
+        plan = FilePlan('/a/b/c.nc', FILE_SIZE, [self.attribute_fix])
+        self.assertEqual(2, plan.num_commands)
+        self.assertEqual(0, plan.num_rewrites)
+        self.assertEqual(0, plan.peak_temp_bytes)
+        self.assertEqual(0, plan.peak_memory_bytes)
+        self.assertEqual(0, plan.bytes_written)
+
+    def test_mask_peak(self):
+        """ Test that the masking fixes need four times the file's size """
+        plan = FilePlan('/a/b/c.nc', FILE_SIZE,
+                        [self.attribute_fix, self.mask_fix, self.nco_fix])
+        self.assertEqual(4 * FILE_SIZE, plan.peak_disk_bytes)
+        self.assertEqual(3 * FILE_SIZE, plan.peak_temp_bytes)
+        self.assertEqual(6 * FILE_SIZE, plan.peak_memory_bytes)
+        self.assertEqual(6 * FILE_SIZE, plan.bytes_written)
+        self.assertEqual(10, plan.num_commands)
+
+    def test_satisfied_not_costed(self):
+        """ Test that satisfied fixes aren't included in the cost """
+        plan = FilePlan('/a/b/c.nc', FILE_SIZE, [self.attribute_fix],
+                        [self.attribute_fix])
+        self.assertEqual(0, plan.num_commands)
+        self.assertEqual({
+            'path': '/a/b/c.nc',
+            'size': FILE_SIZE,
+            'fixes': [],
+            'satisfied_fixes': ['RealmAtmos'],
+            'num_commands': 0,
+            'num_rewrites': 0,
+            'peak_temp_bytes': 0,
+            'peak_memory_bytes': 0,
+            'bytes_read': 0,
+            'bytes_written': 0
+        }, plan.to_dict())
+
+
+class TestPlanFiles(unittest.TestCase):
+    """ Test pre_proc.plan.plan_files """
+    def setUp(self):
+        patch = mock.patch('pre_proc.plan.FilePlan.from_file')
+        self.mock_from_file = patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_totals(self):
+        """ Test that the totals are summed over the files """
+        self.mock_from_file.side_effect = [
+            FilePlan('/a/1.nc', FILE_SIZE,
+                     [FixMaskOrca1TSurface(FILENAME, DIRECTORY)]),
+            FilePlan('/a/2.nc', FILE_SIZE, []),
+            CannotLoadSourceFileError('/a/3.nc')
+        ]
+        summary = plan_files(['/a/1.nc', '/a/2.nc', '/a/3.nc'])
+        self.assertEqual(2, len(summary['files']))
+        self.assertEqual(['/a/3.nc'], summary['files_failed'])
+        totals = summary['totals']
+        self.assertEqual(2, totals['num_files'])
+        self.assertEqual(1, totals['num_files_to_fix'])
+        self.assertEqual(2 * FILE_SIZE, totals['size'])
+        self.assertEqual(4, totals['num_commands'])
+        self.assertEqual(3 * FILE_SIZE, totals['max_peak_temp_bytes'])
+
+    def test_plans_changed(self):
+        """
+        Test that the completed files whose fixes have changed are reported
+        """
+        self.mock_from_file.side_effect = [
+            FilePlan('/a/1.nc', FILE_SIZE,
+                     [RealmAtmos(FILENAME, DIRECTORY)]),
+            FilePlan('/a/2.nc', FILE_SIZE,
+                     [RealmAtmos(FILENAME, DIRECTORY)]),
+            FilePlan('/a/3.nc', FILE_SIZE, [])
+        ]
+        completed = {'/a/1.nc': plan_hash(['RealmAtmos']),
+                     '/a/2.nc': plan_hash([])}
+
+        def is_complete(filepath, fix_hash=None):
+            return (filepath in completed and
+                    fix_hash in (None, completed[filepath]))
+
+        journal = mock.Mock()
+        journal.is_complete.side_effect = is_complete
+        summary = plan_files(['/a/1.nc', '/a/2.nc', '/a/3.nc'],
+                             journal=journal)
+        self.assertEqual(['/a/2.nc'], summary['plans_changed'])
@@ -0,0 +1,55 @@
+"""
+test_profiling.py
+
+Unit tests for pre_proc.profiling
+"""
+import os
+import pstats
+import shutil
+import tempfile
+import unittest
+
+from pre_proc.profiling import BatchProfiler, STATS_FILENAME
+
+
+def _work():
+    """ Something to profile """
+    return sum(range(1000))
+
+
+class TestBatchProfiler(unittest.TestCase):
+    """ Test pre_proc.profiling.BatchProfiler """
+    def setUp(self):
+        """ Create a directory for the profile """
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.profile_dir = os.path.join(self.temp_dir, 'profile')
+
+    def test_disabled(self):
+        """ Test that nothing is profiled without a directory """
+        profiler = BatchProfiler()
+        with profiler.profile():
+            _work()
+        self.assertIsNone(profiler.stats)
+        self.assertEqual('No files were profiled', profiler.dump())
+
+    def test_merged(self):
+        """ Test that the profiles of several files are merged """
+        profiler = BatchProfiler(self.profile_dir, top_n=5)
+        for _index in range(3):
+            with profiler.profile():
+                _work()
+        summary = profiler.dump()
+        self.assertTrue(summary.startswith('Profiled 3 files'))
+        stats = pstats.Stats(os.path.join(self.profile_dir, STATS_FILENAME))
+        work_stats = [value for key, value in stats.stats.items()
+                      if key[2] == '_work']
+        self.assertEqual(3, work_stats[0][1])
+
+    def test_exception_profiled(self):
+        """ Test that a file that fails is still profiled """
+        profiler = BatchProfiler(self.profile_dir)
+        with self.assertRaises(ValueError):
+            with profiler.profile():
+                raise ValueError()
+        self.assertEqual(1, profiler.num_files)
@@ -0,0 +1,176 @@
+"""
+test_sharding.py
+
+Unit tests for pre_proc.sharding
+"""
+import glob
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from pre_proc.metrics import MetricsRecorder
+from pre_proc.sharding import (MANIFEST_PREFIX, array_shard, hash_shard,
+                               merge_reports, parse_shard, partition_by_size,
+                               select_shard, shard_path, write_report)
+
+
+class TestParseShard(unittest.TestCase):
+    """ Test pre_proc.sharding.parse_shard and array_shard """
+    def test_explicit(self):
+        """ Test that i/N is parsed """
+        self.assertEqual((2, 8), parse_shard('2/8'))
+
+    def test_invalid(self):
+        """ Test that invalid shards are rejected """
+        for spec in ['8/8', '-1/8', '1', 'a/b', '0/0']:
+            self.assertRaises(ValueError, parse_shard, spec)
+
+    def test_slurm(self):
+        """ Test that the shard is taken from a SLURM array job """
+        environ = {'SLURM_ARRAY_TASK_ID': '5', 'SLURM_ARRAY_TASK_COUNT': '4',
+                   'SLURM_ARRAY_TASK_MIN': '3'}
+        self.assertEqual((2, 4), parse_shard('array', environ))
+
+    def test_lsf(self):
+        """ Test that the shard is taken from an LSF array job """
+        environ = {'LSB_JOBINDEX': '1', 'LSB_JOBINDEX_END': '10'}
+        self.assertEqual((0, 10), array_shard(environ))
+
+    def test_not_array(self):
+        """ Test that an error is raised outside of an array job """
+        self.assertRaises(ValueError, array_shard, {'LSB_JOBINDEX': '0'})
+
+
+class TestPartition(unittest.TestCase):
+    """ Test pre_proc.sharding.partition_by_size """
+    def test_balanced_by_size(self):
+        """ Test that each shard gets a similar number of bytes """
+        file_sizes = {'/a/{}.nc'.format(index): size
+                      for index, size in enumerate([100, 60, 50, 40, 30,
+                                                    10, 10])}
+        assignment = partition_by_size(file_sizes, 2)
+        totals = [0, 0]
+        for filepath, shard in assignment.items():
+            totals[shard] += file_sizes[filepath]
+        self.assertEqual([150, 150], sorted(totals))
+
+    def test_deterministic(self):
+        """ Test that the order of the files doesn't matter """
+        file_sizes = {'/a/{}.nc'.format(index): 10 for index in range(20)}
+        reversed_sizes = dict(reversed(list(file_sizes.items())))
+        self.assertEqual(partition_by_size(file_sizes, 3),
+                         partition_by_size(reversed_sizes, 3))
+
+    def test_hash_shard(self):
+        """ Test that the hash assignment is in range and stable """
+        self.assertEqual(hash_shard('/a/1.nc', 7), hash_shard('/a/1.nc', 7))
+        self.assertIn(hash_shard('/a/1.nc', 7), range(7))
+
+
+class TestSelectShard(unittest.TestCase):
+    """ Test pre_proc.sharding.select_shard """
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.filepaths = []
+        for index in range(12):
+            filepath = os.path.join(self.directory, '{:02}.nc'.format(index))
+            with open(filepath, 'wb') as fh:
+                fh.write(b'x' * (index + 1) * 100)
+            self.filepaths.append(filepath)
+
+    def test_every_file_once(self):
+        """ Test that the shards cover every file exactly once """
+        shards = [select_shard(self.filepaths, self.directory, index, 3)
+                  for index in range(3)]
+        self.assertEqual(self.filepaths,
+                         sorted(sum(shards, [])))
+        for shard in shards:
+            self.assertEqual(sorted(shard), shard)
+
+    def test_manifest_reused(self):
+        """ Test that later shards use the published partition """
+        first = select_shard(self.filepaths, self.directory, 0, 3)
+        self.assertEqual(1, len(glob.glob(os.path.join(
+            self.directory, MANIFEST_PREFIX + '*'
+        ))))
+        # Fixing the first shard's files changes their sizes
+        for filepath in first:
+            with open(filepath, 'ab') as fh:
+                fh.write(b'x' * 10000)
+        shards = [first] + [select_shard(self.filepaths, self.directory,
+                                         index, 3)
+                            for index in range(1, 3)]
+        self.assertEqual(self.filepaths, sorted(sum(shards, [])))
+
+    def test_new_files(self):
+        """ Test that files not in the manifest are assigned by hash """
+        select_shard(self.filepaths, self.directory, 0, 3)
+        new_path = os.path.join(self.directory, 'new.nc')
+        shards = [select_shard(self.filepaths + [new_path], self.directory,
+                               index, 3)
+                  for index in range(3)]
+        self.assertIn(new_path, shards[hash_shard(new_path, 3)])
+
+    def test_one_shard(self):
+        """ Test that a single shard has every file and no manifest """
+        self.assertEqual(self.filepaths,
+                         select_shard(iter(self.filepaths), self.directory,
+                                      0, 1))
+        self.assertFalse(glob.glob(os.path.join(self.directory,
+                                                MANIFEST_PREFIX + '*')))
+
+
+class TestReports(unittest.TestCase):
+    """ Test the writing and merging of the shards' reports """
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_shard_path(self):
+        """ Test that the shard's index is substituted """
+        self.assertEqual('/a/report_3.json',
+                         shard_path('/a/report_{shard}.json', 3))
+        self.assertEqual('/a/report.json', shard_path('/a/report.json', 3))
+
+    def test_merge(self):
+        """ Test that the reports are combined and missing shards found """
+        reports = []
+        for index in [0, 2]:
+            report_path = os.path.join(self.directory,
+                                       '{}.json'.format(index))
+            write_report(report_path, (index, 4), 10,
+                         ['/a/{}.nc'.format(index)], 1,
+                         '/a/metrics_{}.jsonl'.format(index))
+            with open(report_path) as fh:
+                reports.append(json.load(fh))
+        merged = merge_reports(reports)
+        self.assertEqual(4, merged['num_shards'])
+        self.assertEqual(20, merged['num_files'])
+        self.assertEqual(2, merged['files_skipped'])
+        self.assertEqual(['/a/0.nc', '/a/2.nc'], merged['files_failed'])
+        self.assertEqual([1, 3], merged['missing_shards'])
+        self.assertEqual(['/a/metrics_0.jsonl', '/a/metrics_2.jsonl'],
+                         merged['metrics'])
+
+    def test_load_metrics(self):
+        """ Test that the shards' metrics are loaded together """
+        metrics_paths = []
+        for index in range(2):
+            metrics_path = os.path.join(self.directory,
+                                        '{}.jsonl'.format(index))
+            recorder = MetricsRecorder(metrics_path)
+            recorder.record({'fix': 'LevToPlev', 'succeeded': True,
+                             'wall_time': 1.0, 'command_time': 0.5,
+                             'bytes_read': 10, 'bytes_written': 20})
+            recorder.close()
+            metrics_paths.append(metrics_path)
+        totals = MetricsRecorder.load(metrics_paths).aggregate()
+        self.assertEqual(2, totals['LevToPlev']['count'])
+        self.assertEqual(2.0, totals['LevToPlev']['wall_time'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+test_staging.py
+
+Unit tests for pre_proc.staging
+"""
+import errno
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from pre_proc.staging import copy_file, replace_file, same_filesystem
+
+
+class StagingBaseTest(unittest.TestCase):
+    """
+    Base class that creates a temporary directory containing a source file
+    """
+    def setUp(self):
+        """ Create the directory and file """
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.src = os.path.join(self.temp_dir, 'src.nc')
+        self.dst = os.path.join(self.temp_dir, 'dst.nc')
+        with open(self.src, 'wb') as fh:
+            fh.write(b'some netCDF data' * 1000)
+
+    def _read(self, path):
+        """ Return the contents of `path` """
+        with open(path, 'rb') as fh:
+            return fh.read()
+
+
+class TestCopyFile(StagingBaseTest):
+    """ Test pre_proc.staging.copy_file """
+    def test_contents_copied(self):
+        """ Test that the contents are copied and the source is kept """
+        copy_file(self.src, self.dst)
+        self.assertEqual(self._read(self.src), self._read(self.dst))
+
+    def test_empty_file(self):
+        """ Test that an empty file can be copied """
+        open(self.src, 'wb').close()
+        copy_file(self.src, self.dst)
+        self.assertEqual(b'', self._read(self.dst))
+
+    @mock.patch('pre_proc.staging.os.copy_file_range', create=True)
+    @mock.patch('pre_proc.staging.fcntl.ioctl')
+    def test_fallback(self, mock_ioctl, mock_cfr):
+        """ Test that shutil is used when zero-copy isn't supported """
+        mock_ioctl.side_effect = OSError(errno.EOPNOTSUPP, 'no reflink')
+        mock_cfr.side_effect = OSError(errno.EXDEV, 'cross device')
+        copy_file(self.src, self.dst)
+        self.assertEqual(self._read(self.src), self._read(self.dst))
+
+    @mock.patch('pre_proc.staging.fcntl.ioctl')
+    def test_short_copy_file_range(self, mock_ioctl):
+        """ Test that the rest is copied if copy_file_range stops early """
+        if not hasattr(os, 'copy_file_range'):
+            self.skipTest('os.copy_file_range() is not available')
+        mock_ioctl.side_effect = OSError(errno.EOPNOTSUPP, 'no reflink')
+        copy_file_range = os.copy_file_range
+        calls = []
+
+        def short_copy(src, dst, count, offset_src, offset_dst):
+            calls.append(offset_src)
+            if len(calls) > 1:
+                return 0
+            return copy_file_range(src, dst, 100, offset_src, offset_dst)
+
+        with mock.patch('pre_proc.staging.os.copy_file_range',
+                        side_effect=short_copy):
+            copy_file(self.src, self.dst)
+        self.assertEqual([0, 100], calls)
+        self.assertEqual(self._read(self.src), self._read(self.dst))
+
+
+class TestReplaceFile(StagingBaseTest):
+    """ Test pre_proc.staging.replace_file """
+    def test_same_filesystem_renamed(self):
+        """ Test that a rename is used on the same device """
+        with open(self.dst, 'wb') as fh:
+            fh.write(b'old')
+        expected = self._read(self.src)
+        with mock.patch('pre_proc.staging.copy_file') as mock_copy:
+            replace_file(self.src, self.dst)
+        mock_copy.assert_not_called()
+        self.assertEqual(expected, self._read(self.dst))
+        self.assertFalse(os.path.exists(self.src))
+
+    @mock.patch('pre_proc.staging.same_filesystem')
+    def test_different_filesystem(self, mock_same):
+        """ Test that the file's copied alongside and then renamed """
+        mock_same.return_value = False
+        with open(self.dst, 'wb') as fh:
+            fh.write(b'old')
+        expected = self._read(self.src)
+        replace_file(self.src, self.dst)
+        self.assertEqual(expected, self._read(self.dst))
+        self.assertFalse(os.path.exists(self.src))
+        self.assertEqual(['dst.nc'], os.listdir(self.temp_dir))
+
+    @mock.patch('pre_proc.staging.copy_file')
+    @mock.patch('pre_proc.staging.same_filesystem')
+    def test_failed_copy_keeps_original(self, mock_same, mock_copy):
+        """ Test that the destination is untouched if the copy fails """
+        mock_same.return_value = False
+        mock_copy.side_effect = OSError(errno.ENOSPC, 'disk full')
+        with open(self.dst, 'wb') as fh:
+            fh.write(b'old')
+        self.assertRaises(OSError, replace_file, self.src, self.dst)
+        self.assertEqual(b'old', self._read(self.dst))
+        self.assertTrue(os.path.exists(self.src))
+
+    def test_new_destination(self):
+        """ Test that a file can be moved to a new name """
+        expected = self._read(self.src)
+        replace_file(self.src, self.dst)
+        self.assertEqual(expected, self._read(self.dst))
+        self.assertFalse(os.path.exists(self.src))
+
+    def test_same_filesystem_missing_path(self):
+        """ Test that the parent is checked for a path that doesn't exist """
+        self.assertTrue(same_filesystem(self.src, self.dst))
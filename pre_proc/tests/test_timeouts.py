@@ -0,0 +1,83 @@
+"""
+test_timeouts.py
+
+Unit tests for pre_proc.timeouts
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from pre_proc.file_fix import (FixMaskOrca1TOlevel, LevToPlev,
+                               ParentBranchTimeDoubleFix)
+from pre_proc.timeouts import (command_limits, command_timeout,
+                               current_timeout, load_timeouts, set_timeouts)
+
+GIB = 1024 ** 3
+
+
+class TestCommandTimeout(unittest.TestCase):
+    """ Test pre_proc.timeouts.command_timeout """
+    def setUp(self):
+        self.addCleanup(set_timeouts, {})
+
+    def test_scaled_by_size(self):
+        """ Test that the limit increases with the file's size """
+        self.assertEqual(600, command_timeout(['ncks'], 0))
+        self.assertEqual(1200, command_timeout(['ncks', '-3'], 2 * GIB))
+
+    def test_unknown_tool(self):
+        """ Test that an unknown tool gets the default limit """
+        self.assertEqual(1500, command_timeout(['/bin/ncwa'], GIB))
+
+    def test_tool_override(self):
+        """ Test that a tool's limit can be overridden """
+        set_timeouts({'ncks': [60, 10]})
+        self.assertEqual(70, command_timeout(['ncks'], GIB, LevToPlev))
+
+    def test_family_override(self):
+        """ Test that a base class's limit applies to its subclasses """
+        set_timeouts({'ncks': [60, 10], 'FixHadGEMMask': [120, 20],
+                      'FixHadGEMMask.ncap2': [240, 40]})
+        self.assertEqual(140, command_timeout(['ncks'], GIB,
+                                              FixMaskOrca1TOlevel))
+        self.assertEqual(280, command_timeout(['ncap2'], GIB,
+                                              FixMaskOrca1TOlevel))
+        self.assertEqual(70, command_timeout(['ncks'], GIB, LevToPlev))
+
+    def test_disabled(self):
+        """ Test that a limit of None disables the limit """
+        set_timeouts({'AttributeEdit': None})
+        self.assertIsNone(command_timeout(['ncatted'], GIB,
+                                          ParentBranchTimeDoubleFix))
+
+    def test_invalid(self):
+        """ Test that an invalid limit raises an exception """
+        self.assertRaises(ValueError, set_timeouts, {'ncks': 600})
+
+    def test_load(self):
+        """ Test that the overrides are loaded from a JSON file """
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        path = os.path.join(temp_dir, 'timeouts.json')
+        with open(path, 'w') as fh:
+            json.dump({'cdo': [30, 0]}, fh)
+        load_timeouts(path)
+        self.assertEqual(30, command_timeout(['cdo'], GIB))
+
+
+class TestCommandLimits(unittest.TestCase):
+    """ Test pre_proc.timeouts.command_limits """
+    def test_context(self):
+        """ Test that limits only apply within the context """
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        path = os.path.join(temp_dir, 'tas.nc')
+        with open(path, 'wb') as fh:
+            fh.write(b'0' * 1024)
+        self.assertIsNone(current_timeout(['ncks']))
+        with command_limits(path, LevToPlev):
+            self.assertAlmostEqual(600 + 300 * 1024 / GIB,
+                                   current_timeout(['ncks']))
+        self.assertIsNone(current_timeout(['ncks']))
@@ -0,0 +1,150 @@
+"""
+test_work_queue.py
+
+Unit tests for pre_proc.work_queue
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from pre_proc.work_queue import WorkQueue
+
+
+def _claim_all(queue_path, worker, results):
+    """
+    Claim and complete files until the queue is empty, in a child process.
+
+    :param str queue_path: The full path of the queue
+    :param str worker: The worker's name
+    :param multiprocessing.Queue results: The claimed files are put here
+    """
+    queue = WorkQueue(queue_path)
+    claimed = []
+    while True:
+        claim = queue.claim(worker)
+        if claim is None:
+            break
+        claimed.append(claim.filepath)
+        claim.complete()
+    results.put(claimed)
+
+
+class TestWorkQueue(unittest.TestCase):
+    """ Test pre_proc.work_queue.WorkQueue """
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.queue_path = os.path.join(self.temp_dir, 'queue.sqlite')
+        self.queue = WorkQueue(self.queue_path, lease_time=60)
+
+    def test_enqueue_once(self):
+        """ Test that a file is only added to the queue once """
+        self.assertEqual(2, self.queue.enqueue(['/a/1.nc', '/a/2.nc']))
+        claim = self.queue.claim('w1')
+        claim.complete()
+        self.assertEqual(1, self.queue.enqueue(['/a/1.nc', '/a/2.nc',
+                                                '/a/3.nc']))
+        self.assertEqual({'pending': 2, 'claimed': 0, 'done': 1,
+                          'failed': 0}, self.queue.counts())
+
+    def test_claim_order(self):
+        """ Test that files are claimed in the order they were added """
+        self.queue.enqueue(['/a/2.nc', '/a/1.nc'])
+        self.assertEqual('/a/2.nc', self.queue.claim('w1').filepath)
+        self.assertEqual('/a/1.nc', self.queue.claim('w1').filepath)
+        self.assertIsNone(self.queue.claim('w1'))
+
+    def test_concurrent_claims(self):
+        """ Test that concurrent workers never claim the same file """
+        filepaths = ['/a/{:03}.nc'.format(index) for index in range(200)]
+        self.queue.enqueue(filepaths)
+        results = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=_claim_all,
+                                           args=(self.queue_path,
+                                                 'w{}'.format(index),
+                                                 results))
+                   for index in range(4)]
+        for worker in workers:
+            worker.start()
+        claimed = [results.get(timeout=60) for _worker in workers]
+        for worker in workers:
+            worker.join()
+        self.assertEqual(filepaths, sorted(sum(claimed, [])))
+        self.assertEqual(200, self.queue.counts()['done'])
+
+    def test_expired_lease_reclaimed(self):
+        """ Test that a copy's expired lease returns it to the queue """
+        queue = WorkQueue(self.queue_path, lease_time=0.1)
+        queue.enqueue(['/a/1.nc'])
+        first = queue.claim('w1')
+        self.assertIsNone(queue.claim('w2'))
+        time.sleep(0.2)
+        second = queue.claim('w2')
+        self.assertEqual('/a/1.nc', second.filepath)
+        self.assertEqual(2, second.attempt)
+        # The first worker can no longer complete or renew the file
+        self.assertFalse(first.complete())
+        self.assertFalse(first.still_held())
+        self.assertTrue(second.complete())
+
+    def test_expired_in_place_failed(self):
+        """ Test that a file fixed in place isn't fixed again """
+        queue = WorkQueue(self.queue_path, lease_time=0.1)
+        queue.enqueue(['/a/1.nc'])
+        queue.claim('w1', in_place=True)
+        time.sleep(0.2)
+        self.assertIsNone(queue.claim('w2'))
+        self.assertEqual('/a/1.nc', queue.failures()[0][0])
+
+    def test_expired_replace_failed(self):
+        """ Test that a file whose copy was replacing it isn't fixed again """
+        queue = WorkQueue(self.queue_path, lease_time=0.1)
+        queue.enqueue(['/a/1.nc'])
+        claim = queue.claim('w1')
+        self.assertTrue(claim.begin_replace())
+        time.sleep(0.2)
+        self.assertIsNone(queue.claim('w2'))
+        self.assertEqual('/a/1.nc', queue.failures()[0][0])
+
+    def test_replace_lost_claim(self):
+        """ Test that a copy can't replace a file whose claim was lost """
+        queue = WorkQueue(self.queue_path, lease_time=0.1)
+        queue.enqueue(['/a/1.nc'])
+        first = queue.claim('w1')
+        time.sleep(0.2)
+        queue.claim('w2')
+        self.assertFalse(first.begin_replace())
+
+    def test_heartbeats(self):
+        """ Test that heartbeats keep the lease """
+        queue = WorkQueue(self.queue_path, lease_time=0.3)
+        queue.enqueue(['/a/1.nc'])
+        claim = queue.claim('w1')
+        with claim.heartbeats(interval=0.05):
+            time.sleep(0.6)
+            self.assertIsNone(queue.claim('w2'))
+        self.assertFalse(claim.lost.is_set())
+        self.assertTrue(claim.complete())
+
+    def test_fail(self):
+        """ Test that a failure is recorded with its error """
+        self.queue.enqueue(['/a/1.nc'])
+        self.queue.claim('w1').fail('ncks failed')
+        self.assertEqual([('/a/1.nc', 'ncks failed')], self.queue.failures())
+
+    def test_release(self):
+        """ Test that a released file goes to the end of the queue """
+        self.queue.enqueue(['/a/1.nc', '/a/2.nc'])
+        claim = self.queue.claim('w1')
+        self.assertTrue(claim.release())
+        self.assertEqual('/a/2.nc', self.queue.claim('w1').filepath)
+        retry = self.queue.claim('w1')
+        self.assertEqual('/a/1.nc', retry.filepath)
+        self.assertEqual(2, retry.attempt)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+"""
+timeouts.py
+
+The time limits for the external commands run by the fixes. A command that
+doesn't complete within its limit is assumed to have hung, e.g. on a flaky
+parallel file system, and is killed. Each limit is a base time plus a time
+per GiB of the file being fixed, so that commands that rewrite large files
+are given longer.
+
+The limits for each tool in COMMAND_TIMEOUTS can be overridden with
+set_timeouts() or load_timeouts(). An override is keyed by the tool's name,
+by the name of a fix class, which applies to every command run by that class
+and its subclasses (i.e. a family of fixes), or by `<fix class>.<tool>`. The
+most specific override is used. A limit of None disables the time limit.
+"""
+from contextlib import contextmanager
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# The base time in seconds and the additional time in seconds per GiB of the
+# file being fixed for each tool
+COMMAND_TIMEOUTS = {
+    # Tools that only edit the metadata in place
+    'ncatted': (300, 30),
+    'ncrename': (300, 30),
+    # Tools that rewrite the data
+    'ncks': (600, 300),
+    'ncpdq': (600, 600),
+    'ncap2': (600, 600),
+    'cdo': (600, 600)
+}
+# The limit for any other tool
+DEFAULT_TIMEOUT = (900, 600)
+
+# The overrides of the limits
+_overrides = {}
+
+# The fix class and the size in bytes of the file that commands are currently
+# being run for in each thread
+_context = threading.local()
+
+
+def set_timeouts(overrides):
+    """
+    Set the overrides of the time limits.
+
+    :param dict overrides: The base time and time per GiB, or None, keyed by
+        tool, fix class or `<fix class>.<tool>`
+    :raises ValueError: If a limit isn't a pair of numbers or None
+    """
+    for key, limit in overrides.items():
+        if limit is not None and not (
+                isinstance(limit, (list, tuple)) and len(limit) == 2 and
+                all(isinstance(value, (int, float)) for value in limit)):
+            raise ValueError('The time limit for {} must be a base time and '
+                             'a time per GiB or null'.format(key))
+    _overrides.clear()
+    _overrides.update({key: tuple(limit) if limit is not None else None
+                       for key, limit in overrides.items()})
+
+
+def load_timeouts(path):
+    """
+    Set the overrides of the time limits from a JSON file, e.g.
+    `{"ncks": [900, 600], "FixHadGEMMask.ncap2": [1800, 1200]}`.
+
+    :param str path: The full path of the JSON file
+    :raises ValueError: If a limit isn't a pair of numbers or null
+    """
+    with open(path) as fh:
+        set_timeouts(json.load(fh))
+
+
+def command_timeout(argv, file_size, fix_class=None):
+    """
+    Calculate the time limit for a command.
+
+    :param list argv: The command's arguments
+    :param int file_size: The size in bytes of the file being fixed
+    :param type fix_class: The class of the fix running the command
+    :returns: The time limit in seconds or None if there's no limit
+    :rtype: float
+    """
+    tool = os.path.basename(str(argv[0]))
+    keys = []
+    for cls in fix_class.__mro__ if fix_class else []:
+        keys.append('{}.{}'.format(cls.__name__, tool))
+    for cls in fix_class.__mro__ if fix_class else []:
+        keys.append(cls.__name__)
+    keys.append(tool)
+    for key in keys:
+        if key in _overrides:
+            limit = _overrides[key]
+            break
+    else:
+        limit = COMMAND_TIMEOUTS.get(tool, DEFAULT_TIMEOUT)
+
+    if limit is None:
+        return None
+    base_time, time_per_gib = limit
+    return base_time + time_per_gib * file_size / 1024 ** 3
+
+
+@contextmanager
+def command_limits(filepath, fix_class=None):
+    """
+    A context manager that applies time limits to the commands that
+    pre_proc.common.run_command() runs within it. Commands run outside of
+    this context have no limit.
+
+    :param str filepath: The full path of the file being fixed
+    :param type fix_class: The class of the fix running the commands
+    """
+    try:
+        file_size = os.path.getsize(filepath)
+    except OSError:
+        file_size = 0
+    previous = getattr(_context, 'limits', None)
+    _context.limits = (fix_class, file_size)
+    try:
+        yield
+    finally:
+        _context.limits = previous
+
+
+def current_timeout(argv):
+    """
+    Calculate the time limit for a command run in the current context.
+
+    :param list argv: The command's arguments
+    :returns: The time limit in seconds or None if there's no limit
+    :rtype: float
+    """
+    limits = getattr(_context, 'limits', None)
+    if limits is None:
+        return None
+    fix_class, file_size = limits
+    return command_timeout(argv, file_size, fix_class)
@@ -0,0 +1,443 @@
+"""
+work_queue.py
+
+A work queue of the files to fix, stored in an sqlite file, so that several
+independent worker processes, e.g. on different nodes or in different batch
+tasks, can fix files from overlapping directories without any file being
+fixed twice.
+
+Files are added to the queue when they're discovered and adding a file that
+is already in the queue has no effect. A worker claims a file atomically and
+holds a lease on it, which it renews with heartbeats while it fixes the file.
+If a worker dies then its lease expires and the file is reclaimed by the next
+worker to claim a file. A file that was being fixed in a temporary copy is
+returned to the queue because the original hasn't been changed, but a file
+that was being fixed in place is marked as failed, because some fixes can't
+be applied twice. A worker that fixed a temporary copy marks its claim as
+in place before the copy replaces the original, so that a file whose worker
+dies between replacing it and completing it isn't fixed again. Each claim
+has a token and a worker can only complete a file while it still holds the
+claim, so a worker whose lease has expired mustn't replace the original file
+with its fixed copy.
+
+The sqlite file must be on a file system whose locks work between all of the
+workers' hosts. sqlite's default rollback journal is used rather than
+write-ahead logging, which only works between processes on the same host.
+"""
+from contextlib import closing, contextmanager
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+STATUS_PENDING = 'pending'
+STATUS_CLAIMED = 'claimed'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+# The time in seconds that a claim lasts without a heartbeat
+DEFAULT_LEASE_TIME = 300
+# The time in seconds to wait for another worker's transaction to finish
+DEFAULT_BUSY_TIMEOUT = 60
+# The number of files added to the queue in each transaction
+ENQUEUE_BATCH_SIZE = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS queue (
+    filepath TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    worker TEXT,
+    token TEXT,
+    in_place INTEGER NOT NULL DEFAULT 0,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS queue_status ON queue (status);
+"""
+
+
+class WorkQueue(object):
+    """
+    A queue of files in an sqlite file. Each method uses its own connection
+    so that an instance can be used from several threads, e.g. by a
+    worker's heartbeat thread.
+    """
+    def __init__(self, path, lease_time=DEFAULT_LEASE_TIME,
+                 busy_timeout=DEFAULT_BUSY_TIMEOUT):
+        """
+        Initialise the class, creating the queue if it doesn't exist.
+
+        :param str path: The full path of the sqlite file
+        :param float lease_time: The time in seconds that a claim lasts
+            without a heartbeat
+        :param float busy_timeout: The time in seconds to wait for another
+            worker's transaction to finish
+        """
+        self.path = path
+        self.lease_time = lease_time
+        self.busy_timeout = busy_timeout
+        with self._transaction() as conn:
+            for statement in SCHEMA.split(';'):
+                if statement.strip():
+                    conn.execute(statement)
+
+    @contextmanager
+    def _transaction(self):
+        """
+        A context manager that runs the statements within it in a write
+        transaction. The write lock is taken at the start of the transaction
+        so that a claim can't be interleaved with another worker's claim.
+
+        :returns: The connection
+        :rtype: sqlite3.Connection
+        """
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout,
+                               isolation_level=None)
+        with closing(conn):
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+
+    def enqueue(self, filepaths):
+        """
+        Add files to the queue. Files that are already in the queue,
+        whatever their status, aren't changed.
+
+        :param filepaths: An iterable of the full paths of the files
+        :returns: The number of files added
+        :rtype: int
+        """
+        num_added = 0
+        batch = []
+        for filepath in filepaths:
+            batch.append(filepath)
+            if len(batch) == ENQUEUE_BATCH_SIZE:
+                num_added += self._enqueue_batch(batch)
+                batch = []
+        if batch:
+            num_added += self._enqueue_batch(batch)
+        return num_added
+
+    def _enqueue_batch(self, filepaths):
+        """
+        Add a batch of files to the queue in a single transaction.
+
+        :param list filepaths: The full paths of the files
+        :returns: The number of files added
+        :rtype: int
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.executemany(
+                'INSERT OR IGNORE INTO queue (filepath, status, updated) '
+                'VALUES (?, ?, ?)',
+                [(filepath, STATUS_PENDING, now) for filepath in filepaths]
+            )
+            return cursor.rowcount
+
+    def _reclaim_expired(self, conn, now):
+        """
+        Reclaim the files whose lease has expired. Files that were being
+        fixed in place are marked as failed and the others are returned to
+        the queue.
+
+        :param sqlite3.Connection conn: The connection in a write transaction
+        :param float now: The current time
+        """
+        cursor = conn.execute(
+            'UPDATE queue SET status = ?, token = NULL, error = ?, '
+            'updated = ? WHERE status = ? AND lease_expires < ? AND in_place',
+            (STATUS_FAILED, 'The lease expired while the file was being '
+             'fixed in place', now, STATUS_CLAIMED, now)
+        )
+        if cursor.rowcount:
+            logger.warning('{} files whose lease expired while they were '
+                           'being fixed in place have been marked as failed'.
+                           format(cursor.rowcount))
+        cursor = conn.execute(
+            'UPDATE queue SET status = ?, token = NULL, updated = ? '
+            'WHERE status = ? AND lease_expires < ? AND NOT in_place',
+            (STATUS_PENDING, now, STATUS_CLAIMED, now)
+        )
+        if cursor.rowcount:
+            logger.debug('{} files whose lease expired have been returned to '
+                         'the queue'.format(cursor.rowcount))
+
+    def claim(self, worker, in_place=False):
+        """
+        Claim the next file in the queue, reclaiming any expired leases
+        first.
+
+        :param str worker: The name of the worker, for information
+        :param bool in_place: True if the worker fixes files in place
+        :returns: The claim or None if the queue is empty
+        :rtype: pre_proc.work_queue.Claim
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            self._reclaim_expired(conn, now)
+            row = conn.execute(
+                'SELECT filepath, attempts FROM queue WHERE status = ? '
+                'ORDER BY rowid LIMIT 1', (STATUS_PENDING,)
+            ).fetchone()
+            if row is None:
+                return None
+            token = uuid.uuid4().hex
+            conn.execute(
+                'UPDATE queue SET status = ?, worker = ?, token = ?, '
+                'in_place = ?, lease_expires = ?, attempts = attempts + 1, '
+                'updated = ? WHERE filepath = ?',
+                (STATUS_CLAIMED, worker, token, int(in_place),
+                 now + self.lease_time, now, row[0])
+            )
+        return Claim(self, row[0], token, row[1] + 1)
+
+    def _update_claim(self, filepath, token, assignments, values):
+        """
+        Update a file that is claimed with a token.
+
+        :param str filepath: The full path of the file
+        :param str token: The claim's token
+        :param str assignments: The SQL assignments of the columns to update
+        :param tuple values: The values of the assignments
+        :returns: True if the file was still claimed with the token
+        :rtype: bool
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                'UPDATE queue SET {}, updated = ? WHERE filepath = ? AND '
+                'token = ? AND status = ?'.format(assignments),
+                values + (time.time(), filepath, token, STATUS_CLAIMED)
+            )
+            return cursor.rowcount == 1
+
+    def heartbeat(self, filepath, token):
+        """
+        Renew a claim's lease.
+
+        :param str filepath: The full path of the file
+        :param str token: The claim's token
+        :returns: True if the claim was renewed or False if it has been lost
+        :rtype: bool
+        """
+        return self._update_claim(filepath, token, 'lease_expires = ?',
+                                  (time.time() + self.lease_time,))
+
+    def begin_replace(self, filepath, token):
+        """
+        Mark a claimed file as being changed in place, and renew its lease,
+        before a fixed copy replaces the original. If the lease then expires
+        then the file is marked as failed rather than returned to the queue.
+
+        :param str filepath: The full path of the file
+        :param str token: The claim's token
+        :returns: True if the file was still claimed with the token
+        :rtype: bool
+        """
+        return self._update_claim(filepath, token,
+                                  'in_place = 1, lease_expires = ?',
+                                  (time.time() + self.lease_time,))
+
+    def complete(self, filepath, token):
+        """
+        Mark a claimed file as fixed.
+
+        :param str filepath: The full path of the file
+        :param str token: The claim's token
+        :returns: True if the file was still claimed with the token
+        :rtype: bool
+        """
+        return self._update_claim(filepath, token, 'status = ?, token = NULL',
+                                  (STATUS_DONE,))
+
+    def fail(self, filepath, token, error):
+        """
+        Mark a claimed file as failed.
+
+        :param str filepath: The full path of the file
+        :param str token: The claim's token
+        :param str error: A description of the failure
+        :returns: True if the file was still claimed with the token
+        :rtype: bool
+        """
+        return self._update_claim(
+            filepath, token, 'status = ?, token = NULL, error = ?',
+            (STATUS_FAILED, error)
+        )
+
+    def release(self, filepath, token):
+        """
+        Return a claimed file to the end of the queue, e.g. so that it's
+        retried after a command timed out. The number of attempts is kept.
+
+        :param str filepath: The full path of the file
+        :param str token: The claim's token
+        :returns: True if the file was still claimed with the token
+        :rtype: bool
+        """
+        with self._transaction() as conn:
+            row = conn.execute(
+                'SELECT attempts FROM queue WHERE filepath = ? AND '
+                'token = ? AND status = ?',
+                (filepath, token, STATUS_CLAIMED)
+            ).fetchone()
+            if row is None:
+                return False
+            # Re-inserting the row moves it to the end of the queue
+            conn.execute('DELETE FROM queue WHERE filepath = ?', (filepath,))
+            conn.execute(
+                'INSERT INTO queue (filepath, status, attempts, updated) '
+                'VALUES (?, ?, ?, ?)',
+                (filepath, STATUS_PENDING, row[0], time.time())
+            )
+            return True
+
+    def counts(self):
+        """
+        Count the files with each status.
+
+        :returns: The number of files keyed by status
+        :rtype: dict
+        """
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout)
+        with closing(conn):
+            counts = {status: 0 for status in (STATUS_PENDING, STATUS_CLAIMED,
+                                               STATUS_DONE, STATUS_FAILED)}
+            counts.update(conn.execute(
+                'SELECT status, COUNT(*) FROM queue GROUP BY status'
+            ).fetchall())
+            return counts
+
+    def failures(self):
+        """
+        List the files that have failed.
+
+        :returns: Tuples of each file's path and its error
+        :rtype: list
+        """
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout)
+        with closing(conn):
+            return conn.execute(
+                'SELECT filepath, error FROM queue WHERE status = ? '
+                'ORDER BY filepath', (STATUS_FAILED,)
+            ).fetchall()
+
+
+class Claim(object):
+    """
+    A worker's claim on a file in the queue.
+    """
+    def __init__(self, queue, filepath, token, attempt=1):
+        """
+        Initialise the class
+
+        :param WorkQueue queue: The queue
+        :param str filepath: The full path of the claimed file
+        :param str token: The claim's token
+        :param int attempt: The number of times that the file has been
+            claimed, including this claim
+        """
+        self.queue = queue
+        self.filepath = filepath
+        self.token = token
+        self.attempt = attempt
+        self.lost = threading.Event()
+
+    @contextmanager
+    def heartbeats(self, interval=None):
+        """
+        A context manager that renews the lease in a background thread while
+        the file is being fixed. `lost` is set if the lease couldn't be
+        renewed.
+
+        :param float interval: The time in seconds between heartbeats, which
+            defaults to a fifth of the lease time
+        """
+        interval = interval or self.queue.lease_time / 5
+        stop = threading.Event()
+
+        def beat():
+            """ Renew the lease until stopped or the lease is lost """
+            while not stop.wait(interval):
+                try:
+                    renewed = self.queue.heartbeat(self.filepath, self.token)
+                except sqlite3.Error as exc:
+                    # Retry at the next heartbeat
+                    logger.warning('Heartbeat for {} failed: {}'.
+                                   format(self.filepath, exc))
+                    continue
+                if not renewed:
+                    logger.error('The lease on {} has been lost'.
+                                 format(self.filepath))
+                    self.lost.set()
+                    return
+
+        thread = threading.Thread(target=beat, name='pre_proc-heartbeat',
+                                  daemon=True)
+        thread.start()
+        try:
+            yield self
+        finally:
+            stop.set()
+            thread.join()
+
+    def complete(self):
+        """
+        Mark the file as fixed.
+
+        :returns: True if the file was still claimed
+        :rtype: bool
+        """
+        return self.queue.complete(self.filepath, self.token)
+
+    def fail(self, error):
+        """
+        Mark the file as failed.
+
+        :param str error: A description of the failure
+        :returns: True if the file was still claimed
+        :rtype: bool
+        """
+        return self.queue.fail(self.filepath, self.token, error)
+
+    def release(self):
+        """
+        Return the file to the queue.
+
+        :returns: True if the file was still claimed
+        :rtype: bool
+        """
+        return self.queue.release(self.filepath, self.token)
+
+    def begin_replace(self):
+        """
+        Mark the file as being changed in place, just before the fixed copy
+        replaces the original file, so that it isn't fixed again if this
+        worker dies before the file is completed.
+
+        :returns: True if the claim is still held and so the original can be
+            replaced
+        :rtype: bool
+        """
+        return (not self.lost.is_set() and
+                self.queue.begin_replace(self.filepath, self.token))
+
+    def still_held(self):
+        """
+        Check that the claim is still held, by renewing it, e.g. just before
+        the fixed copy replaces the original file.
+
+        :returns: True if the claim is still held
+        :rtype: bool
+        """
+        return (not self.lost.is_set() and
+                self.queue.heartbeat(self.filepath, self.token))
@@ -2,7 +2,24 @@
 
 
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+
+def init_connection(connection, **_kwargs):
+    """
+    Run the PRAGMA statements in the SQLITE_PRAGMAS setting on each new
+    sqlite connection.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+        connection.connection.execute('PRAGMA {} = {}'.format(name, value))
 
 
 class PreProcAppConfig(AppConfig):
     name = 'pre_proc_app'
+
+    def ready(self):
+        connection_created.connect(init_connection,
+                                   dispatch_uid='pre_proc_init_connection')
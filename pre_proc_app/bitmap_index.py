@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+bitmap_index.py
+
+An in-memory bitmap index of the data requests and their fixes, for
+answering questions such as which data requests have one fix but not
+another. Each data request is given a position and there is a bitmap for
+each fix. The bitmaps are Python integers with the bit at a data request's
+position set, so that queries are evaluated with bitwise operations rather
+than joins over the data requests' fix profiles. The data requests are matched
+against the fields that rules filter on by
+pre_proc_app.rule_engine.DataRequestIndex and the matches are converted to
+bitmaps.
+"""
+import logging
+
+from pre_proc_app.lazy_rules import CompiledRules
+from pre_proc_app.bulk import stored_fix_ids
+from pre_proc_app.models import FileFix
+from pre_proc_app.rule_engine import DataRequestIndex
+
+logger = logging.getLogger(__name__)
+
+
+def _to_bitmap(positions, num_bits):
+    """
+    Create a bitmap with the bits at the positions set.
+
+    :param list positions: The positions of the bits to set
+    :param int num_bits: The number of bits in the bitmap
+    :returns: The bitmap
+    :rtype: int
+    """
+    # Setting the bits in a bytearray avoids creating a new large integer
+    # for each bit
+    bits = bytearray((num_bits + 7) // 8)
+    for position in positions:
+        bits[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(bits, 'little')
+
+
+def _positions(bitmap):
+    """
+    Find the positions of the bits that are set in a bitmap.
+
+    :param int bitmap: The bitmap
+    :returns: The positions in ascending order
+    :rtype: list
+    """
+    positions = []
+    bits = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')
+    for byte_index, byte in enumerate(bits):
+        if byte:
+            for bit in range(8):
+                if byte >> bit & 1:
+                    positions.append(byte_index * 8 + bit)
+    return positions
+
+
+class BitmapIndex(object):
+    """
+    A bitmap index of the data requests by their fixes and by the value of
+    each of the fields in pre_proc_app.rule_engine.FILTER_FIELDS.
+    """
+    def __init__(self, index, fix_names):
+        """
+        Initialise the class
+
+        :param pre_proc_app.rule_engine.DataRequestIndex index: The index of
+            the data requests, whose order gives their positions
+        :param dict fix_names: The names of each data request's fixes keyed
+            by its id
+        """
+        self.index = index
+        self.ids = [data_req_id for data_req_id, _values
+                    in index.data_requests]
+        self.values = [values for _data_req_id, values
+                       in index.data_requests]
+        self.num_bits = len(self.ids)
+        self.all = (1 << self.num_bits) - 1
+        self._positions = {data_req_id: position
+                           for position, data_req_id in enumerate(self.ids)}
+
+        fix_positions = {}
+        for position, data_req_id in enumerate(self.ids):
+            for fix_name in fix_names.get(data_req_id, ()):
+                fix_positions.setdefault(fix_name, []).append(position)
+        self._fixes = {name: _to_bitmap(positions, self.num_bits)
+                       for name, positions in fix_positions.items()}
+
+    @classmethod
+    def from_db(cls, lazy_rules=True):
+        """
+        Build the index from the database with one query each for the data
+        requests, their profiles, the profiles' fixes and the fixes' names.
+
+        :param bool lazy_rules: If True then include the fixes from the
+            FixRule objects, so that the index contains the fixes that would
+            be applied to each data request
+        :returns: The index
+        :rtype: BitmapIndex
+        """
+        index = DataRequestIndex()
+        names = dict(FileFix.objects.values_list('id', 'name'))
+        fix_names = {data_req_id: {names[fix_id] for fix_id in fix_ids}
+                     for data_req_id, fix_ids in stored_fix_ids().items()
+                     if fix_ids}
+        if lazy_rules:
+            rules = CompiledRules.from_db()
+            if rules.num_rules:
+                fix_names = {
+                    data_req_id: rules.resolve(values,
+                                               fix_names.get(data_req_id, ()))
+                    for data_req_id, values in index.data_requests
+                }
+        return cls(index, fix_names)
+
+    @property
+    def fix_names(self):
+        """
+        The names of the fixes that are assigned to any data request.
+
+        :rtype: list
+        """
+        return sorted(self._fixes)
+
+    def fix(self, name):
+        """
+        Get the bitmap of the data requests that have a fix.
+
+        :param str name: The fix's name
+        :returns: The bitmap
+        :rtype: int
+        """
+        return self._fixes.get(name, 0)
+
+    def field(self, field, values):
+        """
+        Get the bitmap of the data requests whose field has any of the
+        values.
+
+        :param str field: The field's name
+        :param values: A value or list of values
+        :returns: The bitmap
+        :rtype: int
+        :raises ValueError: If the field isn't one of FILTER_FIELDS
+        """
+        return _to_bitmap([self._positions[data_req_id] for data_req_id
+                           in self.index.lookup(field, values)],
+                          self.num_bits)
+
+    def select(self, with_fixes=(), without_fixes=(), **filters):
+        """
+        Get the bitmap of the data requests that have all of the fixes in
+        with_fixes, none of the fixes in without_fixes and that match all of
+        the filters.
+
+        :param list with_fixes: The names of the fixes that the data
+            requests must have
+        :param list without_fixes: The names of the fixes that the data
+            requests mustn't have
+        :param filters: The values of the fields in FILTER_FIELDS to match
+        :returns: The bitmap
+        :rtype: int
+        """
+        bitmap = self.all
+        for fix_name in with_fixes:
+            bitmap &= self.fix(fix_name)
+        for fix_name in without_fixes:
+            bitmap &= ~self.fix(fix_name)
+        for field, values in filters.items():
+            bitmap &= self.field(field, values)
+        return bitmap & self.all
+
+    @staticmethod
+    def count(bitmap):
+        """
+        Count the data requests in a bitmap.
+
+        :param int bitmap: The bitmap
+        :returns: The number of data requests
+        :rtype: int
+        """
+        return bin(bitmap).count('1')
+
+    def data_request_ids(self, bitmap):
+        """
+        Get the ids of the data requests in a bitmap.
+
+        :param int bitmap: The bitmap
+        :returns: The ids
+        :rtype: list
+        """
+        return [self.ids[position] for position in _positions(bitmap)]
+
+    def describe(self, bitmap):
+        """
+        Describe the data requests in a bitmap in the same format as
+        str(DataRequest).
+
+        :param int bitmap: The bitmap
+        :returns: A description of each data request
+        :rtype: list
+        """
+        fields = ['institution_id', 'source_id', 'experiment_id',
+                  'variant_label', 'table_id', 'cmor_name']
+        return ['.'.join(str(self.values[position][field])
+                         for field in fields)
+                for position in _positions(bitmap)]
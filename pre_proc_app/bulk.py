@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+"""
+bulk.py
+
+Helpers to create many database objects in batches rather than one query
+per object, and to change the fixes assigned to many data requests. Each
+data request's fixes are stored as the FixProfile that is shared by all of
+the data requests with the same fixes.
+"""
+from django.db import transaction
+from django.db.models import Count
+
+from pre_proc_app.models import (ClimateModel, DataRequest, Experiment,
+                                 FixProfile, Institution)
+from pre_proc_app.profiles import clear_cache, profile_key
+
+# The number of objects created per query. Django reduces this if necessary
+# to keep below sqlite's limit on the number of variables in a query.
+BATCH_SIZE = 500
+
+# The model of each of the simple name objects in the DMT's JSON
+NAME_OBJECTS = [
+    ('institution_id', Institution),
+    ('source_id', ClimateModel),
+    ('experiment_id', Experiment)
+]
+
+# The fields that identify a data request, apart from its variant_label
+DATA_REQUEST_KEY = ['institution_id_id', 'source_id_id', 'experiment_id_id',
+                    'table_id', 'cmor_name']
+
+
+def bulk_create_ignoring_conflicts(model, objects, batch_size=BATCH_SIZE):
+    """
+    Create objects in batches, skipping any that would violate a uniqueness
+    constraint because they already exist. The database doesn't consider
+    NULLs to be equal in a uniqueness constraint and so objects with a NULL
+    in a constraint's fields must be filtered out by the caller.
+
+    :param django.db.models.Model model: The objects' model
+    :param list objects: The unsaved objects
+    :param int batch_size: The number of objects to create per query
+    :returns: The number of objects created
+    :rtype: int
+    """
+    with transaction.atomic():
+        num_before = model.objects.count()
+        model.objects.bulk_create(objects, batch_size=batch_size,
+                                  ignore_conflicts=True)
+        return model.objects.count() - num_before
+
+
+def load_dmt_json(json_dict):
+    """
+    Load the institutions, models, experiments and data requests from the
+    DMT's JSON in a single transaction, creating them in batches. The
+    foreign key objects are loaded once into dictionaries rather than being
+    queried for each data request. Objects that already exist are skipped,
+    so the JSON can be loaded again after it has been updated.
+
+    :param dict json_dict: The loaded JSON
+    :returns: The number of objects of each type that were created and the
+        number in the JSON
+    :rtype: dict
+    """
+    counts = {}
+    with transaction.atomic():
+        foreign_keys = {}
+        for object_type, klass in NAME_OBJECTS:
+            names = [object_instance['__kwargs__']['short_name']
+                     for object_instance in json_dict[object_type]]
+            num_created = bulk_create_ignoring_conflicts(
+                klass, [klass(name=name) for name in names]
+            )
+            counts[object_type] = (num_created, len(names))
+            foreign_keys[object_type] = dict(
+                klass.objects.values_list('name', 'id')
+            )
+
+        # A data request without a variant_label never conflicts with an
+        # existing one and so these are skipped here instead
+        null_label_keys = set(DataRequest.objects.filter(
+            variant_label__isnull=True
+        ).values_list(*DATA_REQUEST_KEY))
+        data_requests = []
+        for object_instance in json_dict['data_requests']:
+            kwargs = object_instance['__kwargs__']
+            fk_ids = {}
+            for object_type, klass in NAME_OBJECTS:
+                name = kwargs[object_type + '__name']
+                try:
+                    fk_ids[object_type] = foreign_keys[object_type][name]
+                except KeyError:
+                    raise klass.DoesNotExist('{} {} does not exist'.
+                                             format(klass.__name__, name))
+            data_request = DataRequest(
+                institution_id_id=fk_ids['institution_id'],
+                source_id_id=fk_ids['source_id'],
+                experiment_id_id=fk_ids['experiment_id'],
+                table_id=kwargs['table_id'],
+                cmor_name=kwargs['cmor_name'],
+                variant_label=kwargs['variant_label']
+            )
+            if data_request.variant_label is None:
+                key = tuple(getattr(data_request, field)
+                            for field in DATA_REQUEST_KEY)
+                if key in null_label_keys:
+                    continue
+                null_label_keys.add(key)
+            data_requests.append(data_request)
+        num_created = bulk_create_ignoring_conflicts(DataRequest,
+                                                     data_requests)
+        counts['data_requests'] = (num_created,
+                                   len(json_dict['data_requests']))
+    return counts
+
+
+def add_fixes(data_reqs, fixes, batch_size=BATCH_SIZE):
+    """
+    Add the fixes to each of the data requests by giving them the profiles
+    for their new sets of fixes. The data requests are read and updated in
+    batches, which avoids both a query per data request and sqlite's
+    `too many SQL variables` error. Fixes that a data request already has
+    are skipped.
+
+    :param data_reqs: The data requests as a QuerySet or list
+    :param list fixes: The pre_proc_app.models.FileFix objects to add
+    :param int batch_size: The number of data requests per query
+    :returns: The number of fixes added to data requests
+    :rtype: int
+    """
+    fix_ids = {fix.id for fix in fixes}
+    if not fix_ids:
+        return 0
+    with transaction.atomic():
+        current = stored_fix_ids(_data_request_ids(data_reqs), batch_size)
+        new = {data_req_id: ids | fix_ids
+               for data_req_id, ids in current.items()}
+        set_fix_ids(new, batch_size)
+    return sum(len(new[data_req_id]) - len(ids)
+               for data_req_id, ids in current.items())
+
+
+def remove_fixes(data_reqs, fixes, batch_size=BATCH_SIZE):
+    """
+    Remove the fixes from each of the data requests by giving them the
+    profiles for their new sets of fixes, in batches of data requests.
+
+    :param data_reqs: The data requests as a QuerySet or list
+    :param list fixes: The pre_proc_app.models.FileFix objects to remove
+    :param int batch_size: The number of data requests per query
+    :returns: The number of fixes removed from data requests
+    :rtype: int
+    """
+    fix_ids = {fix.id for fix in fixes}
+    with transaction.atomic():
+        current = stored_fix_ids(_data_request_ids(data_reqs), batch_size)
+        new = {data_req_id: ids - fix_ids
+               for data_req_id, ids in current.items()}
+        set_fix_ids(new, batch_size)
+    return sum(len(ids) - len(new[data_req_id])
+               for data_req_id, ids in current.items())
+
+
+def stored_fix_ids(data_req_ids=None, batch_size=BATCH_SIZE):
+    """
+    Get the ids of the fixes stored for data requests. The profiles' fixes
+    are loaded with a single query.
+
+    :param list data_req_ids: The ids of the data requests or None for all
+        of them
+    :param int batch_size: The number of data requests per query
+    :returns: The ids of each data request's fixes keyed by its id
+    :rtype: dict
+    """
+    profile_fixes = {}
+    for profile_id, fix_id in FixProfile.fixes.through.objects.values_list(
+            'fixprofile_id', 'filefix_id'):
+        profile_fixes.setdefault(profile_id, set()).add(fix_id)
+    fix_ids = {}
+    for data_req_id, profile_id in _data_request_profiles(data_req_ids,
+                                                          batch_size):
+        fix_ids[data_req_id] = frozenset(profile_fixes.get(profile_id, ()))
+    return fix_ids
+
+
+def set_fix_ids(fix_ids, batch_size=BATCH_SIZE):
+    """
+    Set the fixes of data requests, creating the profiles for any new sets
+    of fixes and deleting the profiles that are no longer used. Only the
+    data requests whose profile changes are updated.
+
+    :param dict fix_ids: The ids of each data request's fixes keyed by its
+        id
+    :param int batch_size: The number of objects to create or update per
+        query
+    :returns: The number of data requests whose profile was changed
+    :rtype: int
+    """
+    keys = {data_req_id: profile_key(ids)
+            for data_req_id, ids in fix_ids.items()}
+    with transaction.atomic():
+        profile_ids = dict(FixProfile.objects.values_list('key', 'id'))
+        new_keys = sorted(set(keys.values()) - set(profile_ids) - {''})
+        FixProfile.objects.bulk_create([FixProfile(key=key)
+                                        for key in new_keys],
+                                       batch_size=batch_size)
+        profile_ids = dict(FixProfile.objects.values_list('key', 'id'))
+        FixProfile.fixes.through.objects.bulk_create(
+            [FixProfile.fixes.through(fixprofile_id=profile_ids[key],
+                                      filefix_id=int(fix_id))
+             for key in new_keys for fix_id in key.split(',')],
+            batch_size=batch_size
+        )
+
+        # A data request without any fixes doesn't have a profile
+        profile_ids[''] = None
+        by_profile = {}
+        for data_req_id, profile_id in _data_request_profiles(
+                sorted(keys), batch_size):
+            new_profile_id = profile_ids[keys[data_req_id]]
+            if profile_id != new_profile_id:
+                by_profile.setdefault(new_profile_id, []).append(data_req_id)
+        num_changed = 0
+        for profile_id, data_req_ids in by_profile.items():
+            for chunk in chunks(sorted(data_req_ids), batch_size):
+                num_changed += DataRequest.objects.filter(
+                    id__in=chunk
+                ).update(fix_profile_id=profile_id)
+
+        if num_changed:
+            FixProfile.objects.filter(datarequest__isnull=True).delete()
+    clear_cache()
+    return num_changed
+
+
+def count_fix_assignments():
+    """
+    Count the fixes assigned to all of the data requests.
+
+    :returns: The total over the data requests of their number of fixes
+    :rtype: int
+    """
+    return DataRequest.objects.aggregate(
+        num_fixes=Count('fix_profile__fixes')
+    )['num_fixes']
+
+
+def _data_request_profiles(data_req_ids, batch_size):
+    """
+    Get the profile ids of data requests.
+
+    :param list data_req_ids: The ids of the data requests or None for all
+        of them
+    :param int batch_size: The number of data requests per query
+    :returns: An iterator of tuples of each data request's id and its
+        profile's id
+    """
+    if data_req_ids is None:
+        yield from DataRequest.objects.values_list('id', 'fix_profile_id')
+        return
+    for chunk in chunks(data_req_ids, batch_size):
+        yield from DataRequest.objects.filter(id__in=chunk).values_list(
+            'id', 'fix_profile_id'
+        )
+
+
+def _data_request_ids(data_reqs):
+    """
+    Get the ids of the data requests.
+
+    :param data_reqs: The data requests as a QuerySet or list
+    :returns: The ids
+    :rtype: list
+    """
+    if hasattr(data_reqs, 'values_list'):
+        return list(data_reqs.values_list('id', flat=True))
+    return [data_req.id for data_req in data_reqs]
+
+
+def chunks(items, chunk_size):
+    """
+    Split a list into chunks.
+
+    :param list items: The items
+    :param int chunk_size: The maximum number of items in each chunk
+    :returns: An iterator of lists of items
+    """
+    for index in range(0, len(items), chunk_size):
+        yield items[index:index + chunk_size]
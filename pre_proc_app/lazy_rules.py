@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+lazy_rules.py
+
+Evaluate the pattern-based FixRule objects when the fixes for a data
+request are determined, rather than materialising them in the data
+requests' fix profiles. The rules are loaded once per process and compiled
+into an index keyed by table and variable, so that only the rules that
+could apply to a data request are checked.
+"""
+import logging
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from pre_proc_app.models import FileFix, FixRule
+from pre_proc_app.profiles import stored_fix_names
+from pre_proc_app.rule_engine import ACTION_KEYS, matches, validate_filters
+
+logger = logging.getLogger(__name__)
+
+# The compiled rules, which are loaded when they're first needed
+_compiled_rules = None
+
+
+class CompiledRules(object):
+    """
+    The FixRule objects indexed by the table and variables that they apply
+    to.
+    """
+    def __init__(self, rules):
+        """
+        Initialise the class
+
+        :param list rules: Tuples of each rule's position, name, filters and
+            the names of the fixes that it adds and removes, in the order
+            that the rules are applied
+        """
+        self.num_rules = len(rules)
+        # The rules that apply to specific variables keyed by
+        # (table_id, cmor_name), to whole tables keyed by (table_id, None)
+        # and to any table keyed by None
+        self._index = {}
+        for order, rule in enumerate(rules):
+            filters = rule[2]
+            if 'tables' not in filters:
+                self._index.setdefault(None, []).append((order, rule))
+                continue
+            for table_id, cmor_names in filters['tables'].items():
+                if cmor_names is None:
+                    keys = [(table_id, None)]
+                elif isinstance(cmor_names, list):
+                    keys = [(table_id, cmor_name)
+                            for cmor_name in cmor_names]
+                else:
+                    keys = [(table_id, cmor_names)]
+                for key in keys:
+                    self._index.setdefault(key, []).append((order, rule))
+
+    @classmethod
+    def from_db(cls):
+        """
+        Load and compile all of the rules in the database.
+
+        :returns: The compiled rules
+        :rtype: CompiledRules
+        """
+        rules = []
+        for fix_rule in FixRule.objects.prefetch_related('add', 'remove'):
+            validate_filters(fix_rule.filters, fix_rule.name)
+            rules.append((
+                fix_rule.position, fix_rule.name, fix_rule.filters,
+                [fix.name for fix in fix_rule.add.all()],
+                [fix.name for fix in fix_rule.remove.all()]
+            ))
+        return cls(rules)
+
+    def candidates(self, table_id, cmor_name):
+        """
+        Find the rules that could apply to a variable.
+
+        :param str table_id: The table
+        :param str cmor_name: The variable
+        :returns: The rules in the order that they are applied
+        :rtype: list
+        """
+        candidates = {}
+        for key in [(table_id, cmor_name), (table_id, None), None]:
+            for order, rule in self._index.get(key, []):
+                candidates[order] = rule
+        return [candidates[order] for order in sorted(candidates)]
+
+    def resolve(self, values, fix_names):
+        """
+        Apply the matching rules to a data request's fixes.
+
+        :param dict values: The data request's value of each field in
+            pre_proc_app.rule_engine.FILTER_FIELDS
+        :param list fix_names: The names of the fixes stored for the data
+            request
+        :returns: The names of the fixes to apply
+        :rtype: set
+        """
+        fix_names = set(fix_names)
+        for _position, name, filters, add, remove in self.candidates(
+                values['table_id'], values['cmor_name']):
+            if matches(filters, values):
+                logger.debug('Rule {} applies'.format(name))
+                fix_names |= set(add)
+                fix_names -= set(remove)
+        return fix_names
+
+
+def get_compiled_rules():
+    """
+    Get the compiled rules, loading them from the database if they haven't
+    been loaded yet in this process.
+
+    :returns: The compiled rules
+    :rtype: CompiledRules
+    """
+    global _compiled_rules
+    if _compiled_rules is None:
+        _compiled_rules = CompiledRules.from_db()
+        logger.debug('{} fix rules loaded'.format(_compiled_rules.num_rules))
+    return _compiled_rules
+
+
+def clear_cache(**_kwargs):
+    """
+    Discard the compiled rules so that they're loaded again when next
+    needed. This is connected to the signals sent when a FixRule is changed
+    in this process.
+    """
+    global _compiled_rules
+    _compiled_rules = None
+
+
+def resolve_fixes(data_req):
+    """
+    Determine the names of the fixes for a data request from the fixes
+    stored for it and the rules that match it.
+
+    :param pre_proc_app.models.DataRequest data_req: The data request
+    :returns: The names of the fixes to apply
+    :rtype: set
+    """
+    values = {
+        'institution_id': data_req.institution_id.name,
+        'source_id': data_req.source_id.name,
+        'experiment_id': data_req.experiment_id.name,
+        'variant_label': data_req.variant_label,
+        'table_id': data_req.table_id,
+        'cmor_name': data_req.cmor_name
+    }
+    return get_compiled_rules().resolve(values, stored_fix_names(data_req))
+
+
+def store_rules(rules):
+    """
+    Store rules in the database to be evaluated lazily. A rule with the same
+    name as an existing rule replaces it.
+
+    :param list rules: The rules in the format of
+        pre_proc_app.rule_engine.load_rules()
+    :returns: The number of rules stored
+    :rtype: int
+    :raises pre_proc_app.models.FileFix.DoesNotExist: If a rule uses a fix
+        that isn't in the database
+    """
+    with transaction.atomic():
+        for position, rule in enumerate(rules):
+            name = rule.get('name', 'rule {}'.format(position))
+            fix_rule, _created = FixRule.objects.update_or_create(
+                name=name,
+                defaults={
+                    'position': position,
+                    'filters': {key: value for key, value in rule.items()
+                                if key not in ACTION_KEYS}
+                }
+            )
+            fix_rule.add.set([FileFix.objects.get(name=fix_name)
+                              for fix_name in rule.get('add', [])])
+            fix_rule.remove.set([FileFix.objects.get(name=fix_name)
+                                 for fix_name in rule.get('remove', [])])
+    return len(rules)
+
+
+post_save.connect(clear_cache, sender=FixRule)
+post_delete.connect(clear_cache, sender=FixRule)
+m2m_changed.connect(clear_cache, sender=FixRule.add.through)
+m2m_changed.connect(clear_cache, sender=FixRule.remove.through)
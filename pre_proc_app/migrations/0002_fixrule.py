@@ -0,0 +1,28 @@
+# Generated by Django 3.2.25 on 2026-10-19 02:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pre_proc_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FixRule',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('position', models.IntegerField(default=0, help_text='Rules are applied in order of their position', verbose_name='Position')),
+                ('filters', models.JSONField(default=dict, verbose_name='Filters')),
+                ('add', models.ManyToManyField(blank=True, related_name='added_by_rules', to='pre_proc_app.FileFix')),
+                ('remove', models.ManyToManyField(blank=True, related_name='removed_by_rules', to='pre_proc_app.FileFix')),
+            ],
+            options={
+                'verbose_name': 'Fix Rule',
+                'ordering': ['position', 'name'],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.2.25 on 2026-10-19 02:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pre_proc_app', '0002_fixrule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FixProfile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.TextField(blank=True, unique=True, verbose_name='Sorted fix ids')),
+                ('fixes', models.ManyToManyField(to='pre_proc_app.FileFix')),
+            ],
+            options={
+                'verbose_name': 'Fix Profile',
+            },
+        ),
+        migrations.AddField(
+            model_name='datarequest',
+            name='fix_profile',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='pre_proc_app.fixprofile', verbose_name='Fix Profile'),
+        ),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 3.2.25 on 2026-10-19 04:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# The number of objects created or updated per query
+BATCH_SIZE = 500
+
+
+def _profile_key(fix_ids):
+    """ The key that identifies a set of fixes """
+    return ','.join(str(fix_id) for fix_id in sorted(fix_ids))
+
+
+def fixes_to_profiles(apps, schema_editor):
+    """
+    Give each data request the profile for the fixes in its DataRequest.fixes
+    table, which is then removed.
+    """
+    DataRequest = apps.get_model('pre_proc_app', 'DataRequest')
+    FixProfile = apps.get_model('pre_proc_app', 'FixProfile')
+    fix_ids = {}
+    for data_req_id, fix_id in DataRequest.fixes.through.objects.values_list(
+            'datarequest_id', 'filefix_id'):
+        fix_ids.setdefault(data_req_id, set()).add(fix_id)
+    keys = {data_req_id: _profile_key(ids)
+            for data_req_id, ids in fix_ids.items()}
+
+    profile_ids = dict(FixProfile.objects.values_list('key', 'id'))
+    new_keys = sorted(set(keys.values()) - set(profile_ids))
+    FixProfile.objects.bulk_create([FixProfile(key=key) for key in new_keys],
+                                   batch_size=BATCH_SIZE)
+    profile_ids = dict(FixProfile.objects.values_list('key', 'id'))
+    FixProfile.fixes.through.objects.bulk_create(
+        [FixProfile.fixes.through(fixprofile_id=profile_ids[key],
+                                  filefix_id=int(fix_id))
+         for key in new_keys for fix_id in key.split(',')],
+        batch_size=BATCH_SIZE
+    )
+
+    DataRequest.objects.update(fix_profile=None)
+    by_profile = {}
+    for data_req_id, key in keys.items():
+        by_profile.setdefault(profile_ids[key], []).append(data_req_id)
+    for profile_id, data_req_ids in by_profile.items():
+        data_req_ids.sort()
+        for index in range(0, len(data_req_ids), BATCH_SIZE):
+            DataRequest.objects.filter(
+                id__in=data_req_ids[index:index + BATCH_SIZE]
+            ).update(fix_profile_id=profile_id)
+    FixProfile.objects.filter(datarequest__isnull=True).delete()
+
+
+def profiles_to_fixes(apps, schema_editor):
+    """
+    Copy each data request's fixes from its profile to the DataRequest.fixes
+    table.
+    """
+    DataRequest = apps.get_model('pre_proc_app', 'DataRequest')
+    FixProfile = apps.get_model('pre_proc_app', 'FixProfile')
+    profile_fixes = {}
+    for profile_id, fix_id in FixProfile.fixes.through.objects.values_list(
+            'fixprofile_id', 'filefix_id'):
+        profile_fixes.setdefault(profile_id, []).append(fix_id)
+    through = DataRequest.fixes.through
+    through.objects.bulk_create(
+        [through(datarequest_id=data_req_id, filefix_id=fix_id)
+         for data_req_id, profile_id in DataRequest.objects.filter(
+             fix_profile__isnull=False).values_list('id', 'fix_profile_id')
+         for fix_id in profile_fixes.get(profile_id, [])],
+        batch_size=BATCH_SIZE
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pre_proc_app', '0003_fixprofile'),
+    ]
+
+    operations = [
+        migrations.RunPython(fixes_to_profiles, profiles_to_fixes),
+        migrations.RemoveField(
+            model_name='datarequest',
+            name='fixes',
+        ),
+        migrations.AlterField(
+            model_name='datarequest',
+            name='fix_profile',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='pre_proc_app.fixprofile', verbose_name='Fix Profile'),
+        ),
+    ]
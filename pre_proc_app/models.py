@@ -61,6 +61,24 @@ class Experiment(models.Model):
         verbose_name = 'Experiment'
 
 
+class FixProfile(models.Model):
+    """
+    An interned set of fixes that is shared by all of the data requests that
+    have the same fixes. A profile's fixes never change: a data request
+    whose fixes change is given the profile for its new set of fixes.
+    """
+    key = models.TextField(null=False, blank=True, unique=True,
+                           verbose_name='Sorted fix ids')
+    fixes = models.ManyToManyField(FileFix)
+
+    def __str__(self):
+        return ', '.join(self.fixes.order_by('name').
+                         values_list('name', flat=True))
+
+    class Meta:
+        verbose_name = 'Fix Profile'
+
+
 class DataRequest(models.Model):
     """
     A data request that matches a variable and table with a model and
@@ -84,7 +102,10 @@ class DataRequest(models.Model):
     cmor_name = models.CharField(max_length=50, null=False, blank=False,
                                  verbose_name='CMOR variable name')
 
-    fixes = models.ManyToManyField(FileFix)
+    # The fixes to apply, or None if there aren't any
+    fix_profile = models.ForeignKey(FixProfile, null=True, blank=True,
+                                    verbose_name='Fix Profile',
+                                    on_delete=models.PROTECT)
 
     def __str__(self):
         return '{}.{}.{}.{}.{}.{}'.format(self.institution_id, self.source_id,
@@ -96,3 +117,29 @@ class DataRequest(models.Model):
         verbose_name = 'Data Request'
         unique_together = ('institution_id', 'source_id', 'experiment_id',
                            'variant_label', 'table_id', 'cmor_name')
+
+
+class FixRule(models.Model):
+    """
+    A pattern-based rule that is evaluated when the fixes for a file are
+    determined, so that it also applies to data requests that are added
+    after the rule. The filters are in the same format as the rules in
+    pre_proc_app.rule_engine.
+    """
+    name = models.CharField(max_length=100, null=False, blank=False,
+                            unique=True)
+    position = models.IntegerField(verbose_name='Position', default=0,
+                                   help_text='Rules are applied in order of '
+                                             'their position')
+    filters = models.JSONField(verbose_name='Filters', default=dict)
+    add = models.ManyToManyField(FileFix, blank=True,
+                                 related_name='added_by_rules')
+    remove = models.ManyToManyField(FileFix, blank=True,
+                                    related_name='removed_by_rules')
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        verbose_name = 'Fix Rule'
+        ordering = ['position', 'name']
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+profiles.py
+
+Read the fixes assigned to data requests, which are stored as FixProfile
+objects. Many data requests have identical fixes and so they share a single
+profile, a data request's fixes are found from a single foreign key, and
+the fixes in each profile are only loaded once per process. The profiles
+are written by the helpers in pre_proc_app.bulk.
+"""
+from pre_proc_app.models import FixProfile
+
+# The names of the fixes in each profile keyed by the profile's id
+_profile_fixes = {}
+
+
+def profile_key(fix_ids):
+    """
+    Generate the key that identifies a set of fixes.
+
+    :param fix_ids: The ids of the fixes
+    :returns: The key
+    :rtype: str
+    """
+    return ','.join(str(fix_id) for fix_id in sorted(fix_ids))
+
+
+def stored_fix_names(data_req):
+    """
+    Get the names of the fixes stored for a data request.
+
+    :param pre_proc_app.models.DataRequest data_req: The data request
+    :returns: The names of the fixes
+    :rtype: list
+    """
+    profile_id = data_req.fix_profile_id
+    if profile_id is None:
+        return []
+    if profile_id not in _profile_fixes:
+        _profile_fixes[profile_id] = list(
+            FixProfile.fixes.through.objects.filter(
+                fixprofile_id=profile_id
+            ).values_list('filefix__name', flat=True)
+        )
+    return _profile_fixes[profile_id]
+
+
+def clear_cache():
+    """
+    Discard the loaded profiles. An unused profile is deleted and so its id
+    may be reused by a new profile.
+    """
+    _profile_fixes.clear()
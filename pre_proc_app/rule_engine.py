@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+rule_engine.py
+
+Apply declarative fix rules to the data requests. A rule file is a JSON
+file containing a list of rules, which are applied in order. Each rule
+selects data requests and lists the fixes to add to and remove from them:
+
+    {
+        "name": "fix_request_4205",
+        "institution_id": "EC-Earth-Consortium",
+        "experiment_id": ["highresSST-present"],
+        "variant_label": "r1i1p1f1",
+        "tables": {
+            "Emon": ["hus27", "ta27", "ua27", "va27", "zg27"],
+            "6hrPlev": ["wap4"],
+            "Amon": null
+        },
+        "exclude": [
+            {"source_id": "EC-Earth3P", "experiment_id": "hist-1950"}
+        ],
+        "add": ["AAVarNameToFileName"],
+        "remove": ["VarNameToFileName"]
+    }
+
+The institution_id, source_id, experiment_id, variant_label, table_id and
+cmor_name filters may each be a single value or a list of values and any
+that are omitted match all data requests. `tables` maps each table to its
+variables, with null selecting all of the table's variables. Each entry in
+`exclude` contains the same filters and removes the data requests that
+match all of them.
+
+The whole rule set is evaluated in one pass. The data requests, their fix
+profiles and the profiles' fixes are each loaded with a single query, each
+rule is evaluated with set operations on in-memory indexes of the data
+requests, and the data requests whose fixes changed are then given the
+profiles for their new fixes in batches in a single transaction.
+"""
+import json
+import logging
+
+from pre_proc_app.bulk import BATCH_SIZE, set_fix_ids, stored_fix_ids
+from pre_proc_app.models import DataRequest, FileFix
+
+logger = logging.getLogger(__name__)
+
+# The filters that a rule can contain and the field of DataRequest that
+# each one is looked up in
+FILTER_FIELDS = {
+    'institution_id': 'institution_id__name',
+    'source_id': 'source_id__name',
+    'experiment_id': 'experiment_id__name',
+    'variant_label': 'variant_label',
+    'table_id': 'table_id',
+    'cmor_name': 'cmor_name'
+}
+
+# The keys in a rule that aren't filters
+ACTION_KEYS = {'name', 'description', 'add', 'remove'}
+
+
+def load_rules(rule_path):
+    """
+    Load and validate a rule file.
+
+    :param str rule_path: The full path to the JSON rule file
+    :returns: The rules
+    :rtype: list
+    :raises ValueError: If a rule isn't valid
+    """
+    with open(rule_path) as fh:
+        rules = json.load(fh)
+    for index, rule in enumerate(rules):
+        _validate_rule(rule, index)
+    return rules
+
+
+def _validate_rule(rule, index):
+    """
+    Check that a rule only contains known keys and changes some fixes.
+
+    :param dict rule: The rule
+    :param int index: The rule's position in the rule file
+    :raises ValueError: If the rule isn't valid
+    """
+    name = rule.get('name', 'rule {}'.format(index))
+    validate_filters({key: value for key, value in rule.items()
+                      if key not in ACTION_KEYS}, name)
+    if not rule.get('add') and not rule.get('remove'):
+        raise ValueError('{} neither adds nor removes any fixes'.format(name))
+
+
+def validate_filters(filters, name):
+    """
+    Check that a rule's filters only contain known keys.
+
+    :param dict filters: The rule's filters, tables and exclusions
+    :param str name: The rule's name for any error message
+    :raises ValueError: If the filters aren't valid
+    """
+    unknown = set(filters) - set(FILTER_FIELDS) - {'tables', 'exclude'}
+    if unknown:
+        raise ValueError('{} contains unknown keys: {}'.
+                         format(name, ', '.join(sorted(unknown))))
+    for exclusion in filters.get('exclude', []):
+        unknown = set(exclusion) - set(FILTER_FIELDS)
+        if unknown:
+            raise ValueError('An exclusion in {} contains unknown keys: {}'.
+                             format(name, ', '.join(sorted(unknown))))
+
+
+def matches(filters, values):
+    """
+    Check whether a single data request matches a rule's filters.
+
+    :param dict filters: The rule's filters, tables and exclusions
+    :param dict values: The data request's value of each field in
+        FILTER_FIELDS
+    :returns: True if the data request matches
+    :rtype: bool
+    """
+    if not _matches_all(filters, values):
+        return False
+    if 'tables' in filters:
+        if values['table_id'] not in filters['tables']:
+            return False
+        cmor_names = filters['tables'][values['table_id']]
+        if (cmor_names is not None and
+                values['cmor_name'] not in _as_list(cmor_names)):
+            return False
+    return not any(_matches_all(exclusion, values)
+                   for exclusion in filters.get('exclude', []))
+
+
+def _matches_all(filters, values):
+    """
+    Check whether a data request matches all of the field filters.
+
+    :param dict filters: The values of each field to match
+    :param dict values: The data request's value of each field
+    :returns: True if the data request matches
+    :rtype: bool
+    """
+    return all(values[field] in _as_list(filters[field])
+               for field in FILTER_FIELDS if field in filters)
+
+
+def _as_list(value):
+    """
+    Convert a single value to a list.
+
+    :param value: A value or list of values
+    :returns: The values
+    :rtype: list
+    """
+    return value if isinstance(value, list) else [value]
+
+
+class DataRequestIndex(object):
+    """
+    An in-memory index of the data requests' ids by the value of each of the
+    fields that rules can filter on. This is the only place where the data
+    requests are matched against the fields' values, and
+    pre_proc_app.bitmap_index.BitmapIndex is built on it.
+    """
+    def __init__(self, data_requests=None):
+        """
+        Initialise the class
+
+        :param list data_requests: Tuples of each data request's id and a
+            dictionary of its value of each field in FILTER_FIELDS, in order
+            of id, or None to load all of the data requests with a single
+            query
+        """
+        if data_requests is None:
+            fields = list(FILTER_FIELDS)
+            data_requests = [
+                (row[0], dict(zip(fields, row[1:])))
+                for row in DataRequest.objects.order_by('id').values_list(
+                    'id', *[FILTER_FIELDS[field] for field in fields]
+                )
+            ]
+        self.data_requests = data_requests
+        self.all_ids = set()
+        self._index = {field: {} for field in FILTER_FIELDS}
+        for data_req_id, values in data_requests:
+            self.all_ids.add(data_req_id)
+            for field in FILTER_FIELDS:
+                self._index[field].setdefault(values[field],
+                                              set()).add(data_req_id)
+
+    def lookup(self, field, values):
+        """
+        Find the data requests whose field has any of the values.
+
+        :param str field: The field's name
+        :param values: A value or list of values
+        :returns: The data requests' ids
+        :rtype: set
+        :raises ValueError: If the field isn't one of FILTER_FIELDS
+        """
+        if field not in self._index:
+            raise ValueError('Unknown field {}'.format(field))
+        ids = set()
+        for value in _as_list(values):
+            ids |= self._index[field].get(value, set())
+        return ids
+
+    def select(self, filters):
+        """
+        Find the data requests that match all of the filters.
+
+        :param dict filters: The values of each field to match
+        :returns: The data requests' ids
+        :rtype: set
+        """
+        ids = set(self.all_ids)
+        for field in FILTER_FIELDS:
+            if field in filters:
+                ids &= self.lookup(field, filters[field])
+        return ids
+
+    def evaluate(self, rule):
+        """
+        Find the data requests that a rule applies to.
+
+        :param dict rule: The rule
+        :returns: The data requests' ids
+        :rtype: set
+        """
+        ids = self.select(rule)
+        if 'tables' in rule:
+            table_ids = set()
+            for table_id, cmor_names in rule['tables'].items():
+                table_reqs = self.lookup('table_id', table_id)
+                if cmor_names is not None:
+                    table_reqs &= self.lookup('cmor_name', cmor_names)
+                table_ids |= table_reqs
+            ids &= table_ids
+        for exclusion in rule.get('exclude', []):
+            ids -= self.select(exclusion)
+        return ids
+
+
+def apply_rules(rules, dry_run=False, batch_size=BATCH_SIZE):
+    """
+    Apply the rules in order, so that a later rule can remove a fix that an
+    earlier rule added.
+
+    :param list rules: The rules
+    :param bool dry_run: If True then calculate the changes but don't make
+        them
+    :param int batch_size: The number of objects to create or update per
+        query
+    :returns: A dictionary for each rule of its name, the number of data
+        requests that it matched and the number of fixes that it added and
+        removed, and the total numbers of fixes added and removed
+    :rtype: tuple
+    :raises pre_proc_app.models.FileFix.DoesNotExist: If a rule uses a fix
+        that isn't in the database
+    """
+    fix_names = {name for rule in rules
+                 for name in rule.get('add', []) + rule.get('remove', [])}
+    fix_ids = dict(FileFix.objects.filter(name__in=fix_names).
+                   values_list('name', 'id'))
+    missing = sorted(fix_names - set(fix_ids))
+    if missing:
+        raise FileFix.DoesNotExist('FileFix {} not found'.
+                                   format(', '.join(missing)))
+
+    index = DataRequestIndex()
+    stored = stored_fix_ids()
+    existing = {(data_req_id, fix_id)
+                for data_req_id, ids in stored.items() for fix_id in ids}
+    links = set(existing)
+    results = []
+    for position, rule in enumerate(rules):
+        data_req_ids = index.evaluate(rule)
+        num_links = len(links)
+        for fix_name in rule.get('add', []):
+            links |= {(data_req_id, fix_ids[fix_name])
+                      for data_req_id in data_req_ids}
+        num_added = len(links) - num_links
+        num_links = len(links)
+        for fix_name in rule.get('remove', []):
+            links -= {(data_req_id, fix_ids[fix_name])
+                      for data_req_id in data_req_ids}
+        results.append({
+            'rule': rule.get('name', 'rule {}'.format(position)),
+            'data_requests': len(data_req_ids),
+            'added': num_added,
+            'removed': num_links - len(links)
+        })
+
+    to_add = links - existing
+    to_remove = existing - links
+    logger.debug('{} fixes to add and {} to remove'.format(len(to_add),
+                                                           len(to_remove)))
+    if not dry_run:
+        changed = {data_req_id for data_req_id, _fix_id in to_add | to_remove}
+        new = {data_req_id: set(stored[data_req_id])
+               for data_req_id in changed}
+        for data_req_id, fix_id in to_add:
+            new[data_req_id].add(fix_id)
+        for data_req_id, fix_id in to_remove:
+            new[data_req_id].discard(fix_id)
+        set_fix_ids(new, batch_size)
+    return results, len(to_add), len(to_remove)
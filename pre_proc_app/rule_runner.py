@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+rule_runner.py
+
+Run the fix_request rule scripts' main() functions in a single process and
+a single database transaction so that either all of the rules are applied
+or, if any of them fail, none are.
+"""
+import glob
+import importlib.util
+import logging
+import os
+import time
+
+from django.db import transaction
+
+from pre_proc_app.bulk import count_fix_assignments
+
+logger = logging.getLogger(__name__)
+
+# The pattern that the rule scripts' filenames match
+RULE_PATTERN = 'fix_request_*.py'
+
+
+def discover_rules(rule_dir, names=None):
+    """
+    Find the rule scripts in a directory. They are returned in the order of
+    their filenames, which is the order that they must be run in because
+    some rules remove fixes that earlier rules added.
+
+    :param str rule_dir: The directory containing the rule scripts
+    :param list names: Only return the rules with these names, e.g.
+        `fix_request_2000` or just `2000`
+    :returns: The rules' names and the full paths to their scripts
+    :rtype: list
+    """
+    rules = []
+    for path in sorted(glob.glob(os.path.join(rule_dir, RULE_PATTERN))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        if names and not (name in names or
+                          name[len('fix_request_'):] in names):
+            continue
+        rules.append((name, path))
+    return rules
+
+
+def load_rule(name, path):
+    """
+    Import a rule script as a module.
+
+    :param str name: The rule's name, which is used as the module's name
+    :param str path: The full path to the rule script
+    :returns: The rule's main() function
+    """
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.main
+
+
+def run_rules(rules, dry_run=False):
+    """
+    Run the rules in order inside a single transaction. If a rule raises an
+    exception then the transaction is rolled back and the exception is
+    raised again. A rule that calls sys.exit() raises a RuntimeError.
+
+    :param list rules: The rules' names and main() functions
+    :param bool dry_run: If True then roll the transaction back at the end
+    :returns: A dictionary for each rule of its name, the time that it took
+        in seconds and the net change in the number of fixes assigned to
+        data requests
+    :rtype: list
+    """
+    results = []
+    with transaction.atomic():
+        for name, main in rules:
+            num_before = count_fix_assignments()
+            start_time = time.perf_counter()
+            try:
+                main()
+            except Exception:
+                logger.error('Rule {} failed and so no rules have been '
+                             'applied'.format(name))
+                raise
+            except SystemExit as exc:
+                # Some scripts exit when their checks fail, which must be
+                # reported like any other failure rather than ending the
+                # driver
+                logger.error('Rule {} failed and so no rules have been '
+                             'applied'.format(name))
+                raise RuntimeError('Rule {} exited with status {}'.
+                                   format(name, exc.code)) from exc
+            results.append({
+                'rule': name,
+                'time': time.perf_counter() - start_time,
+                'change': count_fix_assignments() - num_before
+            })
+        if dry_run:
+            transaction.set_rollback(True)
+    return results
+
+
+def format_results(results):
+    """
+    Format the rules' results as a table.
+
+    :param list results: The results from run_rules()
+    :returns: The table
+    :rtype: str
+    """
+    header = '{:<20} {:>10} {:>10}'.format('rule', 'change', 'time (s)')
+    lines = [header, '-' * len(header)]
+    for result in results:
+        lines.append('{:<20} {:>+10} {:>10.2f}'.format(
+            result['rule'], result['change'], result['time']
+        ))
+    lines.append('-' * len(header))
+    lines.append('{:<20} {:>+10} {:>10.2f}'.format(
+        'total', sum(result['change'] for result in results),
+        sum(result['time'] for result in results)
+    ))
+    return '\n'.join(lines)
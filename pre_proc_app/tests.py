@@ -1,6 +1,578 @@
 # -*- coding: utf-8 -*-
 
 
-from django.test import TestCase
+import json
+import os
+import sqlite3
+import sys
+import tempfile
 
-# Create your tests here.
+from django.db import connections
+from django.test import TestCase, override_settings
+
+from pre_proc.esgf_submission import EsgfSubmission
+from pre_proc_site.database import DATABASE_FILENAME, sqlite_database
+from pre_proc_app.bitmap_index import BitmapIndex
+from pre_proc_app.bulk import (add_fixes, bulk_create_ignoring_conflicts,
+                               load_dmt_json, remove_fixes, set_fix_ids)
+from pre_proc_app.lazy_rules import (clear_cache, get_compiled_rules,
+                                     resolve_fixes, store_rules)
+from pre_proc_app.models import (ClimateModel, DataRequest, Experiment,
+                                 FileFix, FixProfile, FixRule, Institution)
+from pre_proc_app.profiles import stored_fix_names
+from pre_proc_app.rule_engine import (DataRequestIndex, apply_rules,
+                                      load_rules)
+from pre_proc_app.rule_runner import discover_rules, load_rule, run_rules
+
+
+class TestBulkCreateIgnoringConflicts(TestCase):
+    """ Test pre_proc_app.bulk.bulk_create_ignoring_conflicts """
+    def test_existing_skipped(self):
+        """ Test that existing objects are skipped and counted """
+        Institution.objects.create(name='MOHC')
+        num_created = bulk_create_ignoring_conflicts(
+            Institution,
+            [Institution(name=name) for name in ['MOHC', 'MPI-M', 'CMCC']],
+            batch_size=2
+        )
+        self.assertEqual(2, num_created)
+        self.assertEqual(3, Institution.objects.count())
+
+
+class TestLoadDmtJson(TestCase):
+    """ Test pre_proc_app.bulk.load_dmt_json """
+    def setUp(self):
+        def data_request(cmor_name, variant_label):
+            return {'__class__': 'DataRequest', '__kwargs__': {
+                'institution_id__name': 'MOHC',
+                'source_id__name': 'HadGEM3-GC31-LM',
+                'experiment_id__name': 'highresSST-present',
+                'table_id': 'Amon', 'cmor_name': cmor_name,
+                'variant_label': variant_label
+            }}
+
+        self.json_dict = {
+            'institution_id': [{'__kwargs__': {'short_name': 'MOHC'}}],
+            'source_id': [{'__kwargs__': {'short_name': 'HadGEM3-GC31-LM'}}],
+            'experiment_id': [{'__kwargs__': {'short_name':
+                                              'highresSST-present'}}],
+            'data_requests': [data_request('tas', 'r1i1p1f1'),
+                              data_request('pr', None),
+                              data_request('pr', None)]
+        }
+
+    def test_load(self):
+        """ Test that the objects are created """
+        counts = load_dmt_json(self.json_dict)
+        self.assertEqual((1, 1), counts['institution_id'])
+        self.assertEqual((2, 3), counts['data_requests'])
+        self.assertEqual(1, DataRequest.objects.filter(
+            cmor_name='pr', variant_label__isnull=True).count())
+
+    def test_reload(self):
+        """
+        Test that loading the JSON again doesn't create any duplicates,
+        including data requests without a variant_label.
+        """
+        load_dmt_json(self.json_dict)
+        counts = load_dmt_json(self.json_dict)
+        self.assertEqual((0, 1), counts['source_id'])
+        self.assertEqual((0, 3), counts['data_requests'])
+        self.assertEqual(2, DataRequest.objects.count())
+
+
+def _make_data_requests():
+    """ Create some data requests and fixes to test with """
+    institution = Institution.objects.create(name='MOHC')
+    climate_model = ClimateModel.objects.create(name='HadGEM3-GC31-LM')
+    experiment = Experiment.objects.create(name='highresSST-present')
+    for cmor_name in ['tas', 'pr', 'psl']:
+        DataRequest.objects.create(
+            institution_id=institution, source_id=climate_model,
+            experiment_id=experiment, variant_label='r1i1p1f1',
+            table_id='Amon', cmor_name=cmor_name
+        )
+    return [FileFix.objects.create(name=name) for name in ['FixA', 'FixB']]
+
+
+def _num_with_fix(fix):
+    """ The number of data requests that have a fix """
+    return DataRequest.objects.filter(fix_profile__fixes=fix).count()
+
+
+class TestFixHelpers(TestCase):
+    """ Test pre_proc_app.bulk.add_fixes and remove_fixes """
+    def setUp(self):
+        self.fixes = _make_data_requests()
+
+    def test_add_fixes(self):
+        """ Test that all fixes are added to all data requests """
+        num_added = add_fixes(DataRequest.objects.all(), self.fixes)
+        self.assertEqual(6, num_added)
+        for data_req in DataRequest.objects.all():
+            self.assertEqual(['FixA', 'FixB'],
+                             sorted(stored_fix_names(data_req)))
+
+    def test_add_fixes_small_batches(self):
+        """ Test that the data requests are split across batches """
+        num_added = add_fixes(list(DataRequest.objects.all()), self.fixes,
+                              batch_size=3)
+        self.assertEqual(6, num_added)
+        self.assertEqual(3, _num_with_fix(self.fixes[1]))
+
+    def test_add_fixes_existing_skipped(self):
+        """ Test that fixes that data requests already have are skipped """
+        add_fixes(DataRequest.objects.filter(cmor_name='tas'),
+                  self.fixes[:1])
+        num_added = add_fixes(DataRequest.objects.all(), self.fixes)
+        self.assertEqual(5, num_added)
+        self.assertEqual(3, _num_with_fix(self.fixes[0]))
+
+    def test_add_no_fixes(self):
+        """ Test that nothing is added when there are no fixes """
+        self.assertEqual(0, add_fixes(DataRequest.objects.all(), []))
+
+    def test_remove_fixes(self):
+        """ Test that only the specified fixes are removed """
+        add_fixes(DataRequest.objects.all(), self.fixes)
+        num_removed = remove_fixes(
+            DataRequest.objects.filter(cmor_name__in=['tas', 'pr']),
+            self.fixes[:1], batch_size=1
+        )
+        self.assertEqual(2, num_removed)
+        self.assertEqual(1, _num_with_fix(self.fixes[0]))
+        self.assertEqual(3, _num_with_fix(self.fixes[1]))
+
+
+class TestRuleRunner(TestCase):
+    """ Test pre_proc_app.rule_runner """
+    def setUp(self):
+        self.fixes = _make_data_requests()
+
+    def _add_rule(self, fix_name):
+        """ A rule that adds a fix to all data requests """
+        def main():
+            add_fixes(DataRequest.objects.all(),
+                      [FileFix.objects.get(name=fix_name)])
+        return main
+
+    def _failing_rule(self):
+        """ A rule that fails """
+        raise FileFix.DoesNotExist('FixC')
+
+    def test_discover_rules(self):
+        """ Test that rules are found in order and can be selected """
+        with tempfile.TemporaryDirectory() as rule_dir:
+            for filename in ['fix_request_6000.py', 'fix_request_2000.py',
+                             'index_fix_requests.py']:
+                open(os.path.join(rule_dir, filename), 'w').close()
+            self.assertEqual(
+                ['fix_request_2000', 'fix_request_6000'],
+                [name for name, _path in discover_rules(rule_dir)]
+            )
+            self.assertEqual(
+                [('fix_request_6000',
+                  os.path.join(rule_dir, 'fix_request_6000.py'))],
+                discover_rules(rule_dir, ['6000'])
+            )
+
+    def test_load_rule(self):
+        """ Test that a rule's main() is loaded """
+        with tempfile.TemporaryDirectory() as rule_dir:
+            path = os.path.join(rule_dir, 'fix_request_2000.py')
+            with open(path, 'w') as fh:
+                fh.write('def main():\n    return 2000\n')
+            self.assertEqual(2000, load_rule('fix_request_2000', path)())
+
+    def test_run_rules(self):
+        """ Test that the rules are applied and their changes counted """
+        results = run_rules([('fix_request_2000', self._add_rule('FixA')),
+                             ('fix_request_2001', self._add_rule('FixA'))])
+        self.assertEqual([3, 0], [result['change'] for result in results])
+        self.assertEqual(3, _num_with_fix(self.fixes[0]))
+
+    def test_failure_rolls_back(self):
+        """ Test that no changes are kept if a rule fails """
+        self.assertRaises(
+            FileFix.DoesNotExist, run_rules,
+            [('fix_request_2000', self._add_rule('FixA')),
+             ('fix_request_2001', self._failing_rule)]
+        )
+        self.assertEqual(0, _num_with_fix(self.fixes[0]))
+
+    def test_exit_rolls_back(self):
+        """ Test that a rule that exits is reported as a failure """
+        def exiting_rule():
+            sys.exit(1)
+
+        with self.assertRaises(RuntimeError) as context:
+            run_rules([('fix_request_2000', self._add_rule('FixA')),
+                       ('fix_request_2001', exiting_rule)])
+        self.assertIn('fix_request_2001', str(context.exception))
+        self.assertEqual(0, _num_with_fix(self.fixes[0]))
+
+    def test_dry_run(self):
+        """ Test that no changes are kept in a dry run """
+        results = run_rules([('fix_request_2000', self._add_rule('FixB'))],
+                            dry_run=True)
+        self.assertEqual(3, results[0]['change'])
+        self.assertEqual(0, _num_with_fix(self.fixes[1]))
+
+
+class TestRuleEngine(TestCase):
+    """ Test pre_proc_app.rule_engine """
+    def setUp(self):
+        self.fixes = _make_data_requests()
+        tas = DataRequest.objects.get(cmor_name='tas')
+        self.tos = DataRequest.objects.create(
+            institution_id=tas.institution_id, source_id=tas.source_id,
+            experiment_id=tas.experiment_id, variant_label='r1i1p1f1',
+            table_id='Omon', cmor_name='tos'
+        )
+
+    def _ids(self, cmor_names):
+        """ The ids of the data requests with the variables """
+        return set(DataRequest.objects.filter(cmor_name__in=cmor_names).
+                   values_list('id', flat=True))
+
+    def test_evaluate_filters(self):
+        """ Test that the filters are combined """
+        index = DataRequestIndex()
+        self.assertEqual(
+            self._ids(['tas', 'pr', 'psl', 'tos']),
+            index.evaluate({'institution_id': ['MOHC', 'NERC'],
+                            'experiment_id': 'highresSST-present'})
+        )
+        self.assertEqual(set(), index.evaluate({'source_id': 'EC-Earth3P'}))
+
+    def test_evaluate_tables(self):
+        """ Test that a table's variables or the whole table are selected """
+        index = DataRequestIndex()
+        self.assertEqual(
+            self._ids(['tas', 'tos']),
+            index.evaluate({'tables': {'Amon': ['tas', 'tos'], 'Omon': None}})
+        )
+
+    def test_evaluate_exclude(self):
+        """ Test that data requests matching all of an exclusion's filters
+        are excluded """
+        index = DataRequestIndex()
+        self.assertEqual(
+            self._ids(['pr', 'psl', 'tos']),
+            index.evaluate({'exclude': [{'table_id': 'Amon',
+                                         'cmor_name': 'tas'},
+                                        {'table_id': 'Omon',
+                                         'cmor_name': 'tas'}]})
+        )
+
+    def test_apply_rules(self):
+        """ Test that the rules are applied in order """
+        rules = [
+            {'name': 'all', 'add': ['FixA', 'FixB']},
+            {'name': 'ocean', 'tables': {'Omon': None}, 'remove': ['FixA']}
+        ]
+        results, num_added, num_removed = apply_rules(rules, batch_size=2)
+        self.assertEqual([{'rule': 'all', 'data_requests': 4, 'added': 8,
+                           'removed': 0},
+                          {'rule': 'ocean', 'data_requests': 1, 'added': 0,
+                           'removed': 1}], results)
+        self.assertEqual((7, 0), (num_added, num_removed))
+        self.tos.refresh_from_db()
+        self.assertEqual(['FixB'], stored_fix_names(self.tos))
+        self.assertEqual(3, _num_with_fix(self.fixes[0]))
+        self.assertEqual(4, _num_with_fix(self.fixes[1]))
+
+    def test_apply_rules_removes_existing(self):
+        """ Test that existing fixes are removed """
+        add_fixes(DataRequest.objects.all(), self.fixes)
+        _results, num_added, num_removed = apply_rules(
+            [{'cmor_name': ['tas', 'pr'], 'remove': ['FixB']}]
+        )
+        self.assertEqual((0, 2), (num_added, num_removed))
+        self.assertEqual(2, _num_with_fix(self.fixes[1]))
+
+    def test_dry_run(self):
+        """ Test that nothing is changed in a dry run """
+        _results, num_added, _num_removed = apply_rules(
+            [{'add': ['FixA']}], dry_run=True
+        )
+        self.assertEqual(4, num_added)
+        self.assertEqual(0, _num_with_fix(self.fixes[0]))
+
+    def test_missing_fix(self):
+        """ Test that an exception is raised for an unknown fix """
+        self.assertRaises(FileFix.DoesNotExist, apply_rules,
+                          [{'add': ['FixA', 'FixC']}])
+
+    def test_load_rules_validates(self):
+        """ Test that unknown keys are rejected """
+        with tempfile.TemporaryDirectory() as rule_dir:
+            rule_path = os.path.join(rule_dir, 'rules.json')
+            with open(rule_path, 'w') as fh:
+                json.dump([{'name': 'bad', 'model': 'HadGEM3-GC31-LM',
+                            'add': ['FixA']}], fh)
+            self.assertRaisesRegex(ValueError, 'bad contains unknown keys: '
+                                               'model', load_rules, rule_path)
+
+
+class TestLazyRules(TestCase):
+    """ Test pre_proc_app.lazy_rules """
+    def setUp(self):
+        self.fixes = _make_data_requests()
+        for name in ['DataSpecsVersionAdd', 'RealmAtmos']:
+            FileFix.objects.create(name=name)
+        clear_cache()
+
+    def test_resolve_fixes(self):
+        """ Test that matching rules are applied in order """
+        add_fixes(DataRequest.objects.filter(cmor_name='tas'),
+                  self.fixes[1:])
+        store_rules([
+            {'name': 'all', 'institution_id': 'MOHC',
+             'add': ['FixA', 'RealmAtmos']},
+            {'name': 'tas', 'tables': {'Amon': ['tas']},
+             'remove': ['RealmAtmos']},
+            {'name': 'other', 'institution_id': 'NERC', 'add': ['FixB']}
+        ])
+        self.assertEqual(
+            {'FixA', 'FixB'},
+            resolve_fixes(DataRequest.objects.get(cmor_name='tas'))
+        )
+        self.assertEqual(
+            {'FixA', 'RealmAtmos'},
+            resolve_fixes(DataRequest.objects.get(cmor_name='pr'))
+        )
+
+    def test_exclude(self):
+        """ Test that excluded data requests aren't matched """
+        store_rules([{'name': 'amip',
+                      'exclude': [{'experiment_id': 'highresSST-present'}],
+                      'add': ['FixA']}])
+        self.assertEqual(
+            set(), resolve_fixes(DataRequest.objects.get(cmor_name='psl'))
+        )
+
+    def test_candidates(self):
+        """ Test that only rules that could apply are checked """
+        store_rules([
+            {'name': 'tas', 'tables': {'Amon': ['tas']}, 'add': ['FixA']},
+            {'name': 'amon', 'tables': {'Amon': None}, 'add': ['FixB']},
+            {'name': 'omon', 'tables': {'Omon': None}, 'add': ['FixB']},
+            {'name': 'all', 'add': ['FixA']}
+        ])
+        self.assertEqual(
+            ['tas', 'amon', 'all'],
+            [rule[1] for rule in
+             get_compiled_rules().candidates('Amon', 'tas')]
+        )
+
+    def test_cache_cleared(self):
+        """ Test that changing a rule clears the compiled rules """
+        store_rules([{'name': 'all', 'add': ['FixA']}])
+        data_req = DataRequest.objects.get(cmor_name='tas')
+        self.assertEqual({'FixA'}, resolve_fixes(data_req))
+        FixRule.objects.get(name='all').add.add(self.fixes[1])
+        self.assertEqual({'FixA', 'FixB'}, resolve_fixes(data_req))
+        FixRule.objects.all().delete()
+        self.assertEqual(set(), resolve_fixes(data_req))
+
+    def test_determine_fixes(self):
+        """ Test that a submission's fixes include those from rules """
+        add_fixes(DataRequest.objects.filter(cmor_name='tas'),
+                  FileFix.objects.filter(name='RealmAtmos'))
+        store_rules([{'name': 'amon', 'tables': {'Amon': None},
+                      'add': ['DataSpecsVersionAdd']}])
+        submission = EsgfSubmission.from_file(
+            '/a/tas_Amon_HadGEM3-GC31-LM_highresSST-present_r1i1p1f1_gn_'
+            '195001-195012.nc'
+        )
+        submission.determine_fixes()
+        self.assertEqual(['DataSpecsVersionAdd', 'RealmAtmos'],
+                         [type(fix).__name__ for fix in submission.fixes])
+
+
+class TestFixProfiles(TestCase):
+    """ Test the fix profiles written by pre_proc_app.bulk """
+    def setUp(self):
+        self.fixes = _make_data_requests()
+        add_fixes(DataRequest.objects.filter(cmor_name__in=['tas', 'pr']),
+                  self.fixes)
+
+    def _profile_ids(self):
+        """ The profile id of each variable's data request """
+        return dict(DataRequest.objects.values_list('cmor_name',
+                                                    'fix_profile_id'))
+
+    def test_shared(self):
+        """ Test that data requests with the same fixes share a profile """
+        profile_ids = self._profile_ids()
+        self.assertEqual(profile_ids['tas'], profile_ids['pr'])
+        self.assertIsNone(profile_ids['psl'])
+        self.assertEqual(1, FixProfile.objects.count())
+        tas = DataRequest.objects.get(cmor_name='tas')
+        self.assertEqual(['FixA', 'FixB'], sorted(stored_fix_names(tas)))
+        self.assertEqual(
+            [], stored_fix_names(DataRequest.objects.get(cmor_name='psl'))
+        )
+
+    def test_changed_fixes(self):
+        """ Test that a data request whose fixes change gets a new profile """
+        previous = self._profile_ids()
+        add_fixes(DataRequest.objects.filter(cmor_name='psl'),
+                  self.fixes[:1])
+        profile_ids = self._profile_ids()
+        self.assertEqual(previous['tas'], profile_ids['tas'])
+        self.assertNotIn(profile_ids['psl'], (None, profile_ids['tas']))
+        psl = DataRequest.objects.get(cmor_name='psl')
+        self.assertEqual(['FixA'], stored_fix_names(psl))
+        self.assertEqual(2, FixProfile.objects.count())
+
+    def test_unused_profiles_deleted(self):
+        """ Test that profiles that are no longer used are deleted """
+        self.assertEqual(4, remove_fixes(DataRequest.objects.all(),
+                                         self.fixes))
+        self.assertEqual(0, FixProfile.objects.count())
+        self.assertEqual({None}, set(self._profile_ids().values()))
+
+    def test_set_fix_ids(self):
+        """ Test that only the data requests whose fixes change are
+        updated """
+        ids = dict(DataRequest.objects.values_list('cmor_name', 'id'))
+        fix_ids = {self.fixes[0].id, self.fixes[1].id}
+        self.assertEqual(1, set_fix_ids({ids['tas']: fix_ids,
+                                         ids['psl']: fix_ids},
+                                        batch_size=1))
+        self.assertEqual(1, len(set(self._profile_ids().values())))
+
+    def test_rules_write_profiles(self):
+        """ Test that apply_rules() gives the data requests new profiles """
+        apply_rules([{'cmor_name': 'tas', 'remove': ['FixB']}])
+        profile_ids = self._profile_ids()
+        self.assertNotEqual(profile_ids['tas'], profile_ids['pr'])
+        self.assertEqual(
+            ['FixA'],
+            stored_fix_names(DataRequest.objects.get(cmor_name='tas'))
+        )
+        self.assertEqual(
+            ['FixA', 'FixB'],
+            sorted(stored_fix_names(DataRequest.objects.get(cmor_name='pr')))
+        )
+
+
+class TestBitmapIndex(TestCase):
+    """ Test pre_proc_app.bitmap_index """
+    def setUp(self):
+        self.fixes = _make_data_requests()
+        add_fixes(DataRequest.objects.filter(cmor_name__in=['tas', 'pr']),
+                  self.fixes[:1])
+        add_fixes(DataRequest.objects.filter(cmor_name='pr'), self.fixes[1:])
+        clear_cache()
+
+    def test_with_and_without(self):
+        """ Test a conjunction and difference of fixes """
+        index = BitmapIndex.from_db()
+        bitmap = index.select(['FixA'], ['FixB'])
+        self.assertEqual(1, index.count(bitmap))
+        self.assertEqual(
+            ['MOHC.HadGEM3-GC31-LM.highresSST-present.r1i1p1f1.Amon.tas'],
+            index.describe(bitmap)
+        )
+        self.assertEqual(
+            list(DataRequest.objects.filter(cmor_name='tas').
+                 values_list('id', flat=True)),
+            index.data_request_ids(bitmap)
+        )
+
+    def test_without_only(self):
+        """ Test that data requests without any fixes are included """
+        index = BitmapIndex.from_db()
+        self.assertEqual(2, index.count(index.select(without_fixes=['FixB'])))
+        self.assertEqual(0, index.count(index.select(['FixC'])))
+
+    def test_filters(self):
+        """ Test that the fields' values are filtered on """
+        index = BitmapIndex.from_db()
+        self.assertEqual(2, index.count(
+            index.select(['FixA'], cmor_name=['pr', 'psl'],
+                         institution_id='MOHC') |
+            index.select(cmor_name='psl')
+        ))
+        self.assertRaises(ValueError, index.field, 'model', 'HadGEM3')
+
+    def test_lazy_rules(self):
+        """ Test that the fixes from rules are included unless disabled """
+        store_rules([{'name': 'psl', 'cmor_name': 'psl', 'add': ['FixB']}])
+        index = BitmapIndex.from_db()
+        self.assertEqual(2, index.count(index.fix('FixB')))
+        index = BitmapIndex.from_db(lazy_rules=False)
+        self.assertEqual(1, index.count(index.fix('FixB')))
+
+
+class TestDatabaseModes(TestCase):
+    """ Test pre_proc_site.database and the connection initialisation """
+    def test_default(self):
+        """ Test the default mode's settings """
+        database, pragmas = sqlite_database('/db')
+        self.assertEqual(os.path.join('/db', DATABASE_FILENAME),
+                         database['NAME'])
+        self.assertEqual({}, pragmas)
+
+    def test_readonly(self):
+        """ Test that the read-only mode can read but not write """
+        with tempfile.TemporaryDirectory() as database_dir:
+            path = os.path.join(database_dir, DATABASE_FILENAME)
+            with sqlite3.connect(path) as conn:
+                conn.execute('CREATE TABLE t (x INTEGER)')
+                conn.execute('INSERT INTO t VALUES (1)')
+            conn.close()
+
+            database, pragmas = sqlite_database(database_dir, 'readonly')
+            self.assertTrue(database['NAME'].endswith('?mode=ro&immutable=1'))
+            self.assertIn('mmap_size', pragmas)
+            conn = sqlite3.connect(database['NAME'], uri=True)
+            try:
+                self.assertEqual([(1,)],
+                                 conn.execute('SELECT x FROM t').fetchall())
+                self.assertRaises(sqlite3.OperationalError, conn.execute,
+                                  'INSERT INTO t VALUES (2)')
+            finally:
+                conn.close()
+
+    def test_wal_readers_not_blocked(self):
+        """ Test that a reader isn't blocked by a write in WAL mode """
+        with tempfile.TemporaryDirectory() as database_dir:
+            database, pragmas = sqlite_database(database_dir, 'wal')
+            connections_ = []
+            try:
+                for _index in range(2):
+                    conn = sqlite3.connect(database['NAME'], timeout=0,
+                                           isolation_level=None)
+                    for name, value in pragmas.items():
+                        conn.execute('PRAGMA {} = {}'.format(name, value))
+                    connections_.append(conn)
+                writer, reader = connections_
+                writer.execute('CREATE TABLE t (x INTEGER)')
+                writer.execute('INSERT INTO t VALUES (1)')
+                writer.execute('BEGIN IMMEDIATE')
+                writer.execute('INSERT INTO t VALUES (2)')
+                self.assertEqual([(1,)],
+                                 reader.execute('SELECT x FROM t').fetchall())
+                writer.execute('COMMIT')
+            finally:
+                for conn in connections_:
+                    conn.close()
+
+    def test_unknown_mode(self):
+        """ Test that an unknown mode is rejected """
+        self.assertRaises(ValueError, sqlite_database, '/db', 'fast')
+
+    @override_settings(SQLITE_PRAGMAS={'cache_size': -1234})
+    def test_pragmas_run(self):
+        """ Test that the pragmas are run on a new connection """
+        connection = connections.create_connection('default')
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA cache_size')
+                self.assertEqual((-1234,), cursor.fetchone())
+        finally:
+            connection.close()
@@ -0,0 +1,89 @@
+"""
+database.py
+
+The sqlite database settings for each of the ways that the database can be
+accessed. The mode is chosen with the DATABASE_MODE environment variable:
+
+default
+    Read-write with sqlite's default settings.
+readonly
+    The database file is opened read-only and immutable, so that any number
+    of processes can share it without copying it or taking any locks. The
+    file mustn't be modified by any process while it's open in this mode.
+wal
+    Read-write with write-ahead logging, so that processes reading the
+    database are never blocked by a process writing to it, e.g. when the
+    data requests are loaded or the fix_request scripts are run while files
+    are being pre-processed. A writer that finds the database locked by
+    another writer waits for up to BUSY_TIMEOUT seconds rather than failing
+    immediately. The database must be on a local file system because WAL
+    uses shared memory. Once a database has been switched to WAL it stays
+    in WAL, and so the log should be checkpointed, e.g. with
+    `PRAGMA wal_checkpoint(TRUNCATE)`, before the file is opened in
+    readonly mode or copied.
+"""
+import os
+from urllib.parse import quote
+
+# The name of the database file in DATABASE_DIR
+DATABASE_FILENAME = 'pre-proc_db.sqlite3'
+
+DATABASE_MODES = ['default', 'readonly', 'wal']
+
+# The PRAGMA statements run on each new connection in read-only mode
+READONLY_PRAGMAS = {
+    # A 64 MiB page cache (negative values are in KiB)
+    'cache_size': -65536,
+    # Read the database through a memory map of up to 1 GiB
+    'mmap_size': 1024 ** 3,
+    'query_only': 1,
+    'temp_store': 'MEMORY'
+}
+
+# The time in seconds that a connection waits for a lock in WAL mode
+BUSY_TIMEOUT = 60
+
+# The PRAGMA statements run on each new connection in WAL mode
+WAL_PRAGMAS = {
+    'journal_mode': 'WAL',
+    # Only sync at checkpoints, which is safe in WAL mode
+    'synchronous': 'NORMAL',
+    'busy_timeout': BUSY_TIMEOUT * 1000,
+    'cache_size': -65536
+}
+
+
+def sqlite_database(database_dir, mode='default'):
+    """
+    Generate the settings for the sqlite database in a directory.
+
+    :param str database_dir: The directory containing the database file
+    :param str mode: The access mode, one of DATABASE_MODES
+    :returns: The settings for DATABASES['default'] and the PRAGMA
+        statements to run on each new connection
+    :rtype: tuple
+    :raises ValueError: If the mode isn't known
+    """
+    database_path = os.path.join(database_dir, DATABASE_FILENAME)
+    if mode == 'default':
+        return {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': database_path,
+        }, {}
+    elif mode == 'readonly':
+        # Django opens sqlite databases with URI filenames enabled
+        return {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': 'file:{}?mode=ro&immutable=1'.format(
+                quote(os.path.abspath(database_path))
+            ),
+        }, dict(READONLY_PRAGMAS)
+    elif mode == 'wal':
+        return {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': database_path,
+            'OPTIONS': {'timeout': BUSY_TIMEOUT},
+        }, dict(WAL_PRAGMAS)
+    else:
+        raise ValueError('DATABASE_MODE must be one of: {}'.
+                         format(', '.join(DATABASE_MODES)))
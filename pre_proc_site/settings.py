@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/1.11/ref/settings/
 
 import os
 
+from pre_proc_site.database import sqlite_database
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -76,11 +78,14 @@ WSGI_APPLICATION = 'pre_proc_site.wsgi.application'
 
 DATABASE_DIR = os.environ['DATABASE_DIR']
 
+# The way that the database is accessed, which is described in
+# pre_proc_site/database.py
+DATABASE_MODE = os.environ.get('DATABASE_MODE', 'default')
+
+_database, SQLITE_PRAGMAS = sqlite_database(DATABASE_DIR, DATABASE_MODE)
+
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(DATABASE_DIR, 'pre-proc_db.sqlite3'),
-    }
+    'default': _database
 }
 
 